@@ -3,6 +3,9 @@
 from datetime import date
 from typing import Any
 
+_SUMMARY_COLUMNS = ("quantity", "revenue", "price", "promo_flag")
+_PRODUCT_COLUMNS = ("product_id", "category_id", "quantity", "revenue", "price", "promo_flag")
+
 
 async def get_sales_summary(
     forecasting_repo: Any,
@@ -11,7 +14,7 @@ async def get_sales_summary(
     to_date: date,
 ) -> dict[str, Any]:
     """Fetch aggregated sales summary from DB for a single product."""
-    df = await forecasting_repo.get_sales_df(from_date, to_date, [product_id])
+    df = await forecasting_repo.get_sales_df(from_date, to_date, [product_id], columns=_SUMMARY_COLUMNS)
     if df.empty:
         return {
             "product_id": product_id,
@@ -46,7 +49,7 @@ async def get_category_sales(
     to_date: date,
 ) -> dict[str, Any]:
     """Fetch sales aggregated by product for a given category. Returns per-product breakdown sorted by revenue."""
-    df = await forecasting_repo.get_sales_df(from_date, to_date)
+    df = await forecasting_repo.get_sales_df(from_date, to_date, columns=_PRODUCT_COLUMNS)
     if df.empty:
         return {"category": category, "products": [], "message": "No data found"}
 
@@ -95,7 +98,7 @@ async def get_all_products_summary(
     to_date: date,
 ) -> dict[str, Any]:
     """Fetch sales summary for ALL products grouped by product and category. Use for comparisons, rankings, trends across all products."""
-    df = await forecasting_repo.get_sales_df(from_date, to_date)
+    df = await forecasting_repo.get_sales_df(from_date, to_date, columns=_PRODUCT_COLUMNS)
     if df.empty:
         return {"products": [], "message": "No data found"}
 
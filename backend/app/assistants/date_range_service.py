@@ -91,8 +91,8 @@ class DateRangeDeterministicService:
                 },
             )
 
-        data_signature = await forecasting_repo.get_sales_dataset_signature()
-        data_fingerprint = _build_data_fingerprint(data_signature)
+        data_version = await forecasting_repo.get_sales_dataset_fingerprint()
+        data_fingerprint = _build_data_fingerprint(data_version)
         cache_key = _cache_key(locale, data_fingerprint)
         cached = await _get_cache(cache_key)
         if trace:
@@ -101,7 +101,7 @@ class DateRangeDeterministicService:
                 {
                     "intent": _INTENT_NAME,
                     "data_fingerprint": data_fingerprint,
-                    "data_signature": data_signature,
+                    "data_version": data_version,
                     "cache_hit": bool(cached),
                 },
             )
@@ -212,9 +212,9 @@ def _render_answer(locale: str, date_from: str, date_to: str) -> str:
     return f"Sales data covers the period from {date_from} to {date_to}."
 
 
-def _build_data_fingerprint(data_signature: dict[str, Any]) -> str:
+def _build_data_fingerprint(data_version: dict[str, Any]) -> str:
     canonical = json.dumps(
-        data_signature,
+        data_version,
         sort_keys=True,
         ensure_ascii=False,
         separators=(",", ":"),
@@ -87,8 +87,8 @@ class DeterministicFactsService:
                 },
             )
 
-        data_signature = await forecasting_repo.get_sales_dataset_signature()
-        data_fingerprint = _build_data_fingerprint(data_signature)
+        data_version = await forecasting_repo.get_sales_dataset_fingerprint()
+        data_fingerprint = _build_data_fingerprint(data_version)
         cached = await deterministic_facts_cache.get(spec_hash, data_fingerprint)
         if trace:
             trace.add_step(
@@ -96,7 +96,7 @@ class DeterministicFactsService:
                 {
                     "spec_hash": spec_hash,
                     "data_fingerprint": data_fingerprint,
-                    "data_signature": data_signature,
+                    "data_version": data_version,
                     "cache_hit": bool(cached),
                 },
             )
@@ -167,9 +167,9 @@ class DeterministicFactsService:
         )
 
 
-def _build_data_fingerprint(data_signature: dict[str, Any]) -> str:
+def _build_data_fingerprint(data_version: dict[str, Any]) -> str:
     canonical = json.dumps(
-        data_signature,
+        data_version,
         sort_keys=True,
         ensure_ascii=False,
         separators=(",", ":"),
@@ -986,8 +986,8 @@ async def _answer_top_products_ranking(
     metric = str(parameters.get("metric") or "quantity")
     direction = str(parameters.get("direction") or "desc")
 
-    data_signature = await forecasting_repo.get_sales_dataset_signature()
-    data_fingerprint = _build_data_fingerprint(data_signature)
+    data_version = await forecasting_repo.get_sales_dataset_fingerprint()
+    data_fingerprint = _build_data_fingerprint(data_version)
     cache_key = _deterministic_intent_cache_key(
         intent_id=intent_id,
         locale=locale,
@@ -1001,7 +1001,7 @@ async def _answer_top_products_ranking(
             {
                 "intent_id": intent_id,
                 "data_fingerprint": data_fingerprint,
-                "data_signature": data_signature,
+                "data_version": data_version,
                 "parameters": parameters,
                 "cache_hit": bool(cached),
             },
@@ -1128,9 +1128,9 @@ async def _set_deterministic_intent_cache(key: str, payload: dict[str, Any]) ->
     await client.set(key, json.dumps(payload, ensure_ascii=False))
 
 
-def _build_data_fingerprint(data_signature: dict[str, Any]) -> str:
+def _build_data_fingerprint(data_version: dict[str, Any]) -> str:
     canonical = json.dumps(
-        data_signature,
+        data_version,
         sort_keys=True,
         ensure_ascii=False,
         separators=(",", ":"),
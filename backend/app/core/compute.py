@@ -0,0 +1,255 @@
+"""
+Shared compute executor for CPU-bound work.
+
+Two pools per worker process, created lazily and reused across requests:
+    - threads   (COMPUTE_THREAD_WORKERS)   LightGBM predict/train and NumPy,
+                                           which release the GIL
+    - processes (COMPUTE_PROCESS_WORKERS)  pandas-heavy pure-Python work that
+                                           would otherwise hold the GIL; spawn
+                                           context, so fn and its arguments
+                                           must be picklable
+0 workers means one per CPU core. With COMPUTE_PROCESS_ENABLED=false process
+work runs on the thread pool instead, and map_in_processes runs inline (its
+callers are usually compute threads already, and waiting on their own pool
+could deadlock it).
+
+Both pools record in-flight/queued counts and wait/execution times, exposed
+via compute.metrics() on /api/metrics.
+
+Cancelling a coroutine that awaits run_thread/run_process does not stop the
+pool work itself. Code that must know when that work is over (job locks)
+wraps it in compute.tracking(), which collects the pool futures submitted
+from that context.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Pool futures submitted under compute.tracking() in this context, until they finish
+_tracked: ContextVar[set[Future] | None] = ContextVar("compute_tracked", default=None)
+
+
+def resolve_workers(requested: int) -> int:
+    """Return the worker count to use; 0 or negative means one per CPU core."""
+    if requested and requested > 0:
+        return requested
+    return os.cpu_count() or 1
+
+
+def split_evenly(items: list[T], n_chunks: int) -> list[list[T]]:
+    """Split items into at most n_chunks contiguous, non-empty chunks of near-equal size."""
+    n_chunks = max(1, min(n_chunks, len(items)))
+    size, extra = divmod(len(items), n_chunks)
+    chunks: list[list[T]] = []
+    start = 0
+    for i in range(n_chunks):
+        end = start + size + (1 if i < extra else 0)
+        if end > start:
+            chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+def _timed_call(fn: Callable[..., R], args: tuple, kwargs: dict) -> tuple[R, float, float]:
+    """Run fn and return (result, started, finished) wall-clock times; top-level so it pickles."""
+    started = time.time()
+    result = fn(*args, **kwargs)
+    return result, started, time.time()
+
+
+class _PoolStats:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_seconds_total = 0.0
+        self.exec_seconds_total = 0.0
+        self.exec_seconds_max = 0.0
+
+    def snapshot(self, workers: int) -> dict[str, Any]:
+        return {
+            "workers": workers,
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "exec_seconds_total": round(self.exec_seconds_total, 6),
+            "exec_seconds_max": round(self.exec_seconds_max, 6),
+            "exec_seconds_mean": round(self.exec_seconds_total / self.completed, 6) if self.completed else 0.0,
+        }
+
+
+class ComputeExecutor:
+    """Per-process thread + process pools with queue depth and timing metrics."""
+
+    def __init__(self) -> None:
+        self._thread_pool: ThreadPoolExecutor | None = None
+        self._process_pool: ProcessPoolExecutor | None = None
+        self._stats = {"thread": _PoolStats(), "process": _PoolStats()}
+        self._lock = threading.Lock()
+
+    def _workers(self, kind: str) -> int:
+        if kind == "thread":
+            return resolve_workers(settings.compute_thread_workers)
+        return resolve_workers(settings.compute_process_workers)
+
+    def _pool(self, kind: str) -> tuple[str, Executor]:
+        with self._lock:
+            if kind == "process" and settings.compute_process_enabled:
+                if self._process_pool is None:
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=self._workers("process"),
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                return "process", self._process_pool
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self._workers("thread"), thread_name_prefix="compute"
+                )
+            return "thread", self._thread_pool
+
+    def _begin(self, kind: str) -> None:
+        with self._lock:
+            self._stats[kind].in_flight += 1
+
+    def _end(self, kind: str, submitted: float, timed: tuple | None) -> None:
+        with self._lock:
+            stats = self._stats[kind]
+            stats.in_flight -= 1
+            if timed is None:
+                stats.failed += 1
+                return
+            _, started, finished = timed
+            stats.completed += 1
+            stats.wait_seconds_total += max(0.0, started - submitted)
+            stats.exec_seconds_total += finished - started
+            stats.exec_seconds_max = max(stats.exec_seconds_max, finished - started)
+
+    def _reset_broken(self, pool: Executor) -> None:
+        with self._lock:
+            if self._process_pool is pool:
+                logger.warning("Compute process pool broke — it will be recreated on next use.")
+                self._process_pool = None
+
+    async def _run(self, kind: str, fn: Callable[..., R], args: tuple, kwargs: dict) -> R:
+        kind, pool = self._pool(kind)
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        self._begin(kind)
+        timed = None
+        try:
+            future = pool.submit(_timed_call, fn, args, kwargs)
+            tracked = _tracked.get()
+            if tracked is not None:
+                tracked.add(future)
+                future.add_done_callback(tracked.discard)
+            timed = await asyncio.wrap_future(future, loop=loop)
+            return timed[0]
+        except BrokenProcessPool:
+            self._reset_broken(pool)
+            raise
+        finally:
+            self._end(kind, submitted, timed)
+
+    @contextmanager
+    def tracking(self) -> Iterator[set[Future]]:
+        """
+        Collect the pool futures submitted from this context while it is open.
+
+        Tasks created inside inherit the context, so their work is collected
+        too. Finished futures drop out of the set on their own.
+        """
+        token = _tracked.set(set())
+        try:
+            yield _tracked.get()
+        finally:
+            _tracked.reset(token)
+
+    @staticmethod
+    async def settle(futures: set[Future]) -> None:
+        """Wait until every collected future has finished, whatever its outcome."""
+        pending = [asyncio.wrap_future(f) for f in list(futures) if not f.done()]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def run_thread(self, fn: Callable[..., R], *args: Any, **kwargs: Any) -> R:
+        """Run fn on the shared thread pool (GIL-releasing work)."""
+        return await self._run("thread", fn, args, kwargs)
+
+    async def run_process(self, fn: Callable[..., R], *args: Any, **kwargs: Any) -> R:
+        """Run a picklable top-level fn on the shared process pool (GIL-bound work)."""
+        return await self._run("process", fn, args, kwargs)
+
+    def map_in_processes(self, fn: Callable[[T], R], items: Iterable[T], max_workers: int) -> list[R]:
+        """
+        Blocking ordered map of a top-level (picklable) fn over the process pool.
+
+        Runs inline when only one worker or one item is involved, so small jobs
+        do not pay inter-process overhead, and when the process pool is
+        disabled. Safe to call from any thread, including compute threads.
+        """
+        items = list(items)
+        if not settings.compute_process_enabled or min(resolve_workers(max_workers), len(items)) <= 1:
+            return [fn(item) for item in items]
+        kind, pool = self._pool("process")
+        submitted = time.time()
+        futures = []
+        for item in items:
+            self._begin(kind)
+            futures.append(pool.submit(_timed_call, fn, (item,), {}))
+        results: list[R] = []
+        done = 0
+        try:
+            for future in futures:
+                timed = None
+                try:
+                    timed = future.result()
+                finally:
+                    done += 1
+                    self._end(kind, submitted, timed)
+                results.append(timed[0])
+        except BrokenProcessPool:
+            self._reset_broken(pool)
+            raise
+        finally:
+            for future in futures[done:]:
+                future.cancel()
+                self._end(kind, submitted, None)
+        return results
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "thread": self._stats["thread"].snapshot(self._workers("thread")),
+                "process": self._stats["process"].snapshot(self._workers("process")),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pools = [p for p in (self._thread_pool, self._process_pool) if p is not None]
+            self._thread_pool = self._process_pool = None
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Module-level singleton — one pair of pools per worker process
+compute = ComputeExecutor()
@@ -9,7 +9,7 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from app.db.base import Base
 from app.assistants.db_models import AssistantTrace, AssistantTraceStep
-from app.forecasting.db_models import ModelArtifact, SalesFact
+from app.forecasting.db_models import MaterializedForecastPoint, ModelArtifact, SalesFact
 from app.settings import settings
 
 config = context.config
@@ -0,0 +1,36 @@
+"""forecast points
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "forecast_points",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("model_version", sa.String(length=32), nullable=False),
+        sa.Column("product_id", sa.String(length=64), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("predicted_quantity", sa.Float(), nullable=False),
+        sa.Column("predicted_revenue", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("model_version", "product_id", "date", name="uq_forecast_points_version_product_date"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("forecast_points")
@@ -0,0 +1,37 @@
+"""model artifact lineage
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "model_artifacts",
+        sa.Column("training_mode", sa.String(length=16), nullable=False, server_default="full"),
+    )
+    op.add_column("model_artifacts", sa.Column("parent_version", sa.String(length=32), nullable=True))
+    op.add_column("model_artifacts", sa.Column("base_version", sa.String(length=32), nullable=True))
+    op.add_column(
+        "model_artifacts",
+        sa.Column("refresh_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("model_artifacts", "refresh_count")
+    op.drop_column("model_artifacts", "base_version")
+    op.drop_column("model_artifacts", "parent_version")
+    op.drop_column("model_artifacts", "training_mode")
@@ -0,0 +1,111 @@
+"""sales_facts composite index and date partitioning
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17
+
+On PostgreSQL sales_facts becomes a table range-partitioned by date, with one
+partition per calendar year and a DEFAULT partition for rows outside them.
+The primary key becomes (id, date) because a partitioned table's unique
+constraints must include the partition key; id keeps its sequence.
+
+Indexes (created on the parent, inherited by every partition):
+    ix_sales_facts_product_date  btree (product_id, date) for the per-product
+                                 range scans and "latest date" lookups
+    ix_sales_facts_date_brin     BRIN (date) for date-only ranges over the
+                                 append-only history
+They replace the single-column product_id and date indexes from 001.
+
+Other dialects only get the composite index.
+"""
+
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COLUMNS = "id, product_id, date, quantity, revenue, price, promo_flag, category_id, source, created_at"
+_COLUMN_DDL = """
+    id integer NOT NULL DEFAULT nextval('sales_facts_id_seq'::regclass),
+    product_id varchar(64) NOT NULL,
+    date date NOT NULL,
+    quantity double precision NOT NULL,
+    revenue double precision NOT NULL,
+    price double precision,
+    promo_flag boolean NOT NULL DEFAULT false,
+    category_id varchar(64),
+    source varchar(64),
+    created_at timestamp without time zone"""
+
+
+def partitioned_sales_ddl(first_year: int, last_year: int) -> list[str]:
+    """Statements creating the partitioned sales_facts with yearly partitions [first_year, last_year]."""
+    statements = [
+        f"CREATE TABLE sales_facts ({_COLUMN_DDL},\n"
+        "    CONSTRAINT sales_facts_pkey PRIMARY KEY (id, date)\n"
+        ") PARTITION BY RANGE (date)"
+    ]
+    for year in range(first_year, last_year + 1):
+        statements.append(
+            f"CREATE TABLE sales_facts_y{year} PARTITION OF sales_facts "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        )
+    statements += [
+        "CREATE TABLE sales_facts_default PARTITION OF sales_facts DEFAULT",
+        "CREATE INDEX ix_sales_facts_product_date ON sales_facts (product_id, date)",
+        "CREATE INDEX ix_sales_facts_date_brin ON sales_facts USING brin (date)",
+    ]
+    return statements
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.create_index("ix_sales_facts_product_date", "sales_facts", ["product_id", "date"])
+        return
+
+    first, last = bind.execute(
+        sa.text(
+            "SELECT EXTRACT(YEAR FROM min(date))::int, EXTRACT(YEAR FROM max(date))::int FROM sales_facts"
+        )
+    ).one()
+    this_year = date.today().year
+    first = first or this_year
+    # One spare year ahead so appends keep landing in a yearly partition
+    last = max(last or this_year, this_year) + 1
+
+    op.execute("ALTER TABLE sales_facts RENAME TO sales_facts_unpartitioned")
+    op.execute("ALTER TABLE sales_facts_unpartitioned RENAME CONSTRAINT sales_facts_pkey TO sales_facts_unpartitioned_pkey")
+    op.drop_index("ix_sales_facts_product_id", table_name="sales_facts_unpartitioned")
+    op.drop_index("ix_sales_facts_date", table_name="sales_facts_unpartitioned")
+    for statement in partitioned_sales_ddl(first, last):
+        op.execute(statement)
+    op.execute(f"INSERT INTO sales_facts ({_COLUMNS}) SELECT {_COLUMNS} FROM sales_facts_unpartitioned")
+    op.execute("ALTER SEQUENCE sales_facts_id_seq OWNED BY sales_facts.id")
+    op.execute("DROP TABLE sales_facts_unpartitioned")
+    op.execute("ANALYZE sales_facts")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.drop_index("ix_sales_facts_product_date", table_name="sales_facts")
+        return
+
+    op.execute("ALTER TABLE sales_facts RENAME TO sales_facts_partitioned")
+    op.execute("ALTER TABLE sales_facts_partitioned RENAME CONSTRAINT sales_facts_pkey TO sales_facts_partitioned_pkey")
+    op.execute("ALTER INDEX ix_sales_facts_product_date RENAME TO ix_sales_facts_partitioned_product_date")
+    op.execute("ALTER INDEX ix_sales_facts_date_brin RENAME TO ix_sales_facts_partitioned_date_brin")
+    op.execute(f"CREATE TABLE sales_facts ({_COLUMN_DDL},\n    CONSTRAINT sales_facts_pkey PRIMARY KEY (id)\n)")
+    op.execute(f"INSERT INTO sales_facts ({_COLUMNS}) SELECT {_COLUMNS} FROM sales_facts_partitioned")
+    op.execute("ALTER SEQUENCE sales_facts_id_seq OWNED BY sales_facts.id")
+    op.execute("DROP TABLE sales_facts_partitioned")
+    op.create_index("ix_sales_facts_product_id", "sales_facts", ["product_id"])
+    op.create_index("ix_sales_facts_date", "sales_facts", ["date"])
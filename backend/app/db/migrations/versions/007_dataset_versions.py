@@ -0,0 +1,61 @@
+"""dataset_versions change counter
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17
+
+dataset_versions holds one monotonically increasing version per dataset. On
+PostgreSQL a statement-level trigger bumps the sales_facts row after every
+INSERT, UPDATE, DELETE or TRUNCATE, so any writer (app, psql, ETL) changes
+the fingerprint the assistants and caches key on.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dataset_versions",
+        sa.Column("name", sa.String(64), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="1"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    op.execute("INSERT INTO dataset_versions (name, version) VALUES ('sales_facts', 1)")
+
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(
+        """
+        CREATE FUNCTION bump_dataset_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO dataset_versions (name, version, updated_at)
+            VALUES (TG_TABLE_NAME, 1, now() AT TIME ZONE 'utc')
+            ON CONFLICT (name) DO UPDATE
+                SET version = dataset_versions.version + 1, updated_at = EXCLUDED.updated_at;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER sales_facts_dataset_version "
+        "AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON sales_facts "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_dataset_version()"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS sales_facts_dataset_version ON sales_facts")
+        op.execute("DROP FUNCTION IF EXISTS bump_dataset_version()")
+    op.drop_table("dataset_versions")
@@ -0,0 +1,129 @@
+"""product_sales_rollup per-product aggregates
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17
+
+product_sales_rollup holds one row of additive aggregates per product. On
+PostgreSQL statement-level triggers with transition tables recompute only the
+products touched by each INSERT/UPDATE/DELETE (TRUNCATE empties it) and stamp
+dataset_versions['product_sales_rollup'] with the sales_facts version. They
+are named to fire after sales_facts_dataset_version, which also serializes
+concurrent writers on the version row.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_AGGREGATE = """
+    SELECT product_id,
+           count(*),
+           count(DISTINCT date),
+           coalesce(sum(quantity), 0),
+           coalesce(sum(revenue), 0),
+           count(*) FILTER (WHERE promo_flag),
+           coalesce(sum(quantity) FILTER (WHERE promo_flag), 0),
+           count(*) FILTER (WHERE NOT promo_flag),
+           coalesce(sum(quantity) FILTER (WHERE NOT promo_flag), 0),
+           count(price),
+           coalesce(sum(price), 0),
+           min(date),
+           max(date)
+    FROM sales_facts
+"""
+_COLUMNS = (
+    "product_id, row_count, day_count, quantity_sum, revenue_sum, promo_row_count, promo_quantity_sum, "
+    "non_promo_row_count, non_promo_quantity_sum, price_row_count, price_sum, first_date, last_date"
+)
+_STAMP = """
+    INSERT INTO dataset_versions (name, version, updated_at)
+    SELECT 'product_sales_rollup', version, updated_at FROM dataset_versions WHERE name = 'sales_facts'
+    ON CONFLICT (name) DO UPDATE SET version = EXCLUDED.version, updated_at = EXCLUDED.updated_at
+"""
+_TRIGGERS = {
+    "sales_facts_rollup_insert": ("INSERT", "NEW TABLE AS new_rows"),
+    "sales_facts_rollup_update": ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    "sales_facts_rollup_delete": ("DELETE", "OLD TABLE AS old_rows"),
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "product_sales_rollup",
+        sa.Column("product_id", sa.String(64), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("day_count", sa.Integer(), nullable=False),
+        sa.Column("quantity_sum", sa.Float(), nullable=False),
+        sa.Column("revenue_sum", sa.Float(), nullable=False),
+        sa.Column("promo_row_count", sa.Integer(), nullable=False),
+        sa.Column("promo_quantity_sum", sa.Float(), nullable=False),
+        sa.Column("non_promo_row_count", sa.Integer(), nullable=False),
+        sa.Column("non_promo_quantity_sum", sa.Float(), nullable=False),
+        sa.Column("price_row_count", sa.Integer(), nullable=False),
+        sa.Column("price_sum", sa.Float(), nullable=False),
+        sa.Column("first_date", sa.Date(), nullable=False),
+        sa.Column("last_date", sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint("product_id"),
+    )
+    if op.get_bind().dialect.name != "postgresql":
+        # Built on first read by ForecastingRepository (stamp lags sales_facts)
+        return
+
+    op.execute(f"INSERT INTO product_sales_rollup ({_COLUMNS}) {_AGGREGATE} GROUP BY product_id")
+    op.execute(_STAMP)
+    op.execute(
+        f"""
+        CREATE FUNCTION refresh_product_sales_rollup() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            changed text[];
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                DELETE FROM product_sales_rollup;
+            ELSE
+                IF TG_OP = 'INSERT' THEN
+                    SELECT array_agg(DISTINCT product_id) INTO changed FROM new_rows;
+                ELSIF TG_OP = 'DELETE' THEN
+                    SELECT array_agg(DISTINCT product_id) INTO changed FROM old_rows;
+                ELSE
+                    SELECT array_agg(product_id) INTO changed FROM (
+                        SELECT product_id FROM new_rows UNION SELECT product_id FROM old_rows
+                    ) touched;
+                END IF;
+                IF changed IS NOT NULL THEN
+                    DELETE FROM product_sales_rollup WHERE product_id = ANY(changed);
+                    INSERT INTO product_sales_rollup ({_COLUMNS})
+                    {_AGGREGATE} WHERE product_id = ANY(changed) GROUP BY product_id;
+                END IF;
+            END IF;
+            {_STAMP};
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    for name, (event, referencing) in _TRIGGERS.items():
+        op.execute(
+            f"CREATE TRIGGER {name} AFTER {event} ON sales_facts REFERENCING {referencing} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION refresh_product_sales_rollup()"
+        )
+    op.execute(
+        "CREATE TRIGGER sales_facts_rollup_truncate AFTER TRUNCATE ON sales_facts "
+        "FOR EACH STATEMENT EXECUTE FUNCTION refresh_product_sales_rollup()"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        for name in [*_TRIGGERS, "sales_facts_rollup_truncate"]:
+            op.execute(f"DROP TRIGGER IF EXISTS {name} ON sales_facts")
+        op.execute("DROP FUNCTION IF EXISTS refresh_product_sales_rollup()")
+    op.execute("DELETE FROM dataset_versions WHERE name = 'product_sales_rollup'")
+    op.drop_table("product_sales_rollup")
@@ -0,0 +1,127 @@
+"""sales_period_rollups weekly/monthly aggregates
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+
+sales_period_rollups holds per-product weekly (ISO, Monday start) and monthly
+sums for /api/data/historical. Daily reads keep using sales_facts, which is
+already one row per product and day.
+
+On PostgreSQL statement-level triggers recompute only the (product, period)
+buckets touched by each write and stamp dataset_versions['sales_period_rollups']
+with the sales_facts version; until the stamp matches, readers aggregate
+sales_facts on the fly.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_RESOLUTIONS = ("week", "month")
+_COLUMNS = "resolution, product_id, period_start, quantity, revenue, price_sum, price_count, row_count"
+_STAMP = """
+    INSERT INTO dataset_versions (name, version, updated_at)
+    SELECT 'sales_period_rollups', version, updated_at FROM dataset_versions WHERE name = 'sales_facts'
+    ON CONFLICT (name) DO UPDATE SET version = EXCLUDED.version, updated_at = EXCLUDED.updated_at
+"""
+_TRIGGERS = {
+    "sales_facts_period_rollup_insert": ("INSERT", "NEW TABLE AS new_rows"),
+    "sales_facts_period_rollup_update": ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    "sales_facts_period_rollup_delete": ("DELETE", "OLD TABLE AS old_rows"),
+}
+
+
+def _aggregate(resolution: str) -> str:
+    return f"""
+        SELECT '{resolution}', product_id, date_trunc('{resolution}', date::timestamp)::date,
+               sum(quantity), sum(revenue), coalesce(sum(price), 0), count(price), count(*)
+        FROM sales_facts
+    """
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sales_period_rollups",
+        sa.Column("resolution", sa.String(8), nullable=False),
+        sa.Column("product_id", sa.String(64), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("quantity", sa.Float(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+        sa.Column("price_sum", sa.Float(), nullable=False),
+        sa.Column("price_count", sa.Integer(), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("resolution", "product_id", "period_start"),
+    )
+    op.create_index("ix_sales_period_rollups_period", "sales_period_rollups", ["resolution", "period_start"])
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    for resolution in _RESOLUTIONS:
+        op.execute(f"INSERT INTO sales_period_rollups ({_COLUMNS}) {_aggregate(resolution)} GROUP BY 1, 2, 3")
+    op.execute(_STAMP)
+
+    recompute = "\n".join(
+        f"""
+                DELETE FROM sales_period_rollups r USING (
+                    SELECT DISTINCT product_id, date_trunc('{resolution}', date::timestamp)::date AS period_start FROM sales_rollup_touched
+                ) k
+                WHERE r.resolution = '{resolution}' AND r.product_id = k.product_id AND r.period_start = k.period_start;
+                INSERT INTO sales_period_rollups ({_COLUMNS})
+                {_aggregate(resolution)}
+                WHERE product_id IN (SELECT product_id FROM sales_rollup_touched)
+                  AND (product_id, date_trunc('{resolution}', date::timestamp)::date) IN (
+                    SELECT product_id, date_trunc('{resolution}', date::timestamp)::date FROM sales_rollup_touched
+                )
+                GROUP BY 1, 2, 3;"""
+        for resolution in _RESOLUTIONS
+    )
+    op.execute(
+        f"""
+        CREATE FUNCTION refresh_sales_period_rollups() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                DELETE FROM sales_period_rollups;
+            ELSE
+                CREATE TEMP TABLE sales_rollup_touched (product_id varchar(64), date date) ON COMMIT DROP;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO sales_rollup_touched SELECT DISTINCT product_id, date FROM new_rows;
+                END IF;
+                IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                    INSERT INTO sales_rollup_touched SELECT DISTINCT product_id, date FROM old_rows;
+                END IF;
+                {recompute}
+                DROP TABLE sales_rollup_touched;
+            END IF;
+            {_STAMP};
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    for name, (event, referencing) in _TRIGGERS.items():
+        op.execute(
+            f"CREATE TRIGGER {name} AFTER {event} ON sales_facts REFERENCING {referencing} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION refresh_sales_period_rollups()"
+        )
+    op.execute(
+        "CREATE TRIGGER sales_facts_period_rollup_truncate AFTER TRUNCATE ON sales_facts "
+        "FOR EACH STATEMENT EXECUTE FUNCTION refresh_sales_period_rollups()"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        for name in [*_TRIGGERS, "sales_facts_period_rollup_truncate"]:
+            op.execute(f"DROP TRIGGER IF EXISTS {name} ON sales_facts")
+        op.execute("DROP FUNCTION IF EXISTS refresh_sales_period_rollups()")
+    op.execute("DELETE FROM dataset_versions WHERE name = 'sales_period_rollups'")
+    op.drop_index("ix_sales_period_rollups_period", table_name="sales_period_rollups")
+    op.drop_table("sales_period_rollups")
@@ -0,0 +1,46 @@
+"""product_feature_state online inference features
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17
+
+product_feature_state keeps each product's trailing daily quantities/prices
+and running window sums so forecast and pricing requests can build feature
+rows without reading sales_facts. The application updates it on ingest and
+stamps dataset_versions['product_feature_state']; readers fall back to raw
+history while the stamp lags.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "product_feature_state",
+        sa.Column("product_id", sa.String(64), nullable=False),
+        sa.Column("last_date", sa.Date(), nullable=False),
+        sa.Column("quantities", sa.LargeBinary(), nullable=False),
+        sa.Column("prices", sa.LargeBinary(), nullable=False),
+        sa.Column("quantity_sum_7", sa.Float(), nullable=False),
+        sa.Column("quantity_sum_30", sa.Float(), nullable=False),
+        sa.Column("price_sum_30", sa.Float(), nullable=False),
+        sa.Column("last_price", sa.Float(), nullable=True),
+        sa.Column("promo_flag", sa.Boolean(), nullable=False),
+        sa.Column("category_id", sa.String(64), nullable=True),
+        sa.Column("observed_days", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("product_id"),
+    )
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM dataset_versions WHERE name = 'product_feature_state'")
+    op.drop_table("product_feature_state")
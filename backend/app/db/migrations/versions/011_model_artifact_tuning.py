@@ -0,0 +1,31 @@
+"""model artifact hyperparameters and cross-validation metrics
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17
+
+params holds the LightGBM configuration of artifacts trained with non-default
+parameters (tuned models and their incremental refreshes); cv_metrics the
+search summary and per-fold validation metrics of tuned models.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("model_artifacts", sa.Column("params", sa.JSON(), nullable=True))
+    op.add_column("model_artifacts", sa.Column("cv_metrics", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("model_artifacts", "cv_metrics")
+    op.drop_column("model_artifacts", "params")
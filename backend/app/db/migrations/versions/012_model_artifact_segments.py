@@ -0,0 +1,29 @@
+"""model artifact segments for per-category model groups
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-17
+
+A "segmented" artifact is a model group: file_path points at a JSON manifest
+listing one booster per category plus a global fallback, and segments holds
+each segment's product count, training rows and evaluation metrics.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "012"
+down_revision: Union[str, None] = "011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("model_artifacts", sa.Column("segments", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("model_artifacts", "segments")
@@ -1,5 +1,7 @@
 """Backtesting module - time-based split and rolling backtest."""
 
+import time
+from dataclasses import dataclass
 from datetime import date, timedelta
 from typing import Callable
 
@@ -7,10 +9,15 @@ import numpy as np
 import pandas as pd
 
 from app.forecasting.features import engineer_features
+from app.core.compute import compute, resolve_workers, split_evenly
 from app.forecasting.training import DATE_COL, ENTITY_COL, FEATURE_COLS, TARGET_COL
 
 # Rows of lookback context per product needed for lag_30 to be valid
 _LAG_CONTEXT_ROWS = 30
+# Fewest per-window context evaluations worth shipping to a worker process
+_MIN_WINDOWS_PER_WORKER = 8
+# Fewest products per worker process for portfolio backtests
+_MIN_PRODUCTS_PER_WORKER = 4
 
 
 def time_based_split(
@@ -105,6 +112,67 @@ def _compute_test_features_with_context(
     return test_feat
 
 
+@dataclass
+class _Window:
+    """One rolling test window: full-range feature rows, or raw slices for the context path."""
+
+    actuals: np.ndarray
+    test_dates: list
+    feature_rows: np.ndarray | None = None
+    train_df: pd.DataFrame | None = None
+    test_df: pd.DataFrame | None = None
+
+
+def _full_range_features(
+    df: pd.DataFrame,
+    entity_col: str,
+) -> tuple[pd.DataFrame | None, np.ndarray]:
+    """
+    Engineer features once over df (sorted by entity/date, RangeIndex).
+
+    Returns the feature frame and a per-row flag marking rows whose features
+    are exactly what _compute_test_features_with_context would produce from
+    a full _LAG_CONTEXT_ROWS context: the row has a real lag_30 and no price
+    in the row or its context needed median filling. Duplicate (entity, date)
+    rows make context selection order-dependent, so they disable the flag.
+    """
+    grouped = df.groupby(entity_col, sort=False)
+    has_lag = grouped[TARGET_COL].shift(_LAG_CONTEXT_ROWS).notna().to_numpy()
+    if not has_lag.any() or df.duplicated([entity_col, DATE_COL]).any():
+        return None, np.zeros(len(df), dtype=bool)
+
+    # Any missing price among the row and its _LAG_CONTEXT_ROWS predecessors
+    position = grouped.cumcount().to_numpy()
+    nan_seen = np.concatenate([[0], np.cumsum(df["price"].isna().to_numpy())])
+    rows = np.arange(len(df))
+    window_start = rows - np.minimum(position, _LAG_CONTEXT_ROWS)
+    recent_nan_price = (nan_seen[rows + 1] - nan_seen[window_start]) > 0
+
+    features = engineer_features(df)
+    for col in FEATURE_COLS:
+        if col not in features.columns:
+            features[col] = 0
+    features[FEATURE_COLS] = features[FEATURE_COLS].fillna(0)
+    return features, has_lag & ~recent_nan_price
+
+
+def _predict_context_windows(
+    task: tuple[Callable[[pd.DataFrame], np.ndarray], list[tuple[pd.DataFrame, pd.DataFrame]]],
+) -> list[np.ndarray | None]:
+    """
+    Per-window context features + predict for a chunk of (train_df, test_df) windows.
+
+    Top-level so it can run in a worker process; None marks a window whose
+    context features came out empty.
+    """
+    predict_fn, windows = task
+    preds: list[np.ndarray | None] = []
+    for train_df, test_df in windows:
+        test_feat = _compute_test_features_with_context(train_df, test_df)
+        preds.append(np.asarray(predict_fn(test_feat)) if not test_feat.empty else None)
+    return preds
+
+
 def rolling_backtest(
     df: pd.DataFrame,
     date_col: str,
@@ -112,24 +180,43 @@ def rolling_backtest(
     predict_fn: Callable[[pd.DataFrame], np.ndarray],
     train_window_days: int = 90,
     step_days: int = 7,
+    max_workers: int = 1,
 ) -> tuple[np.ndarray, np.ndarray, list[date]]:
     """
     Rolling backtest: evaluate predict_fn on successive sliding test windows.
 
-    Features for each test window are computed with context from the train window
-    (see _compute_test_features_with_context) to prevent lag/rolling leakage.
+    Features are engineered once over the whole frame, each window's test
+    rows are taken by index and all such windows are scored in one predict.
+    A window falls back to per-window features with train context (see
+    _compute_test_features_with_context) only when its context is shorter
+    than _LAG_CONTEXT_ROWS or touches missing prices, so results match
+    evaluating every window on its own context.
+
+    With max_workers > 1 the fallback windows are split across a process
+    pool; in that case predict_fn must be picklable (e.g. functools.partial).
 
     Returns (actuals, predictions, test_dates).
     """
-    df = df.sort_values([entity_col, date_col])
+    df = df.sort_values([entity_col, date_col]).reset_index(drop=True)
     dates = sorted(df[date_col].unique())
     if len(dates) < train_window_days + step_days:
         return np.array([]), np.array([]), []
 
-    actuals: list[float] = []
-    preds: list[float] = []
-    test_dates: list[date] = []
-
+    features, precomputable = _full_range_features(df, entity_col)
+    date_values = df[date_col].to_numpy()
+    day = pd.to_datetime(df[date_col]).to_numpy()
+    by_date = np.argsort(day, kind="stable")
+    sorted_day = day[by_date]
+    product_codes, products = pd.factorize(df[entity_col])
+    position = df.groupby(entity_col, sort=False).cumcount().to_numpy()
+    target = df[TARGET_COL].to_numpy()
+
+    def rows_between(start, end) -> np.ndarray:
+        lo = np.searchsorted(sorted_day, pd.Timestamp(start).to_datetime64(), side="left")
+        hi = np.searchsorted(sorted_day, pd.Timestamp(end).to_datetime64(), side="right")
+        return np.sort(by_date[lo:hi])
+
+    windows: list[_Window] = []
     for i in range(train_window_days, len(dates) - step_days + 1, step_days):
         train_end = dates[i - 1]
         # Always anchor test exactly 1 day after train_end so there is no gap
@@ -137,33 +224,113 @@ def rolling_backtest(
         test_start = train_end + timedelta(days=1)
         test_end = dates[min(i + step_days - 1, len(dates) - 1)]
 
-        train_df = df[
-            (df[date_col] >= dates[i - train_window_days]) & (df[date_col] <= train_end)
-        ]
-        test_df = df[(df[date_col] >= test_start) & (df[date_col] <= test_end)]
-
-        if train_df.empty or test_df.empty:
+        train_rows = rows_between(dates[i - train_window_days], train_end)
+        test_rows = rows_between(test_start, test_end)
+        if len(train_rows) == 0 or len(test_rows) == 0:
             continue
 
-        assert train_df[date_col].max() < test_df[date_col].min(), (
+        assert day[train_rows].max() < day[test_rows].min(), (
             f"Rolling split leakage at window i={i}: "
-            f"train_end={train_df[date_col].max()}  test_start={test_df[date_col].min()}"
+            f"train_end={date_values[train_rows].max()}  test_start={date_values[test_rows].min()}"
         )
 
-        test_feat = _compute_test_features_with_context(train_df, test_df)
-        if test_feat.empty:
-            continue
+        window = _Window(
+            actuals=target[test_rows],
+            test_dates=pd.unique(date_values[test_rows]).tolist(),
+        )
 
-        pred = predict_fn(test_feat)
-        actual = test_df[TARGET_COL].values
+        # Full-range features match the context path only if every test product's
+        # train window holds its whole _LAG_CONTEXT_ROWS context (or all its history).
+        test_codes = product_codes[test_rows]
+        first = np.r_[True, test_codes[1:] != test_codes[:-1]]
+        context_rows = np.bincount(product_codes[train_rows], minlength=len(products))[test_codes[first]]
+        needed = np.minimum(position[test_rows[first]], _LAG_CONTEXT_ROWS)
+        if features is not None and precomputable[test_rows].all() and (context_rows >= needed).all():
+            window.feature_rows = test_rows
+        else:
+            window.train_df = df.iloc[train_rows]
+            window.test_df = df.iloc[test_rows]
+        windows.append(window)
+
+    window_preds: list[np.ndarray | None] = [None] * len(windows)
+
+    # Windows served from full-range features: one stacked predict.
+    precomputed = [k for k, w in enumerate(windows) if w.feature_rows is not None]
+    if precomputed:
+        rows = [windows[k].feature_rows for k in precomputed]
+        stacked = np.asarray(predict_fn(features.loc[np.concatenate(rows)]))
+        offsets = np.cumsum([len(r) for r in rows])[:-1]
+        for k, part in zip(precomputed, np.split(stacked, offsets)):
+            window_preds[k] = part
+
+    # Windows that need their own context features: spread across the pool.
+    with_context = [k for k, w in enumerate(windows) if w.feature_rows is None]
+    if with_context:
+        # Small jobs stay inline: process start-up would outweigh the work.
+        workers = max(1, min(resolve_workers(max_workers), len(with_context) // _MIN_WINDOWS_PER_WORKER))
+        chunks = split_evenly(with_context, workers)
+        results = compute.map_in_processes(
+            _predict_context_windows,
+            [(predict_fn, [(windows[k].train_df, windows[k].test_df) for k in chunk]) for chunk in chunks],
+            workers,
+        )
+        for chunk, chunk_preds in zip(chunks, results):
+            for k, pred in zip(chunk, chunk_preds):
+                window_preds[k] = pred
 
-        actuals.extend(actual.tolist())
+    actuals: list[float] = []
+    preds: list[float] = []
+    test_dates: list[date] = []
+    for window, pred in zip(windows, window_preds):
+        if pred is None:
+            continue
+        actuals.extend(window.actuals.tolist())
         preds.extend(pred.tolist())
-        test_dates.extend(test_df[date_col].unique().tolist())
+        test_dates.extend(window.test_dates)
 
     return np.array(actuals), np.array(preds), test_dates
 
 
+def _backtest_product_chunk(
+    task: tuple[Callable[[pd.DataFrame], np.ndarray], list[tuple[str, pd.DataFrame]], int, int],
+) -> list[tuple[str, np.ndarray, np.ndarray, list[date], float]]:
+    """Run rolling_backtest for a chunk of products; top-level so it can run in a worker."""
+    predict_fn, products, train_window_days, step_days = task
+    results = []
+    for product_id, df in products:
+        started = time.perf_counter()
+        actuals, preds, test_dates = rolling_backtest(
+            df, DATE_COL, ENTITY_COL, predict_fn, train_window_days, step_days
+        )
+        results.append((product_id, actuals, preds, test_dates, time.perf_counter() - started))
+    return results
+
+
+def rolling_backtest_many(
+    frames: dict[str, pd.DataFrame],
+    predict_fn: Callable[[pd.DataFrame], np.ndarray],
+    train_window_days: int = 90,
+    step_days: int = 7,
+    max_workers: int = 1,
+) -> dict[str, tuple[np.ndarray, np.ndarray, list[date], float]]:
+    """
+    rolling_backtest for many products, each on its own history and date grid.
+
+    Products are split across a process pool (predict_fn must then be
+    picklable). Returns {product_id: (actuals, predictions, test_dates, seconds)};
+    each entry equals a standalone rolling_backtest call for that product.
+    """
+    items = list(frames.items())
+    workers = max(1, min(resolve_workers(max_workers), len(items) // _MIN_PRODUCTS_PER_WORKER))
+    chunks = split_evenly(items, workers)
+    results = compute.map_in_processes(
+        _backtest_product_chunk,
+        [(predict_fn, chunk, train_window_days, step_days) for chunk in chunks],
+        workers,
+    )
+    return {pid: (actuals, preds, dates, secs) for chunk in results for pid, actuals, preds, dates, secs in chunk}
+
+
 def backtest_metrics(actuals: np.ndarray, preds: np.ndarray) -> dict[str, float]:
     """
     Compute MAE, RMSE, and MAPE.
@@ -0,0 +1,83 @@
+"""
+Redis cache for portfolio backtest results.
+
+Cache key schema:
+    forecasting:backtest:{model_version}:{sha256(params + sales dataset version)}
+
+Results are only valid for one model and one state of sales_facts, so both
+the active model version and the sales dataset version are part of the key;
+a retrain or data change simply stops hitting old entries, which then expire
+after BACKTEST_CACHE_TTL seconds (0 = no expiry).
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(model_version: str, params: dict[str, Any], data_version: dict[str, Any]) -> str:
+    payload = json.dumps({"params": params, "data": data_version}, sort_keys=True, default=str)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"forecasting:backtest:{model_version}:{digest}"
+
+
+class BacktestCache:
+    """Thin async wrapper around redis-py; every failure degrades to a cache miss."""
+
+    def __init__(self) -> None:
+        self._redis: Any = None
+
+    async def _get_client(self) -> Any:
+        if self._redis is not None:
+            return self._redis
+        try:
+            import redis.asyncio as aioredis  # type: ignore
+
+            self._redis = aioredis.from_url(
+                settings.redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+            )
+            await self._redis.ping()
+        except Exception as exc:
+            logger.warning("Backtest cache Redis unavailable (%s) — caching disabled.", exc)
+            self._redis = None
+        return self._redis
+
+    async def get(self, key: str) -> dict | None:
+        client = await self._get_client()
+        if client is None:
+            return None
+        try:
+            raw = await client.get(key)
+            return json.loads(raw) if raw else None
+        except Exception as exc:
+            logger.warning("Backtest cache GET error: %s", exc)
+            return None
+
+    async def set(self, key: str, payload: dict) -> None:
+        client = await self._get_client()
+        if client is None:
+            return
+        ttl = settings.backtest_cache_ttl
+        try:
+            await client.set(key, json.dumps(payload), **({"ex": ttl} if ttl > 0 else {}))
+        except Exception as exc:
+            logger.warning("Backtest cache SET error: %s", exc)
+
+    async def close(self) -> None:
+        if self._redis:
+            try:
+                await self._redis.aclose()
+            except Exception:
+                pass
+            self._redis = None
+
+
+# Module-level singleton — one connection pool shared across requests
+backtest_cache = BacktestCache()
@@ -0,0 +1,45 @@
+"""
+Short-lived in-process cache of dataset fingerprints.
+
+The fingerprint itself is a single-row lookup in dataset_versions; caching it
+for DATASET_VERSION_CACHE_SECONDS spares even that round trip on bursts of
+assistant questions. Writes made through this process invalidate it at once;
+writes from other processes become visible once the entry expires.
+"""
+
+import time
+from typing import Any
+
+from app.settings import settings
+
+SALES_DATASET = "sales_facts"
+# Stamp rows: the sales_facts version each derived table was last brought up to
+PRODUCT_ROLLUP = "product_sales_rollup"
+PERIOD_ROLLUPS = "sales_period_rollups"
+FEATURE_STATE = "product_feature_state"
+
+
+class DatasetVersionCache:
+    def __init__(self) -> None:
+        self._entries: dict[str, tuple[float, dict[str, Any]]] = {}
+
+    def get(self, name: str) -> dict[str, Any] | None:
+        entry = self._entries.get(name)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def put(self, name: str, fingerprint: dict[str, Any]) -> None:
+        ttl = settings.dataset_version_cache_seconds
+        if ttl > 0:
+            self._entries[name] = (time.monotonic() + ttl, fingerprint)
+
+    def invalidate(self, name: str | None = None) -> None:
+        if name is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(name, None)
+
+
+# Module-level singleton
+dataset_version_cache = DatasetVersionCache()
@@ -2,20 +2,41 @@
 
 from datetime import date, datetime
 
-from sqlalchemy import Boolean, Date, DateTime, Float, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Date,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    JSON,
+    LargeBinary,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
 
 
 class SalesFact(Base):
-    """Historical sales facts for forecasting."""
+    """
+    Historical sales facts for forecasting.
+
+    On PostgreSQL the table is range-partitioned by date with primary key
+    (id, date) — see migration 006; id stays unique through its sequence.
+    """
 
     __tablename__ = "sales_facts"
+    __table_args__ = (
+        Index("ix_sales_facts_product_date", "product_id", "date"),
+        Index("ix_sales_facts_date_brin", "date", postgresql_using="brin"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    product_id: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
-    date: Mapped[date] = mapped_column(Date, nullable=False, index=True)
+    product_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    date: Mapped[date] = mapped_column(Date, nullable=False)
     quantity: Mapped[float] = mapped_column(Float, nullable=False)
     revenue: Mapped[float] = mapped_column(Float, nullable=False)
     price: Mapped[float | None] = mapped_column(Float, nullable=True)
@@ -39,4 +60,115 @@ class ModelArtifact(Base):
     mae: Mapped[float | None] = mapped_column(Float, nullable=True)
     mape: Mapped[float | None] = mapped_column(Float, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    # Lineage: "full", "tuned" and "segmented" retrains start a chain (base_version
+    # = own version); "incremental" refreshes continue boosting parent_version on new rows.
+    training_mode: Mapped[str] = mapped_column(String(16), default="full", server_default="full", nullable=False)
+    parent_version: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    base_version: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    refresh_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    # LightGBM parameters when not the defaults ("tuned" models and their
+    # refreshes) and the search summary / per-fold CV metrics of tuned models
+    params: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    cv_metrics: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # "segmented" model groups: file_path is the group manifest; per-segment
+    # products, rows and metrics keyed by category ("__global__" = fallback)
+    segments: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class MaterializedForecastPoint(Base):
+    """Precomputed forecast point for one model version, product and date."""
+
+    __tablename__ = "forecast_points"
+    __table_args__ = (
+        UniqueConstraint("model_version", "product_id", "date", name="uq_forecast_points_version_product_date"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    model_version: Mapped[str] = mapped_column(String(32), nullable=False)
+    product_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    date: Mapped[date] = mapped_column(Date, nullable=False)
+    predicted_quantity: Mapped[float] = mapped_column(Float, nullable=False)
+    predicted_revenue: Mapped[float | None] = mapped_column(Float, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class DatasetVersion(Base):
+    """
+    Monotonic change counter per dataset, used as an O(1) cache fingerprint.
+
+    On PostgreSQL a statement-level trigger bumps the sales_facts row on every
+    INSERT/UPDATE/DELETE/TRUNCATE (migration 007); elsewhere the app write paths bump it.
+    """
+
+    __tablename__ = "dataset_versions"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=1, server_default="1")
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ProductSalesRollup(Base):
+    """
+    Per-product aggregates over all of sales_facts for ranking and facts queries.
+
+    Kept as additive sums and counts so averages and promo lift are derived at
+    read time. On PostgreSQL triggers recompute the rows of products touched by
+    each write (migration 008); the repository rebuilds the table whenever its
+    stamp in dataset_versions lags the sales_facts version.
+    """
+
+    __tablename__ = "product_sales_rollup"
+
+    product_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    day_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    quantity_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    revenue_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    promo_row_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    promo_quantity_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    non_promo_row_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    non_promo_quantity_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    price_row_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    price_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    first_date: Mapped[date] = mapped_column(Date, nullable=False)
+    last_date: Mapped[date] = mapped_column(Date, nullable=False)
+
+
+class SalesPeriodRollup(Base):
+    """Per-product weekly/monthly sums for chart reads; maintained by triggers (migration 009)."""
+
+    __tablename__ = "sales_period_rollups"
+    __table_args__ = (Index("ix_sales_period_rollups_period", "resolution", "period_start"),)
+
+    resolution: Mapped[str] = mapped_column(String(8), primary_key=True)
+    product_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    period_start: Mapped[date] = mapped_column(Date, primary_key=True)
+    quantity: Mapped[float] = mapped_column(Float, nullable=False)
+    revenue: Mapped[float] = mapped_column(Float, nullable=False)
+    price_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    price_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class ProductFeatureState(Base):
+    """
+    Online feature state per product (see app.forecasting.feature_state).
+
+    quantities/prices hold the trailing days oldest first as little-endian
+    float64; the sums are the running window totals ending at last_date.
+    """
+
+    __tablename__ = "product_feature_state"
+
+    product_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    last_date: Mapped[date] = mapped_column(Date, nullable=False)
+    quantities: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    prices: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    quantity_sum_7: Mapped[float] = mapped_column(Float, nullable=False)
+    quantity_sum_30: Mapped[float] = mapped_column(Float, nullable=False)
+    price_sum_30: Mapped[float] = mapped_column(Float, nullable=False)
+    last_price: Mapped[float | None] = mapped_column(Float, nullable=True)
+    promo_flag: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    category_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    observed_days: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -0,0 +1,60 @@
+"""
+Largest-Triangle-Three-Buckets downsampling for chart series.
+
+LTTB keeps the first and last point and, for every bucket in between, the
+point forming the largest triangle with the previously kept point and the
+average of the next bucket. Peaks and troughs survive, unlike with plain
+striding or averaging.
+"""
+
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the n_out points LTTB keeps from (x, y); all indices when n_out >= len(x)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # n_out - 2 buckets over the interior points 1 .. n-2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = end, edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def downsample_series(rows: list[dict], max_points: int, value_field: str = "quantity") -> list[dict]:
+    """
+    Cap every product_id series in rows (ordered by date) at max_points with LTTB.
+
+    value_field drives point selection; kept rows carry all their fields.
+    Output keeps the input order.
+    """
+    positions: dict[str, list[int]] = defaultdict(list)
+    for i, row in enumerate(rows):
+        positions[row["product_id"]].append(i)
+    keep: list[int] = []
+    for idx in positions.values():
+        if len(idx) <= max_points:
+            keep.extend(idx)
+            continue
+        x = np.array([date.fromisoformat(rows[i]["date"]).toordinal() for i in idx], dtype=np.float64)
+        y = np.array([rows[i][value_field] for i in idx], dtype=np.float64)
+        keep.extend(idx[j] for j in lttb_indices(x, y, max_points))
+    return [rows[i] for i in sorted(keep)]
@@ -0,0 +1,276 @@
+"""
+Online per-product feature state.
+
+Each product keeps ring buffers of its trailing daily quantities and prices
+on a dense calendar (gaps forward-filled, as densify_history does), running
+window sums and its last price/promo/category. That is everything the lag,
+rolling and price features of the next days depend on, so inference can
+build feature rows without reading sales_facts.
+
+States are persisted in product_feature_state (migration 010). Ingest that
+appends rows pushes them onto the touched products' states (apply_sales);
+products whose history was rewritten are rebuilt from their trailing raw
+history (build_feature_states).
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from app.forecasting.features import LAGS, PRICE_WINDOW, ROLLING_WINDOWS
+
+# Longest lookback of any feature plus the current day
+WINDOW = max(*LAGS, *ROLLING_WINDOWS, PRICE_WINDOW) + 1
+# History read when rebuilding states; matches the inference fetch windows
+REBUILD_LOOKBACK_DAYS = 90
+
+_BUFFER_DTYPE = np.dtype("<f8")
+
+
+def _empty_buffer() -> np.ndarray:
+    return np.full(WINDOW, np.nan, dtype=np.float64)
+
+
+@dataclass
+class FeatureState:
+    """Trailing WINDOW days of one product's history as ring buffers."""
+
+    product_id: str
+    last_date: date | None = None
+    quantities: np.ndarray = field(default_factory=_empty_buffer)
+    prices: np.ndarray = field(default_factory=_empty_buffer)
+    head: int = 0  # next slot to write
+    size: int = 0
+    quantity_sums: dict[int, float] = field(default_factory=lambda: {w: 0.0 for w in ROLLING_WINDOWS})
+    price_sum: float = 0.0  # over the last PRICE_WINDOW days with a known price
+    last_price: float = float("nan")
+    promo_flag: bool = False
+    category_id: str | None = None
+    # Trailing run of days that had a sales row with a price, capped at WINDOW
+    observed_days: int = 0
+
+    def push(
+        self,
+        day: date,
+        quantity: float,
+        price: float | None,
+        promo_flag: bool = False,
+        category_id: str | None = None,
+    ) -> None:
+        """Append one day's sales; missing days since last_date are forward-filled."""
+        if self.last_date is not None:
+            if day <= self.last_date:
+                raise ValueError(f"{self.product_id}: {day} is not after {self.last_date}")
+            gap = (day - self.last_date).days - 1
+            if gap:
+                last_quantity = self._back(0, self.quantities)
+                for _ in range(min(gap, WINDOW)):
+                    self._append(last_quantity, self.last_price)
+                self.observed_days = 0
+        priced = price is not None and not np.isnan(price)
+        if priced and np.isnan(self.last_price) and self.size:
+            # Leading days without a price take the first known one (bfill)
+            self.prices[np.isnan(self.prices)] = price
+            self.price_sum = float(np.sum(self.window(self.prices)[-PRICE_WINDOW:]))
+        if priced:
+            self.last_price = float(price)
+        self._append(float(quantity), self.last_price)
+        self.observed_days = min(self.observed_days + 1, WINDOW) if priced else 0
+        self.last_date = day
+        self.promo_flag = bool(promo_flag)
+        if category_id is not None:
+            self.category_id = category_id
+
+    def _back(self, k: int, buffer: np.ndarray) -> float:
+        """Value k days before last_date."""
+        return float(buffer[(self.head - 1 - k) % WINDOW])
+
+    def _append(self, quantity: float, price: float) -> None:
+        for w in self.quantity_sums:
+            if self.size >= w:
+                self.quantity_sums[w] -= self._back(w - 1, self.quantities)
+            self.quantity_sums[w] += quantity
+        if self.size >= PRICE_WINDOW and not np.isnan(self._back(PRICE_WINDOW - 1, self.prices)):
+            self.price_sum -= self._back(PRICE_WINDOW - 1, self.prices)
+        if not np.isnan(price):
+            self.price_sum += price
+        self.quantities[self.head] = quantity
+        self.prices[self.head] = price
+        self.head = (self.head + 1) % WINDOW
+        self.size = min(self.size + 1, WINDOW)
+
+    def window(self, buffer: np.ndarray) -> np.ndarray:
+        """Buffer contents oldest first."""
+        if self.size < WINDOW:
+            return buffer[: self.size].copy()
+        return np.roll(buffer, -self.head)
+
+    def dense_history(self, to_date: date) -> pd.DataFrame:
+        """
+        Buffered days followed by forward-filled days through to_date.
+
+        For dates after last_date, features engineered from this frame match
+        those from densify_history over the product's full raw history.
+        """
+        if self.last_date is None:
+            raise ValueError(f"{self.product_id}: empty feature state")
+        horizon = max(0, (to_date - self.last_date).days)
+        n = self.size + horizon
+        first = self.last_date - timedelta(days=self.size - 1)
+        quantity = np.concatenate([self.window(self.quantities), np.full(horizon, self._back(0, self.quantities))])
+        price = np.concatenate([self.window(self.prices), np.full(horizon, self.last_price)])
+        return pd.DataFrame(
+            {
+                "product_id": self.product_id,
+                "date": [first + timedelta(days=i) for i in range(n)],
+                "quantity": quantity,
+                "revenue": quantity * price,
+                "price": price,
+                "promo_flag": self.promo_flag,
+                "category_id": self.category_id,
+            }
+        )
+
+    def feature_row(self) -> pd.DataFrame | None:
+        """
+        Model features of last_date as a one-row frame, computed from the buffers.
+
+        Matches the last row of engineer_features over the raw history when
+        the trailing WINDOW days all had a priced sales row; None otherwise.
+        """
+        if self.observed_days < WINDOW:
+            return None
+        q = partial(self._back, buffer=self.quantities)
+        p = partial(self._back, buffer=self.prices)
+        price = p(0)
+        # Features use the windows ending the day before; slide the running sums back one day
+        row = {f"lag_{lag}": q(lag) for lag in LAGS}
+        for w, total in self.quantity_sums.items():
+            row[f"rolling_mean_{w}"] = (total - q(0) + q(w)) / w
+        rolling_price = (self.price_sum - price + p(PRICE_WINDOW)) / PRICE_WINDOW
+        ts = pd.Timestamp(self.last_date)
+        row.update(
+            product_id=self.product_id,
+            date=self.last_date,
+            dow=ts.dayofweek,
+            day_of_month=ts.day,
+            month=ts.month,
+            week_of_year=int(ts.isocalendar()[1]),
+            is_weekend=int(ts.dayofweek >= 5),
+            price=price,
+            price_change_pct=price / p(1) - 1,
+            log_price=float(np.log(max(price, 1e-8))),
+            rolling_mean_price_30=rolling_price,
+            price_vs_avg_30=price / rolling_price if rolling_price else 1.0,
+            promo_flag=int(self.promo_flag),
+            quantity=q(0),
+            category_id=self.category_id,
+        )
+        return pd.DataFrame([row])
+
+    def to_record(self) -> dict:
+        """Column values for a product_feature_state row (buffers oldest first)."""
+        return {
+            "product_id": self.product_id,
+            "last_date": self.last_date,
+            "quantities": self.window(self.quantities).astype(_BUFFER_DTYPE).tobytes(),
+            "prices": self.window(self.prices).astype(_BUFFER_DTYPE).tobytes(),
+            **{f"quantity_sum_{w}": total for w, total in self.quantity_sums.items()},
+            "price_sum_30": self.price_sum,
+            "last_price": None if np.isnan(self.last_price) else self.last_price,
+            "promo_flag": self.promo_flag,
+            "category_id": self.category_id,
+            "observed_days": self.observed_days,
+        }
+
+    @classmethod
+    def from_record(cls, record) -> "FeatureState":
+        """Inverse of to_record; accepts a mapping or an ORM row."""
+        get = record.get if isinstance(record, dict) else lambda name: getattr(record, name)
+        quantities = np.frombuffer(get("quantities"), dtype=_BUFFER_DTYPE)
+        prices = np.frombuffer(get("prices"), dtype=_BUFFER_DTYPE)
+        state = cls(
+            product_id=get("product_id"),
+            last_date=get("last_date"),
+            size=len(quantities),
+            head=len(quantities) % WINDOW,
+            quantity_sums={w: float(get(f"quantity_sum_{w}")) for w in ROLLING_WINDOWS},
+            price_sum=float(get("price_sum_30")),
+            last_price=float("nan") if get("last_price") is None else float(get("last_price")),
+            promo_flag=bool(get("promo_flag")),
+            category_id=get("category_id"),
+            observed_days=int(get("observed_days")),
+        )
+        state.quantities[: state.size] = quantities
+        state.prices[: state.size] = prices
+        return state
+
+
+def _daily(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per (product, date): quantity summed, price averaged, promo any."""
+    return (
+        df.groupby(["product_id", "date"], sort=True)
+        .agg(
+            quantity=("quantity", "sum"),
+            price=("price", "mean"),
+            promo_flag=("promo_flag", "max"),
+            category_id=("category_id", "first"),
+        )
+        .reset_index()
+    )
+
+
+def _push_rows(state: FeatureState, rows: pd.DataFrame) -> None:
+    for r in rows.itertuples(index=False):
+        state.push(r.date, r.quantity, r.price, r.promo_flag, None if pd.isna(r.category_id) else r.category_id)
+
+
+def apply_sales(states: dict[str, FeatureState], df: pd.DataFrame) -> list[str]:
+    """
+    Push newly appended sales rows onto the states of the products they touch.
+
+    states is updated in place. Returns the product ids that could not be
+    updated this way (no state yet, or rows not after the state's last_date);
+    their states are left untouched and must be rebuilt from history.
+    """
+    if df.empty:
+        return []
+    rebuild: list[str] = []
+    for product_id, rows in _daily(df).groupby("product_id", sort=True):
+        state = states.get(product_id)
+        if state is None or state.last_date is None or rows["date"].iloc[0] <= state.last_date:
+            rebuild.append(product_id)
+            continue
+        _push_rows(state, rows)
+    return rebuild
+
+
+def build_feature_states(df: pd.DataFrame) -> list[FeatureState]:
+    """
+    Replay a sales frame into one state per product.
+
+    Rows of one (product, date) are summed first (price averaged, promo any),
+    as the pricing history aggregation does.
+    """
+    if df.empty:
+        return []
+    daily = _daily(df)
+    states: list[FeatureState] = []
+    for product_id, rows in daily.groupby("product_id", sort=False):
+        state = FeatureState(product_id=product_id)
+        # Only the trailing WINDOW days (plus forward-fill context) affect the state
+        cutoff = rows["date"].iloc[-1] - timedelta(days=WINDOW - 1)
+        earlier = rows[rows["date"] < cutoff]
+        recent = rows[rows["date"] >= cutoff]
+        if not earlier.empty:
+            known = earlier["price"].dropna()
+            if len(known):
+                state.last_price = float(known.iloc[-1])
+            prior = earlier.iloc[-1]
+            state.push(prior["date"], prior["quantity"], prior["price"])
+        _push_rows(state, recent)
+        states.append(state)
+    return states
@@ -4,19 +4,121 @@ from datetime import date, timedelta
 
 import numpy as np
 import pandas as pd
+from pandas.api.indexers import BaseIndexer
 
 from app.shared.utils import safe_float
 
+LAGS: tuple[int, ...] = (7, 14, 30)
+ROLLING_WINDOWS: tuple[int, ...] = (7, 30)
+PRICE_WINDOW = 30
+PRICE_WINDOW_MIN_PERIODS = 7
+
+
+class _SegmentWindowIndexer(BaseIndexer):
+    """Trailing fixed-size windows that never cross an entity boundary."""
+
+    def get_window_bounds(
+        self,
+        num_values: int = 0,
+        min_periods: int | None = None,
+        center: bool | None = None,
+        closed: str | None = None,
+        step: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        start = np.maximum(end - self.window_size, self.segment_starts)
+        return start, end
+
+
+class _Segments:
+    """Contiguous per-entity row segments of a frame sorted by (entity, date)."""
+
+    def __init__(self, keys: np.ndarray):
+        n = len(keys)
+        is_start = np.ones(n, dtype=bool)
+        if n > 1:
+            is_start[1:] = keys[1:] != keys[:-1]
+        codes = np.cumsum(is_start) - 1
+        self.row_starts = np.flatnonzero(is_start)[codes].astype(np.int64)
+        self.position = np.arange(n, dtype=np.int64) - self.row_starts
+
+    def shift(self, values: pd.Series, periods: int) -> np.ndarray:
+        """Equivalent of ``groupby(entity).shift(periods)`` for periods >= 1."""
+        src = values.to_numpy(dtype=np.float64)
+        out = np.full(len(src), np.nan)
+        if periods < len(src):
+            out[periods:] = src[:-periods]
+        out[self.position < periods] = np.nan
+        return out
+
+    def rolling_mean(self, shifted: np.ndarray, window: int, min_periods: int) -> np.ndarray:
+        """Equivalent of ``groupby(entity).rolling(window, min_periods).mean()`` in one pass."""
+        indexer = _SegmentWindowIndexer(window_size=window, segment_starts=self.row_starts)
+        return pd.Series(shifted).rolling(indexer, min_periods=min_periods).mean().to_numpy()
+
+
+def _add_time_features(out: pd.DataFrame, date_col: str) -> None:
+    out[date_col] = pd.to_datetime(out[date_col])
+    # Calendar attributes are computed once per distinct date and broadcast back.
+    codes, uniques = pd.factorize(out[date_col], use_na_sentinel=False)
+    cal = pd.DatetimeIndex(uniques)
+    dow = cal.dayofweek.to_numpy()[codes]
+    out["dow"] = dow
+    out["day_of_month"] = cal.day.to_numpy()[codes]
+    out["month"] = cal.month.to_numpy()[codes]
+    out["week_of_year"] = cal.isocalendar().week.to_numpy().astype(int)[codes]
+    out["is_weekend"] = (dow >= 5).astype(int)
+
+
+def _add_lag_features(
+    out: pd.DataFrame,
+    target_col: str,
+    segments: _Segments,
+    lags: tuple[int, ...],
+) -> None:
+    for lag in lags:
+        out[f"lag_{lag}"] = segments.shift(out[target_col], lag)
+
+
+def _add_rolling_features(
+    out: pd.DataFrame,
+    target_col: str,
+    segments: _Segments,
+    windows: tuple[int, ...],
+) -> None:
+    shifted = segments.shift(out[target_col], 1)
+    for w in windows:
+        out[f"rolling_mean_{w}"] = segments.rolling_mean(shifted, w, 1)
+
+
+def _add_price_features(out: pd.DataFrame, price_col: str, segments: _Segments) -> None:
+    price = out[price_col]
+    prev_price = segments.shift(price, 1)
+    out["price_change_pct"] = (price / prev_price - 1).fillna(0)
+    out["log_price"] = np.log(price.clip(lower=1e-8))
+    out["rolling_mean_price_30"] = segments.rolling_mean(
+        prev_price, PRICE_WINDOW, PRICE_WINDOW_MIN_PERIODS
+    )
+    out["price_vs_avg_30"] = price / out["rolling_mean_price_30"]
+    out["price_vs_avg_30"] = out["price_vs_avg_30"].replace([np.inf, -np.inf], np.nan).fillna(1)
+
+
+def _sorted_by_entity(
+    df: pd.DataFrame,
+    entity_col: str,
+    date_col: str,
+) -> tuple[pd.DataFrame, pd.Index, _Segments]:
+    """Sort once by (entity, date) onto a RangeIndex; returns frame, original labels and segments."""
+    out = df.sort_values([entity_col, date_col])
+    index = out.index
+    out = out.reset_index(drop=True)
+    return out, index, _Segments(out[entity_col].to_numpy())
+
 
 def build_time_features(df: pd.DataFrame, date_col: str = "date") -> pd.DataFrame:
     """Add time-based features."""
     out = df.copy()
-    out[date_col] = pd.to_datetime(out[date_col])
-    out["dow"] = out[date_col].dt.dayofweek
-    out["day_of_month"] = out[date_col].dt.day
-    out["month"] = out[date_col].dt.month
-    out["week_of_year"] = out[date_col].dt.isocalendar().week.astype(int)
-    out["is_weekend"] = (out["dow"] >= 5).astype(int)
+    _add_time_features(out, date_col)
     return out
 
 
@@ -25,13 +127,12 @@ def build_lag_features(
     target_col: str,
     entity_col: str,
     date_col: str,
-    lags: tuple[int, ...] = (7, 14, 30),
+    lags: tuple[int, ...] = LAGS,
 ) -> pd.DataFrame:
     """Add lag features per product."""
-    out = df.copy()
-    out = out.sort_values([entity_col, date_col])
-    for lag in lags:
-        out[f"lag_{lag}"] = out.groupby(entity_col)[target_col].shift(lag)
+    out, index, segments = _sorted_by_entity(df, entity_col, date_col)
+    _add_lag_features(out, target_col, segments, lags)
+    out.index = index
     return out
 
 
@@ -40,16 +141,12 @@ def build_rolling_features(
     target_col: str,
     entity_col: str,
     date_col: str,
-    windows: tuple[int, ...] = (7, 30),
+    windows: tuple[int, ...] = ROLLING_WINDOWS,
 ) -> pd.DataFrame:
     """Add rolling mean features per product."""
-    out = df.copy()
-    out = out.sort_values([entity_col, date_col])
-    for w in windows:
-        out[f"rolling_mean_{w}"] = (
-            out.groupby(entity_col)[target_col]
-            .transform(lambda x: x.shift(1).rolling(w, min_periods=1).mean())
-        )
+    out, index, segments = _sorted_by_entity(df, entity_col, date_col)
+    _add_rolling_features(out, target_col, segments, windows)
+    out.index = index
     return out
 
 
@@ -60,17 +157,9 @@ def build_price_features(
     date_col: str = "date",
 ) -> pd.DataFrame:
     """Add price-related features (including price change)."""
-    out = df.copy()
-    out = out.sort_values([entity_col, date_col])
-    out["price_change_pct"] = out.groupby(entity_col)[price_col].pct_change()
-    out["price_change_pct"] = out["price_change_pct"].fillna(0)
-    out["log_price"] = np.log(out[price_col].clip(lower=1e-8))
-    out["rolling_mean_price_30"] = (
-        out.groupby(entity_col)[price_col]
-        .transform(lambda x: x.shift(1).rolling(window=30, min_periods=7).mean())
-    )
-    out["price_vs_avg_30"] = out[price_col] / out["rolling_mean_price_30"]
-    out["price_vs_avg_30"] = out["price_vs_avg_30"].replace([np.inf, -np.inf], np.nan).fillna(1)
+    out, index, segments = _sorted_by_entity(df, entity_col, date_col)
+    _add_price_features(out, price_col, segments)
+    out.index = index
     return out
 
 
@@ -85,15 +174,21 @@ def engineer_features(
     """
     Full feature engineering pipeline.
     Returns DataFrame with all features for model training.
+
+    The frame is sorted by (entity, date) exactly once; lags and rolling windows
+    are then computed over contiguous per-product segments in single vectorized
+    passes, without per-group Python callbacks.
     """
     out = df.copy()
     out[price_col] = out[price_col].fillna(out[price_col].median())
     out[promo_col] = out[promo_col].fillna(0).astype(int)
 
-    out = build_time_features(out, date_col)
-    out = build_lag_features(out, target_col, entity_col, date_col)
-    out = build_rolling_features(out, target_col, entity_col, date_col)
-    out = build_price_features(out, price_col, entity_col, date_col)
+    _add_time_features(out, date_col)
+    out, index, segments = _sorted_by_entity(out, entity_col, date_col)
+    _add_lag_features(out, target_col, segments, LAGS)
+    _add_rolling_features(out, target_col, segments, ROLLING_WINDOWS)
+    _add_price_features(out, price_col, segments)
+    out.index = index
 
     # Drop rows with NaN in lag_30 (from lags at start), or fillna if all NaN (inference)
     if out["lag_30"].notna().any():
@@ -0,0 +1,228 @@
+"""
+Redis cache for single-product forecast and price-change scenario responses.
+
+Cache key schema:
+    forecasting:forecast:{model_version}:{sha256(kind, product, range, price delta + sales dataset version)}
+
+Like the backtest cache, the active model version and the sales dataset
+version are part of the key: activating a model or writing sales makes every
+older entry unreachable, and those expire after FORECAST_CACHE_TTL seconds.
+
+Payloads are columnar (day offsets from the range start plus one array per
+value) and zlib-compressed JSON, a few hundred bytes for a month of points.
+
+Concurrent misses for the same key are collapsed (single flight): within a
+process they await one shared computation; across workers the first miss
+takes a short Redis lock (SET NX) and the others poll for its result for up
+to FORECAST_CACHE_LOCK_SECONDS before computing themselves.
+"""
+
+import asyncio
+from datetime import date, timedelta
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable
+import zlib
+
+from app.forecasting.schemas import ForecastPoint
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Delay between checks while another worker computes a locked key
+_LOCK_POLL_SECONDS = 0.05
+
+
+def make_key(
+    kind: str,
+    model_version: str,
+    data_version: dict[str, Any],
+    product_id: str,
+    from_date: date,
+    to_date: date,
+    price_delta_pct: float | None = None,
+) -> str:
+    payload = json.dumps(
+        {
+            "kind": kind,
+            "product_id": product_id,
+            "from": from_date.isoformat(),
+            "to": to_date.isoformat(),
+            "price_delta_pct": price_delta_pct,
+            "data": data_version,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"forecasting:forecast:{model_version}:{digest}"
+
+
+def encode_points(points: list[ForecastPoint], start: date) -> dict[str, list]:
+    """Columnar form of forecast points: day offsets from start, quantities, revenues."""
+    return {
+        "t": [(p.date - start).days for p in points],
+        "q": [p.predicted_quantity for p in points],
+        "r": [p.predicted_revenue for p in points],
+    }
+
+
+def decode_points(columns: dict[str, list], start: date, product_id: str) -> list[ForecastPoint]:
+    return [
+        ForecastPoint(
+            date=start + timedelta(days=offset),
+            product_id=product_id,
+            predicted_quantity=quantity,
+            predicted_revenue=revenue,
+        )
+        for offset, quantity, revenue in zip(columns["t"], columns["q"], columns["r"])
+    ]
+
+
+def pack(payload: dict) -> bytes:
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def unpack(raw: bytes) -> dict:
+    return json.loads(zlib.decompress(raw))
+
+
+class ForecastCache:
+    """Single-flight get-or-compute over redis-py; every Redis failure degrades to a miss."""
+
+    def __init__(self) -> None:
+        self._redis: Any = None
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "stores": 0, "errors": 0}
+
+    async def _get_client(self) -> Any:
+        if self._redis is not None:
+            return self._redis
+        try:
+            import redis.asyncio as aioredis  # type: ignore
+
+            # Binary client: payloads are compressed bytes
+            self._redis = aioredis.from_url(settings.redis_url, decode_responses=False)
+            await self._redis.ping()
+        except Exception as exc:
+            logger.warning("Forecast cache Redis unavailable (%s) — caching disabled.", exc)
+            self._redis = None
+        return self._redis
+
+    async def _read(self, client: Any, key: str) -> dict | None:
+        try:
+            raw = await client.get(key)
+            return unpack(raw) if raw else None
+        except Exception as exc:
+            self._stats["errors"] += 1
+            logger.warning("Forecast cache GET error: %s", exc)
+            return None
+
+    async def _write(self, client: Any, key: str, payload: dict) -> None:
+        ttl = settings.forecast_cache_ttl
+        try:
+            await client.set(key, pack(payload), **({"ex": ttl} if ttl > 0 else {}))
+            self._stats["stores"] += 1
+        except Exception as exc:
+            self._stats["errors"] += 1
+            logger.warning("Forecast cache SET error: %s", exc)
+
+    async def _lock(self, client: Any, lock_key: str) -> bool:
+        """True if this worker should compute (it holds the lock, or locking failed)."""
+        try:
+            return bool(await client.set(lock_key, b"1", nx=True, ex=max(1, int(settings.forecast_cache_lock_seconds))))
+        except Exception as exc:
+            self._stats["errors"] += 1
+            logger.warning("Forecast cache lock error: %s", exc)
+            return True
+
+    async def _wait_for(self, client: Any, key: str, lock_key: str) -> dict | None:
+        """Poll for another worker's result; None once its lock is gone or the wait times out."""
+        deadline = time.monotonic() + settings.forecast_cache_lock_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_LOCK_POLL_SECONDS)
+            cached = await self._read(client, key)
+            if cached is not None:
+                return cached
+            try:
+                if not await client.exists(lock_key):
+                    return None
+            except Exception:
+                return None
+        return None
+
+    async def _lookup_or_compute(self, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        client = await self._get_client()
+        locked = False
+        if client is not None:
+            cached = await self._read(client, key)
+            if cached is not None:
+                self._stats["hits"] += 1
+                return cached
+            locked = await self._lock(client, f"{key}:lock")
+            if not locked:
+                cached = await self._wait_for(client, key, f"{key}:lock")
+                if cached is not None:
+                    self._stats["coalesced"] += 1
+                    return cached
+
+        self._stats["misses"] += 1
+        try:
+            payload = await compute()
+            if client is not None:
+                await self._write(client, key, payload)
+        finally:
+            if locked:
+                try:
+                    await client.delete(f"{key}:lock")
+                except Exception:
+                    pass
+        return payload
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        """
+        Cached payload for key, else compute() stored under key.
+
+        compute must return a JSON-serializable dict. Callers awaiting a key
+        already being computed in this process share that result (or error).
+        """
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the error retrieved when nobody else was waiting for it
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            payload = await self._lookup_or_compute(key, compute)
+            future.set_result(payload)
+            return payload
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def metrics(self) -> dict[str, float | int]:
+        served = self._stats["hits"] + self._stats["coalesced"]
+        total = served + self._stats["misses"]
+        return {**self._stats, "hit_ratio": round(served / total, 4) if total else 0.0}
+
+    async def close(self) -> None:
+        if self._redis:
+            try:
+                await self._redis.aclose()
+            except Exception:
+                pass
+            self._redis = None
+
+
+# Module-level singleton — one connection pool shared across requests
+forecast_cache = ForecastCache()
@@ -1,27 +1,72 @@
-"""Import Kaggle retail_store_inventory.csv into sales_facts."""
+"""
+Import Kaggle retail_store_inventory.csv into sales_facts.
 
-import csv
-from datetime import date
+Streaming pipeline with bounded memory:
+    1. the CSV is parsed in chunks of IMPORT_CHUNK_ROWS rows; each chunk is
+       reduced to one partial aggregate per (date, product) with vectorized
+       pandas ops (store-level rows of one day/product may span chunks)
+    2. partials are bulk-loaded with asyncpg COPY into a temporary staging table
+    3. one INSERT ... SELECT merges the partials into sales_facts
+All steps run in a single transaction, so a failed import leaves the previous
+kaggle rows in place.
+"""
+
+import logging
+from collections.abc import Awaitable, Callable, Iterator
+from itertools import count
 from pathlib import Path
 
-from sqlalchemy import delete
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import pandas as pd
+from sqlalchemy import delete, text
 
+from app.core.compute import compute
 from app.db.base import Base
-from app.forecasting.db_models import SalesFact
+from app.db.session import AsyncSessionLocal, async_engine
+from app.forecasting.db_models import MaterializedForecastPoint, SalesFact
+from app.forecasting.repository import ForecastingRepository
 from app.settings import settings
 
+logger = logging.getLogger(__name__)
+
+ProgressFn = Callable[[float, str], Awaitable[None]]
 
-def _parse_row(row: dict) -> tuple[date, str, float, float, float, bool, str]:
-    d = date.fromisoformat(row["Date"])
-    pid = row["Product ID"]
-    qty = float(row["Units Sold"])
-    price = float(row["Price"])
-    discount = float(row.get("Discount", 0))
-    revenue = qty * price * (1 - discount / 100)
-    promo = int(row.get("Holiday/Promotion", 0)) == 1
-    cat = row.get("Category", "")
-    return (d, pid, qty, revenue, price, promo, cat)
+_STAGING_TABLE = "sales_facts_import"
+_STAGING_COLUMNS = ("seq", "date", "product_id", "quantity", "revenue", "price", "promo_flag", "category_id")
+_CSV_COLUMNS = {
+    "Date": "date",
+    "Product ID": "product_id",
+    "Units Sold": "quantity",
+    "Price": "price",
+    "Discount": "discount",
+    "Holiday/Promotion": "promo",
+    "Category": "category_id",
+}
+_OPTIONAL_CSV_COLUMNS = {"Discount": 0.0, "Holiday/Promotion": 0, "Category": ""}
+
+# Partials are merged in file order: price and category come from the first
+# store row of each (date, product), the effective price from the totals.
+_MERGE_SQL = f"""
+WITH inserted AS (
+    INSERT INTO sales_facts (product_id, date, quantity, revenue, price, promo_flag, category_id, source, created_at)
+    SELECT product_id, date, sum(quantity), sum(revenue),
+           CASE WHEN sum(quantity) > 0 THEN sum(revenue) / sum(quantity)
+                ELSE (array_agg(price ORDER BY seq))[1] END,
+           bool_or(promo_flag),
+           NULLIF((array_agg(category_id ORDER BY seq))[1], ''),
+           'kaggle', now() AT TIME ZONE 'utc'
+    FROM {_STAGING_TABLE}
+    GROUP BY product_id, date
+    ORDER BY date, product_id
+    RETURNING 1
+)
+SELECT count(*) FROM inserted
+"""
+# Products whose history the import rewrites: old kaggle rows and staged rows
+_TOUCHED_SQL = f"""
+SELECT product_id FROM sales_facts WHERE source = 'kaggle'
+UNION
+SELECT product_id FROM {_STAGING_TABLE}
+"""
 
 
 def _find_csv(data_dir: Path = Path("/data")) -> Path:
@@ -36,7 +81,57 @@ def _find_csv(data_dir: Path = Path("/data")) -> Path:
     )
 
 
-async def import_csv(csv_path: str | Path | None = None) -> int:
+def aggregate_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Reduce raw CSV rows to one partial aggregate per (date, product_id), in first-seen order."""
+    revenue = chunk["quantity"] * chunk["price"] * (1 - chunk["discount"] / 100)
+    frame = chunk.assign(revenue=revenue, promo_flag=chunk["promo"] == 1)
+    part = frame.groupby(["date", "product_id"], sort=False).agg(
+        quantity=("quantity", "sum"),
+        revenue=("revenue", "sum"),
+        price=("price", "first"),
+        promo_flag=("promo_flag", "any"),
+        category_id=("category_id", "first"),
+    )
+    part = part.reset_index()
+    part["date"] = pd.to_datetime(part["date"], format="%Y-%m-%d").dt.date
+    return part
+
+
+def iter_csv_partials(csv_path: Path, chunk_rows: int) -> Iterator[tuple[pd.DataFrame, float]]:
+    """Yield (partial aggregates, fraction of the file read) for each chunk of the CSV."""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    missing = [c for c in _CSV_COLUMNS if c not in header and c not in _OPTIONAL_CSV_COLUMNS]
+    if missing:
+        raise ValueError(f"CSV is missing required columns: {missing}")
+    usecols = [c for c in _CSV_COLUMNS if c in header]
+    total = max(1, csv_path.stat().st_size)
+    with open(csv_path, "rb") as f:
+        reader = pd.read_csv(
+            f,
+            encoding="utf-8",
+            usecols=usecols,
+            dtype={"Date": str, "Product ID": str, "Category": str},
+            keep_default_na=False,
+            chunksize=max(1, chunk_rows),
+        )
+        for chunk in reader:
+            for column, default in _OPTIONAL_CSV_COLUMNS.items():
+                if column not in chunk.columns:
+                    chunk[column] = default
+            chunk = chunk.rename(columns=_CSV_COLUMNS)
+            yield aggregate_chunk(chunk), min(1.0, f.tell() / total)
+
+
+async def import_csv(
+    csv_path: str | Path | None = None,
+    progress: ProgressFn | None = None,
+) -> int:
+    """
+    Replace the kaggle rows in sales_facts with the aggregated CSV.
+
+    progress, when given, is awaited with (fraction of the file read, message)
+    after every chunk. Returns the number of (date, product) rows written.
+    """
     data_dir = Path("/data")
     if csv_path:
         csv_path = Path(csv_path)
@@ -45,44 +140,54 @@ async def import_csv(csv_path: str | Path | None = None) -> int:
     else:
         csv_path = _find_csv(data_dir)
 
-    engine = create_async_engine(settings.database_url)
-    async with engine.begin() as conn:
+    async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
-    Session = async_sessionmaker(
-        bind=engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-    )
+    async with AsyncSessionLocal() as sess:
+        conn = await sess.connection()
+        driver = (await conn.get_raw_connection()).driver_connection
+        if not hasattr(driver, "copy_records_to_table"):
+            raise RuntimeError("CSV import needs the asyncpg driver (COPY)")
 
-    agg: dict[tuple[date, str], list] = {}
-    with open(csv_path, encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            d, pid, qty, revenue, price, promo, cat = _parse_row(row)
-            key = (d, pid)
-            if key not in agg:
-                agg[key] = [0.0, 0.0, price, promo, cat]
-            agg[key][0] += qty
-            agg[key][1] += revenue
-            if promo:
-                agg[key][3] = True
-
-    async with Session() as sess:
-        await sess.execute(delete(SalesFact).where(SalesFact.source == "kaggle"))
-        for (d, pid), (qty, rev, price, promo, cat) in agg.items():
-            eff_price = rev / qty if qty > 0 else price
-            sess.add(
-                SalesFact(
-                    product_id=pid,
-                    date=d,
-                    quantity=qty,
-                    revenue=rev,
-                    price=eff_price,
-                    promo_flag=promo,
-                    category_id=cat or None,
-                    source="kaggle",
-                )
+        await sess.execute(
+            text(
+                f"CREATE TEMP TABLE {_STAGING_TABLE} ("
+                "seq integer NOT NULL, date date NOT NULL, product_id varchar(64) NOT NULL, "
+                "quantity double precision NOT NULL, revenue double precision NOT NULL, "
+                "price double precision, promo_flag boolean NOT NULL, category_id varchar(64)"
+                ") ON COMMIT DROP"
             )
+        )
+        partials = iter_csv_partials(csv_path, settings.import_chunk_rows)
+        staged = 0
+        try:
+            for seq in count():
+                # Parsing and aggregation run off the event loop, one chunk at a time
+                item = await compute.run_thread(next, partials, None)
+                if item is None:
+                    break
+                part, fraction = item
+                records = part.assign(seq=seq)[list(_STAGING_COLUMNS)].itertuples(index=False, name=None)
+                await driver.copy_records_to_table(_STAGING_TABLE, records=list(records), columns=_STAGING_COLUMNS)
+                staged += len(part)
+                message = f"staged {staged} partial rows from {csv_path.name}"
+                logger.info("Kaggle import %.0f%%: %s", fraction * 100, message)
+                if progress is not None:
+                    await progress(fraction, message)
+        finally:
+            partials.close()
+
+        repo = ForecastingRepository(sess)
+        states_current = await repo.lock_feature_states()
+        touched = list((await sess.execute(text(_TOUCHED_SQL))).scalars().all())
+        await sess.execute(delete(SalesFact).where(SalesFact.source == "kaggle"))
+        # Materialized forecasts were built from the replaced history
+        await sess.execute(delete(MaterializedForecastPoint))
+        n = int((await sess.execute(text(_MERGE_SQL))).scalar_one())
+        await repo.bump_sales_dataset_version()
+        # Products from other sources keep their states when those were current
+        await repo.refresh_feature_states(product_ids=touched if states_current else None)
+        await repo.refresh_sales_period_rollups()
         await sess.commit()
-        return len(agg)
+        logger.info("Kaggle import merged %d rows into sales_facts", n)
+        return n
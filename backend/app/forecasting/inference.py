@@ -0,0 +1,105 @@
+"""Inference helpers shared by live forecasting and batch/materialization jobs."""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from app.forecasting.features import LAGS, engineer_features
+from app.forecasting.training import DATE_COL, ENTITY_COL, FEATURE_COLS, predict
+
+SCENARIO_KEY_COL = "_scenario_key"
+
+
+def densify_history(df: pd.DataFrame, to_date: date) -> pd.DataFrame:
+    """
+    Reindex each product's history onto a daily calendar ending at to_date.
+
+    Each product's range starts at its own earliest row; gaps and the forecast
+    horizon are forward-filled (then back-filled) within the product only.
+    """
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"])
+    starts = df.groupby(ENTITY_COL, sort=False)[DATE_COL].min()
+    end = pd.Timestamp(to_date)
+    lengths = ((end - starts).dt.days + 1).clip(lower=0).to_numpy()
+
+    total = int(lengths.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    dates = np.repeat(starts.to_numpy(), lengths) + offsets.astype("timedelta64[D]")
+    full_index = pd.MultiIndex.from_arrays(
+        [np.repeat(starts.index.to_numpy(), lengths), dates],
+        names=[ENTITY_COL, DATE_COL],
+    )
+
+    dense = df.set_index([ENTITY_COL, DATE_COL]).reindex(full_index)
+    by_product = dense.groupby(level=ENTITY_COL, sort=False)
+    dense = by_product.ffill()
+    dense = dense.groupby(level=ENTITY_COL, sort=False).bfill()
+    dense = dense.reset_index()
+    dense[DATE_COL] = pd.to_datetime(dense[DATE_COL]).dt.date
+    return dense
+
+
+def _engineer_dense(df_full: pd.DataFrame) -> pd.DataFrame:
+    """
+    engineer_features over many products with single-product results.
+
+    Products too short to have any lag_30 value are engineered apart from the
+    rest, so the shared lag_30 dropna does not remove them.
+    """
+    counts = df_full.groupby(ENTITY_COL, sort=False).size()
+    short = df_full[ENTITY_COL].isin(counts.index[counts <= max(LAGS)])
+    if short.all() or not short.any():
+        return engineer_features(df_full)
+    return pd.concat([engineer_features(df_full[~short]), engineer_features(df_full[short])])
+
+
+def predict_dense(model, df_full: pd.DataFrame) -> pd.DataFrame:
+    """Engineer features for a dense history frame and attach predicted quantity/revenue."""
+    df_feat = _engineer_dense(df_full)
+    for col in FEATURE_COLS:
+        if col not in df_feat.columns:
+            df_feat[col] = 0
+    df_feat[FEATURE_COLS] = df_feat[FEATURE_COLS].fillna(0)
+
+    preds = predict(model, df_feat)
+    df_feat["predicted_quantity"] = preds
+    df_feat["predicted_revenue"] = df_feat["predicted_quantity"] * df_feat["price"]
+
+    df_feat[DATE_COL] = pd.to_datetime(df_feat[DATE_COL]).dt.date
+    return df_feat
+
+
+def predict_price_sweep(model, df_full: pd.DataFrame, price_deltas: list[float]) -> pd.DataFrame:
+    """
+    Evaluate several price_delta_pct values over one dense history frame.
+
+    The frame is stacked once per delta with prices scaled by (1 + delta/100).
+    Each (scenario, product) pair gets its own entity key so lags and rolling
+    windows never cross scenarios; features and predict run once over the
+    stack. Rows carry a "price_delta_pct" column; per scenario the output
+    equals predict_dense(model, apply_price_delta(df_full, delta)).
+    """
+    n_rows = len(df_full)
+    n_scenarios = len(price_deltas)
+    product_codes, products = pd.factorize(df_full[ENTITY_COL])
+
+    stacked = pd.concat([df_full] * n_scenarios, ignore_index=True)
+    deltas = np.repeat(np.asarray(price_deltas, dtype=np.float64), n_rows)
+    stacked["price"] = stacked["price"] * (1.0 + deltas / 100.0)
+    stacked[SCENARIO_KEY_COL] = (
+        np.repeat(np.arange(n_scenarios), n_rows) * len(products) + np.tile(product_codes, n_scenarios)
+    )
+
+    df_feat = engineer_features(stacked, entity_col=SCENARIO_KEY_COL)
+    for col in FEATURE_COLS:
+        if col not in df_feat.columns:
+            df_feat[col] = 0
+    df_feat[FEATURE_COLS] = df_feat[FEATURE_COLS].fillna(0)
+
+    df_feat["predicted_quantity"] = predict(model, df_feat)
+    df_feat["predicted_revenue"] = df_feat["predicted_quantity"] * df_feat["price"]
+    df_feat["price_delta_pct"] = deltas[df_feat.index.to_numpy()]
+    df_feat[DATE_COL] = pd.to_datetime(df_feat[DATE_COL]).dt.date
+    return df_feat.drop(columns=[SCENARIO_KEY_COL])
@@ -0,0 +1,98 @@
+"""
+Materialized forecasts — precompute forecast_points for every product.
+
+Run after each training run: the active model's predictions for all products
+over [latest_sales_date - history_days + 1, latest_sales_date + horizon_days]
+are computed in parallel worker processes and stored keyed by
+(model_version, product_id, date). get_forecast then serves covered ranges
+with a single indexed read.
+"""
+
+from datetime import date, timedelta
+import logging
+import time
+from typing import Any
+
+import pandas as pd
+
+from app.forecasting.inference import densify_history, predict_dense
+from app.core.compute import compute, resolve_workers, split_evenly
+from app.forecasting.training import DATE_COL, ENTITY_COL, load_model
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Days of history before the window start needed for lag_30 / rolling_mean_30
+_LOOKBACK_DAYS = 60
+_POINT_COLS = [ENTITY_COL, DATE_COL, "predicted_quantity", "predicted_revenue"]
+
+# Per-process booster cache (each pool worker parses the model file once)
+_boosters: dict[str, Any] = {}
+
+
+def _load_booster(file_path: str) -> Any:
+    booster = _boosters.get(file_path)
+    if booster is None:
+        booster = load_model(file_path)
+        _boosters.clear()
+        _boosters[file_path] = booster
+    return booster
+
+
+def forecast_chunk(task: tuple[str, pd.DataFrame, date, date]) -> pd.DataFrame:
+    """Forecast one chunk of products; top-level so it can run in a worker process."""
+    file_path, history, from_date, to_date = task
+    if history.empty:
+        return pd.DataFrame(columns=_POINT_COLS)
+    df_feat = predict_dense(_load_booster(file_path), densify_history(history, to_date))
+    mask = (df_feat[DATE_COL] >= from_date) & (df_feat[DATE_COL] <= to_date)
+    return df_feat.loc[mask, _POINT_COLS].reset_index(drop=True)
+
+
+def materialization_window(latest_date: date) -> tuple[date, date]:
+    """Return the (from_date, to_date) covered by materialized forecasts."""
+    from_date = latest_date - timedelta(days=max(settings.forecast_materialize_history_days, 0) - 1)
+    to_date = latest_date + timedelta(days=max(settings.forecast_materialize_horizon_days, 0))
+    return from_date, to_date
+
+
+async def materialize_forecasts(repo: Any, version: str, file_path: str) -> dict[str, Any]:
+    """Fill forecast_points for every product under the given model version."""
+    started = time.perf_counter()
+    _, latest_date = await repo.get_date_range()
+    if latest_date is None:
+        return {"points": 0, "products": 0}
+
+    from_date, to_date = materialization_window(latest_date)
+    history = await repo.get_sales_df(from_date - timedelta(days=_LOOKBACK_DAYS), latest_date)
+    products = sorted(history[ENTITY_COL].unique().tolist()) if not history.empty else []
+    if not products:
+        return {"points": 0, "products": 0}
+
+    workers = resolve_workers(settings.forecast_materialize_workers)
+    tasks = [
+        (file_path, history[history[ENTITY_COL].isin(chunk)], from_date, to_date)
+        for chunk in split_evenly(products, workers)
+    ]
+    frames = await compute.run_thread(compute.map_in_processes, forecast_chunk, tasks, workers)
+    points = pd.concat(frames, ignore_index=True)
+
+    n_points = await repo.replace_forecast_points(version, points)
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "Materialized forecasts: version=%s  products=%d  points=%d  window=[%s, %s]  workers=%d  %.2fs",
+        version,
+        len(products),
+        n_points,
+        from_date,
+        to_date,
+        len(tasks),
+        elapsed,
+    )
+    return {
+        "points": n_points,
+        "products": len(products),
+        "from_date": str(from_date),
+        "to_date": str(to_date),
+        "seconds": round(elapsed, 3),
+    }
@@ -0,0 +1,212 @@
+"""
+In-process registry of the active LightGBM booster.
+
+Each worker keeps the parsed booster in memory, keyed by artifact version, so
+forecast/scenario/backtest/pricing calls skip both the model_artifacts lookups
+and re-parsing the model file from disk.
+
+Invalidation:
+    - The worker that trains a model swaps it in directly (activate()).
+    - It then publishes {"version", "file_path"} on the Redis channel
+      _CHANNEL; every other worker's listener loads that file and swaps.
+    - The listener resubscribes with exponential backoff while Redis is
+      unreachable, at startup or after a dropped connection.
+    - As a safety net (Redis down, missed message) the active version is
+      re-resolved from the DB at most once per model_registry_refresh_seconds.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from app.forecasting.training import load_model
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_CHANNEL = "forecasting:model_activated"
+_MAX_CACHED_VERSIONS = 2
+# Delay before the listener's next subscription attempt, doubled per failure
+_RETRY_MIN_SECONDS = 1.0
+_RETRY_MAX_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class ActiveModel:
+    """Immutable snapshot of the active model; replaced as a whole on swap."""
+
+    version: str
+    file_path: str
+    booster: Any
+
+
+class ModelRegistry:
+    """Versioned booster cache with atomic hot swap across uvicorn workers."""
+
+    def __init__(self) -> None:
+        self._active: ActiveModel | None = None
+        self._boosters: dict[str, Any] = {}
+        self._resolved_at: float | None = None
+        self._lock = asyncio.Lock()
+        self._redis: Any = None
+        self._listener: asyncio.Task | None = None
+
+    # ------------------------------------------------------------------
+    # Resolution
+    # ------------------------------------------------------------------
+
+    def _is_fresh(self) -> bool:
+        if self._active is None or self._resolved_at is None:
+            return False
+        return (time.monotonic() - self._resolved_at) < settings.model_registry_refresh_seconds
+
+    async def get_active(self, repo: Any) -> ActiveModel | None:
+        """Return the active model, resolving it from the DB only when stale."""
+        if self._is_fresh():
+            return self._active
+
+        async with self._lock:
+            if self._is_fresh():
+                return self._active
+
+            art = await repo.get_active_model_artifact()
+            if art is None or not os.path.exists(art.file_path):
+                return None
+
+            current = self._active
+            if current is not None and current.version == art.version:
+                self._resolved_at = time.monotonic()
+                return current
+
+            booster = self._boosters.get(art.version)
+            if booster is None:
+                booster = await asyncio.to_thread(load_model, art.file_path)
+            self.activate(art.version, art.file_path, booster)
+            return self._active
+
+    def activate(self, version: str, file_path: str, booster: Any) -> None:
+        """Swap in a new active booster (single reference assignment)."""
+        self._boosters.pop(version, None)
+        self._boosters[version] = booster
+        while len(self._boosters) > _MAX_CACHED_VERSIONS:
+            self._boosters.pop(next(iter(self._boosters)))
+        self._active = ActiveModel(version=version, file_path=file_path, booster=booster)
+        self._resolved_at = time.monotonic()
+        logger.info("Model registry: active version=%s", version)
+
+    def invalidate(self) -> None:
+        """Force the next get_active() to re-resolve from the DB."""
+        self._resolved_at = None
+
+    # ------------------------------------------------------------------
+    # Cross-worker notification
+    # ------------------------------------------------------------------
+
+    async def _client(self) -> Any:
+        if self._redis is not None:
+            return self._redis
+        try:
+            import redis.asyncio as aioredis  # type: ignore
+
+            self._redis = aioredis.from_url(
+                settings.redis_url, encoding="utf-8", decode_responses=True
+            )
+            await self._redis.ping()
+        except Exception as exc:
+            logger.warning("Model registry Redis unavailable (%s) — relying on refresh interval.", exc)
+            self._redis = None
+        return self._redis
+
+    async def publish_activation(self, version: str, file_path: str) -> None:
+        """Tell other workers a new model was activated. Silently ignores failures."""
+        client = await self._client()
+        if client is None:
+            return
+        try:
+            await client.publish(_CHANNEL, json.dumps({"version": version, "file_path": file_path}))
+        except Exception as exc:
+            logger.warning("Model registry PUBLISH error: %s", exc)
+
+    async def handle_notification(self, raw: str) -> None:
+        """Hot-swap to the announced version; fall back to invalidation on any error."""
+        try:
+            payload = json.loads(raw)
+            version = payload["version"]
+            file_path = payload["file_path"]
+        except Exception:
+            self.invalidate()
+            return
+
+        current = self._active
+        if current is not None and current.version == version:
+            return
+        try:
+            booster = self._boosters.get(version)
+            if booster is None:
+                booster = await asyncio.to_thread(load_model, file_path)
+            self.activate(version, file_path, booster)
+        except Exception as exc:
+            logger.warning("Model registry hot swap to %s failed: %s", version, exc)
+            self.invalidate()
+
+    async def _listen(self) -> None:
+        """Subscribe until cancelled, retrying with backoff while Redis is unreachable."""
+        delay = _RETRY_MIN_SECONDS
+        while True:
+            client = await self._client()
+            if client is not None and await self._consume(client):
+                delay = _RETRY_MIN_SECONDS
+            # Activations may have been missed while disconnected
+            self.invalidate()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _RETRY_MAX_SECONDS)
+
+    async def _consume(self, client: Any) -> bool:
+        """Handle notifications until the subscription ends; True if it was established."""
+        pubsub = client.pubsub()
+        subscribed = False
+        try:
+            await pubsub.subscribe(_CHANNEL)
+            subscribed = True
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    await self.handle_notification(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Model registry listener disconnected (%s) — retrying.", exc)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+        return subscribed
+
+    def start_listener(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener = None
+        if self._redis is not None:
+            try:
+                await self._redis.aclose()
+            except Exception:
+                pass
+            self._redis = None
+
+
+# Module-level singleton — one booster cache per worker process
+model_registry = ModelRegistry()
@@ -1,19 +1,84 @@
 """Pure pricing objective functions."""
 
+import numpy as np
+
 from app.forecasting.pricing_schemas import PricingStrategyParams
+from app.forecasting.training import FEATURE_COLS
+
+_PRICE_IDX = FEATURE_COLS.index("price")
+_LOG_PRICE_IDX = FEATURE_COLS.index("log_price")
+_PRICE_VS_AVG_IDX = FEATURE_COLS.index("price_vs_avg_30")
+_PRICE_CHANGE_IDX = FEATURE_COLS.index("price_change_pct")
 
 
 def compute_objective_score(
     *,
-    profit: float,
-    quantity: float,
+    profit,
+    quantity,
     baseline_quantity: float,
     strategy: PricingStrategyParams,
-) -> tuple[float, float]:
-    """Return (objective_score, risk_penalty) for candidate ranking."""
+):
+    """
+    Return (objective_score, risk_penalty) for candidate ranking.
+
+    Accepts scalars or NumPy arrays (one entry per candidate price).
+    """
     risk_penalty = 0.0
     if strategy.objective == "risk_adjusted_profit":
         risk_penalty = strategy.quantity_swing_penalty * abs(quantity - baseline_quantity)
 
     score = profit - risk_penalty
     return score, risk_penalty
+
+
+def candidate_feature_matrix(
+    base_features: np.ndarray,
+    prices: np.ndarray,
+    *,
+    base_price: float,
+    base_rolling_mean_price: float,
+) -> np.ndarray:
+    """
+    Build one FEATURE_COLS row per candidate price.
+
+    All features are copied from the product's latest row; only the
+    price-derived columns are recomputed for each candidate.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    X = np.repeat(base_features.reshape(1, -1).astype(np.float64), len(prices), axis=0)
+    X[:, _PRICE_IDX] = prices
+    X[:, _LOG_PRICE_IDX] = np.log(np.maximum(prices, 1e-8))
+    X[:, _PRICE_VS_AVG_IDX] = prices / base_rolling_mean_price
+    X[:, _PRICE_CHANGE_IDX] = (prices - base_price) / base_price if base_price > 0 else 0.0
+    return X
+
+
+def refine_prices(
+    prices: np.ndarray,
+    scores: np.ndarray,
+    *,
+    n_points: int,
+    precision: float,
+) -> np.ndarray:
+    """
+    Next batch of an adaptive price search.
+
+    Assumes the objective is unimodal in price: the optimum lies between the
+    evaluated neighbours of the best-scoring price, so n_points prices are
+    spread over that bracket, snapped to multiples of precision. Prices
+    already evaluated are skipped; an empty batch means the bracket is down
+    to precision and the search has converged.
+    """
+    order = np.argsort(prices, kind="stable")
+    prices = np.asarray(prices, dtype=np.float64)[order]
+    scores = np.asarray(scores, dtype=np.float64)[order]
+    if np.isnan(scores).all():
+        return np.empty(0)
+    best = int(np.nanargmax(scores))
+    low, high = prices[max(best - 1, 0)], prices[min(best + 1, len(prices) - 1)]
+    candidates = np.unique(np.round(np.linspace(low, high, n_points + 2)[1:-1] / precision) * precision)
+    candidates = candidates[(candidates > low) & (candidates < high)]
+    if len(candidates) == 0:
+        return candidates
+    gap = np.abs(candidates[:, None] - prices[None, :]).min(axis=1)
+    return candidates[gap > precision / 2]
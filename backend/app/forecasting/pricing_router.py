@@ -3,7 +3,7 @@
 from fastapi import APIRouter, HTTPException
 
 from app.core.deps import AsyncSessionDep
-from app.forecasting.pricing_schemas import PricingOptimizeRequest
+from app.forecasting.pricing_schemas import PortfolioPricingRequest, PricingOptimizeRequest
 from app.forecasting.pricing_service import PricingOptimizationService
 from app.forecasting.repository import ForecastingRepository
 
@@ -25,3 +25,16 @@ async def pricing_optimize(
         return await service.optimize(body)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/pricing/optimize/batch")
+async def pricing_optimize_batch(
+    body: PortfolioPricingRequest,
+    session: AsyncSessionDep,
+):
+    """Optimize prices for many products with one history query and one model pass."""
+    service = _get_service(session)
+    try:
+        return await service.optimize_portfolio(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -26,8 +26,58 @@ class PricingOptimizeRequest(BaseModel):
     cost: float
     price_min: float
     price_max: float
-    n_steps: int = 50
+    n_steps: int = Field(50, description="Grid size; the coarse grid size when search=adaptive.")
+    search: Literal["grid", "adaptive"] = Field(
+        "grid",
+        description="grid scores n_steps evenly spaced prices; adaptive refines around the best one.",
+    )
+    price_precision: float = Field(0.01, description="Price resolution the adaptive search refines down to.")
     max_price_change_pct: float = 0.08
     min_margin_pct: float = 0.15
     smoothing_alpha: float = 0.3
     strategy: PricingStrategyParams = Field(default_factory=PricingStrategyParams)
+
+
+class PortfolioPricingItem(BaseModel):
+    """Per-product cost and price bounds for portfolio optimization."""
+
+    product_id: str
+    cost: float
+    price_min: float
+    price_max: float
+    n_steps: int | None = Field(None, description="Overrides the request-level n_steps.")
+
+
+class PortfolioPricingRequest(BaseModel):
+    """Request body for batch pricing; strategy and constraints are shared by all items."""
+
+    items: list[PortfolioPricingItem] = Field(..., min_length=1, max_length=1000)
+    n_steps: int = Field(50, description="Grid size; the coarse grid size when search=adaptive.")
+    search: Literal["grid", "adaptive"] = Field(
+        "grid",
+        description="grid scores n_steps evenly spaced prices; adaptive refines around the best one.",
+    )
+    price_precision: float = Field(0.01, description="Price resolution the adaptive search refines down to.")
+    max_price_change_pct: float = 0.08
+    min_margin_pct: float = 0.15
+    smoothing_alpha: float = 0.3
+    strategy: PricingStrategyParams = Field(default_factory=PricingStrategyParams)
+
+    def item_requests(self) -> list[PricingOptimizeRequest]:
+        """Expand into one single-product request per item."""
+        return [
+            PricingOptimizeRequest(
+                product_id=item.product_id,
+                cost=item.cost,
+                price_min=item.price_min,
+                price_max=item.price_max,
+                n_steps=item.n_steps if item.n_steps is not None else self.n_steps,
+                search=self.search,
+                price_precision=self.price_precision,
+                max_price_change_pct=self.max_price_change_pct,
+                min_margin_pct=self.min_margin_pct,
+                smoothing_alpha=self.smoothing_alpha,
+                strategy=self.strategy,
+            )
+            for item in self.items
+        ]
@@ -1,21 +1,55 @@
 """Pricing optimization orchestration service."""
 
-import os
+from dataclasses import dataclass, field
 
 import numpy as np
 import pandas as pd
 
-from app.forecasting.features import engineer_features
+from app.core.compute import compute
+from app.forecasting.features import LAGS, engineer_features
+from app.forecasting.model_registry import model_registry
 from app.forecasting.pricing_constraints import (
     PricingConstraintParams,
     apply_business_constraints,
     apply_smoothing,
     should_hold_price_by_hysteresis,
 )
-from app.forecasting.pricing_engine import compute_objective_score
-from app.forecasting.pricing_schemas import PricingOptimizeRequest
+from app.forecasting.pricing_engine import candidate_feature_matrix, compute_objective_score, refine_prices
+from app.forecasting.pricing_schemas import PortfolioPricingRequest, PricingOptimizeRequest
 from app.forecasting.repository import ForecastingRepository
-from app.forecasting.training import FEATURE_COLS, load_model, predict
+from app.forecasting.training import ENTITY_COL, FEATURE_COLS, predict
+
+# Upper bound on the candidate grid; one grid is a single (n_steps x features) predict.
+_MAX_STEPS = 10_000
+# Upper bound on product x candidate rows scored in one portfolio predict.
+_MAX_PORTFOLIO_CANDIDATES = 1_000_000
+_MIN_HISTORY_ROWS = 30
+# Adaptive search: prices per product per refinement batch, and a cap on batches
+_REFINE_STEPS = 8
+_MAX_REFINE_ROUNDS = 40
+
+
+@dataclass
+class _ProductPlan:
+    """Per-product state carried between the grid predict and the smoothed-price predict."""
+
+    body: PricingOptimizeRequest
+    base_features: np.ndarray
+    base_price: float
+    base_rolling_mean_price: float
+    candidate_prices: np.ndarray
+    # Route the plan's rows to the right booster of a segmented model
+    product_id: str | None = None
+    category_id: str | None = None
+    candidate_quantities: np.ndarray | None = None
+    search_rounds: int = 0
+    base_quantity: float = 0.0
+    scenarios: list[dict] = field(default_factory=list)
+    raw_optimal_price: float = 0.0
+    constrained_price: float = 0.0
+    allowed_min: float = 0.0
+    allowed_max: float = 0.0
+    smoothed_price: float = 0.0
 
 
 class PricingOptimizationService:
@@ -32,90 +66,188 @@ class PricingOptimizationService:
 
         product_id = self._PRODUCT_ALIASES.get(body.product_id, body.product_id)
         model = await self._load_active_model()
-        df = await self._load_product_history(product_id)
-        df_feat = self._prepare_features(df)
+        plan = self._plan(body, await self._latest_features(product_id))
+
+        # Current state and the whole candidate grid go through a single predict call.
+        await self._search(model, [plan])
+        smoothed = await compute.run_thread(
+            self._predict_quantities, model, self._smoothed_matrix(plan), self._row_ids([plan], [1])
+        )
+        smoothed_quantity = float(smoothed[0])
+        return self._finalize(plan, smoothed_quantity)
+
+    async def optimize_portfolio(self, body: PortfolioPricingRequest) -> dict:
+        """
+        Optimize many products with one history query and one grid predict.
+
+        Request-level validation errors raise ValueError for the whole batch;
+        products without enough history are reported under "failed".
+        """
+        requests = body.item_requests()
+        for req in requests:
+            self._validate_request(req)
+        product_ids = [self._PRODUCT_ALIASES.get(r.product_id, r.product_id) for r in requests]
+        if len(set(product_ids)) != len(product_ids):
+            raise ValueError("Duplicate product_id in items")
+        n_candidates = sum(r.n_steps for r in requests)
+        if n_candidates > _MAX_PORTFOLIO_CANDIDATES:
+            raise ValueError(
+                f"Total candidate prices across items must be <= {_MAX_PORTFOLIO_CANDIDATES}"
+            )
 
-        base_row = df_feat.iloc[-1].copy()
+        model = await self._load_active_model()
+        features = self._state_features(await self._repo.get_feature_states(product_ids))
+        failed: dict[str, str] = {}
+        fetch = [pid for pid in product_ids if pid not in features]
+        if fetch:
+            df = await self._repo.get_latest_sales_df_per_product(fetch, min_days=90)
+            fetched, failed = await compute.run_thread(self._prepare_portfolio_features, df, fetch)
+            features.update(fetched)
+
+        plans: list[_ProductPlan] = []
+        for req, pid in zip(requests, product_ids):
+            if pid in features:
+                plans.append(self._plan(req, features[pid]))
+
+        recommendations: list[dict] = []
+        if plans:
+            await self._search(model, plans)
+            smoothed = await compute.run_thread(
+                self._predict_quantities,
+                model,
+                np.vstack([self._smoothed_matrix(plan) for plan in plans]),
+                self._row_ids(plans, [1] * len(plans)),
+            )
+            for plan, smoothed_quantity in zip(plans, smoothed.tolist()):
+                recommendations.append(
+                    {"product_id": plan.body.product_id, **self._finalize(plan, smoothed_quantity)}
+                )
+
+        aliases = dict(zip(product_ids, (r.product_id for r in requests)))
+        return {
+            "recommendations": recommendations,
+            "failed": [{"product_id": aliases[pid], "detail": detail} for pid, detail in failed.items()],
+        }
+
+    def _plan(self, body: PricingOptimizeRequest, df_feat: pd.DataFrame) -> _ProductPlan:
+        """Capture the latest feature row and candidate grid for one product."""
+        base_row = df_feat.iloc[-1]
         base_price = float(base_row["price"])
         base_rolling_mean_price = float(base_row.get("rolling_mean_price_30", base_price))
         if base_rolling_mean_price <= 0:
             base_rolling_mean_price = base_price if base_price > 0 else 1.0
+        return _ProductPlan(
+            body=body,
+            base_features=base_row[FEATURE_COLS].to_numpy(dtype=np.float64),
+            base_price=base_price,
+            base_rolling_mean_price=base_rolling_mean_price,
+            candidate_prices=np.linspace(body.price_min, body.price_max, body.n_steps),
+            product_id=base_row.get(ENTITY_COL),
+            category_id=None if pd.isna(base_row.get("category_id")) else base_row.get("category_id"),
+        )
 
-        base_quantity = max(0.0, float(predict(model, df_feat.tail(1))[0]))
-        current_revenue = base_price * base_quantity
-        current_profit = (base_price - body.cost) * base_quantity
+    async def _search(self, model, plans: list[_ProductPlan]) -> None:
+        """
+        Score every plan's grid in one stacked predict, refine, then select.
 
-        candidate_prices = np.linspace(body.price_min, body.price_max, body.n_steps)
-        scenarios: list[dict] = []
-        best_candidate: dict | None = None
-        best_score = float("-inf")
-
-        for candidate in candidate_prices:
-            price = float(candidate)
-            quantity, revenue, profit = self._predict_metrics_for_price(
-                model=model,
-                base_row=base_row,
-                price=price,
-                base_price=base_price,
-                base_rolling_mean_price=base_rolling_mean_price,
-                cost=body.cost,
-            )
-            score, risk_penalty = compute_objective_score(
-                profit=profit,
-                quantity=quantity,
-                baseline_quantity=base_quantity,
-                strategy=body.strategy,
-            )
+        Plans with search="adaptive" continue with refine_prices batches, one
+        stacked predict per round across all such plans, until each bracket
+        is down to its price_precision.
+        """
+        grids = [self._grid_matrix(plan) for plan in plans]
+        for plan, quantities in zip(plans, await self._predict_stacked(model, plans, grids)):
+            plan.base_quantity = float(quantities[0])
+            plan.candidate_quantities = quantities[1:]
+            plan.search_rounds = 1
 
-            scenario = {
-                "price": round(price, 2),
-                "quantity": round(quantity, 2),
-                "revenue": round(revenue, 2),
-                "profit": round(profit, 2),
-                "objective_score": round(score, 2),
-            }
-            if body.strategy.objective == "risk_adjusted_profit":
-                scenario["risk_penalty"] = round(risk_penalty, 2)
-
-            scenarios.append(scenario)
-
-            if score > best_score:
-                best_score = score
-                best_candidate = {
-                    "price": price,
-                    "quantity": quantity,
-                    "revenue": revenue,
-                    "profit": profit,
-                    "score": score,
-                }
-
-        raw_optimal_price = best_candidate["price"] if best_candidate is not None else base_price
-        constraints = PricingConstraintParams(
-            max_price_change_pct=body.max_price_change_pct,
-            min_margin_pct=body.min_margin_pct,
-            smoothing_alpha=body.smoothing_alpha,
+        refining = [plan for plan in plans if plan.body.search == "adaptive"]
+        for _ in range(_MAX_REFINE_ROUNDS):
+            batches = [(plan, self._next_prices(plan)) for plan in refining]
+            batches = [(plan, prices) for plan, prices in batches if len(prices)]
+            if not batches:
+                break
+            refining = [plan for plan, _ in batches]
+            matrices = [self._candidate_matrix(plan, prices) for plan, prices in batches]
+            for (plan, prices), quantities in zip(batches, await self._predict_stacked(model, refining, matrices)):
+                plan.candidate_prices = np.concatenate([plan.candidate_prices, prices])
+                plan.candidate_quantities = np.concatenate([plan.candidate_quantities, quantities])
+                plan.search_rounds += 1
+
+        for plan in plans:
+            order = np.argsort(plan.candidate_prices, kind="stable")
+            plan.candidate_prices = plan.candidate_prices[order]
+            self._select(plan, np.concatenate([[plan.base_quantity], plan.candidate_quantities[order]]))
+
+    def _next_prices(self, plan: _ProductPlan) -> np.ndarray:
+        """Next adaptive batch for a plan from the prices scored so far."""
+        body = plan.body
+        scores, _ = compute_objective_score(
+            profit=(plan.candidate_prices - body.cost) * plan.candidate_quantities,
+            quantity=plan.candidate_quantities,
+            baseline_quantity=plan.base_quantity,
+            strategy=body.strategy,
         )
-        constrained_price, allowed_min, allowed_max = apply_business_constraints(
-            raw_optimal_price=raw_optimal_price,
-            base_price=base_price,
+        return refine_prices(
+            plan.candidate_prices, scores, n_points=_REFINE_STEPS, precision=body.price_precision
+        )
+
+    def _select(self, plan: _ProductPlan, quantities: np.ndarray) -> None:
+        """Score the grid, pick the raw optimum and apply constraints and smoothing."""
+        body = plan.body
+        prices = plan.candidate_prices
+        plan.base_quantity = float(quantities[0])
+
+        grid_quantities = quantities[1:]
+        grid_revenues = prices * grid_quantities
+        grid_profits = (prices - body.cost) * grid_quantities
+        scores, risk_penalties = compute_objective_score(
+            profit=grid_profits,
+            quantity=grid_quantities,
+            baseline_quantity=plan.base_quantity,
+            strategy=body.strategy,
+        )
+        scores = np.asarray(scores, dtype=np.float64)
+        risk_penalties = np.broadcast_to(np.asarray(risk_penalties, dtype=np.float64), scores.shape)
+
+        plan.scenarios = self._build_scenarios(
+            prices=prices,
+            quantities=grid_quantities,
+            revenues=grid_revenues,
+            profits=grid_profits,
+            scores=scores,
+            risk_penalties=risk_penalties if body.strategy.objective == "risk_adjusted_profit" else None,
+        )
+
+        plan.raw_optimal_price = plan.base_price
+        if not np.isnan(scores).all():
+            plan.raw_optimal_price = float(prices[int(np.nanargmax(scores))])
+
+        constraints = self._constraint_params(body)
+        plan.constrained_price, plan.allowed_min, plan.allowed_max = apply_business_constraints(
+            raw_optimal_price=plan.raw_optimal_price,
+            base_price=plan.base_price,
             cost=body.cost,
             price_min=body.price_min,
             price_max=body.price_max,
             params=constraints,
         )
-        smoothed_price = apply_smoothing(
-            base_price=base_price,
-            constrained_price=constrained_price,
+        plan.smoothed_price = apply_smoothing(
+            base_price=plan.base_price,
+            constrained_price=plan.constrained_price,
             alpha=constraints.smoothing_alpha,
         )
-        smoothed_quantity, smoothed_revenue, smoothed_profit = self._predict_metrics_for_price(
-            model=model,
-            base_row=base_row,
-            price=smoothed_price,
-            base_price=base_price,
-            base_rolling_mean_price=base_rolling_mean_price,
-            cost=body.cost,
-        )
+
+    def _finalize(self, plan: _ProductPlan, smoothed_quantity: float) -> dict:
+        """Apply hysteresis and build the per-product API payload."""
+        body = plan.body
+        base_price = plan.base_price
+        base_quantity = plan.base_quantity
+        current_revenue = base_price * base_quantity
+        current_profit = (base_price - body.cost) * base_quantity
+
+        smoothed_price = plan.smoothed_price
+        smoothed_revenue = smoothed_price * smoothed_quantity
+        smoothed_profit = (smoothed_price - body.cost) * smoothed_quantity
         hysteresis_applied, profit_delta_vs_current_pct = should_hold_price_by_hysteresis(
             current_profit=current_profit,
             candidate_profit=smoothed_profit,
@@ -148,8 +280,8 @@ class PricingOptimizationService:
                 "profit": round(current_profit, 2),
             },
             "recommendation": {
-                "raw_optimal_price": round(raw_optimal_price, 2),
-                "constrained_price": round(constrained_price, 2),
+                "raw_optimal_price": round(plan.raw_optimal_price, 2),
+                "constrained_price": round(plan.constrained_price, 2),
                 "final_smoothed_price": round(final_price, 2),
                 "expected_quantity": round(final_quantity, 2),
                 "expected_revenue": round(final_revenue, 2),
@@ -165,8 +297,8 @@ class PricingOptimizationService:
                 "max_price_change_pct": body.max_price_change_pct,
                 "min_margin_pct": body.min_margin_pct,
                 "smoothing_alpha": body.smoothing_alpha,
-                "allowed_price_min": round(allowed_min, 2),
-                "allowed_price_max": round(allowed_max, 2),
+                "allowed_price_min": round(plan.allowed_min, 2),
+                "allowed_price_max": round(plan.allowed_max, 2),
             },
             "strategy": {
                 "objective": body.strategy.objective,
@@ -174,10 +306,23 @@ class PricingOptimizationService:
                 "hysteresis_profit_delta_threshold_pct": body.strategy.hysteresis_profit_delta_threshold_pct,
                 "hysteresis_applied": hysteresis_applied,
             },
+            "search": {
+                "mode": body.search,
+                "evaluations": int(len(plan.candidate_prices)),
+                "rounds": plan.search_rounds,
+            },
             "elasticity_implicit": "model-based",
-            "scenarios": scenarios,
+            "scenarios": plan.scenarios,
         }
 
+    @staticmethod
+    def _constraint_params(body: PricingOptimizeRequest) -> PricingConstraintParams:
+        return PricingConstraintParams(
+            max_price_change_pct=body.max_price_change_pct,
+            min_margin_pct=body.min_margin_pct,
+            smoothing_alpha=body.smoothing_alpha,
+        )
+
     def _validate_request(self, body: PricingOptimizeRequest) -> None:
         """Validate request and strategy parameters."""
         if not body.product_id or body.cost is None or body.price_min is None or body.price_max is None:
@@ -186,6 +331,10 @@ class PricingOptimizationService:
             raise ValueError("price_min must be less than price_max")
         if body.n_steps < 2:
             raise ValueError("n_steps must be >= 2")
+        if body.n_steps > _MAX_STEPS:
+            raise ValueError(f"n_steps must be <= {_MAX_STEPS}")
+        if body.price_precision <= 0:
+            raise ValueError("price_precision must be > 0")
         if body.max_price_change_pct < 0:
             raise ValueError("max_price_change_pct must be >= 0")
         if body.min_margin_pct < 0:
@@ -198,16 +347,35 @@ class PricingOptimizationService:
             raise ValueError("strategy.hysteresis_profit_delta_threshold_pct must be >= 0")
 
     async def _load_active_model(self):
-        file_path = await self._repo.get_active_model_path()
-        if not file_path or not os.path.exists(file_path):
+        active = await model_registry.get_active(self._repo)
+        if active is None:
             raise ValueError("No trained model available")
-        return load_model(file_path)
+        return active.booster
+
+    async def _latest_features(self, product_id: str) -> pd.DataFrame:
+        """Feature rows ending at the product's latest day; online state first, raw history otherwise."""
+        features = self._state_features(await self._repo.get_feature_states([product_id]))
+        if product_id in features:
+            return features[product_id]
+        df = await self._load_product_history(product_id)
+        return await compute.run_thread(self._prepare_features, df)
+
+    @staticmethod
+    def _state_features(states: dict) -> dict[str, pd.DataFrame]:
+        """Latest feature row per product whose state covers a full feature window."""
+        rows = {pid: state.feature_row() for pid, state in states.items()}
+        return {pid: row for pid, row in rows.items() if row is not None}
 
     async def _load_product_history(self, product_id: str) -> pd.DataFrame:
         """Load recent product history needed for lag features."""
         df = await self._repo.get_latest_sales_df([product_id], min_days=90)
-        if df.empty or len(df) < 30:
+        if df.empty or len(df) < _MIN_HISTORY_ROWS:
             raise ValueError("Insufficient data - need at least 30 days of history")
+        return self._aggregate_history(df)
+
+    @staticmethod
+    def _aggregate_history(df: pd.DataFrame) -> pd.DataFrame:
+        """Collapse duplicate (date, product) rows into one daily row."""
         if "date" in df.columns and "product_id" in df.columns:
             agg = df.groupby(["date", "product_id"]).agg(
                 quantity=("quantity", "sum"),
@@ -219,6 +387,51 @@ class PricingOptimizationService:
             df = agg.reset_index()
         return df
 
+    def _prepare_portfolio_features(
+        self,
+        df: pd.DataFrame,
+        product_ids: list[str],
+    ) -> tuple[dict[str, pd.DataFrame], dict[str, str]]:
+        """
+        Engineer features for all products at once; returns (features by product, failures).
+
+        Output per product matches _prepare_features on that product alone:
+        missing prices are filled with the product's own median, and products
+        too short to have any lag_30 value are engineered separately so the
+        shared dropna does not remove them.
+        """
+        failed: dict[str, str] = {}
+        raw_counts = df.groupby("product_id").size() if not df.empty else pd.Series(dtype=int)
+        for pid in product_ids:
+            n_rows = int(raw_counts.get(pid, 0))
+            if n_rows == 0:
+                failed[pid] = "No sales history"
+            elif n_rows < _MIN_HISTORY_ROWS:
+                failed[pid] = "Insufficient data - need at least 30 days of history"
+        eligible = [pid for pid in product_ids if pid not in failed]
+        if not eligible:
+            return {}, failed
+
+        agg = self._aggregate_history(df[df["product_id"].isin(eligible)])
+        agg["price"] = agg["price"].fillna(agg.groupby("product_id")["price"].transform("median"))
+        daily_counts = agg.groupby("product_id").size()
+        short_ids = set(daily_counts.index[daily_counts <= max(LAGS)])
+
+        features: dict[str, pd.DataFrame] = {}
+        long_df = agg[~agg["product_id"].isin(short_ids)]
+        if not long_df.empty:
+            df_feat = self._prepare_features(long_df)
+            features.update(dict(tuple(df_feat.groupby("product_id", sort=False))))
+        for pid in short_ids:
+            try:
+                features[pid] = self._prepare_features(agg[agg["product_id"] == pid])
+            except ValueError as exc:
+                failed[pid] = str(exc)
+        for pid in eligible:
+            if pid not in features and pid not in failed:
+                failed[pid] = "Insufficient data for feature engineering (need 30+ days)"
+        return features, failed
+
     def _prepare_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Build feature matrix and enforce required training columns."""
         df_feat = engineer_features(df)
@@ -233,29 +446,67 @@ class PricingOptimizationService:
             raise ValueError("Insufficient data for feature engineering (need 30+ days)")
         return df_feat
 
-    def _predict_metrics_for_price(
-        self,
-        *,
-        model,
-        base_row: pd.Series,
-        price: float,
-        base_price: float,
-        base_rolling_mean_price: float,
-        cost: float,
-    ) -> tuple[float, float, float]:
-        """Predict quantity/revenue/profit for a candidate price."""
-        row = base_row.copy()
-        row["price"] = price
-        row["log_price"] = np.log(max(price, 1e-8))
-        row["price_vs_avg_30"] = price / base_rolling_mean_price
-        row["price_change_pct"] = (price - base_price) / base_price if base_price > 0 else 0.0
+    @staticmethod
+    def _candidate_matrix(plan: _ProductPlan, prices: np.ndarray) -> np.ndarray:
+        return candidate_feature_matrix(
+            plan.base_features,
+            prices,
+            base_price=plan.base_price,
+            base_rolling_mean_price=plan.base_rolling_mean_price,
+        )
 
-        for col in FEATURE_COLS:
-            if col not in row.index:
-                row[col] = 0
-
-        X = pd.DataFrame([row[FEATURE_COLS]])
-        quantity_pred = max(0.0, float(predict(model, X)[0]))
-        revenue = price * quantity_pred
-        profit = (price - cost) * quantity_pred
-        return quantity_pred, revenue, profit
+    def _grid_matrix(self, plan: _ProductPlan) -> np.ndarray:
+        """Base row followed by one row per candidate price."""
+        return np.vstack([plan.base_features.reshape(1, -1), self._candidate_matrix(plan, plan.candidate_prices)])
+
+    def _smoothed_matrix(self, plan: _ProductPlan) -> np.ndarray:
+        return self._candidate_matrix(plan, np.array([plan.smoothed_price]))
+
+    async def _predict_stacked(self, model, plans: list[_ProductPlan], matrices: list[np.ndarray]) -> list[np.ndarray]:
+        """Predict the plans' matrices in one call; returns each plan's quantities."""
+        counts = [len(m) for m in matrices]
+        quantities = await compute.run_thread(
+            self._predict_quantities, model, np.vstack(matrices), self._row_ids(plans, counts)
+        )
+        return np.split(quantities, np.cumsum(counts)[:-1])
+
+    @staticmethod
+    def _row_ids(plans: list[_ProductPlan], counts: list[int]) -> dict[str, np.ndarray]:
+        """product_id / category_id of every row of the plans' stacked matrices."""
+        return {
+            ENTITY_COL: np.repeat(np.array([p.product_id for p in plans], dtype=object), counts),
+            "category_id": np.repeat(np.array([p.category_id for p in plans], dtype=object), counts),
+        }
+
+    @staticmethod
+    def _predict_quantities(model, X: np.ndarray, row_ids: dict[str, np.ndarray] | None = None) -> np.ndarray:
+        """Predict non-negative quantities for a stacked FEATURE_COLS matrix (row_ids route segmented models)."""
+        frame = pd.DataFrame(X, columns=FEATURE_COLS)
+        if row_ids is not None:
+            frame = frame.assign(**row_ids)
+        preds = predict(model, frame)
+        return np.maximum(0.0, np.asarray(preds, dtype=np.float64))
+
+    @staticmethod
+    def _build_scenarios(
+        *,
+        prices: np.ndarray,
+        quantities: np.ndarray,
+        revenues: np.ndarray,
+        profits: np.ndarray,
+        scores: np.ndarray,
+        risk_penalties: np.ndarray | None,
+    ) -> list[dict]:
+        """Convert candidate arrays into the rounded per-price scenario payload."""
+        columns = {
+            "price": prices,
+            "quantity": quantities,
+            "revenue": revenues,
+            "profit": profits,
+            "objective_score": scores,
+        }
+        if risk_penalties is not None:
+            columns["risk_penalty"] = risk_penalties
+        keys = list(columns)
+        rows = zip(*(np.asarray(v, dtype=np.float64).tolist() for v in columns.values()))
+        return [{k: round(v, 2) for k, v in zip(keys, row)} for row in rows]
@@ -1,13 +1,231 @@
 """Forecasting repository - data access layer."""
 
+import io
+import logging
 from datetime import date, datetime, timedelta
-from typing import Sequence
+from typing import IO, Sequence
 
+import numpy as np
 import pandas as pd
-from sqlalchemy import select
+from sqlalchemy import case, delete, distinct, func, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.forecasting.db_models import ModelArtifact, SalesFact
+from app.core.compute import compute
+from app.forecasting.dataset_version import (
+    FEATURE_STATE,
+    PERIOD_ROLLUPS,
+    PRODUCT_ROLLUP,
+    SALES_DATASET,
+    dataset_version_cache,
+)
+from app.forecasting.db_models import (
+    DatasetVersion,
+    MaterializedForecastPoint,
+    ModelArtifact,
+    ProductFeatureState,
+    ProductSalesRollup,
+    SalesFact,
+    SalesPeriodRollup,
+)
+from app.forecasting.feature_state import REBUILD_LOOKBACK_DAYS, FeatureState, apply_sales, build_feature_states
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SALES_COLUMNS = ("product_id", "date", "quantity", "revenue", "price", "promo_flag", "category_id")
+_SALES_DTYPES = {"quantity": np.float64, "revenue": np.float64, "price": np.float64, "promo_flag": np.bool_}
+_COPY_NULL = "\\N"
+
+
+def _sales_column(name: str, values) -> np.ndarray:
+    dtype = _SALES_DTYPES.get(name, object)
+    return np.array(values, dtype=dtype) if dtype is not object else np.array(values, dtype=object)
+
+
+def sales_frame_from_rows(chunks: Sequence[Sequence[tuple]], columns: Sequence[str]) -> pd.DataFrame:
+    """Build a typed sales DataFrame from row chunks without per-row dicts."""
+    parts: list[list[np.ndarray]] = []
+    for chunk in chunks:
+        if len(chunk):
+            transposed = list(zip(*chunk))
+            parts.append([_sales_column(c, transposed[i]) for i, c in enumerate(columns)])
+    data = {
+        c: np.concatenate([p[i] for p in parts]) if parts else _sales_column(c, [])
+        for i, c in enumerate(columns)
+    }
+    return pd.DataFrame(data, columns=list(columns))
+
+
+def sales_frame_from_csv(buf: IO[bytes], columns: Sequence[str]) -> pd.DataFrame:
+    """Parse COPY ... CSV output (NULL as \\N) into the same typed frame."""
+    dtypes = {c: ("str" if c in ("product_id", "date", "category_id") else _SALES_DTYPES[c]) for c in columns}
+    dtypes.pop("promo_flag", None)
+    df = pd.read_csv(
+        buf,
+        header=None,
+        names=list(columns),
+        dtype=dtypes,
+        keep_default_na=False,
+        na_values=[_COPY_NULL],
+        true_values=["t"],
+        false_values=["f"],
+    )
+    if "promo_flag" in df.columns:
+        df["promo_flag"] = df["promo_flag"].astype(np.bool_)
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d").dt.date
+    return df
+
+
+ROLLUP_COLUMNS = tuple(c.name for c in ProductSalesRollup.__table__.columns)
+
+
+def product_rollup_source():
+    """Aggregate sales_facts into rows shaped like product_sales_rollup."""
+    promo = SalesFact.promo_flag.is_(True)
+    non_promo = SalesFact.promo_flag.is_(False)
+    values = (
+        SalesFact.product_id,
+        func.count(),
+        func.count(distinct(SalesFact.date)),
+        func.coalesce(func.sum(SalesFact.quantity), 0.0),
+        func.coalesce(func.sum(SalesFact.revenue), 0.0),
+        func.sum(case((promo, 1), else_=0)),
+        func.sum(case((promo, SalesFact.quantity), else_=0.0)),
+        func.sum(case((non_promo, 1), else_=0)),
+        func.sum(case((non_promo, SalesFact.quantity), else_=0.0)),
+        func.count(SalesFact.price),
+        func.coalesce(func.sum(SalesFact.price), 0.0),
+        func.min(SalesFact.date),
+        func.max(SalesFact.date),
+    )
+    return select(*(v.label(name) for v, name in zip(values, ROLLUP_COLUMNS))).group_by(SalesFact.product_id)
+
+
+def _rollup_metric(rollup, metric: str):
+    """(metric expression, row conditions) over a product_sales_rollup-shaped selectable."""
+    c = rollup.c
+    if metric == "quantity":
+        return c.quantity_sum, []
+    if metric == "revenue":
+        return c.revenue_sum, []
+    if metric == "promo_lift":
+        promo_avg = c.promo_quantity_sum / c.promo_row_count
+        non_promo_avg = c.non_promo_quantity_sum / c.non_promo_row_count
+        lift = ((promo_avg - non_promo_avg) / non_promo_avg) * 100.0
+        return lift, [c.promo_row_count > 0, c.non_promo_row_count > 0, c.non_promo_quantity_sum != 0]
+    if metric == "avg_price":
+        return c.price_sum / c.price_row_count, [c.price_row_count > 0]
+    raise ValueError(f"Unsupported metric '{metric}'.")
+
+
+def product_rank_winners_query(rollup, metric: str, direction: str):
+    """All products tied for the top (desc) or bottom (asc) metric value, via one rank() window."""
+    metric_value, conditions = _rollup_metric(rollup, metric)
+    if direction not in ("desc", "asc"):
+        raise ValueError(f"Unsupported direction '{direction}'.")
+    order = metric_value.desc() if direction == "desc" else metric_value.asc()
+    ranked = (
+        select(
+            rollup.c.product_id.label("product_id"),
+            metric_value.label("metric_value"),
+            func.rank().over(order_by=order).label("metric_rank"),
+        )
+        .where(*conditions)
+        .subquery()
+    )
+    return (
+        select(ranked.c.product_id, ranked.c.metric_value)
+        .where(ranked.c.metric_rank == 1)
+        .order_by(ranked.c.product_id.asc())
+    )
+
+
+def product_ranked_list_query(rollup, metric: str, direction: str, limit: int):
+    """Top/bottom `limit` products by total quantity or revenue, ties broken by product_id."""
+    if metric not in ("quantity", "revenue"):
+        raise ValueError(f"Unsupported metric '{metric}' for ranking list.")
+    metric_value, _ = _rollup_metric(rollup, metric)
+    if direction == "desc":
+        order = metric_value.desc()
+    elif direction == "asc":
+        order = metric_value.asc()
+    else:
+        raise ValueError(f"Unsupported direction '{direction}' for ranking list.")
+    return (
+        select(rollup.c.product_id.label("product_id"), metric_value.label("metric_value"))
+        .order_by(order, rollup.c.product_id.asc())
+        .limit(limit)
+    )
+
+
+def period_start(d: date, resolution: str) -> date:
+    """First day of the week (Monday) or month containing d."""
+    if resolution == "week":
+        return d - timedelta(days=d.weekday())
+    if resolution == "month":
+        return d.replace(day=1)
+    raise ValueError(f"Unsupported resolution '{resolution}'.")
+
+
+def period_rollup_query(resolution: str, from_date: date, to_date: date, product_ids: list[str] | None = None):
+    """Rows of sales_period_rollups for periods starting in [from_date, to_date], by period then product."""
+    r = SalesPeriodRollup
+    q = select(
+        r.period_start,
+        r.product_id,
+        r.quantity,
+        r.revenue,
+        case((r.price_count > 0, r.price_sum / r.price_count), else_=0.0).label("price"),
+    ).where(r.resolution == resolution, r.period_start >= from_date, r.period_start <= to_date)
+    if product_ids:
+        q = q.where(r.product_id.in_(product_ids))
+    return q.order_by(r.period_start, r.product_id)
+
+
+PERIOD_ROLLUP_COLUMNS = tuple(c.name for c in SalesPeriodRollup.__table__.columns)
+PERIOD_RESOLUTIONS = ("week", "month")
+
+
+def period_rollup_frame(df: pd.DataFrame, resolution: str) -> pd.DataFrame:
+    """Sum a sales frame into sales_period_rollups rows, sorted by period then product."""
+    if resolution not in PERIOD_RESOLUTIONS:
+        raise ValueError(f"Unsupported resolution '{resolution}'.")
+    if df.empty:
+        return pd.DataFrame(columns=list(PERIOD_ROLLUP_COLUMNS))
+    starts = pd.to_datetime(df["date"])
+    if resolution == "week":
+        starts = starts - pd.to_timedelta(starts.dt.weekday, unit="D")
+    else:
+        starts = starts.dt.to_period("M").dt.start_time
+    grouped = (
+        df.assign(period_start=starts.dt.date)
+        .groupby(["period_start", "product_id"], sort=True)
+        .agg(
+            quantity=("quantity", "sum"),
+            revenue=("revenue", "sum"),
+            price_sum=("price", "sum"),
+            price_count=("price", "count"),
+            row_count=("quantity", "size"),
+        )
+        .reset_index()
+    )
+    return grouped.assign(resolution=resolution)[list(PERIOD_ROLLUP_COLUMNS)]
+
+
+def aggregate_sales_periods(df: pd.DataFrame, resolution: str) -> list[dict]:
+    """Sum a sales frame into per-product periods; price is the mean of the non-null daily prices."""
+    grouped = period_rollup_frame(df, resolution)
+    return [
+        {
+            "date": str(r.period_start),
+            "product_id": r.product_id,
+            "quantity": float(r.quantity),
+            "revenue": float(r.revenue),
+            "price": float(r.price_sum / r.price_count) if r.price_count else 0.0,
+        }
+        for r in grouped.itertuples(index=False)
+    ]
 
 
 class ForecastingRepository:
@@ -21,34 +239,63 @@ class ForecastingRepository:
         from_date: date,
         to_date: date,
         product_ids: list[str] | None = None,
+        columns: Sequence[str] = SALES_COLUMNS,
     ) -> pd.DataFrame:
-        """Fetch sales as DataFrame for feature engineering."""
+        """
+        Fetch sales as DataFrame for feature engineering.
+
+        Full-table reads (no product filter) are served from the local
+        sales snapshot when SALES_SNAPSHOT_ENABLED is set. Otherwise only
+        the requested columns are selected. On asyncpg the rows are
+        pulled with COPY; otherwise they are streamed in chunks and built
+        column by column. Numeric columns are float64, promo_flag is bool
+        and date holds datetime.date values.
+        """
+        columns = list(columns)
+        unknown = set(columns) - set(SALES_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown sales columns: {sorted(unknown)}")
+        if not product_ids and settings.sales_snapshot_enabled:
+            from app.forecasting.sales_snapshot import sales_snapshot
+            try:
+                return await sales_snapshot.get_sales_df(self, from_date, to_date, columns)
+            except (OSError, ValueError, KeyError) as exc:
+                logger.warning("Sales snapshot unavailable (%s) — reading from database.", exc)
         q = (
-            select(SalesFact)
+            select(*(getattr(SalesFact, c) for c in columns))
             .where(SalesFact.date >= from_date, SalesFact.date <= to_date)
         )
         if product_ids:
             q = q.where(SalesFact.product_id.in_(product_ids))
         q = q.order_by(SalesFact.date)
-        result = await self._session.execute(q)
-        rows = result.scalars().all()
-        if not rows:
-            return pd.DataFrame(
-                columns=["product_id", "date", "quantity", "revenue", "price", "promo_flag", "category_id"]
-            )
-        data = [
-            {
-                "product_id": r.product_id,
-                "date": r.date,
-                "quantity": r.quantity,
-                "revenue": r.revenue,
-                "price": r.price,
-                "promo_flag": r.promo_flag,
-                "category_id": r.category_id,
-            }
-            for r in rows
-        ]
-        return pd.DataFrame(data)
+        return await self._fetch_sales_frame(q, columns)
+
+    async def _fetch_sales_frame(self, q, columns: list[str]) -> pd.DataFrame:
+        """Run a column select and return a typed DataFrame."""
+        if settings.sales_fetch_copy_enabled:
+            df = await self._copy_sales_frame(q, columns)
+            if df is not None:
+                return df
+        chunks: list[Sequence] = []
+        result = await self._session.stream(q)
+        async for partition in result.partitions(max(1, settings.sales_fetch_chunk_rows)):
+            chunks.append(partition)
+        return sales_frame_from_rows(chunks, columns)
+
+    async def _copy_sales_frame(self, q, columns: list[str]) -> pd.DataFrame | None:
+        """COPY the query result as CSV via asyncpg; None when the driver cannot."""
+        conn = await self._session.connection()
+        if conn.dialect.name != "postgresql":
+            return None
+        raw = await conn.get_raw_connection()
+        driver = getattr(raw, "driver_connection", None)
+        if not hasattr(driver, "copy_from_query"):
+            return None
+        sql = str(q.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+        buf = io.BytesIO()
+        await driver.copy_from_query(sql, output=buf, format="csv", null=_COPY_NULL)
+        buf.seek(0)
+        return sales_frame_from_csv(buf, columns)
 
     async def get_aggregated_daily(
         self,
@@ -86,6 +333,53 @@ class ForecastingRepository:
             for r in rows
         ]
 
+    async def get_aggregated_sales(
+        self,
+        from_date: date,
+        to_date: date,
+        product_ids: list[str] | None = None,
+        resolution: str = "day",
+    ) -> list[dict]:
+        """
+        Aggregated sales for visualization at day, week or month resolution.
+
+        Weekly and monthly rows cover whole periods overlapping the range
+        and are dated by the period start. They come from sales_period_rollups
+        when its stamp matches the sales_facts version; otherwise (stamp
+        lagging, or no version row to compare) they are aggregated from
+        sales_facts on the fly. Rebuilding the rollups is left to the ingest
+        paths and, on PostgreSQL, the migration 009 trigger.
+        """
+        if resolution == "day":
+            return await self.get_aggregated_daily(from_date, to_date, product_ids)
+        first = period_start(from_date, resolution)
+        result = await self._session.execute(
+            select(DatasetVersion.name, DatasetVersion.version).where(
+                DatasetVersion.name.in_([SALES_DATASET, PERIOD_ROLLUPS])
+            )
+        )
+        versions = dict(result.all())
+        if SALES_DATASET in versions and versions.get(PERIOD_ROLLUPS) == versions[SALES_DATASET]:
+            rows = (await self._session.execute(period_rollup_query(resolution, first, to_date, product_ids))).all()
+            return [
+                {
+                    "date": str(r.period_start),
+                    "product_id": r.product_id,
+                    "quantity": float(r.quantity),
+                    "revenue": float(r.revenue),
+                    "price": float(r.price or 0),
+                }
+                for r in rows
+            ]
+        if resolution == "week":
+            last = period_start(to_date, resolution) + timedelta(days=6)
+        else:
+            last = (period_start(to_date, resolution) + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+        df = await self.get_sales_df(
+            first, last, product_ids, columns=["product_id", "date", "quantity", "revenue", "price"]
+        )
+        return aggregate_sales_periods(df, resolution)
+
     async def get_latest_sales_df(
         self,
         product_ids: list[str],
@@ -102,12 +396,38 @@ class ForecastingRepository:
         result = await self._session.execute(subq)
         max_date = result.scalar_one_or_none()
         if not max_date:
-            return pd.DataFrame(
-                columns=["product_id", "date", "quantity", "revenue", "price", "promo_flag", "category_id"]
-            )
+            return sales_frame_from_rows([], list(SALES_COLUMNS))
         from_date = max_date - timedelta(days=min_days)
         return await self.get_sales_df(from_date, max_date, product_ids)
 
+    async def get_latest_sales_df_per_product(
+        self,
+        product_ids: list[str] | None,
+        min_days: int = 90,
+    ) -> pd.DataFrame:
+        """
+        Fetch each product's trailing min_days of sales in a single query.
+
+        Unlike get_latest_sales_df, the window is anchored on every product's
+        own latest date, so products with stale history are not cut off.
+        product_ids=None covers every product.
+        """
+        from sqlalchemy import func
+        latest = select(
+            SalesFact.product_id.label("product_id"),
+            func.max(SalesFact.date).label("max_date"),
+        )
+        if product_ids is not None:
+            latest = latest.where(SalesFact.product_id.in_(product_ids))
+        latest = latest.group_by(SalesFact.product_id).subquery()
+        q = (
+            select(*(getattr(SalesFact, c) for c in SALES_COLUMNS))
+            .join(latest, SalesFact.product_id == latest.c.product_id)
+            .where(SalesFact.date >= latest.c.max_date - timedelta(days=min_days))
+            .order_by(SalesFact.product_id, SalesFact.date)
+        )
+        return await self._fetch_sales_frame(q, list(SALES_COLUMNS))
+
     async def get_date_range(self) -> tuple["date | None", "date | None"]:
         """Return (min_date, max_date) across all sales_facts rows."""
         from sqlalchemy import func
@@ -125,11 +445,18 @@ class ForecastingRepository:
         )
         return [r[0] for r in result.all()]
 
-    async def get_sales_dataset_signature(self) -> dict[str, str | int | float | None]:
-        """Return a stable aggregate signature for sales_facts cache invalidation."""
+    async def get_sales_dataset_signature(
+        self, max_id: int | None = None
+    ) -> dict[str, str | int | float | None]:
+        """
+        Return a stable aggregate signature for sales_facts cache invalidation.
+
+        With max_id, only rows with id <= max_id are covered; the sales
+        snapshot uses this to check that already-copied rows are unchanged.
+        """
         from sqlalchemy import case, func
 
-        result = await self._session.execute(
+        q = (
             select(
                 func.count(SalesFact.id),
                 func.coalesce(func.sum(SalesFact.quantity), 0.0),
@@ -147,6 +474,9 @@ class ForecastingRepository:
                 func.max(SalesFact.date),
             )
         )
+        if max_id is not None:
+            q = q.where(SalesFact.id <= max_id)
+        result = await self._session.execute(q)
         row = result.one()
         return {
             "row_count": int(row[0] or 0),
@@ -159,6 +489,267 @@ class ForecastingRepository:
             "date_to": row[7].isoformat() if row[7] else None,
         }
 
+    async def get_sales_dataset_fingerprint(self) -> dict[str, str | int | None]:
+        """
+        Return the sales_facts cache fingerprint: its dataset_versions row.
+
+        A primary-key lookup, cached in-process for DATASET_VERSION_CACHE_SECONDS.
+        Falls back to the full-table signature when no version row exists yet.
+        """
+        cached = dataset_version_cache.get(SALES_DATASET)
+        if cached is not None:
+            return cached
+        result = await self._session.execute(
+            select(DatasetVersion.version, DatasetVersion.updated_at).where(DatasetVersion.name == SALES_DATASET)
+        )
+        row = result.one_or_none()
+        if row is None:
+            fingerprint = {"dataset": SALES_DATASET, "signature": await self.get_sales_dataset_signature()}
+        else:
+            fingerprint = {
+                "dataset": SALES_DATASET,
+                "version": int(row.version),
+                "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+            }
+        dataset_version_cache.put(SALES_DATASET, fingerprint)
+        return fingerprint
+
+    async def _has_sales_version_trigger(self) -> bool:
+        """True when the migration 007 trigger bumps the sales_facts version on every write."""
+        from sqlalchemy import text
+
+        conn = await self._session.connection()
+        if conn.dialect.name != "postgresql":
+            return False
+        result = await self._session.execute(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_trigger "
+                "WHERE tgname = 'sales_facts_dataset_version' AND NOT tgisinternal)"
+            )
+        )
+        return bool(result.scalar())
+
+    async def bump_sales_dataset_version(self) -> None:
+        """
+        Record a sales_facts change; call in the same transaction as the write.
+
+        Where the migration 007 trigger exists every write statement has
+        already bumped the version and the rollup triggers have stamped their
+        tables with it, so bumping again would leave those stamps one version
+        behind; only the in-process fingerprint cache is dropped then.
+        """
+        from sqlalchemy import update
+
+        if await self._has_sales_version_trigger():
+            dataset_version_cache.invalidate(SALES_DATASET)
+            return
+        now = datetime.utcnow()
+        result = await self._session.execute(
+            update(DatasetVersion)
+            .where(DatasetVersion.name == SALES_DATASET)
+            .values(version=DatasetVersion.version + 1, updated_at=now)
+        )
+        if not result.rowcount:
+            self._session.add(DatasetVersion(name=SALES_DATASET, version=1, updated_at=now))
+            await self._session.flush()
+        dataset_version_cache.invalidate(SALES_DATASET)
+
+    async def get_sales_max_id(self) -> int:
+        """Return the highest sales_facts id (0 when empty)."""
+        from sqlalchemy import func
+        result = await self._session.execute(select(func.coalesce(func.max(SalesFact.id), 0)))
+        return int(result.scalar_one())
+
+    async def get_sales_rows_by_id(self, after_id: int, upto_id: int) -> pd.DataFrame:
+        """Fetch all sales columns for after_id < id <= upto_id, ordered by id."""
+        q = (
+            select(*(getattr(SalesFact, c) for c in SALES_COLUMNS))
+            .where(SalesFact.id > after_id, SalesFact.id <= upto_id)
+            .order_by(SalesFact.id)
+        )
+        return await self._fetch_sales_frame(q, list(SALES_COLUMNS))
+
+    async def _product_rollup(self):
+        """
+        Selectable with the product_sales_rollup columns.
+
+        The table itself once its stamp matches the sales_facts version
+        (rebuilding it first when it lags); an on-the-fly aggregate when
+        sales_facts has no version row to compare against.
+        """
+        result = await self._session.execute(
+            select(DatasetVersion.name, DatasetVersion.version).where(
+                DatasetVersion.name.in_([SALES_DATASET, PRODUCT_ROLLUP])
+            )
+        )
+        versions = dict(result.all())
+        if SALES_DATASET not in versions:
+            return product_rollup_source().subquery()
+        if versions.get(PRODUCT_ROLLUP) != versions[SALES_DATASET]:
+            await self.refresh_product_sales_rollup()
+        return ProductSalesRollup.__table__
+
+    async def _lock_stamp(self, name: str):
+        """(locked stamp row or None, sales_facts (version, updated_at) or None) for a derived table."""
+        stamp = (
+            await self._session.execute(select(DatasetVersion).where(DatasetVersion.name == name).with_for_update())
+        ).scalar_one_or_none()
+        sales = (
+            await self._session.execute(
+                select(DatasetVersion.version, DatasetVersion.updated_at).where(DatasetVersion.name == SALES_DATASET)
+            )
+        ).one_or_none()
+        return stamp, sales
+
+    async def _write_stamp(self, name: str, stamp, sales) -> int:
+        """Bring a derived table's stamp up to the sales_facts version; returns that version."""
+        from sqlalchemy import update
+
+        version = sales.version if sales is not None else 0
+        updated_at = sales.updated_at if sales is not None else datetime.utcnow()
+        if stamp is None:
+            self._session.add(DatasetVersion(name=name, version=version, updated_at=updated_at))
+            await self._session.flush()
+        else:
+            await self._session.execute(
+                update(DatasetVersion).where(DatasetVersion.name == name).values(version=version, updated_at=updated_at)
+            )
+        return version
+
+    async def refresh_product_sales_rollup(self, force: bool = False) -> bool:
+        """
+        Rebuild product_sales_rollup from sales_facts if its stamp lags; True when rebuilt.
+
+        The stamp row is locked first, so concurrent callers rebuild once.
+        On PostgreSQL triggers normally keep the table current (migration 008).
+        """
+        stamp, sales = await self._lock_stamp(PRODUCT_ROLLUP)
+        if not force and stamp is not None and sales is not None and stamp.version == sales.version:
+            return False
+
+        await self._session.execute(delete(ProductSalesRollup))
+        await self._session.execute(insert(ProductSalesRollup).from_select(ROLLUP_COLUMNS, product_rollup_source()))
+        version = await self._write_stamp(PRODUCT_ROLLUP, stamp, sales)
+        logger.info("product_sales_rollup rebuilt at sales_facts version %s", version)
+        return True
+
+    async def refresh_sales_period_rollups(self, force: bool = False) -> bool:
+        """
+        Rebuild sales_period_rollups from sales_facts if its stamp lags; True when rebuilt.
+
+        Locked like refresh_product_sales_rollup. On PostgreSQL triggers
+        normally keep the table current (migration 009); elsewhere the ingest
+        paths rebuild it, and reads fall back to raw sales until they have.
+        """
+        stamp, sales = await self._lock_stamp(PERIOD_ROLLUPS)
+        if not force and stamp is not None and sales is not None and stamp.version == sales.version:
+            return False
+
+        columns = ["product_id", "date", "quantity", "revenue", "price"]
+        df = await self._fetch_sales_frame(select(*(getattr(SalesFact, c) for c in columns)), columns)
+        frame = await compute.run_thread(
+            lambda: pd.concat([period_rollup_frame(df, r) for r in PERIOD_RESOLUTIONS], ignore_index=True)
+        )
+        await self._session.execute(delete(SalesPeriodRollup))
+        if not frame.empty:
+            await self._session.execute(insert(SalesPeriodRollup), frame.to_dict("records"))
+        version = await self._write_stamp(PERIOD_ROLLUPS, stamp, sales)
+        logger.info("sales_period_rollups rebuilt (%d rows) at sales_facts version %s", len(frame), version)
+        return True
+
+    async def get_feature_states(self, product_ids: list[str]) -> dict[str, FeatureState]:
+        """
+        Online feature states of the given products that have one.
+
+        Empty when FEATURE_STATE_ENABLED is off, sales_facts has no version
+        row or product_feature_state lags it; callers then build features from
+        raw history. States are only rebuilt by the ingest paths.
+        """
+        if not settings.feature_state_enabled or not product_ids:
+            return {}
+        result = await self._session.execute(
+            select(DatasetVersion.name, DatasetVersion.version).where(
+                DatasetVersion.name.in_([SALES_DATASET, FEATURE_STATE])
+            )
+        )
+        versions = dict(result.all())
+        if SALES_DATASET not in versions:
+            return {}
+        if versions.get(FEATURE_STATE) != versions[SALES_DATASET]:
+            return {}
+        return await self._load_feature_states(product_ids)
+
+    async def _load_feature_states(self, product_ids: list[str]) -> dict[str, FeatureState]:
+        rows = await self._session.execute(
+            select(ProductFeatureState).where(ProductFeatureState.product_id.in_(product_ids))
+        )
+        return {row.product_id: FeatureState.from_record(row) for row in rows.scalars()}
+
+    async def _replace_feature_states(self, states: list[FeatureState], product_ids: list[str] | None) -> None:
+        """Replace the rows of product_ids (all rows when None) with states."""
+        stmt = delete(ProductFeatureState)
+        if product_ids is not None:
+            stmt = stmt.where(ProductFeatureState.product_id.in_(product_ids))
+        await self._session.execute(stmt)
+        if states:
+            await self._session.execute(insert(ProductFeatureState), [state.to_record() for state in states])
+
+    async def lock_feature_states(self) -> bool:
+        """
+        Lock the product_feature_state stamp for an ingest; True when it is current.
+
+        Called before writing sales_facts. While current, the ingest only has
+        to bring the products it touches forward (update_feature_states or a
+        scoped refresh_feature_states); otherwise it rebuilds every product.
+        """
+        stamp, sales = await self._lock_stamp(FEATURE_STATE)
+        return stamp is not None and sales is not None and stamp.version == sales.version
+
+    async def update_feature_states(self, appended: pd.DataFrame) -> None:
+        """
+        Push rows just appended to sales_facts onto the states of their products.
+
+        Requires the stamp to have been current before the rows were written
+        (lock_feature_states). Products without a state, or with rows not
+        after their last_date, are rebuilt from their own trailing history.
+        """
+        stamp, sales = await self._lock_stamp(FEATURE_STATE)
+        product_ids = sorted(appended["product_id"].unique()) if not appended.empty else []
+        states = await self._load_feature_states(product_ids) if product_ids else {}
+        rebuild = await compute.run_thread(apply_sales, states, appended)
+        updated = [states[p] for p in product_ids if p in states and p not in rebuild]
+        if rebuild:
+            df = await self.get_latest_sales_df_per_product(rebuild, min_days=REBUILD_LOOKBACK_DAYS)
+            updated += await compute.run_thread(build_feature_states, df)
+        await self._replace_feature_states(updated, product_ids)
+        version = await self._write_stamp(FEATURE_STATE, stamp, sales)
+        logger.info(
+            "product_feature_state updated for %d products (%d rebuilt) at sales_facts version %s",
+            len(product_ids),
+            len(rebuild),
+            version,
+        )
+
+    async def refresh_feature_states(self, force: bool = False, product_ids: list[str] | None = None) -> bool:
+        """
+        Rebuild product_feature_state from each product's trailing history if its stamp lags.
+
+        Called by the ingest paths right after bump_sales_dataset_version, so
+        inference finds current states; True when rebuilt. product_ids limits
+        the rebuild to the products an ingest rewrote and requires the stamp
+        to have been current before it (lock_feature_states).
+        """
+        stamp, sales = await self._lock_stamp(FEATURE_STATE)
+        if not force and stamp is not None and sales is not None and stamp.version == sales.version:
+            return False
+
+        df = await self.get_latest_sales_df_per_product(product_ids, min_days=REBUILD_LOOKBACK_DAYS)
+        states = await compute.run_thread(build_feature_states, df)
+        await self._replace_feature_states(states, product_ids)
+        version = await self._write_stamp(FEATURE_STATE, stamp, sales)
+        logger.info("product_feature_state rebuilt for %d products at sales_facts version %s", len(states), version)
+        return True
+
     async def get_product_rank_winners(
         self,
         *,
@@ -168,9 +759,7 @@ class ForecastingRepository:
         date_range: None = None,
         limit: int = 1,
     ) -> list[dict[str, float | str]]:
-        """Return all tied winners for a supported top/bottom product query."""
-        from sqlalchemy import case, func
-
+        """Return all tied winners for a supported top/bottom product query (from the rollup)."""
         if filters:
             raise ValueError("Product rank resolver does not support filters yet.")
         if date_range is not None:
@@ -178,72 +767,11 @@ class ForecastingRepository:
         if limit != 1:
             raise ValueError("Product rank resolver supports only limit=1.")
 
-        if metric == "quantity":
-            metric_column = SalesFact.quantity
-            grouped = (
-                select(
-                    SalesFact.product_id.label("product_id"),
-                    func.sum(metric_column).label("metric_value"),
-                )
-                .group_by(SalesFact.product_id)
-                .subquery()
-            )
-        elif metric == "revenue":
-            metric_column = SalesFact.revenue
-            grouped = (
-                select(
-                    SalesFact.product_id.label("product_id"),
-                    func.sum(metric_column).label("metric_value"),
-                )
-                .group_by(SalesFact.product_id)
-                .subquery()
-            )
-        elif metric == "promo_lift":
-            promo_avg = func.avg(case((SalesFact.promo_flag.is_(True), SalesFact.quantity), else_=None))
-            non_promo_avg = func.avg(case((SalesFact.promo_flag.is_(False), SalesFact.quantity), else_=None))
-            promo_count = func.sum(case((SalesFact.promo_flag.is_(True), 1), else_=0))
-            non_promo_count = func.sum(case((SalesFact.promo_flag.is_(False), 1), else_=0))
-            grouped = (
-                select(
-                    SalesFact.product_id.label("product_id"),
-                    (((promo_avg - non_promo_avg) / func.nullif(non_promo_avg, 0.0)) * 100.0).label("metric_value"),
-                )
-                .group_by(SalesFact.product_id)
-                .having(promo_count > 0)
-                .having(non_promo_count > 0)
-                .having(non_promo_avg != 0)
-                .subquery()
-            )
-        elif metric == "avg_price":
-            grouped = (
-                select(
-                    SalesFact.product_id.label("product_id"),
-                    func.avg(SalesFact.price).label("metric_value"),
-                )
-                .where(SalesFact.price.is_not(None))
-                .group_by(SalesFact.product_id)
-                .subquery()
-            )
-        else:
-            raise ValueError(f"Unsupported metric '{metric}'.")
-        aggregate_fn = func.max if direction == "desc" else func.min if direction == "asc" else None
-        if aggregate_fn is None:
-            raise ValueError(f"Unsupported direction '{direction}'.")
-
-        extreme_result = await self._session.execute(select(aggregate_fn(grouped.c.metric_value)))
-        extreme_value = extreme_result.scalar_one_or_none()
-        if extreme_value is None:
-            return []
-
-        winners_result = await self._session.execute(
-            select(grouped.c.product_id, grouped.c.metric_value)
-            .where(grouped.c.metric_value == extreme_value)
-            .order_by(grouped.c.product_id.asc())
-        )
-        rows = winners_result.all()
+        rollup = await self._product_rollup()
+        result = await self._session.execute(product_rank_winners_query(rollup, metric, direction))
         return [
             {"product_id": row.product_id, "value": float(row.metric_value)}
-            for row in rows
+            for row in result.all()
         ]
 
     async def get_product_ranked_list(
@@ -254,47 +782,29 @@ class ForecastingRepository:
         limit: int = 5,
     ) -> list[dict[str, float | str]]:
         """Return a stable top/bottom product ranking list for supported aggregate metrics."""
-        from sqlalchemy import func
-
         if limit <= 0:
             raise ValueError("Product ranking list requires limit > 0.")
 
-        if metric == "quantity":
-            metric_column = SalesFact.quantity
-            grouped = (
-                select(
-                    SalesFact.product_id.label("product_id"),
-                    func.sum(metric_column).label("metric_value"),
-                )
-                .group_by(SalesFact.product_id)
-            )
-        elif metric == "revenue":
-            metric_column = SalesFact.revenue
-            grouped = (
-                select(
-                    SalesFact.product_id.label("product_id"),
-                    func.sum(metric_column).label("metric_value"),
-                )
-                .group_by(SalesFact.product_id)
-            )
-        else:
-            raise ValueError(f"Unsupported metric '{metric}' for ranking list.")
-
-        order_column = "metric_value"
-        if direction == "desc":
-            grouped = grouped.order_by(getattr(func, "sum")(metric_column).desc(), SalesFact.product_id.asc())
-        elif direction == "asc":
-            grouped = grouped.order_by(getattr(func, "sum")(metric_column).asc(), SalesFact.product_id.asc())
-        else:
-            raise ValueError(f"Unsupported direction '{direction}' for ranking list.")
-
-        result = await self._session.execute(grouped.limit(limit))
-        rows = result.all()
+        rollup = await self._product_rollup()
+        result = await self._session.execute(product_ranked_list_query(rollup, metric, direction, limit))
         return [
             {"product_id": row.product_id, "value": float(row.metric_value)}
-            for row in rows
+            for row in result.all()
         ]
 
+    async def get_active_model_artifact(self) -> ModelArtifact | None:
+        """Get the active model artifact row (version + file path in one query)."""
+        q = select(ModelArtifact).where(ModelArtifact.is_active == True).limit(1)
+        result = await self._session.execute(q)
+        return result.scalar_one_or_none()
+
+    async def get_model_artifact(self, version: str) -> ModelArtifact | None:
+        """Get a model artifact by version."""
+        result = await self._session.execute(
+            select(ModelArtifact).where(ModelArtifact.version == version)
+        )
+        return result.scalar_one_or_none()
+
     async def get_active_model_path(self) -> str | None:
         """Get file path of active model artifact."""
         q = select(ModelArtifact).where(ModelArtifact.is_active == True).limit(1)
@@ -318,6 +828,13 @@ class ForecastingRepository:
         data_to: date,
         mae: float | None = None,
         mape: float | None = None,
+        training_mode: str = "full",
+        parent_version: str | None = None,
+        base_version: str | None = None,
+        refresh_count: int = 0,
+        params: dict | None = None,
+        cv_metrics: dict | None = None,
+        segments: dict | None = None,
     ) -> ModelArtifact:
         """Create and persist model artifact; deactivate previous."""
         await self._session.execute(
@@ -332,7 +849,67 @@ class ForecastingRepository:
             mae=mae,
             mape=mape,
             is_active=True,
+            training_mode=training_mode,
+            parent_version=parent_version,
+            base_version=base_version or version,
+            refresh_count=refresh_count,
+            params=params,
+            cv_metrics=cv_metrics,
+            segments=segments,
         )
         self._session.add(art)
         await self._session.flush()
         return art
+
+    async def get_forecast_points(
+        self,
+        version: str,
+        product_id: str,
+        from_date: date,
+        to_date: date,
+    ) -> list:
+        """Fetch materialized forecast rows (date, predicted_quantity, predicted_revenue)."""
+        q = (
+            select(
+                MaterializedForecastPoint.date,
+                MaterializedForecastPoint.predicted_quantity,
+                MaterializedForecastPoint.predicted_revenue,
+            )
+            .where(
+                MaterializedForecastPoint.model_version == version,
+                MaterializedForecastPoint.product_id == product_id,
+                MaterializedForecastPoint.date >= from_date,
+                MaterializedForecastPoint.date <= to_date,
+            )
+            .order_by(MaterializedForecastPoint.date)
+        )
+        result = await self._session.execute(q)
+        return list(result.all())
+
+    _INSERT_CHUNK_ROWS = 10_000
+
+    async def replace_forecast_points(self, version: str, points: pd.DataFrame) -> int:
+        """Replace all materialized forecasts with the given version's points."""
+        await self.delete_forecast_points()
+        rows = [
+            {
+                "model_version": version,
+                "product_id": product_id,
+                "date": d,
+                "predicted_quantity": float(qty),
+                "predicted_revenue": None if pd.isna(rev) else float(rev),
+            }
+            for product_id, d, qty, rev in points[
+                ["product_id", "date", "predicted_quantity", "predicted_revenue"]
+            ].itertuples(index=False, name=None)
+        ]
+        for start in range(0, len(rows), self._INSERT_CHUNK_ROWS):
+            await self._session.execute(
+                insert(MaterializedForecastPoint),
+                rows[start : start + self._INSERT_CHUNK_ROWS],
+            )
+        return len(rows)
+
+    async def delete_forecast_points(self) -> None:
+        """Drop all materialized forecasts (e.g. after new sales data lands)."""
+        await self._session.execute(delete(MaterializedForecastPoint))
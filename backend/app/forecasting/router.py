@@ -2,18 +2,29 @@
 
 import asyncio
 from datetime import date
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 
+from app.core.compute import compute
 from app.core.security import verify_api_key
 from app.core.deps import AsyncSessionDep
+from app.db.session import AsyncSessionLocal
+from app.forecasting.downsample import downsample_series
 from app.forecasting.repository import ForecastingRepository
 from app.forecasting.schemas import (
+    BatchForecastRequest,
+    BatchForecastResponse,
     ForecastResponse,
+    PortfolioBacktestRequest,
     ScenarioPriceChangeRequest,
     ScenarioPriceChangeResponse,
+    ScenarioSweepRequest,
+    ScenarioSweepResponse,
 )
 from app.forecasting.service import ForecastingService
+from app.jobs.manager import JobContext
+from app.jobs.router import run_exclusive, submit_job
 
 router = APIRouter(prefix="/api", tags=["forecasting"])
 
@@ -22,16 +33,30 @@ def get_forecasting_service(session: AsyncSessionDep) -> ForecastingService:
     return ForecastingService(ForecastingRepository(session))
 
 
+def _service_job(method: str, **kwargs):
+    """Background job running one ForecastingService method on its own session."""
+
+    async def run(ctx: JobContext):
+        async with AsyncSessionLocal() as session:
+            await ctx.report(0.0, f"{method} started")
+            result = await getattr(get_forecasting_service(session), method)(**kwargs)
+            await session.commit()
+            return result
+
+    return run
+
+
 @router.post("/admin/seed", dependencies=[Depends(verify_api_key)])
 async def seed_demo_data():
     """Load demo data (API key required)."""
     from datetime import timedelta
 
-    from sqlalchemy import func, select
+    import pandas as pd
+    from sqlalchemy import delete, func, select
 
     from app.db.base import Base
     from app.db.session import async_engine
-    from app.forecasting.db_models import SalesFact
+    from app.forecasting.db_models import MaterializedForecastPoint, SalesFact
     from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
     async with async_engine.begin() as conn:
@@ -47,16 +72,19 @@ async def seed_demo_data():
         cnt = result.scalar() or 0
         if cnt > 0:
             return {"status": "ok", "message": "Data already exists", "rows": cnt}
+        repo = ForecastingRepository(sess)
+        states_current = await repo.lock_feature_states()
         start = date.today() - timedelta(days=120)
         products = [("P001", 19.99, "C1"), ("P002", 24.99, "C2"), ("P003", 29.99, "C3")]
+        rows = []
         for i in range(120):
             d = start + timedelta(days=i)
             for j, (pid, price, cat) in enumerate(products):
                 qty = 10 + (j * 5) + (d.day % 7)
                 promo = d.weekday() in (4, 5)
                 p = price * 0.9 if promo else price
-                sess.add(
-                    SalesFact(
+                rows.append(
+                    dict(
                         product_id=pid,
                         date=d,
                         quantity=float(qty),
@@ -64,22 +92,44 @@ async def seed_demo_data():
                         price=p,
                         promo_flag=promo,
                         category_id=cat,
-                        source="seed",
                     )
                 )
+        sess.add_all([SalesFact(**row, source="seed") for row in rows])
+        await sess.execute(delete(MaterializedForecastPoint))
+        await repo.bump_sales_dataset_version()
+        if states_current:
+            await repo.update_feature_states(pd.DataFrame(rows))
+        else:
+            await repo.refresh_feature_states()
+        await repo.refresh_sales_period_rollups()
         await sess.commit()
     return {"status": "ok", "message": "Seeded 360 sales facts", "rows": 360}
 
 
 @router.post("/admin/import-kaggle", dependencies=[Depends(verify_api_key)])
-async def import_kaggle_data():
-    """Import Kaggle retail CSV from /data into sales_facts (API key required)."""
+async def import_kaggle_data(background: bool = False):
+    """
+    Import Kaggle retail CSV from /data into sales_facts (API key required).
+
+    background=true returns 202 with a job id; job progress follows the
+    share of the file read.
+    """
     from app.forecasting.import_kaggle import import_csv
+
+    if background:
+
+        async def run(ctx: JobContext):
+            n = await import_csv(progress=ctx.report)
+            return {"status": "ok", "message": f"Imported {n} rows", "rows": n}
+
+        return await submit_job("import_kaggle", {}, run, exclusive="import_kaggle")
     try:
         n = await import_csv()
         return {"status": "ok", "message": f"Imported {n} rows", "rows": n}
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/data/products")
@@ -95,11 +145,21 @@ async def get_historical_data(
     from_date: date,
     to_date: date,
     product_id: str | None = None,
+    resolution: Literal["day", "week", "month"] = "day",
+    max_points: int | None = Query(None, ge=3),
 ):
-    """Get aggregated historical data for visualization."""
+    """
+    Get aggregated historical data for visualization.
+
+    resolution picks daily rows or weekly/monthly rollups (dated by period
+    start); max_points caps each product's series with LTTB downsampling.
+    """
     repo = ForecastingRepository(session)
     product_ids = [product_id] if product_id else None
-    return await repo.get_aggregated_daily(from_date, to_date, product_ids)
+    rows = await repo.get_aggregated_sales(from_date, to_date, product_ids, resolution)
+    if max_points is not None:
+        rows = await compute.run_thread(downsample_series, rows, max_points)
+    return rows
 
 
 @router.post("/admin/train", dependencies=[Depends(verify_api_key)])
@@ -108,6 +168,10 @@ async def train_model_endpoint(
     from_date: date | None = None,
     to_date: date | None = None,
     split_date: date | None = None,
+    mode: Literal["full", "incremental"] = "full",
+    low_memory: bool | None = None,
+    segmented: bool | None = None,
+    background: bool = False,
 ):
     """
     Train forecasting model (API key required).
@@ -122,15 +186,83 @@ async def train_model_endpoint(
     out-of-sample evaluation metrics (MAE, RMSE, MAPE) in the response.
     The model is trained only on [from_date, split_date) with zero leakage from the
     held-out [split_date, to_date] evaluation window.
+
+    mode=incremental adds trees to the active model using only sales dated
+    after its data_to (to_date optional). It runs a full retrain instead when
+    one is due or drift is detected; the response then has fallback_reason.
+
+    low_memory overrides TRAINING_LOW_MEMORY for full retrains: training runs
+    on float32 arrays and reuses a cached binary Dataset when sales_facts and
+    the window are unchanged. The response reports peak_rss_mb either way.
+
+    segmented overrides TRAINING_SEGMENTED for full retrains: one booster per
+    category_id (SEGMENT_MIN_ROWS or more rows) plus a global fallback,
+    trained concurrently and published as one model group; forecasts,
+    scenarios and pricing route each product to its segment's booster.
+
+    background=true returns 202 with a job id at once (see /api/jobs). Either
+    way only one training runs at a time across all workers (409 otherwise).
     """
+    if background:
+        params = {
+            "from_date": from_date,
+            "to_date": to_date,
+            "split_date": split_date,
+            "mode": mode,
+            "low_memory": low_memory,
+            "segmented": segmented,
+        }
+        return await submit_job("train", params, _service_job("train", **params), exclusive="train")
     service = get_forecasting_service(session)
     try:
-        result = await service.train(from_date, to_date, split_date=split_date)
-        return result
+        async with run_exclusive("train"):
+            return await service.train(
+                from_date, to_date, split_date=split_date, mode=mode, low_memory=low_memory, segmented=segmented
+            )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/admin/tune", dependencies=[Depends(verify_api_key)])
+async def tune_model_endpoint(
+    from_date: date | None = None,
+    to_date: date | None = None,
+    search: Literal["halving", "random"] = "halving",
+    n_candidates: int | None = Query(None, ge=1, le=100),
+    n_folds: int | None = Query(None, ge=1, le=12),
+    horizon_days: int | None = Query(None, ge=1, le=90),
+    seed: int = 42,
+):
+    """
+    Tune LightGBM hyperparameters with time-series cross-validation (API key required).
+
+    Always runs as a background job (202 with a job id; see /api/jobs) and
+    shares the training lock. Candidates are scored on expanding-window folds
+    in parallel across the compute process pool; the best configuration is
+    retrained on the whole window and published as a "tuned" model whose
+    artifact records the params and per-fold CV metrics. Job progress
+    advances per successive-halving rung.
+    """
+    params = {
+        "from_date": from_date,
+        "to_date": to_date,
+        "search": search,
+        "n_candidates": n_candidates,
+        "n_folds": n_folds,
+        "horizon_days": horizon_days,
+        "seed": seed,
+    }
+
+    async def run(ctx: JobContext):
+        async with AsyncSessionLocal() as session:
+            await ctx.report(0.0, "tune started")
+            result = await get_forecasting_service(session).tune(**params, progress=ctx.report)
+            await session.commit()
+            return result
+
+    return await submit_job("tune", params, run, exclusive="train")
+
+
 @router.get("/forecast")
 async def get_forecast(
     product_id: str,
@@ -153,6 +285,19 @@ async def get_forecast(
     )
 
 
+@router.post("/forecast/batch", response_model=BatchForecastResponse)
+async def get_forecast_batch(
+    body: BatchForecastRequest,
+    session: AsyncSessionDep,
+) -> BatchForecastResponse:
+    """Get forecasts for many products over one date range (columnar payload)."""
+    try:
+        service = get_forecasting_service(session)
+        return await service.get_forecast_batch(body.product_ids, body.from_date, body.to_date)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/backtest")
 async def run_backtest_public(
     session: AsyncSessionDep,
@@ -181,8 +326,18 @@ async def run_backtest_endpoint(
     to_date: date,
     train_window_days: int = 90,
     step_days: int = 7,
+    background: bool = False,
 ):
-    """Run backtest (API key required)."""
+    """Run backtest (API key required); background=true submits it as a job."""
+    if background:
+        params = {
+            "product_id": product_id,
+            "from_date": from_date,
+            "to_date": to_date,
+            "train_window_days": train_window_days,
+            "step_days": step_days,
+        }
+        return await submit_job("backtest", params, _service_job("run_backtest", **params))
     service = get_forecasting_service(session)
     return await service.run_backtest(
         product_id=product_id,
@@ -193,6 +348,30 @@ async def run_backtest_endpoint(
     )
 
 
+@router.post("/admin/backtest/portfolio", dependencies=[Depends(verify_api_key)])
+async def run_portfolio_backtest_endpoint(
+    body: PortfolioBacktestRequest,
+    session: AsyncSessionDep,
+    background: bool = False,
+):
+    """
+    Rolling backtest across the catalog with per-product and aggregate metrics (API key required).
+
+    background=true submits it as a job and returns 202 with the job id.
+    """
+    if background:
+        params = body.model_dump()
+        return await submit_job("backtest_portfolio", params, _service_job("run_portfolio_backtest", **params))
+    service = get_forecasting_service(session)
+    return await service.run_portfolio_backtest(
+        from_date=body.from_date,
+        to_date=body.to_date,
+        train_window_days=body.train_window_days,
+        step_days=body.step_days,
+        product_ids=body.product_ids,
+    )
+
+
 @router.post("/scenario/price-change", response_model=ScenarioPriceChangeResponse)
 async def scenario_price_change(
     body: ScenarioPriceChangeRequest,
@@ -206,3 +385,21 @@ async def scenario_price_change(
         to_date=body.to_date,
         price_delta_pct=body.price_delta_pct,
     )
+
+
+@router.post("/scenario/price-sweep", response_model=ScenarioSweepResponse)
+async def scenario_price_sweep(
+    body: ScenarioSweepRequest,
+    session: AsyncSessionDep,
+) -> ScenarioSweepResponse:
+    """Demand/revenue response curve for many price deltas in one request."""
+    service = get_forecasting_service(session)
+    try:
+        return await service.scenario_price_sweep(
+            product_id=body.product_id,
+            from_date=body.from_date,
+            to_date=body.to_date,
+            price_deltas=body.price_delta_pcts,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,243 @@
+"""
+Local columnar snapshot of sales_facts for full-table reads.
+
+Layout under {ARTIFACTS_PATH}/sales_snapshot:
+    manifest.json              dataset version, max_id, signature and segment list
+    seg-<uuid>/<column>.npy    one array per column
+
+Numeric and date columns are stored as plain .npy arrays and opened with
+mmap_mode="r", so filtering a date range touches only the pages it needs.
+product_id and category_id are dictionary-encoded (int32 codes plus a
+fixed-width label array, -1 = NULL) to keep them mmap-able as well.
+
+Every read checks the snapshot against the database:
+    - same dataset_versions fingerprint          -> served from disk (no scan)
+    - same max id and same signature             -> served from disk
+    - more rows, and the rows already on disk
+      still have the recorded signature          -> only new ids are fetched
+                                                    and appended as a segment
+    - anything else (updates, deletes, reloads)  -> full rebuild
+Segments are compacted into one once SALES_SNAPSHOT_MAX_SEGMENTS is exceeded.
+
+All workers share the directory. Refresh, segment writes and pruning run
+under an exclusive flock on .lock and reads under a shared one, so a segment
+is never pruned while a worker reads it; pruning also keeps every segment
+the manifest on disk lists. Segment writes and compaction run on the
+compute thread pool.
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import shutil
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date
+from pathlib import Path
+from typing import Any, AsyncIterator, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.core.compute import compute
+from app.forecasting.repository import SALES_COLUMNS, ForecastingRepository, sales_frame_from_rows
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_MANIFEST = "manifest.json"
+_LOCK_FILE = ".lock"
+# Delay between attempts while another worker holds the snapshot lock
+_LOCK_POLL_SECONDS = 0.05
+_CODED_COLUMNS = ("product_id", "category_id")
+_FORMAT_VERSION = 1
+
+
+def _write_segment(root: Path, df: pd.DataFrame) -> str:
+    """Write one segment directory and return its name."""
+    name = f"seg-{uuid.uuid4().hex}"
+    tmp = root / f".{name}.tmp"
+    tmp.mkdir(parents=True)
+    for col in SALES_COLUMNS:
+        values = df[col]
+        if col in _CODED_COLUMNS:
+            codes, labels = pd.factorize(values, use_na_sentinel=True)
+            np.save(tmp / f"{col}.npy", codes.astype(np.int32))
+            np.save(tmp / f"{col}.labels.npy", np.asarray(labels, dtype=str))
+        elif col == "date":
+            np.save(tmp / "date.npy", pd.to_datetime(values).to_numpy().astype("datetime64[D]"))
+        elif col == "promo_flag":
+            np.save(tmp / f"{col}.npy", values.to_numpy(dtype=np.bool_))
+        else:
+            np.save(tmp / f"{col}.npy", values.to_numpy(dtype=np.float64))
+    os.replace(tmp, root / name)
+    return name
+
+
+def _decode(codes: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    out = labels.astype(object)[np.maximum(codes, 0)] if len(labels) else np.full(len(codes), None, dtype=object)
+    out[codes < 0] = None
+    return out
+
+
+def _read_segment(
+    path: Path,
+    from_date: date,
+    to_date: date,
+    columns: Sequence[str],
+) -> dict[str, np.ndarray]:
+    """Read the rows of one segment that fall in [from_date, to_date]."""
+    dates = np.load(path / "date.npy", mmap_mode="r")
+    mask = (dates >= np.datetime64(from_date, "D")) & (dates <= np.datetime64(to_date, "D"))
+    idx = None if mask.all() else np.flatnonzero(mask)
+
+    out: dict[str, np.ndarray] = {}
+    for col in columns:
+        values = np.load(path / f"{col}.npy", mmap_mode="r")
+        values = np.asarray(values) if idx is None else values[idx]
+        if col in _CODED_COLUMNS:
+            values = _decode(values, np.load(path / f"{col}.labels.npy"))
+        out[col] = values
+    return out
+
+
+class SalesSnapshot:
+    """Disk snapshot of sales_facts, validated against the DB on every read."""
+
+    def __init__(self, root: Path | None = None) -> None:
+        self._root = root
+        self._lock = asyncio.Lock()
+
+    @property
+    def root(self) -> Path:
+        return self._root or Path(settings.artifacts_path) / "sales_snapshot"
+
+    def _load_manifest(self) -> dict[str, Any] | None:
+        try:
+            manifest = json.loads((self.root / _MANIFEST).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if manifest.get("format") != _FORMAT_VERSION:
+            return None
+        return manifest
+
+    def _store_manifest(self, manifest: dict[str, Any]) -> None:
+        tmp = self.root / f".{_MANIFEST}.{uuid.uuid4().hex}"
+        tmp.write_text(json.dumps(manifest, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.root / _MANIFEST)
+
+    @asynccontextmanager
+    async def _flock(self, operation: int) -> AsyncIterator[None]:
+        """Hold the directory lock across workers: LOCK_EX to write, LOCK_SH to read."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.root / _LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # Non-blocking attempts keep the event loop free while another worker holds it
+            while True:
+                try:
+                    fcntl.flock(fd, operation | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(_LOCK_POLL_SECONDS)
+            yield
+        finally:
+            os.close(fd)  # releases the flock
+
+    def _prune(self, keep: Sequence[str]) -> None:
+        """Remove segments listed neither in keep nor in the manifest on disk."""
+        on_disk = self._load_manifest()
+        keep = {*keep, *(on_disk["segments"] if on_disk else ())}
+        for path in self.root.glob("seg-*"):
+            if path.name not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+
+    async def refresh(self, repo: ForecastingRepository) -> dict[str, Any]:
+        """Bring the snapshot up to date with sales_facts and return its manifest."""
+        async with self._lock, self._flock(fcntl.LOCK_EX):
+            # Read under the lock: another worker may have just refreshed
+            manifest = self._load_manifest()
+            dataset = await repo.get_sales_dataset_fingerprint()
+            if manifest and "version" in dataset and manifest.get("dataset") == dataset:
+                return manifest
+
+            max_id = await repo.get_sales_max_id()
+            signature = await repo.get_sales_dataset_signature(max_id=max_id)
+            if manifest and manifest["max_id"] == max_id and manifest["signature"] == signature:
+                if manifest.get("dataset") != dataset:
+                    manifest = {**manifest, "dataset": dataset}
+                    self._store_manifest(manifest)
+                return manifest
+
+            if (
+                manifest
+                and manifest["max_id"] < max_id
+                and await repo.get_sales_dataset_signature(max_id=manifest["max_id"]) == manifest["signature"]
+            ):
+                delta = await repo.get_sales_rows_by_id(manifest["max_id"], max_id)
+                segments = [*manifest["segments"], await compute.run_thread(_write_segment, self.root, delta)]
+                rows = manifest["rows"] + len(delta)
+                logger.info("Sales snapshot appended %d rows (max_id=%d)", len(delta), max_id)
+            else:
+                full = await repo.get_sales_rows_by_id(0, max_id)
+                segments = [await compute.run_thread(_write_segment, self.root, full)]
+                rows = len(full)
+                logger.info("Sales snapshot rebuilt with %d rows (max_id=%d)", rows, max_id)
+
+            if len(segments) > max(1, settings.sales_snapshot_max_segments):
+                segments = [await compute.run_thread(self._compact, segments)]
+
+            manifest = {
+                "format": _FORMAT_VERSION,
+                "dataset": dataset,
+                "max_id": max_id,
+                "signature": signature,
+                "segments": segments,
+                "rows": rows,
+            }
+            self._store_manifest(manifest)
+            self._prune(segments)
+            return manifest
+
+    def _compact(self, segments: Sequence[str]) -> str:
+        """Merge segments into one new segment and return its name."""
+        return _write_segment(self.root, self._read(segments, date.min, date.max, SALES_COLUMNS))
+
+    def _read(
+        self,
+        segments: Sequence[str],
+        from_date: date,
+        to_date: date,
+        columns: Sequence[str],
+    ) -> pd.DataFrame:
+        parts = [_read_segment(self.root / seg, from_date, to_date, [*columns, "date"]) for seg in segments]
+        data = {
+            col: np.concatenate([p[col] for p in parts]) if parts else np.empty(0)
+            for col in [*columns, "date"]
+        }
+        if not parts or not len(data["date"]):
+            return sales_frame_from_rows([], columns)
+        order = np.argsort(data["date"], kind="stable")
+        frame = {}
+        for col in columns:
+            values = data[col][order]
+            frame[col] = values.astype(object) if col == "date" else values
+        return pd.DataFrame(frame, columns=list(columns))
+
+    async def get_sales_df(
+        self,
+        repo: ForecastingRepository,
+        from_date: date,
+        to_date: date,
+        columns: Sequence[str] = SALES_COLUMNS,
+    ) -> pd.DataFrame:
+        """Same contract as ForecastingRepository.get_sales_df without product filter."""
+        manifest = await self.refresh(repo)
+        # Segments are pruned only under the exclusive lock; the manifest may be newer by now
+        async with self._flock(fcntl.LOCK_SH):
+            manifest = self._load_manifest() or manifest
+            return self._read(manifest["segments"], from_date, to_date, columns)
+
+
+sales_snapshot = SalesSnapshot()
@@ -23,6 +23,16 @@ class BacktestEvaluation(BaseModel):
     date_range: BacktestDateRange | None = None
 
 
+class PortfolioBacktestRequest(BaseModel):
+    """Request for a rolling backtest across many products (all when product_ids is omitted)."""
+
+    from_date: date
+    to_date: date
+    train_window_days: int = Field(90, ge=1)
+    step_days: int = Field(7, ge=1)
+    product_ids: list[str] | None = Field(None, max_length=10000)
+
+
 class ForecastPoint(BaseModel):
     """Single forecast data point."""
 
@@ -44,6 +54,32 @@ class ForecastResponse(BaseModel):
     model_version: str | None = None
 
 
+class BatchForecastRequest(BaseModel):
+    """Request for multi-product forecast over a shared date range."""
+
+    product_ids: list[str] = Field(..., min_length=1, max_length=1000)
+    from_date: date
+    to_date: date
+
+
+class BatchForecastSeries(BaseModel):
+    """Per-product forecast columns, aligned with BatchForecastResponse.dates."""
+
+    predicted_quantity: list[float | None] = Field(default_factory=list)
+    predicted_revenue: list[float | None] = Field(default_factory=list)
+
+
+class BatchForecastResponse(BaseModel):
+    """Columnar response for batch forecast endpoint."""
+
+    from_date: date
+    to_date: date
+    dates: list[date] = Field(default_factory=list)
+    series: dict[str, BatchForecastSeries] = Field(default_factory=dict)
+    missing: list[str] = Field(default_factory=list)
+    model_version: str | None = None
+
+
 class ScenarioPriceChangeRequest(BaseModel):
     """Request for price change scenario."""
 
@@ -64,3 +100,38 @@ class ScenarioPriceChangeResponse(BaseModel):
     scenario_forecast_points: list[ForecastPoint] = Field(default_factory=list)
     delta_revenue_pct: float | None = None
     delta_quantity_pct: float | None = None
+
+
+class ScenarioSweepRequest(BaseModel):
+    """Request for a price response curve over many price deltas."""
+
+    product_id: str
+    from_date: date
+    to_date: date
+    price_delta_pcts: list[float] = Field(
+        ...,
+        min_length=1,
+        max_length=500,
+        description="Price changes in percent to evaluate, e.g. [-20, -10, 0, 10, 20]",
+    )
+
+
+class ScenarioSweepPoint(BaseModel):
+    """Forecast totals over the requested range for one price delta."""
+
+    price_delta_pct: float
+    total_quantity: float
+    total_revenue: float
+    delta_quantity_pct: float | None = None
+    delta_revenue_pct: float | None = None
+    elasticity: float | None = None
+
+
+class ScenarioSweepResponse(BaseModel):
+    """Demand/revenue response curve, sorted by price_delta_pct (0% always included)."""
+
+    product_id: str
+    from_date: date
+    to_date: date
+    curve: list[ScenarioSweepPoint] = Field(default_factory=list)
+    model_version: str | None = None
@@ -0,0 +1,175 @@
+"""
+Segmented training: one booster per category plus a global fallback.
+
+Each product belongs to the category of its latest sales row. Categories
+with at least min_rows training rows get their own booster, trained only on
+their products; the fallback booster is trained on every product and serves
+products of smaller categories and anything unseen (see SegmentedModel).
+Boosters are trained concurrently on the compute process pool, one task per
+segment, and returned as model strings.
+"""
+
+from datetime import date
+import logging
+import os
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from app.core.compute import compute, resolve_workers
+from app.forecasting.training import (
+    DATASET_PARAMS,
+    ENTITY_COL,
+    FALLBACK_SEGMENT,
+    FEATURE_COLS,
+    LGB_PARAMS,
+    N_ESTIMATORS,
+    RssPeak,
+    SegmentedModel,
+    _save_artifact,
+    error_metrics,
+    training_arrays,
+)
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def product_categories(df: pd.DataFrame) -> pd.Series:
+    """Category of each product's latest row (products without one are left out)."""
+    if "category_id" not in df.columns:
+        return pd.Series(dtype=object)
+    latest = df.dropna(subset=["category_id"]).sort_values("date").groupby(ENTITY_COL)["category_id"].last()
+    return latest.astype(str)
+
+
+def plan_segments(df: pd.DataFrame, split_date: date | None, min_rows: int) -> dict[str, list[str]]:
+    """Products per category large enough for its own booster (rows before split_date count)."""
+    categories = product_categories(df)
+    if categories.empty:
+        return {}
+    rows = df if split_date is None else df[pd.to_datetime(df["date"]) < pd.Timestamp(split_date)]
+    per_product = rows.groupby(ENTITY_COL).size().reindex(categories.index, fill_value=0)
+    per_category = per_product.groupby(categories).sum()
+    return {
+        str(category): sorted(categories.index[categories == category])
+        for category in per_category.index[per_category >= min_rows]
+    }
+
+
+def _train_segment(task: tuple) -> tuple:
+    """Train one segment and score its evaluation rows; top-level so it pickles."""
+    key, frame, eval_frame, split_date, params, num_boost_round = task
+    arrays = training_arrays(frame, split_date)
+    if len(arrays.y_train) < 50:
+        raise ValueError(f"Segment {key}: insufficient training rows (got {len(arrays.y_train)}, need ≥ 50)")
+    dataset = lgb.Dataset(arrays.X_train, label=arrays.y_train, feature_name=FEATURE_COLS, params=DATASET_PARAMS)
+    booster = lgb.train(params, dataset, num_boost_round=num_boost_round)
+    if eval_frame is not None:
+        evaluation = training_arrays(eval_frame, split_date) if not eval_frame.empty else None
+        X_eval, actuals = (evaluation.X_eval, evaluation.actuals_eval) if evaluation else (np.empty((0, 0)), np.empty(0))
+    else:
+        X_eval, actuals = arrays.X_eval, arrays.actuals_eval
+    quantity_pred = np.expm1(booster.predict(X_eval)) if len(actuals) else np.empty(0)
+    return key, booster.model_to_string(), quantity_pred, actuals, arrays.eval_source, len(arrays.y_train)
+
+
+def train_segmented_model(
+    df: pd.DataFrame,
+    data_from: date,
+    data_to: date,
+    split_date: date | None = None,
+    artifacts_dir: str | None = None,
+    *,
+    params: dict | None = None,
+    min_rows: int | None = None,
+    max_workers: int | None = None,
+) -> tuple[SegmentedModel, dict]:
+    """
+    Train per-category boosters and the fallback in parallel and save the group.
+
+    Evaluation follows train_model (out-of-sample from split_date, in-sample
+    otherwise); each product is scored by the booster it routes to, and the
+    group metrics pool every product's rows. Returns (model, metrics_dict)
+    with per-segment metrics under "segments".
+    """
+    artifacts_dir = artifacts_dir or settings.artifacts_path
+    min_rows = settings.segment_min_rows if min_rows is None else min_rows
+    max_workers = settings.segment_workers if max_workers is None else max_workers
+    params = {**LGB_PARAMS, **(params or {})}
+    n_estimators = int(params.pop("n_estimators", N_ESTIMATORS))
+
+    plan = plan_segments(df, split_date, min_rows)
+    product_segments = {pid: key for key, pids in plan.items() for pid in pids}
+    segmented = df[ENTITY_COL].isin(product_segments.keys())
+    workers = max(1, min(resolve_workers(max_workers), len(plan) + 1))
+    params["num_threads"] = max(1, (os.cpu_count() or 1) // workers)
+    tasks = [(FALLBACK_SEGMENT, df, df[~segmented], split_date, params, n_estimators)]
+    tasks += [(key, df[df[ENTITY_COL].isin(pids)], None, split_date, params, n_estimators) for key, pids in plan.items()]
+    logger.info(
+        "Segmented training [%s → %s]: %d category models + fallback on %d workers",
+        data_from,
+        data_to,
+        len(plan),
+        workers,
+    )
+    # With the process pool enabled the segments train in child processes, which RssPeak does not see
+    with RssPeak() as rss:
+        results = compute.map_in_processes(_train_segment, tasks, workers)
+
+    boosters: dict[str, lgb.Booster] = {}
+    segments: dict[str, dict] = {}
+    preds, actuals = [], []
+    eval_source = "train"
+    for key, model_str, quantity_pred, segment_actuals, eval_source, train_rows in results:
+        boosters[key] = lgb.Booster(model_str=model_str)
+        mae, rmse, mape = error_metrics(quantity_pred, segment_actuals) if len(segment_actuals) else (None,) * 3
+        segments[key] = {
+            "products": len(plan[key]) if key in plan else int(df.loc[~segmented, ENTITY_COL].nunique()),
+            "train_rows": int(train_rows),
+            "mae": mae,
+            "rmse": rmse,
+            "mape": mape,
+            "n_eval_samples": int(len(segment_actuals)),
+        }
+        preds.append(quantity_pred)
+        actuals.append(segment_actuals)
+
+    model = SegmentedModel(
+        {key: b for key, b in boosters.items() if key != FALLBACK_SEGMENT},
+        boosters[FALLBACK_SEGMENT],
+        product_segments,
+    )
+    quantity_pred, all_actuals = np.concatenate(preds), np.concatenate(actuals)
+    mae, rmse, mape = error_metrics(quantity_pred, all_actuals)
+    n_eval = int(len(all_actuals))
+    logger.info("Segmented evaluation (%s) – MAE: %.4f  RMSE: %.4f  n=%d", eval_source, mae, rmse, n_eval)
+
+    extra = {"segments": segments, "peak_rss_mb": rss.mb}
+    version, filepath = _save_artifact(
+        model,
+        artifacts_dir,
+        {
+            "data_from": data_from.isoformat(),
+            "data_to": data_to.isoformat(),
+            "split_date": split_date.isoformat() if split_date else None,
+            "mae": mae,
+            "rmse": rmse,
+            "mape": mape,
+            "n_eval_samples": n_eval,
+            "eval_source": eval_source,
+            "training_mode": "segmented",
+            **extra,
+        },
+    )
+    return model, {
+        "mae": mae,
+        "rmse": rmse,
+        "mape": mape,
+        "n_eval_samples": n_eval,
+        "eval_source": eval_source,
+        "version": version,
+        "file_path": filepath,
+        **extra,
+    }
@@ -1,33 +1,110 @@
 """Forecasting service - orchestration of forecast and scenario logic."""
 
 from datetime import date, datetime, timedelta
+import functools
 import logging
 import os
+import tempfile
+import time
 
+import numpy as np
 import pandas as pd
 
+from app.core.compute import compute
 from app.forecasting.backtest import (
     backtest_metrics,
     evaluate_time_split,
     rolling_backtest,
+    rolling_backtest_many,
     time_based_split_by_date,
 )
-from app.forecasting.features import apply_price_delta, engineer_features
+from app.forecasting.backtest_cache import backtest_cache, make_key as make_backtest_cache_key
+from app.forecasting.forecast_cache import (
+    decode_points,
+    encode_points,
+    forecast_cache,
+    make_key as make_forecast_cache_key,
+)
+from app.forecasting.inference import densify_history, predict_dense, predict_price_sweep
+from app.forecasting.materialize import materialize_forecasts
+from app.forecasting.model_registry import model_registry
 from app.forecasting.repository import ForecastingRepository
-from app.forecasting.schemas import ForecastPoint, ScenarioPriceChangeResponse
+from app.forecasting.schemas import (
+    BatchForecastResponse,
+    BatchForecastSeries,
+    ForecastPoint,
+    ScenarioPriceChangeResponse,
+    ScenarioSweepPoint,
+    ScenarioSweepResponse,
+)
+from app.forecasting.segments import train_segmented_model
 from app.forecasting.training import (
     DATE_COL,
     ENTITY_COL,
-    FEATURE_COLS,
+    dataset_cache_hit,
+    dataset_cache_key,
+    evaluate_rows,
     load_model,
+    load_model_meta,
     predict,
+    refresh_model,
+    refresh_rows,
     train_model,
 )
+from app.forecasting.tuning import ProgressFn, expanding_folds, run_search, sample_candidates, write_cv_matrix
 from app.settings import settings
 
 logger = logging.getLogger(__name__)
 
 
+def _nullable_floats(values: pd.Series) -> list[float | None]:
+    return [None if pd.isna(v) else float(v) for v in values.to_numpy()]
+
+
+def _backtest_summary(
+    actuals: np.ndarray,
+    preds: np.ndarray,
+    test_dates: list,
+    hist_start: date,
+    train_window_days: int,
+) -> dict:
+    metrics = backtest_metrics(actuals, preds)
+    date_range: dict = {}
+    if len(test_dates) > 0:
+        date_range = {
+            "train_start": str(hist_start),
+            "train_end": str(hist_start + timedelta(days=train_window_days - 1)),
+            "test_start": str(min(test_dates)),
+            "test_end": str(max(test_dates)),
+        }
+    return {
+        "mae": metrics["mae"],
+        "rmse": metrics["rmse"],
+        "mape": metrics["mape"],
+        "n_samples": int(len(preds)),
+        "date_range": date_range,
+    }
+
+
+def _forecast_points(
+    df_feat: pd.DataFrame,
+    product_id: str,
+    from_date: date,
+    to_date: date,
+) -> list[ForecastPoint]:
+    mask = (df_feat["date"] >= from_date) & (df_feat["date"] <= to_date)
+    subset = df_feat[mask]
+    return [
+        ForecastPoint(
+            date=row["date"],
+            product_id=product_id,
+            predicted_quantity=float(row["predicted_quantity"]),
+            predicted_revenue=float(row["predicted_revenue"]) if pd.notna(row.get("predicted_revenue")) else None,
+        )
+        for _, row in subset.iterrows()
+    ]
+
+
 class ForecastingService:
     """Service for forecasting and scenario computation."""
 
@@ -35,16 +112,25 @@ class ForecastingService:
         self._repo = repository
 
     _MAX_TRAIN_YEARS = 3
+    _REFRESH_CONTEXT_DAYS = 60
 
     async def train(
         self,
         from_date: date | None = None,
         to_date: date | None = None,
         split_date: date | None = None,
+        mode: str = "full",
+        low_memory: bool | None = None,
+        params: dict | None = None,
+        segmented: bool | None = None,
     ) -> dict:
         """
         Train model on historical data and persist artifact.
 
+        mode="incremental" continues the active model on sales dated after
+        its data_to instead (see _refresh); it falls back to a full retrain
+        when one is due or the active model has drifted.
+
         When from_date / to_date are omitted the service auto-detects the maximum
         available window from the database, capped at _MAX_TRAIN_YEARS years back
         from the latest row:
@@ -54,32 +140,25 @@ class ForecastingService:
         When split_date is provided the model is trained only on [from_date, split_date)
         and evaluated out-of-sample on [split_date, to_date].  Metrics in the response
         then reflect real held-out performance, not in-sample error.
+
+        low_memory (default TRAINING_LOW_MEMORY) trains from float32 arrays;
+        its binary Dataset is cached per sales_facts version and window, so a
+        repeat run on unchanged data skips the sales fetch and feature
+        engineering. params override the default LightGBM parameters and are
+        recorded on the artifact (see tune).
+
+        segmented (default TRAINING_SEGMENTED) trains one booster per category
+        plus a global fallback in parallel and publishes them as one model
+        group; predictions route each product to its segment's booster.
         """
-        # --- Auto-detect date range if not explicitly supplied ---
-        if from_date is None or to_date is None:
-            min_db_date, max_db_date = await self._repo.get_date_range()
-            if max_db_date is None:
-                raise ValueError("No sales data in database — cannot auto-detect training range")
-            if to_date is None:
-                to_date = max_db_date
-            if from_date is None:
-                three_years_back = date(to_date.year - self._MAX_TRAIN_YEARS, to_date.month, to_date.day)
-                from_date = max(min_db_date, three_years_back)
-            logger.info(
-                "Auto-detected training range: from=%s  to=%s  (cap=%d years, db_min=%s  db_max=%s)",
-                from_date,
-                to_date,
-                self._MAX_TRAIN_YEARS,
-                min_db_date,
-                max_db_date,
-            )
+        if mode == "incremental":
+            if from_date is not None or split_date is not None:
+                raise ValueError("from_date and split_date are not supported in incremental mode")
+            return await self._refresh(to_date)
+        if mode != "full":
+            raise ValueError(f"Unknown training mode: {mode}")
 
-        df = await self._repo.get_sales_df(from_date, to_date)
-        if df.empty or len(df) < 100:
-            raise ValueError(
-                f"Insufficient data for training (got {len(df)} rows for "
-                f"{from_date} → {to_date}, need ≥ 100)"
-            )
+        from_date, to_date = await self._training_window(from_date, to_date)
 
         if split_date is not None and not (from_date < split_date <= to_date):
             raise ValueError(
@@ -87,27 +166,57 @@ class ForecastingService:
                 f"and to_date {to_date}"
             )
 
-        logger.info(
-            "Training request: from=%s  to=%s  split=%s  total_rows=%d  products=%d",
-            from_date,
-            to_date,
-            split_date,
-            len(df),
-            df["product_id"].nunique() if "product_id" in df.columns else "?",
-        )
+        low_memory = settings.training_low_memory if low_memory is None else low_memory
+        segmented = settings.training_segmented if segmented is None else segmented
+        cache_key = None
+        if low_memory and not segmented and settings.training_dataset_cache_entries > 0:
+            fingerprint = await self._repo.get_sales_dataset_fingerprint()
+            cache_key = dataset_cache_key(fingerprint, from_date, to_date, split_date)
 
-        _, meta = train_model(df, from_date, to_date, split_date=split_date)
+        if cache_key and dataset_cache_hit(cache_key):
+            df = None
+            logger.info(
+                "Training request: from=%s  to=%s  split=%s  cached Dataset %s",
+                from_date,
+                to_date,
+                split_date,
+                cache_key,
+            )
+        else:
+            df = await self._repo.get_sales_df(from_date, to_date)
+            if df.empty or len(df) < 100:
+                raise ValueError(
+                    f"Insufficient data for training (got {len(df)} rows for "
+                    f"{from_date} → {to_date}, need ≥ 100)"
+                )
+            logger.info(
+                "Training request: from=%s  to=%s  split=%s  total_rows=%d  products=%d",
+                from_date,
+                to_date,
+                split_date,
+                len(df),
+                df["product_id"].nunique() if "product_id" in df.columns else "?",
+            )
 
-        art = await self._repo.create_model_artifact(
-            version=meta["version"],
-            file_path=meta["file_path"],
-            trained_at=datetime.utcnow(),
-            data_from=from_date,
-            data_to=to_date,
-            mae=meta["mae"],
-            mape=meta["mape"],
-        )
-        await self._repo._session.commit()
+        lineage: dict = {"params": params}
+        if segmented:
+            booster, meta = await compute.run_thread(
+                train_segmented_model, df, from_date, to_date, split_date=split_date, params=params
+            )
+            lineage.update(training_mode="segmented", segments=meta["segments"])
+        else:
+            booster, meta = await compute.run_thread(
+                train_model,
+                df,
+                from_date,
+                to_date,
+                split_date=split_date,
+                low_memory=low_memory,
+                cache_key=cache_key,
+                params=params,
+            )
+        del df  # the raw frame is not needed while publishing and materializing
+        art, materialized = await self._publish(booster, meta, from_date, to_date, **lineage)
 
         logger.info(
             "Model artifact saved: version=%s  MAE=%.4f  RMSE=%.4f  MAPE=%.2f%%  "
@@ -128,7 +237,14 @@ class ForecastingService:
             "mape": meta["mape"],
             "n_eval_samples": meta["n_eval_samples"],
             "eval_source": meta["eval_source"],
+            "training_mode": "segmented" if segmented else "full",
+            "low_memory": meta.get("low_memory", False),
+            "dataset_cache": meta.get("dataset_cache"),
+            "peak_rss_mb": meta["peak_rss_mb"],
+            "materialized_points": materialized,
         }
+        if segmented:
+            result["segments"] = meta["segments"]
         if split_date:
             result["date_range"] = {
                 "train_start": str(from_date),
@@ -138,6 +254,295 @@ class ForecastingService:
             }
         return result
 
+    async def tune(
+        self,
+        from_date: date | None = None,
+        to_date: date | None = None,
+        search: str = "halving",
+        n_candidates: int | None = None,
+        n_folds: int | None = None,
+        horizon_days: int | None = None,
+        seed: int = 42,
+        progress: ProgressFn | None = None,
+    ) -> dict:
+        """
+        Search LightGBM parameters with time-series CV and publish the winner.
+
+        The window defaults as in train. Features are engineered once into a
+        memory-mapped matrix under ARTIFACTS_PATH; candidates (the default
+        parameters plus random draws) are scored on n_folds expanding-window
+        folds of horizon_days each, fitted in parallel across the compute
+        process pool with early stopping (see app.forecasting.tuning).
+
+        The best configuration is retrained on the whole window for its mean
+        early-stopped round count and published as a "tuned" artifact with
+        params and cv_metrics; its recorded MAE/MAPE are the cross-validated
+        ones. Refreshes of the chain keep its params.
+        """
+        from_date, to_date = await self._training_window(from_date, to_date)
+        df = await self._repo.get_sales_df(from_date, to_date)
+        if df.empty or len(df) < 100:
+            raise ValueError(
+                f"Insufficient data for tuning (got {len(df)} rows for {from_date} → {to_date}, need ≥ 100)"
+            )
+        n_folds = n_folds or settings.tuning_folds
+        horizon_days = horizon_days or settings.tuning_horizon_days
+        candidates = sample_candidates(n_candidates or settings.tuning_candidates, seed)
+
+        os.makedirs(settings.artifacts_path, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="cv_matrix_", dir=settings.artifacts_path) as matrix_dir:
+            dates = await compute.run_thread(write_cv_matrix, df, matrix_dir)
+            folds = expanding_folds(dates, n_folds, horizon_days)
+            del dates
+            search_result = await run_search(
+                matrix_dir,
+                folds,
+                candidates,
+                search=search,
+                max_rounds=settings.tuning_max_rounds,
+                early_stopping_rounds=settings.tuning_early_stopping_rounds,
+                max_workers=settings.tuning_workers,
+                progress=progress,
+            )
+
+        params = {**search_result.best_params, "n_estimators": search_result.cv["best_iteration"]}
+        cv_metrics = {k: v for k, v in search_result.to_dict().items() if k != "best_params"}
+        booster, meta = await compute.run_thread(
+            train_model,
+            df,
+            from_date,
+            to_date,
+            params=params,
+            meta={"training_mode": "tuned", "params": params, "cv_metrics": cv_metrics},
+        )
+        del df
+        cv = search_result.cv
+        art, materialized = await self._publish(
+            booster,
+            {**meta, "mae": cv["mae"], "mape": cv["mape"]},
+            from_date,
+            to_date,
+            training_mode="tuned",
+            params=params,
+            cv_metrics=cv_metrics,
+        )
+        logger.info(
+            "Tuned model saved: version=%s  CV MAE=%.4f  (%d candidates, %d fold fits)",
+            meta["version"],
+            cv["mae"],
+            search_result.n_candidates,
+            search_result.evaluations,
+        )
+        return {
+            "version": meta["version"],
+            "artifact_id": art.id,
+            "training_mode": "tuned",
+            "search": search,
+            "n_candidates": search_result.n_candidates,
+            "evaluations": search_result.evaluations,
+            "best_params": params,
+            "mae": cv["mae"],
+            "rmse": cv["rmse"],
+            "mape": cv["mape"],
+            "n_eval_samples": sum(f["valid_rows"] for f in search_result.folds),
+            "eval_source": "cv",
+            "folds": search_result.folds,
+            "rungs": search_result.rungs,
+            "date_range": {"train_start": str(from_date), "train_end": str(to_date)},
+            "materialized_points": materialized,
+        }
+
+    async def _training_window(self, from_date: date | None, to_date: date | None) -> tuple[date, date]:
+        """Fill in a missing from_date / to_date from the database (see train)."""
+        if from_date is not None and to_date is not None:
+            return from_date, to_date
+        min_db_date, max_db_date = await self._repo.get_date_range()
+        if max_db_date is None:
+            raise ValueError("No sales data in database — cannot auto-detect training range")
+        if to_date is None:
+            to_date = max_db_date
+        if from_date is None:
+            three_years_back = date(to_date.year - self._MAX_TRAIN_YEARS, to_date.month, to_date.day)
+            from_date = max(min_db_date, three_years_back)
+        logger.info(
+            "Auto-detected training range: from=%s  to=%s  (cap=%d years, db_min=%s  db_max=%s)",
+            from_date,
+            to_date,
+            self._MAX_TRAIN_YEARS,
+            min_db_date,
+            max_db_date,
+        )
+        return from_date, to_date
+
+    async def _publish(self, booster, meta: dict, data_from: date, data_to: date, **lineage) -> tuple:
+        """Record the artifact, hot-swap it in every worker and materialize forecasts."""
+        art = await self._repo.create_model_artifact(
+            version=meta["version"],
+            file_path=meta["file_path"],
+            trained_at=datetime.utcnow(),
+            data_from=data_from,
+            data_to=data_to,
+            mae=meta["mae"],
+            mape=meta["mape"],
+            **lineage,
+        )
+        await self._repo._session.commit()
+        model_registry.activate(meta["version"], meta["file_path"], booster)
+        await model_registry.publish_activation(meta["version"], meta["file_path"])
+        materialized = await self._materialize(meta["version"], meta["file_path"])
+        return art, materialized
+
+    async def _full_retrain_reason(self, parent) -> str | None:
+        """Why an incremental refresh of parent must become a full retrain, if at all."""
+        if parent is None:
+            return "no_active_model"
+        if parent.training_mode == "segmented":
+            return "segmented_model"
+        if parent.refresh_count >= settings.model_max_incremental_refreshes:
+            return "max_incremental_refreshes"
+        base = parent
+        if parent.base_version and parent.base_version != parent.version:
+            base = await self._repo.get_model_artifact(parent.base_version)
+        if base is None or datetime.utcnow() - base.trained_at > timedelta(days=settings.model_full_retrain_days):
+            return "full_retrain_due"
+        return None
+
+    async def _full_retrain(self, reason: str, to_date: date | None, parent=None) -> dict:
+        logger.info("Incremental refresh falling back to full retrain: %s", reason)
+        result = await self.train(
+            None,
+            to_date,
+            params=parent.params if parent else None,
+            segmented=parent.training_mode == "segmented" if parent else None,
+        )
+        result["fallback_reason"] = reason
+        return result
+
+    @staticmethod
+    def _drift_baseline(parent) -> float | None:
+        """
+        The parent's out-of-sample MAE, or None when it has none to compare with.
+
+        Incremental refreshes record the parent's error on unseen rows and tuned
+        models their CV error; full trains are comparable only when evaluated
+        on a time split (eval_source "test"), not in-sample.
+        """
+        if parent.mae is None:
+            return None
+        if parent.training_mode != "full":
+            return parent.mae
+        meta = load_model_meta(parent.file_path)
+        return parent.mae if meta and meta.get("eval_source") == "test" else None
+
+    async def _refresh(self, to_date: date | None) -> dict:
+        """
+        Warm-start the active booster on rows dated after its data_to.
+
+        Before adding trees the parent is scored on the new rows (a genuine
+        out-of-sample check). If its MAE exceeds the parent's holdout MAE by
+        more than MODEL_DRIFT_TOLERANCE, or the lineage is older than
+        MODEL_FULL_RETRAIN_DAYS / longer than MODEL_MAX_INCREMENTAL_REFRESHES,
+        a full retrain runs instead. Parents without a holdout MAE skip the
+        drift check (reported as drift_check="not_comparable").
+        """
+        parent = await self._repo.get_active_model_artifact()
+        reason = await self._full_retrain_reason(parent)
+        if reason:
+            return await self._full_retrain(reason, to_date, parent)
+
+        if to_date is None:
+            _, to_date = await self._repo.get_date_range()
+        new_from = parent.data_to + timedelta(days=1)
+        if to_date is None or to_date < new_from:
+            raise ValueError(f"No new sales after {parent.data_to} for model {parent.version}")
+
+        df = await self._repo.get_sales_df(new_from - timedelta(days=self._REFRESH_CONTEXT_DAYS), to_date)
+        rows = await compute.run_thread(refresh_rows, df, new_from) if not df.empty else df
+        if rows.empty:
+            raise ValueError(f"No new sales after {parent.data_to} for model {parent.version}")
+
+        active = await model_registry.get_active(self._repo)
+        if active and active.version == parent.version:
+            init_model = active.booster
+        else:
+            init_model = await compute.run_thread(load_model, parent.file_path)
+
+        pre_mae, _, pre_mape = await compute.run_thread(evaluate_rows, init_model, rows)
+        baseline = await compute.run_thread(self._drift_baseline, parent)
+        if baseline is None:
+            drift_check = "not_comparable"
+            logger.info("No holdout MAE for %s; skipping the drift check", parent.version)
+        elif pre_mae > baseline * (1.0 + settings.model_drift_tolerance):
+            logger.warning(
+                "Drift on %d new rows: MAE %.4f vs %.4f holdout MAE of %s",
+                len(rows),
+                pre_mae,
+                baseline,
+                parent.version,
+            )
+            return await self._full_retrain("drift", to_date, parent)
+        else:
+            drift_check = "passed"
+
+        base_version = parent.base_version or parent.version
+        booster, meta = await compute.run_thread(
+            refresh_model,
+            init_model,
+            rows,
+            parent.data_from,
+            to_date,
+            num_boost_round=settings.model_refresh_rounds,
+            meta={"parent_version": parent.version, "base_version": base_version},
+            params=parent.params,
+        )
+        # The parent's error on unseen rows is the honest baseline for the next
+        # drift check; the refreshed model's in-sample MAE would be optimistic.
+        art, materialized = await self._publish(
+            booster,
+            {**meta, "mae": pre_mae, "mape": pre_mape},
+            parent.data_from,
+            to_date,
+            training_mode="incremental",
+            parent_version=parent.version,
+            base_version=base_version,
+            refresh_count=parent.refresh_count + 1,
+            params=parent.params,
+        )
+        return {
+            "version": meta["version"],
+            "artifact_id": art.id,
+            "training_mode": "incremental",
+            "parent_version": parent.version,
+            "base_version": base_version,
+            "refresh_count": parent.refresh_count + 1,
+            "new_rows": int(len(rows)),
+            "trees_added": booster.num_trees() - init_model.num_trees(),
+            "date_range": {"new_from": str(new_from), "new_to": str(to_date)},
+            "pre_refresh_mae": pre_mae,
+            "pre_refresh_mape": pre_mape,
+            "drift_check": drift_check,
+            "drift_baseline_mae": baseline,
+            "mae": meta["mae"],
+            "rmse": meta["rmse"],
+            "mape": meta["mape"],
+            "n_eval_samples": meta["n_eval_samples"],
+            "eval_source": meta["eval_source"],
+            "materialized_points": materialized,
+        }
+
+    async def _materialize(self, version: str, file_path: str) -> int:
+        """Post-train job: refresh forecast_points for the new model. Never fails training."""
+        if not settings.forecast_materialize_enabled:
+            return 0
+        try:
+            summary = await materialize_forecasts(self._repo, version, file_path)
+            await self._repo._session.commit()
+            return summary["points"]
+        except Exception:
+            logger.exception("Forecast materialization failed for version=%s", version)
+            await self._repo._session.rollback()
+            return 0
+
     _PRODUCT_ALIASES = {"P001": "P0001", "P002": "P0002", "P003": "P0003"}
 
     async def get_forecast(
@@ -146,8 +551,81 @@ class ForecastingService:
         from_date: date,
         to_date: date,
     ) -> tuple[list[ForecastPoint], str | None]:
-        """Generate forecast for product and date range."""
+        """
+        Generate forecast for product and date range.
+
+        Dates covered by materialized forecast_points for the active model are
+        served straight from the store; live inference runs only for the
+        uncovered span. Responses are cached per model and sales dataset
+        version (see forecast_cache).
+        """
         product_id = self._PRODUCT_ALIASES.get(product_id, product_id)
+        active = await model_registry.get_active(self._repo)
+        if active is None:
+            return [], None
+        if not settings.forecast_cache_enabled:
+            return await self._compute_forecast(active, product_id, from_date, to_date)
+
+        async def compute_payload() -> dict:
+            points, version = await self._compute_forecast(active, product_id, from_date, to_date)
+            return {"version": version, "points": encode_points(points, from_date)}
+
+        key = make_forecast_cache_key(
+            "forecast",
+            active.version,
+            await self._repo.get_sales_dataset_fingerprint(),
+            product_id,
+            from_date,
+            to_date,
+        )
+        payload = await forecast_cache.get_or_compute(key, compute_payload)
+        return decode_points(payload["points"], from_date, product_id), payload["version"]
+
+    async def _compute_forecast(
+        self,
+        active,
+        product_id: str,
+        from_date: date,
+        to_date: date,
+    ) -> tuple[list[ForecastPoint], str | None]:
+        """Uncached get_forecast for the given active model."""
+        stored = {
+            row.date: ForecastPoint(
+                date=row.date,
+                product_id=product_id,
+                predicted_quantity=float(row.predicted_quantity),
+                predicted_revenue=row.predicted_revenue,
+            )
+            for row in await self._repo.get_forecast_points(active.version, product_id, from_date, to_date)
+        }
+        n_days = (to_date - from_date).days + 1
+        if len(stored) >= n_days:
+            return list(stored.values()), active.version
+
+        uncovered = [
+            d for d in (from_date + timedelta(days=i) for i in range(n_days)) if d not in stored
+        ]
+        live = await self._live_forecast(product_id, min(uncovered), max(uncovered), active.booster)
+        if live is None:
+            if not stored:
+                return [], None
+            live = []
+
+        merged = {p.date: p for p in live}
+        merged.update(stored)
+        return [merged[d] for d in sorted(merged)], active.version
+
+    async def _dense_history(
+        self,
+        product_id: str,
+        from_date: date,
+        to_date: date,
+    ) -> pd.DataFrame | None:
+        """Fetch lookback history once and densify it through to_date; None without history."""
+        state = (await self._repo.get_feature_states([product_id])).get(product_id)
+        if state is not None and from_date > state.last_date:
+            # Forecast lies past the data: the online state holds every feature input
+            return state.dense_history(to_date)
         lookback = 60
         hist_start = from_date - timedelta(days=lookback)
         df = await self._repo.get_sales_df(hist_start, to_date, [product_id])
@@ -155,49 +633,90 @@ class ForecastingService:
             # Requested range beyond data - use latest available and extend to forecast dates
             df = await self._repo.get_latest_sales_df([product_id], min_days=lookback + 30)
         if df.empty:
-            return [], None
+            return None
 
-        file_path = await self._repo.get_active_model_path()
-        if not file_path or not os.path.exists(file_path):
-            return [], None
+        # Full daily range from earliest in df to to_date (covers history + forecast range)
+        df["product_id"] = product_id
+        return densify_history(df, to_date)
 
-        model = load_model(file_path)
-        version = await self._repo.get_active_model_version()
-
-        # Build full date range: from earliest in df to to_date (covers history + forecast range)
-        df["date"] = pd.to_datetime(df["date"])
-        range_start = min(df["date"]).date() if hasattr(min(df["date"]), "date") else min(df["date"])
-        all_dates = pd.date_range(range_start, to_date, freq="D")
-        df_full = df.set_index("date").reindex(all_dates)
-        df_full = df_full.ffill().bfill()
-        df_full = df_full.reset_index()
-        df_full = df_full.rename(columns={"index": "date"})
-        df_full["product_id"] = product_id
-        df_full["date"] = pd.to_datetime(df_full["date"]).dt.date
-
-        df_feat = engineer_features(df_full)
-        for col in FEATURE_COLS:
-            if col not in df_feat.columns:
-                df_feat[col] = 0
-        df_feat[FEATURE_COLS] = df_feat[FEATURE_COLS].fillna(0)
-
-        preds = predict(model, df_feat)
-        df_feat["predicted_quantity"] = preds
-        df_feat["predicted_revenue"] = df_feat["predicted_quantity"] * df_feat["price"]
-
-        df_feat["date"] = pd.to_datetime(df_feat["date"]).dt.date
-        mask = (df_feat["date"] >= from_date) & (df_feat["date"] <= to_date)
-        subset = df_feat[mask]
-        points = [
-            ForecastPoint(
-                date=row["date"],
-                product_id=product_id,
-                predicted_quantity=float(row["predicted_quantity"]),
-                predicted_revenue=float(row["predicted_revenue"]) if pd.notna(row.get("predicted_revenue")) else None,
+    async def _live_forecast(
+        self,
+        product_id: str,
+        from_date: date,
+        to_date: date,
+        model,
+    ) -> list[ForecastPoint] | None:
+        """Run live inference from raw history; None when the product has no history."""
+        dense = await self._dense_history(product_id, from_date, to_date)
+        if dense is None:
+            return None
+        df_feat = await compute.run_thread(predict_dense, model, dense)
+        return _forecast_points(df_feat, product_id, from_date, to_date)
+
+    async def get_forecast_batch(
+        self,
+        product_ids: list[str],
+        from_date: date,
+        to_date: date,
+    ) -> BatchForecastResponse:
+        """
+        Forecast many products over one shared date range.
+
+        History for all products is fetched in one query, features are built on
+        one stacked frame and the model runs a single predict over it. Results
+        are returned column-wise per requested product id, aligned to `dates`.
+        """
+        requested = list(dict.fromkeys(product_ids))
+        resolved = {pid: self._PRODUCT_ALIASES.get(pid, pid) for pid in requested}
+        all_dates = [d.date() for d in pd.date_range(from_date, to_date, freq="D")]
+        response = BatchForecastResponse(from_date=from_date, to_date=to_date, dates=all_dates)
+
+        lookback = 60
+        hist_start = from_date - timedelta(days=lookback)
+        wanted = sorted(set(resolved.values()))
+        # Products whose data ends before the range are served from their online feature state
+        states = {
+            pid: state
+            for pid, state in (await self._repo.get_feature_states(wanted)).items()
+            if from_date > state.last_date
+        }
+        dense_parts = [state.dense_history(to_date) for state in states.values()]
+        fetch = [pid for pid in wanted if pid not in states]
+        if fetch:
+            df = await self._repo.get_sales_df(hist_start, to_date, fetch)
+            without_history = sorted(set(fetch) - set(df[ENTITY_COL].unique()))
+            if without_history:
+                # Requested range beyond data for these products - extend their latest history
+                latest = await self._repo.get_latest_sales_df(without_history, min_days=lookback + 30)
+                if not latest.empty:
+                    df = latest if df.empty else pd.concat([df, latest], ignore_index=True)
+            if not df.empty:
+                dense_parts.append(densify_history(df, to_date))
+
+        active = await model_registry.get_active(self._repo) if dense_parts else None
+        if active is None:
+            response.missing = requested
+            return response
+        response.model_version = active.version
+
+        dense = dense_parts[0] if len(dense_parts) == 1 else pd.concat(dense_parts, ignore_index=True)
+        df_feat = await compute.run_thread(predict_dense, active.booster, dense)
+        mask = (df_feat[DATE_COL] >= from_date) & (df_feat[DATE_COL] <= to_date)
+        subset = df_feat.loc[mask, [ENTITY_COL, DATE_COL, "predicted_quantity", "predicted_revenue"]]
+
+        quantity = subset.pivot(index=DATE_COL, columns=ENTITY_COL, values="predicted_quantity").reindex(all_dates)
+        revenue = subset.pivot(index=DATE_COL, columns=ENTITY_COL, values="predicted_revenue").reindex(all_dates)
+
+        for pid in requested:
+            key = resolved[pid]
+            if key not in quantity.columns:
+                response.missing.append(pid)
+                continue
+            response.series[pid] = BatchForecastSeries(
+                predicted_quantity=_nullable_floats(quantity[key]),
+                predicted_revenue=_nullable_floats(revenue[key]),
             )
-            for _, row in subset.iterrows()
-        ]
-        return points, version
+        return response
 
     async def scenario_price_change(
         self,
@@ -206,93 +725,158 @@ class ForecastingService:
         to_date: date,
         price_delta_pct: float,
     ) -> ScenarioPriceChangeResponse:
-        """Recompute forecast with hypothetical price change."""
+        """
+        Recompute forecast with hypothetical price change.
+
+        Base and scenario forecasts come from one history fetch and one
+        stacked predict, so both are computed from the same frame. Responses
+        are cached like get_forecast.
+        """
         product_id = self._PRODUCT_ALIASES.get(product_id, product_id)
-        base_points, _ = await self.get_forecast(product_id, from_date, to_date)
-        if not base_points:
-            return ScenarioPriceChangeResponse(
-                product_id=product_id,
-                from_date=from_date,
-                to_date=to_date,
-                price_delta_pct=price_delta_pct,
-            )
+        active = await model_registry.get_active(self._repo)
+        if active is None or not settings.forecast_cache_enabled:
+            return await self._compute_price_change(active, product_id, from_date, to_date, price_delta_pct)
 
-        lookback = 60
-        hist_start = from_date - timedelta(days=lookback)
-        df = await self._repo.get_sales_df(hist_start, to_date, [product_id])
-        if df.empty:
-            df = await self._repo.get_latest_sales_df([product_id], min_days=lookback + 30)
-        if df.empty:
-            return ScenarioPriceChangeResponse(
-                product_id=product_id,
-                from_date=from_date,
-                to_date=to_date,
-                price_delta_pct=price_delta_pct,
-                base_forecast_points=base_points,
-            )
+        async def compute_payload() -> dict:
+            response = await self._compute_price_change(active, product_id, from_date, to_date, price_delta_pct)
+            return {
+                "base": encode_points(response.base_forecast_points, from_date),
+                "scenario": encode_points(response.scenario_forecast_points, from_date),
+                "delta_revenue_pct": response.delta_revenue_pct,
+                "delta_quantity_pct": response.delta_quantity_pct,
+            }
 
-        df_scenario = apply_price_delta(df, price_delta_pct)
-        file_path = await self._repo.get_active_model_path()
-        if not file_path or not os.path.exists(file_path):
-            return ScenarioPriceChangeResponse(
-                product_id=product_id,
-                from_date=from_date,
-                to_date=to_date,
-                price_delta_pct=price_delta_pct,
-                base_forecast_points=base_points,
-            )
+        key = make_forecast_cache_key(
+            "price_change",
+            active.version,
+            await self._repo.get_sales_dataset_fingerprint(),
+            product_id,
+            from_date,
+            to_date,
+            float(price_delta_pct),
+        )
+        payload = await forecast_cache.get_or_compute(key, compute_payload)
+        return ScenarioPriceChangeResponse(
+            product_id=product_id,
+            from_date=from_date,
+            to_date=to_date,
+            price_delta_pct=price_delta_pct,
+            base_forecast_points=decode_points(payload["base"], from_date, product_id),
+            scenario_forecast_points=decode_points(payload["scenario"], from_date, product_id),
+            delta_revenue_pct=payload["delta_revenue_pct"],
+            delta_quantity_pct=payload["delta_quantity_pct"],
+        )
 
-        model = load_model(file_path)
-        df_scenario["date"] = pd.to_datetime(df_scenario["date"])
-        range_start = min(df_scenario["date"]).date() if hasattr(min(df_scenario["date"]), "date") else min(df_scenario["date"])
-        all_dates = pd.date_range(range_start, to_date, freq="D")
-        df_full = df_scenario.set_index("date").reindex(all_dates)
-        df_full = df_full.ffill().bfill()
-        df_full = df_full.reset_index()
-        df_full = df_full.rename(columns={"index": "date"})
-        df_full["product_id"] = product_id
-        df_full["date"] = pd.to_datetime(df_full["date"]).dt.date
-
-        df_feat = engineer_features(df_full)
-        for col in FEATURE_COLS:
-            if col not in df_feat.columns:
-                df_feat[col] = 0
-        df_feat[FEATURE_COLS] = df_feat[FEATURE_COLS].fillna(0)
-
-        preds = predict(model, df_feat)
-        df_feat["predicted_quantity"] = preds
-        df_feat["predicted_revenue"] = df_feat["predicted_quantity"] * df_feat["price"]
-
-        df_feat["date"] = pd.to_datetime(df_feat["date"]).dt.date
-        mask = (df_feat["date"] >= from_date) & (df_feat["date"] <= to_date)
-        subset = df_feat[mask]
-        scenario_points = [
-            ForecastPoint(
-                date=row["date"],
-                product_id=product_id,
-                predicted_quantity=float(row["predicted_quantity"]),
-                predicted_revenue=float(row["predicted_revenue"]) if pd.notna(row.get("predicted_revenue")) else None,
-            )
-            for _, row in subset.iterrows()
-        ]
+    async def _compute_price_change(
+        self,
+        active,
+        product_id: str,
+        from_date: date,
+        to_date: date,
+        price_delta_pct: float,
+    ) -> ScenarioPriceChangeResponse:
+        """Uncached scenario_price_change for the given active model."""
+        response = ScenarioPriceChangeResponse(
+            product_id=product_id,
+            from_date=from_date,
+            to_date=to_date,
+            price_delta_pct=price_delta_pct,
+        )
+        if active is None:
+            return response
+        swept = await self._price_sweep_frame(
+            product_id, from_date, to_date, sorted({0.0, float(price_delta_pct)}), active
+        )
+        if swept is None:
+            return response
+        df_feat, _ = swept
+
+        base_points = _forecast_points(
+            df_feat[df_feat["price_delta_pct"] == 0.0], product_id, from_date, to_date
+        )
+        scenario_points = _forecast_points(
+            df_feat[df_feat["price_delta_pct"] == price_delta_pct], product_id, from_date, to_date
+        )
+        response.base_forecast_points = base_points
+        response.scenario_forecast_points = scenario_points
 
         base_rev = sum(p.predicted_revenue or 0 for p in base_points)
         scenario_rev = sum(p.predicted_revenue or 0 for p in scenario_points)
         base_qty = sum(p.predicted_quantity for p in base_points)
         scenario_qty = sum(p.predicted_quantity for p in scenario_points)
-        delta_revenue_pct = ((scenario_rev - base_rev) / (base_rev + 1e-8)) * 100 if base_rev else None
-        delta_quantity_pct = ((scenario_qty - base_qty) / (base_qty + 1e-8)) * 100 if base_qty else None
+        response.delta_revenue_pct = ((scenario_rev - base_rev) / (base_rev + 1e-8)) * 100 if base_rev else None
+        response.delta_quantity_pct = ((scenario_qty - base_qty) / (base_qty + 1e-8)) * 100 if base_qty else None
+        return response
 
-        return ScenarioPriceChangeResponse(
-            product_id=product_id,
-            from_date=from_date,
-            to_date=to_date,
-            price_delta_pct=price_delta_pct,
-            base_forecast_points=base_points,
-            scenario_forecast_points=scenario_points,
-            delta_revenue_pct=delta_revenue_pct,
-            delta_quantity_pct=delta_quantity_pct,
+    async def scenario_price_sweep(
+        self,
+        product_id: str,
+        from_date: date,
+        to_date: date,
+        price_deltas: list[float],
+    ) -> ScenarioSweepResponse:
+        """
+        Demand/revenue response curve over many price deltas in one predict.
+
+        Each curve point sums the forecast over [from_date, to_date]; deltas
+        are reported against the unchanged-price (0%) scenario, which is always
+        evaluated even if not requested.
+        """
+        if any(d <= -100 for d in price_deltas):
+            raise ValueError("price_delta_pcts must be greater than -100")
+        product_id = self._PRODUCT_ALIASES.get(product_id, product_id)
+        deltas = sorted(set(float(d) for d in price_deltas) | {0.0})
+        response = ScenarioSweepResponse(product_id=product_id, from_date=from_date, to_date=to_date)
+
+        swept = await self._price_sweep_frame(product_id, from_date, to_date, deltas)
+        if swept is None:
+            return response
+        df_feat, response.model_version = swept
+
+        mask = (df_feat[DATE_COL] >= from_date) & (df_feat[DATE_COL] <= to_date)
+        totals = (
+            df_feat[mask]
+            .groupby("price_delta_pct")[["predicted_quantity", "predicted_revenue"]]
+            .sum()
+            .reindex(deltas)
         )
+        base_qty = float(totals.loc[0.0, "predicted_quantity"])
+        base_rev = float(totals.loc[0.0, "predicted_revenue"])
+
+        for delta, row in totals.iterrows():
+            qty = float(row["predicted_quantity"])
+            rev = float(row["predicted_revenue"])
+            delta_qty = ((qty - base_qty) / (base_qty + 1e-8)) * 100 if base_qty else None
+            delta_rev = ((rev - base_rev) / (base_rev + 1e-8)) * 100 if base_rev else None
+            response.curve.append(
+                ScenarioSweepPoint(
+                    price_delta_pct=delta,
+                    total_quantity=qty,
+                    total_revenue=rev,
+                    delta_quantity_pct=delta_qty,
+                    delta_revenue_pct=delta_rev,
+                    elasticity=delta_qty / delta if delta_qty is not None and delta != 0 else None,
+                )
+            )
+        return response
+
+    async def _price_sweep_frame(
+        self,
+        product_id: str,
+        from_date: date,
+        to_date: date,
+        price_deltas: list[float],
+        active=None,
+    ) -> tuple[pd.DataFrame, str] | None:
+        """Shared scenario engine: one history fetch, one stacked predict for all deltas."""
+        active = active or await model_registry.get_active(self._repo)
+        if active is None:
+            return None
+        dense = await self._dense_history(product_id, from_date, to_date)
+        if dense is None:
+            return None
+        frame = await compute.run_thread(predict_price_sweep, active.booster, dense, price_deltas)
+        return frame, active.version
 
     async def run_backtest(
         self,
@@ -334,8 +918,8 @@ class ForecastingService:
                 "product_id": product_id,
             }
 
-        file_path = await self._repo.get_active_model_path()
-        if not file_path or not os.path.exists(file_path):
+        active = await model_registry.get_active(self._repo)
+        if active is None:
             return {
                 "mae": None,
                 "rmse": None,
@@ -345,10 +929,8 @@ class ForecastingService:
                 "product_id": product_id,
             }
 
-        model = load_model(file_path)
-
-        def predict_fn(d: pd.DataFrame) -> "np.ndarray":  # noqa: F821
-            return predict(model, d)
+        # partial (not a closure) so worker processes can unpickle it
+        predict_fn = functools.partial(predict, active.booster)
 
         logger.info(
             "Rolling backtest: product=%s  range=[%s, %s]  train_window=%d  step=%d",
@@ -359,25 +941,18 @@ class ForecastingService:
             step_days,
         )
 
-        actuals, preds, test_dates_list = rolling_backtest(
+        actuals, preds, test_dates_list = await compute.run_thread(
+            rolling_backtest,
             df,
             date_col=DATE_COL,
             entity_col=ENTITY_COL,
             predict_fn=predict_fn,
             train_window_days=train_window_days,
             step_days=step_days,
+            max_workers=settings.backtest_workers,
         )
 
-        metrics = backtest_metrics(actuals, preds)
-
-        date_range: dict = {}
-        if len(test_dates_list) > 0:
-            date_range = {
-                "train_start": str(hist_start),
-                "train_end": str(hist_start + timedelta(days=train_window_days - 1)),
-                "test_start": str(min(test_dates_list)),
-                "test_end": str(max(test_dates_list)),
-            }
+        metrics = _backtest_summary(actuals, preds, test_dates_list, hist_start, train_window_days)
 
         logger.info(
             "Backtest result: product=%s  MAE=%.4f  RMSE=%.4f  MAPE=%.2f%%  n=%d",
@@ -388,11 +963,116 @@ class ForecastingService:
             len(preds),
         )
 
-        return {
-            "mae": metrics["mae"],
-            "rmse": metrics["rmse"],
-            "mape": metrics["mape"],
-            "n_samples": int(len(preds)),
-            "date_range": date_range,
-            "product_id": product_id,
+        return {**metrics, "product_id": product_id}
+
+    async def run_portfolio_backtest(
+        self,
+        from_date: date,
+        to_date: date,
+        train_window_days: int = 90,
+        step_days: int = 7,
+        product_ids: list[str] | None = None,
+    ) -> dict:
+        """
+        Rolling backtest for many products (all when product_ids is None).
+
+        Histories come from one query; products are backtested in parallel
+        workers, each exactly as run_backtest would for that product alone.
+        Returns per-product metrics, pooled aggregate metrics over all
+        predictions and timing stats. Results are cached per model version,
+        parameters and sales dataset version.
+        """
+        started = time.perf_counter()
+        wanted = (
+            sorted({self._PRODUCT_ALIASES.get(pid, pid) for pid in product_ids}) if product_ids else None
+        )
+        active = await model_registry.get_active(self._repo)
+        if active is None:
+            return {"message": "No trained model", "products": [], "skipped": [], "aggregate": None}
+
+        params = {
+            "from_date": str(from_date),
+            "to_date": str(to_date),
+            "train_window_days": train_window_days,
+            "step_days": step_days,
+            "product_ids": wanted,
         }
+        cache_key = make_backtest_cache_key(
+            active.version, params, await self._repo.get_sales_dataset_fingerprint()
+        )
+        cached = await backtest_cache.get(cache_key)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        hist_start = from_date - timedelta(days=train_window_days)
+        df = await self._repo.get_sales_df(hist_start, to_date, wanted)
+        fetched = time.perf_counter()
+
+        frames = {pid: g.reset_index(drop=True) for pid, g in df.groupby(ENTITY_COL, sort=True)}
+        skipped = [
+            {"product_id": pid, "message": "Insufficient data"}
+            for pid in sorted(set(wanted or []) | set(frames))
+            if len(frames.get(pid, ())) < train_window_days + step_days
+        ]
+        eligible = {pid: g for pid, g in frames.items() if len(g) >= train_window_days + step_days}
+
+        results = await compute.run_thread(
+            rolling_backtest_many,
+            eligible,
+            functools.partial(predict, active.booster),
+            train_window_days=train_window_days,
+            step_days=step_days,
+            max_workers=settings.backtest_workers,
+        )
+        computed = time.perf_counter()
+
+        products: list[dict] = []
+        pooled_actuals: list[np.ndarray] = []
+        pooled_preds: list[np.ndarray] = []
+        product_seconds: list[float] = []
+        for pid, (actuals, preds, test_dates, seconds) in results.items():
+            if len(actuals) != len(preds):
+                skipped.append({"product_id": pid, "message": "Backtest windows lost rows to missing lags"})
+                continue
+            metrics = _backtest_summary(actuals, preds, test_dates, hist_start, train_window_days)
+            products.append({**metrics, "product_id": pid, "seconds": round(seconds, 4)})
+            pooled_actuals.append(actuals)
+            pooled_preds.append(preds)
+            product_seconds.append(seconds)
+
+        aggregate = None
+        if products:
+            all_actuals = np.concatenate(pooled_actuals)
+            all_preds = np.concatenate(pooled_preds)
+            aggregate = {
+                **backtest_metrics(all_actuals, all_preds),
+                "n_samples": int(len(all_preds)),
+                "n_products": len(products),
+                "mean_product_mae": float(np.mean([p["mae"] for p in products])),
+                "mean_product_mape": float(np.mean([p["mape"] for p in products])),
+            }
+
+        payload = {
+            "model_version": active.version,
+            "params": params,
+            "products": products,
+            "skipped": sorted(skipped, key=lambda s: s["product_id"]),
+            "aggregate": aggregate,
+            "timing": {
+                "fetch_seconds": round(fetched - started, 4),
+                "backtest_seconds": round(computed - fetched, 4),
+                "total_seconds": round(time.perf_counter() - started, 4),
+                "product_seconds_mean": round(float(np.mean(product_seconds)), 4) if product_seconds else 0.0,
+                "product_seconds_max": round(float(np.max(product_seconds)), 4) if product_seconds else 0.0,
+                "rows": int(len(df)),
+            },
+        }
+        logger.info(
+            "Portfolio backtest: products=%d  skipped=%d  rows=%d  total=%.2fs",
+            len(products),
+            len(skipped),
+            len(df),
+            payload["timing"]["total_seconds"],
+        )
+        await backtest_cache.set(cache_key, payload)
+        return {**payload, "cached": False}
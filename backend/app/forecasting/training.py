@@ -1,9 +1,12 @@
 """Model training and persistence."""
 
+from dataclasses import dataclass
 from datetime import date, datetime
+import hashlib
 import json
 import logging
 import os
+import threading
 import uuid
 
 import lightgbm as lgb
@@ -37,13 +40,299 @@ TARGET_COL = "quantity"
 ENTITY_COL = "product_id"
 DATE_COL = "date"
 
+LGB_PARAMS = {
+    "objective": "regression",
+    "metric": "mae",
+    "verbosity": -1,
+    "seed": 42,
+    "deterministic": True,
+    "force_col_wise": True,
+    "num_leaves": 63,
+    "learning_rate": 0.05,
+}
+N_ESTIMATORS = 300
+# Binning parameters of low-memory Datasets. Pre-filtering stays off so a
+# cached Dataset remains valid when min_data_in_leaf changes between runs.
+DATASET_PARAMS = {"max_bin": 255, "feature_pre_filter": False, "verbosity": -1}
+# File suffix of segmented model manifests (see SegmentedModel)
+GROUP_SUFFIX = ".group.json"
+FALLBACK_SEGMENT = "__global__"
+# Sampling interval of RssPeak
+RSS_SAMPLE_SECONDS = 0.1
+
+
+def error_metrics(quantity_pred: np.ndarray, actuals: np.ndarray) -> tuple[float, float, float]:
+    """Return (MAE, RMSE, MAPE %) in quantity space; MAPE skips zero actuals."""
+    errors = quantity_pred - actuals
+    mae = float(np.mean(np.abs(errors)))
+    rmse = float(np.sqrt(np.mean(errors ** 2)))
+    nonzero = actuals > 0
+    mape = (
+        float(np.mean(np.abs(errors[nonzero] / actuals[nonzero]))) * 100
+        if nonzero.any()
+        else 0.0
+    )
+    return mae, rmse, mape
+
+
+def _save_artifact(booster, artifacts_dir: str, meta: dict) -> tuple[str, str]:
+    """Write booster (or SegmentedModel) + _meta.json under a fresh version; return (version, file_path)."""
+    os.makedirs(artifacts_dir, exist_ok=True)
+    version = datetime.utcnow().strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:8]
+    suffix = GROUP_SUFFIX if isinstance(booster, SegmentedModel) else ".txt"
+    filepath = os.path.join(artifacts_dir, f"lgb_{version}{suffix}")
+    booster.save_model(filepath)
+
+    meta = {
+        "version": version,
+        "file_path": filepath,
+        "trained_at": datetime.utcnow().isoformat(),
+        **meta,
+        "feature_cols": FEATURE_COLS,
+    }
+    meta_path = filepath[: -len(suffix)] + "_meta.json"
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    return version, filepath
+
+
+def load_model_meta(file_path: str) -> dict | None:
+    """The _meta.json saved next to a model artifact; None when missing or unreadable."""
+    suffix = GROUP_SUFFIX if file_path.endswith(GROUP_SUFFIX) else ".txt"
+    try:
+        with open(file_path[: -len(suffix)] + "_meta.json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def current_rss_mb() -> float | None:
+    """Current resident set size of this process in MiB; None without /proc (macOS, Windows)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+class RssPeak:
+    """
+    Highest resident set size of this process (MiB) while the with-block runs.
+
+    ru_maxrss is the high-water mark of the whole process lifetime, so in a
+    long-lived worker it reports earlier requests; this samples current RSS
+    from a daemon thread every RSS_SAMPLE_SECONDS instead. Spikes shorter
+    than that can be missed and child processes are not included. mb is
+    None where current_rss_mb() is unsupported.
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS) -> None:
+        self._interval = interval
+        self._peak: float | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-peak", daemon=True)
+
+    def _sample(self) -> None:
+        rss = current_rss_mb()
+        if rss is not None and (self._peak is None or rss > self._peak):
+            self._peak = rss
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self._sample()
+
+    def __enter__(self) -> "RssPeak":
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    @property
+    def mb(self) -> float | None:
+        """Peak so far; also samples now while the block is still running."""
+        if not self._stop.is_set():
+            self._sample()
+        return self._peak
+
+
+def dataset_cache_key(fingerprint: dict, data_from: date, data_to: date, split_date: date | None) -> str:
+    """Key of the binary training Dataset built from one data version, window and feature set."""
+    payload = json.dumps(
+        {
+            "fingerprint": fingerprint,
+            "window": [data_from.isoformat(), data_to.isoformat(), split_date.isoformat() if split_date else None],
+            "features": FEATURE_COLS,
+            "dataset_params": DATASET_PARAMS,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def _dataset_cache_paths(cache_key: str, artifacts_dir: str | None = None) -> tuple[str, str]:
+    """(binary Dataset, evaluation arrays) paths of a cache entry."""
+    cache_dir = os.path.join(artifacts_dir or settings.artifacts_path, "dataset_cache")
+    return os.path.join(cache_dir, f"{cache_key}.bin"), os.path.join(cache_dir, f"{cache_key}_eval.npz")
+
+
+def dataset_cache_hit(cache_key: str, artifacts_dir: str | None = None) -> bool:
+    """True when a binary Dataset for cache_key exists, so training needs no sales frame."""
+    return all(os.path.exists(p) for p in _dataset_cache_paths(cache_key, artifacts_dir))
+
+
+def _prune_dataset_cache(cache_dir: str, keep: int) -> None:
+    """Delete all but the `keep` most recently written cache entries."""
+    bins = sorted(
+        (f for f in os.listdir(cache_dir) if f.endswith(".bin")),
+        key=lambda f: os.path.getmtime(os.path.join(cache_dir, f)),
+        reverse=True,
+    )
+    for name in bins[keep:]:
+        for path in (name, name[: -len(".bin")] + "_eval.npz"):
+            try:
+                os.remove(os.path.join(cache_dir, path))
+            except FileNotFoundError:
+                pass
+
+
+def compact_sales_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcast a sales frame to what feature engineering reads.
+
+    product_id and category_id become integer codes (sorted, so per-product
+    ordering is unchanged), measures float32 and promo_flag int8; revenue
+    and other columns are dropped.
+    """
+    out = pd.DataFrame(
+        {
+            ENTITY_COL: pd.factorize(df[ENTITY_COL], sort=True)[0].astype(np.int32),
+            DATE_COL: pd.to_datetime(df[DATE_COL]),
+            TARGET_COL: df[TARGET_COL].to_numpy(dtype=np.float32),
+            "price": df["price"].to_numpy(dtype=np.float32),
+            "promo_flag": df["promo_flag"].fillna(False).to_numpy(dtype=np.int8),
+        }
+    )
+    if "category_id" in df.columns:
+        codes = pd.factorize(df["category_id"], sort=True)[0]
+        out["category_id"] = codes.astype(np.int16 if codes.max(initial=0) < 2**15 else np.int32)
+    return out
+
+
+@dataclass
+class TrainingArrays:
+    """Contiguous float32 feature matrices of one train/eval split."""
+
+    X_train: np.ndarray
+    y_train: np.ndarray
+    X_eval: np.ndarray
+    actuals_eval: np.ndarray
+    eval_source: str
+
+
+def feature_matrix(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Engineer features on a compacted frame and copy them into a C-contiguous float32 matrix.
+
+    Returns (X, quantity, dates) with one entry per engineered row.
+    """
+    frame = engineer_features(compact_sales_frame(df))
+    n = len(frame)
+    X = np.empty((n, len(FEATURE_COLS)), dtype=np.float32)
+    for j, col in enumerate(FEATURE_COLS):
+        X[:, j] = frame[col].to_numpy(dtype=np.float32) if col in frame.columns else 0.0
+    quantity = frame[TARGET_COL].to_numpy(dtype=np.float32)
+    dates = frame[DATE_COL].to_numpy(dtype="datetime64[D]")
+    return X, quantity, dates
+
+
+def training_arrays(df: pd.DataFrame, split_date: date | None = None) -> TrainingArrays:
+    """
+    Feature matrix of df split into training and evaluation arrays.
+
+    Evaluation arrays are the rows from split_date on, or the training rows
+    themselves (in-sample) without a split.
+    """
+    X, quantity, dates = feature_matrix(df)
+
+    if split_date is None:
+        return TrainingArrays(X, np.log1p(quantity), X, quantity, "train")
+    train = dates < np.datetime64(split_date, "D")
+    if train.all():
+        # Nothing on or after split_date: evaluate in-sample, as the pandas path does
+        return TrainingArrays(X, np.log1p(quantity), X, quantity, "train")
+    return TrainingArrays(
+        np.ascontiguousarray(X[train]),
+        np.log1p(quantity[train]),
+        np.ascontiguousarray(X[~train]),
+        quantity[~train],
+        "test",
+    )
+
+
+def _train_low_memory(
+    df: pd.DataFrame | None,
+    split_date: date | None,
+    params: dict,
+    num_boost_round: int,
+    cache_key: str | None,
+    artifacts_dir: str,
+) -> tuple[lgb.Booster, np.ndarray, np.ndarray, str, str | None]:
+    """Train from float32 arrays or a cached binary Dataset; returns booster, eval preds/actuals, source, cache status."""
+    bin_path, eval_path = _dataset_cache_paths(cache_key, artifacts_dir) if cache_key else (None, None)
+    if cache_key and dataset_cache_hit(cache_key, artifacts_dir):
+        dataset = lgb.Dataset(bin_path, params=DATASET_PARAMS)
+        with np.load(eval_path) as cached:
+            X_eval, actuals, eval_source = cached["X_eval"], cached["actuals"], str(cached["eval_source"])
+        cache_status = "hit"
+        logger.info("Training from cached Dataset %s", bin_path)
+    else:
+        if df is None:
+            raise ValueError("A sales frame is required when the training Dataset is not cached")
+        arrays = training_arrays(df, split_date)
+        if split_date is not None and len(arrays.y_train) < 50:
+            raise ValueError(
+                f"Insufficient training rows before split_date {split_date} "
+                f"(got {len(arrays.y_train)}, need ≥ 50)"
+            )
+        dataset = lgb.Dataset(
+            arrays.X_train,
+            label=arrays.y_train,
+            feature_name=FEATURE_COLS,
+            params=DATASET_PARAMS,
+            free_raw_data=True,
+        ).construct()
+        X_eval, actuals, eval_source = arrays.X_eval, arrays.actuals_eval, arrays.eval_source
+        del arrays
+        cache_status = None
+        if cache_key and settings.training_dataset_cache_entries > 0:
+            os.makedirs(os.path.dirname(bin_path), exist_ok=True)
+            dataset.save_binary(bin_path)
+            np.savez(eval_path, X_eval=X_eval, actuals=actuals, eval_source=eval_source)
+            _prune_dataset_cache(os.path.dirname(bin_path), settings.training_dataset_cache_entries)
+            cache_status = "miss"
+
+    booster = lgb.train(params, dataset, num_boost_round=num_boost_round)
+    quantity_pred = np.expm1(booster.predict(X_eval)) if len(X_eval) else np.empty(0)
+    return booster, quantity_pred, actuals, eval_source, cache_status
+
 
 def train_model(
-    df: pd.DataFrame,
+    df: pd.DataFrame | None,
     data_from: date,
     data_to: date,
     split_date: date | None = None,
     artifacts_dir: str | None = None,
+    *,
+    low_memory: bool | None = None,
+    cache_key: str | None = None,
+    params: dict | None = None,
+    meta: dict | None = None,
 ) -> tuple[lgb.Booster, dict]:
     """
     Train LightGBM regressor on prepared data.
@@ -56,10 +345,54 @@ def train_model(
       - Trains on all data
       - Evaluates on training data (in-sample; reported as eval_source='train')
 
+    low_memory (default TRAINING_LOW_MEMORY) trains from compacted float32
+    arrays through lgb.Dataset. With a cache_key (see dataset_cache_key) the
+    constructed Dataset is saved as a LightGBM binary file and later runs
+    with the same key train from it; df may then be None. params override
+    LGB_PARAMS ("n_estimators" sets the number of boosting rounds); meta is
+    merged into the saved _meta.json only. peak_rss_mb in the metrics is the
+    highest RSS seen during this call (see RssPeak).
+
     Returns (booster, metrics_dict).
     """
+    with RssPeak() as rss:
+        return _train_model(df, data_from, data_to, split_date, artifacts_dir, low_memory, cache_key, params, meta, rss)
+
+
+def _train_model(
+    df: pd.DataFrame | None,
+    data_from: date,
+    data_to: date,
+    split_date: date | None,
+    artifacts_dir: str | None,
+    low_memory: bool | None,
+    cache_key: str | None,
+    params: dict | None,
+    meta: dict | None,
+    rss: RssPeak,
+) -> tuple[lgb.Booster, dict]:
     artifacts_dir = artifacts_dir or settings.artifacts_path
-    os.makedirs(artifacts_dir, exist_ok=True)
+    low_memory = settings.training_low_memory if low_memory is None else low_memory
+    params = {**LGB_PARAMS, **(params or {})}
+    n_estimators = int(params.pop("n_estimators", N_ESTIMATORS))
+
+    if low_memory:
+        booster, quantity_pred, actuals, eval_source, cache_status = _train_low_memory(
+            df, split_date, params, n_estimators, cache_key, artifacts_dir
+        )
+        logger.info(
+            "Low-memory training [%s → %s], split=%s, dataset cache: %s",
+            data_from,
+            data_to,
+            split_date,
+            cache_status or "off",
+        )
+        return _finish_training(
+            booster, quantity_pred, actuals, eval_source, data_from, data_to, split_date, artifacts_dir,
+            {"low_memory": True, "dataset_cache": cache_status}, meta, rss,
+        )
+    if df is None:
+        raise ValueError("A sales frame is required unless training in low-memory mode")
 
     # Feature engineering on full DataFrame so lag/rolling features for the test
     # portion reference real history from the training window.
@@ -97,19 +430,7 @@ def train_model(
     X_train = train_df[FEATURE_COLS]
     y_train = train_df["target"]
 
-    params = {
-        "objective": "regression",
-        "metric": "mae",
-        "verbosity": -1,
-        "seed": 42,
-        "deterministic": True,
-        "force_col_wise": True,
-        "num_leaves": 63,
-        "learning_rate": 0.05,
-        "n_estimators": 300,
-    }
-
-    model = lgb.LGBMRegressor(**params)
+    model = lgb.LGBMRegressor(**params, n_estimators=n_estimators)
     model.fit(X_train, y_train)
 
     # --- Evaluation ---
@@ -118,23 +439,34 @@ def train_model(
         quantity_pred = np.expm1(model.predict(X_test))
         actuals = test_df[TARGET_COL].values
         eval_source = "test"
-        n_eval = int(len(actuals))
     else:
         quantity_pred = np.expm1(model.predict(X_train))
         actuals = train_df[TARGET_COL].values
         eval_source = "train"
-        n_eval = int(len(actuals))
 
-    errors = quantity_pred - actuals
-    mae = float(np.mean(np.abs(errors)))
-    rmse = float(np.sqrt(np.mean(errors ** 2)))
-    nonzero = actuals > 0
-    mape = (
-        float(np.mean(np.abs(errors[nonzero] / actuals[nonzero]))) * 100
-        if nonzero.any()
-        else 0.0
+    return _finish_training(
+        model.booster_, quantity_pred, actuals, eval_source, data_from, data_to, split_date, artifacts_dir,
+        {"low_memory": False}, meta, rss,
     )
 
+
+def _finish_training(
+    booster: lgb.Booster,
+    quantity_pred: np.ndarray,
+    actuals: np.ndarray,
+    eval_source: str,
+    data_from: date,
+    data_to: date,
+    split_date: date | None,
+    artifacts_dir: str,
+    extra: dict,
+    meta: dict | None,
+    rss: RssPeak,
+) -> tuple[lgb.Booster, dict]:
+    """Score the evaluation rows, save the artifact and build the metrics dict."""
+    n_eval = int(len(actuals))
+    mae, rmse, mape = error_metrics(quantity_pred, actuals)
+
     logger.info(
         "Evaluation (%s) – MAE: %.4f  RMSE: %.4f  MAPE: %.2f%%  n=%d",
         eval_source,
@@ -144,54 +476,217 @@ def train_model(
         n_eval,
     )
 
-    version = datetime.utcnow().strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:8]
-    filename = f"lgb_{version}.txt"
-    filepath = os.path.join(artifacts_dir, filename)
-    model.booster_.save_model(filepath)
+    extra = {**extra, "peak_rss_mb": rss.mb}
+    version, filepath = _save_artifact(
+        booster,
+        artifacts_dir,
+        {
+            "data_from": data_from.isoformat(),
+            "data_to": data_to.isoformat(),
+            "split_date": split_date.isoformat() if split_date else None,
+            "mae": mae,
+            "rmse": rmse,
+            "mape": mape,
+            "n_eval_samples": n_eval,
+            "eval_source": eval_source,
+            "training_mode": "full",
+            **extra,
+            **(meta or {}),
+        },
+    )
 
-    meta = {
-        "version": version,
-        "file_path": filepath,
-        "trained_at": datetime.utcnow().isoformat(),
-        "data_from": data_from.isoformat(),
-        "data_to": data_to.isoformat(),
-        "split_date": split_date.isoformat() if split_date else None,
+    return booster, {
         "mae": mae,
         "rmse": rmse,
         "mape": mape,
         "n_eval_samples": n_eval,
         "eval_source": eval_source,
-        "feature_cols": FEATURE_COLS,
+        "version": version,
+        "file_path": filepath,
+        **extra,
     }
-    meta_path = filepath.replace(".txt", "_meta.json")
-    with open(meta_path, "w") as f:
-        json.dump(meta, f, indent=2)
 
-    return model.booster_, {
+
+def refresh_rows(df: pd.DataFrame, new_from: date) -> pd.DataFrame:
+    """
+    Feature rows dated >= new_from, for incremental refresh or drift checks.
+
+    df should start at least ~60 days before new_from so that lag and rolling
+    features of the new rows see real history, as they would in a full train.
+    """
+    df = engineer_features(df)
+    df["target"] = np.log1p(df[TARGET_COL])
+    for col in FEATURE_COLS:
+        if col not in df.columns:
+            df[col] = 0
+    return df[pd.to_datetime(df[DATE_COL]) >= pd.Timestamp(new_from)]
+
+
+def evaluate_rows(model: lgb.Booster, rows: pd.DataFrame) -> tuple[float, float, float]:
+    """(MAE, RMSE, MAPE %) of model on feature rows, filled the way inference fills them."""
+    quantity_pred = np.expm1(model.predict(rows[FEATURE_COLS].fillna(0)))
+    return error_metrics(quantity_pred, rows[TARGET_COL].to_numpy(dtype=float))
+
+
+def refresh_model(
+    init_model: lgb.Booster,
+    rows: pd.DataFrame,
+    data_from: date,
+    data_to: date,
+    num_boost_round: int,
+    artifacts_dir: str | None = None,
+    meta: dict | None = None,
+    params: dict | None = None,
+) -> tuple[lgb.Booster, dict]:
+    """
+    Continue boosting init_model for num_boost_round trees on new rows only.
+
+    rows comes from refresh_rows(). The returned booster contains every tree
+    of init_model plus the new ones; init_model itself is not modified.
+    Metrics are in-sample on rows (eval_source='train'). params override
+    LGB_PARAMS, so a tuned chain keeps its configuration.
+    """
+    artifacts_dir = artifacts_dir or settings.artifacts_path
+    if rows.empty:
+        raise ValueError("No new rows to refresh the model on")
+
+    params = {k: v for k, v in {**LGB_PARAMS, **(params or {})}.items() if k != "n_estimators"}
+    with RssPeak() as rss:
+        booster = lgb.train(
+            params,
+            lgb.Dataset(rows[FEATURE_COLS], label=rows["target"]),
+            num_boost_round=num_boost_round,
+            init_model=init_model,
+        )
+        mae, rmse, mape = evaluate_rows(booster, rows)
+    n_eval = int(len(rows))
+    logger.info(
+        "Incremental refresh on %d rows: %d → %d trees, MAE: %.4f",
+        n_eval,
+        init_model.num_trees(),
+        booster.num_trees(),
+        mae,
+    )
+
+    version, filepath = _save_artifact(
+        booster,
+        artifacts_dir,
+        {
+            "training_mode": "incremental",
+            "data_from": data_from.isoformat(),
+            "data_to": data_to.isoformat(),
+            "split_date": None,
+            "mae": mae,
+            "rmse": rmse,
+            "mape": mape,
+            "n_eval_samples": n_eval,
+            "eval_source": "train",
+            "peak_rss_mb": rss.mb,
+            **(meta or {}),
+        },
+    )
+    return booster, {
         "mae": mae,
         "rmse": rmse,
         "mape": mape,
         "n_eval_samples": n_eval,
-        "eval_source": eval_source,
+        "eval_source": "train",
         "version": version,
         "file_path": filepath,
     }
 
 
-def load_model(file_path: str) -> lgb.Booster:
-    """Load LightGBM model from file."""
+class SegmentedModel:
+    """
+    Per-segment boosters behind the Booster predict interface.
+
+    Rows are routed to the booster of the segment their product was trained
+    in, then to the one of their category_id; anything else (new categories,
+    categories too small for their own model, rows without ids) goes to the
+    fallback booster trained on all products. Each segment's rows are scored
+    in a single predict call.
+
+    Persisted as a JSON manifest (GROUP_SUFFIX) next to one model file per
+    segment.
+    """
+
+    def __init__(self, segments: dict[str, lgb.Booster], fallback: lgb.Booster, product_segments: dict[str, str]):
+        self.segments = segments
+        self.fallback = fallback
+        self.product_segments = product_segments
+
+    def route(self, product_ids=None, category_ids=None, n_rows: int = 0) -> np.ndarray:
+        """Segment key of every row; FALLBACK_SEGMENT where no segment model applies."""
+        if product_ids is None:
+            return np.full(n_rows, FALLBACK_SEGMENT, dtype=object)
+        keys = pd.Series(np.asarray(product_ids, dtype=object)).map(self.product_segments)
+        if category_ids is not None:
+            categories = pd.Series(np.asarray(category_ids, dtype=object))
+            by_category = categories.where(categories.isin(list(self.segments)))
+            keys = keys.fillna(by_category)
+        return keys.fillna(FALLBACK_SEGMENT).to_numpy(dtype=object)
+
+    def predict(self, X, product_ids=None, category_ids=None) -> np.ndarray:
+        """Log-space predictions of each row's segment booster, in row order."""
+        keys = self.route(product_ids, category_ids, n_rows=len(X))
+        out = np.empty(len(X), dtype=np.float64)
+        for key in pd.unique(keys):
+            rows = np.flatnonzero(keys == key)
+            booster = self.fallback if key == FALLBACK_SEGMENT else self.segments[key]
+            out[rows] = booster.predict(X.iloc[rows] if isinstance(X, pd.DataFrame) else X[rows])
+        return out
+
+    def save_model(self, file_path: str) -> None:
+        stem = file_path[: -len(GROUP_SUFFIX)]
+        files = {FALLBACK_SEGMENT: f"{stem}_global.txt"}
+        files.update({key: f"{stem}_seg{i}.txt" for i, key in enumerate(sorted(self.segments))})
+        for key, path in files.items():
+            (self.fallback if key == FALLBACK_SEGMENT else self.segments[key]).save_model(path)
+        with open(file_path, "w") as f:
+            json.dump(
+                {
+                    "segments": {key: os.path.basename(path) for key, path in files.items()},
+                    "product_segments": self.product_segments,
+                },
+                f,
+                indent=2,
+            )
+
+    @classmethod
+    def load(cls, file_path: str) -> "SegmentedModel":
+        with open(file_path) as f:
+            manifest = json.load(f)
+        directory = os.path.dirname(file_path)
+        boosters = {
+            key: lgb.Booster(model_file=os.path.join(directory, name)) for key, name in manifest["segments"].items()
+        }
+        fallback = boosters.pop(FALLBACK_SEGMENT)
+        return cls(boosters, fallback, manifest["product_segments"])
+
+
+def load_model(file_path: str) -> lgb.Booster | SegmentedModel:
+    """Load a LightGBM model, or a segmented model group from its manifest."""
+    if file_path.endswith(GROUP_SUFFIX):
+        return SegmentedModel.load(file_path)
     return lgb.Booster(model_file=file_path)
 
 
 def predict(
-    model: lgb.Booster,
+    model: lgb.Booster | SegmentedModel,
     df: pd.DataFrame,
 ) -> np.ndarray:
-    """Run prediction on feature-prepared DataFrame. Returns quantity (expm1 of log-space output)."""
+    """
+    Run prediction on feature-prepared DataFrame. Returns quantity (expm1 of log-space output).
+
+    A SegmentedModel routes rows by the frame's product_id / category_id columns.
+    """
     for col in FEATURE_COLS:
         if col not in df.columns:
             df = df.copy()
             df[col] = 0
     X = df[FEATURE_COLS]
-    pred = model.predict(X)
+    if isinstance(model, SegmentedModel):
+        pred = model.predict(X, df.get(ENTITY_COL), df.get("category_id"))
+    else:
+        pred = model.predict(X)
     return np.expm1(pred)
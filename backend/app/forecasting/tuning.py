@@ -0,0 +1,331 @@
+"""
+Time-series cross-validation and hyperparameter search.
+
+Features are engineered once for the whole window and written as float32
+.npy files; every fold and candidate reads the same matrix through a
+read-only memory map, so worker processes share it via the page cache
+instead of each receiving a pickled copy.
+
+Folds are expanding windows: fold k trains on every row dated before its
+validation window and validates on the next horizon_days, the last fold
+ending on the latest date. Candidates are scored by mean validation MAE
+across folds. LightGBM early-stops each fold on the last horizon_days of its
+training window, never on the validation rows, so the fold scores stay
+out-of-sample whatever the round budget.
+
+search="random" evaluates every candidate at the full round budget;
+search="halving" (successive halving) evaluates all of them on a small
+budget and promotes the best 1/eta to the next rung, eta times larger,
+until one remains at the full budget.
+"""
+
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+import logging
+import math
+import os
+from typing import Awaitable, Callable
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from app.core.compute import compute, resolve_workers, split_evenly
+from app.forecasting.training import DATASET_PARAMS, FEATURE_COLS, LGB_PARAMS, error_metrics, feature_matrix
+
+logger = logging.getLogger(__name__)
+
+ProgressFn = Callable[[float, str], Awaitable[None]]
+
+# Sampled around LGB_PARAMS; ("choice", values) or ("uniform"/"log_uniform", low, high)
+SEARCH_SPACE: dict[str, tuple] = {
+    "num_leaves": ("choice", [15, 31, 63, 127]),
+    "learning_rate": ("log_uniform", 0.01, 0.2),
+    "min_data_in_leaf": ("choice", [5, 10, 20, 50, 100]),
+    "feature_fraction": ("uniform", 0.6, 1.0),
+    "bagging_fraction": ("uniform", 0.6, 1.0),
+    "lambda_l2": ("log_uniform", 1e-3, 10.0),
+}
+# Fewest rows a fold may train on (train_model's split minimum)
+MIN_TRAIN_ROWS = 50
+# Smallest round budget of a successive-halving rung
+MIN_RUNG_ROUNDS = 20
+
+_MATRIX_FILES = ("X.npy", "y.npy", "quantity.npy")
+
+
+@dataclass(frozen=True)
+class Fold:
+    """Rows [0, fit_end) fit, [fit_end, train_end) early-stop, [train_end, valid_end) validate."""
+
+    index: int
+    fit_end: int
+    train_end: int
+    valid_end: int
+    valid_from: date
+    valid_to: date
+
+
+def write_cv_matrix(df: pd.DataFrame, directory: str) -> np.ndarray:
+    """
+    Engineer df once and save X, log1p target and quantity sorted by date.
+
+    Returns the matching datetime64[D] dates (sorted) for expanding_folds.
+    """
+    X, quantity, dates = feature_matrix(df)
+    order = np.argsort(dates, kind="stable")
+    os.makedirs(directory, exist_ok=True)
+    for name, values in zip(_MATRIX_FILES, (X[order], np.log1p(quantity[order]), quantity[order])):
+        np.save(os.path.join(directory, name), np.ascontiguousarray(values))
+    return dates[order]
+
+
+def _load_cv_matrix(directory: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return tuple(np.load(os.path.join(directory, name), mmap_mode="r") for name in _MATRIX_FILES)
+
+
+def expanding_folds(
+    dates: np.ndarray,
+    n_folds: int,
+    horizon_days: int,
+    min_train_rows: int = MIN_TRAIN_ROWS,
+) -> list[Fold]:
+    """
+    n_folds consecutive horizon_days validation windows ending on the last date.
+
+    Each fold holds out the horizon_days before its validation window from
+    fitting, for early stopping. dates must be sorted. Folds with fewer than
+    min_train_rows rows to fit on, or no early-stopping or validation rows,
+    are dropped; ValueError if none remain.
+    """
+    if n_folds < 1 or horizon_days < 1:
+        raise ValueError("n_folds and horizon_days must be at least 1")
+    if len(dates) == 0:
+        raise ValueError("No rows to cross-validate on")
+    last = pd.Timestamp(dates[-1]).date()
+    folds: list[Fold] = []
+    for k in range(n_folds):
+        valid_from = last - timedelta(days=(n_folds - k) * horizon_days - 1)
+        valid_to = valid_from + timedelta(days=horizon_days - 1)
+        stop_from = valid_from - timedelta(days=horizon_days)
+        fit_end = int(np.searchsorted(dates, np.datetime64(stop_from, "D"), side="left"))
+        train_end = int(np.searchsorted(dates, np.datetime64(valid_from, "D"), side="left"))
+        valid_end = int(np.searchsorted(dates, np.datetime64(valid_to, "D"), side="right"))
+        if fit_end < min_train_rows or train_end == fit_end or valid_end == train_end:
+            continue
+        folds.append(Fold(len(folds), fit_end, train_end, valid_end, valid_from, valid_to))
+    if not folds:
+        raise ValueError(
+            f"No usable folds: {n_folds} x {horizon_days}-day windows (plus as many days held "
+            f"out for early stopping) leave fewer than {min_train_rows} training rows"
+        )
+    return folds
+
+
+def sample_candidates(n_candidates: int, seed: int = 42) -> list[dict]:
+    """LGB_PARAMS first (the baseline), then n_candidates - 1 random draws from SEARCH_SPACE."""
+    rng = np.random.default_rng(seed)
+    candidates = [dict(LGB_PARAMS)]
+    for _ in range(max(0, n_candidates - 1)):
+        params = dict(LGB_PARAMS)
+        for name, (kind, *spec) in SEARCH_SPACE.items():
+            if kind == "choice":
+                params[name] = spec[0][int(rng.integers(len(spec[0])))]
+            elif kind == "uniform":
+                params[name] = round(float(rng.uniform(*spec)), 4)
+            else:
+                params[name] = float(f"{math.exp(rng.uniform(math.log(spec[0]), math.log(spec[1]))):.4g}")
+        params["bagging_freq"] = 1
+        candidates.append(params)
+    return candidates
+
+
+def halving_schedule(n_candidates: int, max_rounds: int, eta: int = 3) -> list[tuple[int, int]]:
+    """(candidates evaluated, round budget) per rung; the last rung has one candidate at max_rounds."""
+    if eta < 2:
+        raise ValueError("eta must be at least 2")
+    sizes = [n_candidates]
+    while sizes[-1] > 1:
+        sizes.append(max(1, sizes[-1] // eta))
+    last = len(sizes) - 1
+    return [(n, max(min(MIN_RUNG_ROUNDS, max_rounds), max_rounds // eta ** (last - k))) for k, n in enumerate(sizes)]
+
+
+def _fit_fold(
+    X: np.ndarray,
+    y: np.ndarray,
+    quantity: np.ndarray,
+    params: dict,
+    fold: Fold,
+    num_boost_round: int,
+    early_stopping_rounds: int,
+) -> dict:
+    train = lgb.Dataset(
+        X[: fold.fit_end],
+        label=y[: fold.fit_end],
+        feature_name=FEATURE_COLS,
+        params=DATASET_PARAMS,
+        free_raw_data=True,
+    )
+    stop = lgb.Dataset(
+        X[fold.fit_end : fold.train_end], label=y[fold.fit_end : fold.train_end], params=DATASET_PARAMS, reference=train
+    )
+    booster = lgb.train(
+        params,
+        train,
+        num_boost_round=num_boost_round,
+        valid_sets=[stop],
+        callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)],
+    )
+    # The validation rows are only scored, never used to pick the iteration
+    X_valid = X[fold.train_end : fold.valid_end]
+    best_iteration = booster.best_iteration or booster.current_iteration()
+    pred = np.expm1(booster.predict(X_valid, num_iteration=best_iteration))
+    mae, rmse, mape = error_metrics(pred, np.asarray(quantity[fold.train_end : fold.valid_end], dtype=np.float64))
+    return {
+        "fold": fold.index,
+        "train_rows": fold.fit_end,
+        "early_stopping_rows": fold.train_end - fold.fit_end,
+        "valid_rows": fold.valid_end - fold.train_end,
+        "valid_from": fold.valid_from.isoformat(),
+        "valid_to": fold.valid_to.isoformat(),
+        "best_iteration": int(best_iteration),
+        "mae": mae,
+        "rmse": rmse,
+        "mape": mape,
+    }
+
+
+def _evaluate_chunk(task: tuple) -> list[tuple[int, dict]]:
+    """Fit (candidate, fold) pairs against the memory-mapped matrix; top-level so it pickles."""
+    matrix_dir, pairs, num_boost_round, early_stopping_rounds, num_threads = task
+    X, y, quantity = _load_cv_matrix(matrix_dir)
+    return [
+        (i, _fit_fold(X, y, quantity, {**params, "num_threads": num_threads}, fold, num_boost_round, early_stopping_rounds))
+        for i, params, fold in pairs
+    ]
+
+
+def evaluate_candidates(
+    matrix_dir: str,
+    candidates: dict[int, dict],
+    folds: list[Fold],
+    num_boost_round: int,
+    early_stopping_rounds: int,
+    max_workers: int = 0,
+) -> dict[int, list[dict]]:
+    """Per-fold metrics of each candidate (keyed as given), fitted across the process pool."""
+    pairs = [(i, params, fold) for i, params in candidates.items() for fold in folds]
+    workers = max(1, min(resolve_workers(max_workers), len(pairs)))
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+    chunks = split_evenly(pairs, workers)
+    results = compute.map_in_processes(
+        _evaluate_chunk,
+        [(matrix_dir, chunk, num_boost_round, early_stopping_rounds, num_threads) for chunk in chunks],
+        workers,
+    )
+    scores: dict[int, list[dict]] = {i: [] for i in candidates}
+    for chunk in results:
+        for i, metrics in chunk:
+            scores[i].append(metrics)
+    return scores
+
+
+def cv_summary(fold_metrics: list[dict]) -> dict:
+    """Mean MAE/RMSE/MAPE across folds and the mean early-stopped iteration."""
+    return {
+        "mae": float(np.mean([m["mae"] for m in fold_metrics])),
+        "rmse": float(np.mean([m["rmse"] for m in fold_metrics])),
+        "mape": float(np.mean([m["mape"] for m in fold_metrics])),
+        "best_iteration": int(round(np.mean([m["best_iteration"] for m in fold_metrics]))),
+    }
+
+
+@dataclass
+class SearchResult:
+    """Winner of a hyperparameter search and how it was found."""
+
+    search: str
+    best_params: dict
+    folds: list[dict]
+    cv: dict
+    rungs: list[dict]
+    n_candidates: int
+    evaluations: int
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+async def run_search(
+    matrix_dir: str,
+    folds: list[Fold],
+    candidates: list[dict],
+    search: str = "halving",
+    max_rounds: int = 500,
+    early_stopping_rounds: int = 30,
+    eta: int = 3,
+    max_workers: int = 0,
+    progress: ProgressFn | None = None,
+) -> SearchResult:
+    """
+    Search candidates on the folds; every rung runs on the shared compute pools.
+
+    progress, when given, is awaited after each rung with (fraction of rungs
+    done, message).
+    """
+    if search == "random":
+        schedule = [(len(candidates), max_rounds)]
+    elif search == "halving":
+        schedule = halving_schedule(len(candidates), max_rounds, eta)
+    else:
+        raise ValueError(f"Unknown search: {search}")
+
+    alive = dict(enumerate(candidates))
+    rungs: list[dict] = []
+    evaluations = 0
+    for r, (_, rounds) in enumerate(schedule):
+        scores = await compute.run_thread(
+            evaluate_candidates,
+            matrix_dir,
+            alive,
+            folds,
+            rounds,
+            early_stopping_rounds,
+            max_workers,
+        )
+        evaluations += len(alive) * len(folds)
+        ranked = sorted(scores, key=lambda i: (cv_summary(scores[i])["mae"], i))
+        best = ranked[0]
+        rungs.append(
+            {
+                "rounds": rounds,
+                "candidates": len(alive),
+                "best_candidate": best,
+                "best_mae": cv_summary(scores[best])["mae"],
+            }
+        )
+        logger.info(
+            "Tuning rung %d/%d: %d candidates x %d folds at %d rounds, best MAE %.4f (candidate %d)",
+            r + 1,
+            len(schedule),
+            len(alive),
+            len(folds),
+            rounds,
+            rungs[-1]["best_mae"],
+            best,
+        )
+        if progress is not None:
+            await progress((r + 1) / len(schedule), f"rung {r + 1}/{len(schedule)}: best MAE {rungs[-1]['best_mae']:.4f}")
+        if r + 1 < len(schedule):
+            alive = {i: alive[i] for i in ranked[: schedule[r + 1][0]]}
+
+    return SearchResult(
+        search=search,
+        best_params=alive[best],
+        folds=sorted(scores[best], key=lambda m: m["fold"]),
+        cv=cv_summary(scores[best]),
+        rungs=rungs,
+        n_candidates=len(candidates),
+        evaluations=evaluations,
+    )
@@ -0,0 +1,376 @@
+"""
+Background job manager for training, backtests and knowledge ingestion.
+
+Key schema:
+    jobs:{id}          →  JSON job record   (TTL: JOB_TTL_SECONDS)
+    jobs:{id}:cancel   →  "1" once any worker asked to cancel
+    jobs:recent        →  sorted set of job ids by submit time (latest 100)
+    jobs:lock:{name}   →  id of the job holding an exclusive lock
+                          (TTL: JOB_LOCK_TTL_SECONDS, renewed while the job lives)
+
+Flow:
+    1. submit() stores a "queued" record and returns it immediately; the job
+       coroutine runs as a task on the submitting worker, at most
+       JOB_MAX_CONCURRENT at a time. Its blocking steps are offloaded from
+       the event loop by the services themselves.
+    2. Jobs report progress through JobContext.report().
+    3. Status, result and cancel work from any worker since records and the
+       cancel flag live in Redis; the owning worker polls the flag.
+    4. exclusive="train" makes submit() fail with JobConflictError while
+       another worker holds the lock, so only one training job runs at once.
+       Requests that train inline hold the same lock via exclusive().
+    5. Cancelling stops the job coroutine, but work it offloaded to the
+       compute pools runs to the end; the exclusive lock is held (and the
+       job stays "running") until that work has finished.
+
+Without Redis records, cancel flags and locks fall back to this process only.
+The local copies of finished records expire like their Redis keys (and at
+most the latest 100 are kept); running jobs stay until they finish.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.compute import compute
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = "jobs:"
+_RECENT_KEY = "jobs:recent"
+_RECENT_MAX = 100
+_FINISHED = ("succeeded", "failed", "cancelled")
+
+# Delete / extend the lock only while we still own it.
+_RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+_RENEW_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('expire', KEYS[1], ARGV[2]) end return 0"
+)
+
+
+class JobConflictError(Exception):
+    """An exclusive job of the same kind is already queued or running."""
+
+    def __init__(self, lock: str, holder: str | None):
+        super().__init__(f"A {lock} job is already running" + (f" (job {holder})" if holder else ""))
+        self.holder = holder
+
+
+class JobContext:
+    """Handle passed to a running job for progress reporting."""
+
+    def __init__(self, manager: "JobManager", job_id: str):
+        self._manager = manager
+        self.job_id = job_id
+
+    async def report(self, progress: float, message: str | None = None) -> None:
+        await self._manager._update(self.job_id, progress=max(0.0, min(1.0, progress)), message=message)
+
+
+JobFn = Callable[[JobContext], Awaitable[Any]]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobManager:
+    """Submits jobs as background tasks and tracks them in Redis."""
+
+    def __init__(self) -> None:
+        self._redis: Any = None
+        # Insertion order is submit order; finished ids in finish order (monotonic time)
+        self._records: dict[str, dict[str, Any]] = {}
+        self._finished: OrderedDict[str, float] = OrderedDict()
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._local_locks: dict[str, str] = {}
+        self._semaphore: asyncio.Semaphore | None = None
+
+    async def _client(self) -> Any:
+        if self._redis is not None:
+            return self._redis
+        try:
+            import redis.asyncio as aioredis  # type: ignore
+
+            self._redis = aioredis.from_url(
+                settings.redis_url, encoding="utf-8", decode_responses=True
+            )
+            await self._redis.ping()
+        except Exception as exc:
+            logger.warning("Job store Redis unavailable (%s) — jobs tracked in-process only.", exc)
+            self._redis = None
+        return self._redis
+
+    # ------------------------------------------------------------------
+    # Records
+    # ------------------------------------------------------------------
+
+    def _evict(self) -> None:
+        """Drop local finished records past job_ttl_seconds or beyond the latest _RECENT_MAX."""
+        ttl = settings.job_ttl_seconds
+        now = time.monotonic()
+        while self._finished:
+            job_id, finished = next(iter(self._finished.items()))
+            if len(self._finished) <= _RECENT_MAX and (not ttl or now - finished < ttl):
+                break
+            del self._finished[job_id]
+            self._records.pop(job_id, None)
+
+    async def _save(self, record: dict[str, Any]) -> None:
+        self._records[record["id"]] = record
+        if record["status"] in _FINISHED and record["id"] not in self._finished:
+            self._finished[record["id"]] = time.monotonic()
+        self._evict()
+        client = await self._client()
+        if client is None:
+            return
+        try:
+            ttl = settings.job_ttl_seconds or None
+            await client.set(_PREFIX + record["id"], json.dumps(record, default=str), ex=ttl)
+        except Exception as exc:
+            logger.warning("Job store SET error: %s", exc)
+
+    async def _update(self, job_id: str, **changes: Any) -> dict[str, Any]:
+        record = {**self._records[job_id], **changes}
+        await self._save(record)
+        return record
+
+    async def get(self, job_id: str) -> dict[str, Any] | None:
+        """Return the job record from this worker or Redis; None if unknown."""
+        self._evict()
+        if job_id in self._records:
+            return self._records[job_id]
+        client = await self._client()
+        if client is None:
+            return None
+        try:
+            raw = await client.get(_PREFIX + job_id)
+            return json.loads(raw) if raw else None
+        except Exception as exc:
+            logger.warning("Job store GET error: %s", exc)
+            return None
+
+    async def list_recent(self, limit: int = 20) -> list[dict[str, Any]]:
+        """Most recently submitted jobs first, without their results."""
+        ids: list[str] = []
+        client = await self._client()
+        if client is not None:
+            try:
+                ids = list(await client.zrevrange(_RECENT_KEY, 0, limit - 1))
+            except Exception as exc:
+                logger.warning("Job store ZREVRANGE error: %s", exc)
+        if not ids:
+            self._evict()
+            ids = list(islice(reversed(self._records), limit))
+        records = [await self.get(job_id) for job_id in ids]
+        return [{k: v for k, v in r.items() if k != "result"} for r in records if r is not None]
+
+    # ------------------------------------------------------------------
+    # Exclusive locks
+    # ------------------------------------------------------------------
+
+    async def _acquire(self, name: str, job_id: str) -> tuple[bool, str | None]:
+        client = await self._client()
+        if client is None:
+            holder = self._local_locks.get(name)
+            if holder is not None:
+                return False, holder
+            self._local_locks[name] = job_id
+            return True, None
+        key = f"{_PREFIX}lock:{name}"
+        if await client.set(key, job_id, nx=True, ex=settings.job_lock_ttl_seconds):
+            return True, None
+        return False, await client.get(key)
+
+    async def _renew(self, name: str, job_id: str) -> None:
+        client = await self._client()
+        if client is None:
+            return
+        try:
+            await client.eval(_RENEW_SCRIPT, 1, f"{_PREFIX}lock:{name}", job_id, settings.job_lock_ttl_seconds)
+        except Exception as exc:
+            logger.warning("Job lock renew error: %s", exc)
+
+    async def _release(self, name: str, job_id: str) -> None:
+        if self._local_locks.get(name) == job_id:
+            del self._local_locks[name]
+        client = await self._client()
+        if client is None:
+            return
+        try:
+            await client.eval(_RELEASE_SCRIPT, 1, f"{_PREFIX}lock:{name}", job_id)
+        except Exception as exc:
+            logger.warning("Job lock release error: %s", exc)
+
+    @asynccontextmanager
+    async def exclusive(self, name: str) -> AsyncIterator[None]:
+        """
+        Hold lock name around work done inline rather than as a job.
+
+        Raises JobConflictError while a job (or another inline holder) has
+        it; the lock is renewed until the block exits.
+        """
+        owner = f"inline-{uuid.uuid4().hex}"
+        acquired, holder = await self._acquire(name, owner)
+        if not acquired:
+            raise JobConflictError(name, holder)
+        keeper = asyncio.create_task(self._keep_lock(name, owner))
+        try:
+            with compute.tracking() as work:
+                try:
+                    yield
+                finally:
+                    # A cancelled request leaves its offloaded work running
+                    await compute.settle(work)
+        finally:
+            keeper.cancel()
+            await self._release(name, owner)
+
+    async def _keep_lock(self, name: str, owner: str) -> None:
+        renew_every = max(1.0, settings.job_lock_ttl_seconds / 3)
+        while True:
+            await asyncio.sleep(renew_every)
+            await self._renew(name, owner)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def submit(
+        self,
+        kind: str,
+        params: dict[str, Any],
+        fn: JobFn,
+        *,
+        exclusive: str | None = None,
+    ) -> dict[str, Any]:
+        """Queue fn as a background job and return its record immediately."""
+        job_id = uuid.uuid4().hex
+        if exclusive is not None:
+            acquired, holder = await self._acquire(exclusive, job_id)
+            if not acquired:
+                raise JobConflictError(exclusive, holder)
+
+        record = {
+            "id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "progress": 0.0,
+            "message": None,
+            "params": jsonable_encoder(params),
+            "submitted_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        await self._save(record)
+        client = await self._client()
+        if client is not None:
+            try:
+                await client.zadd(_RECENT_KEY, {job_id: time.time()})
+                await client.zremrangebyrank(_RECENT_KEY, 0, -_RECENT_MAX - 1)
+            except Exception as exc:
+                logger.warning("Job store ZADD error: %s", exc)
+
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id, fn, exclusive))
+        return record
+
+    async def _run(self, job_id: str, fn: JobFn, exclusive: str | None) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(1, settings.job_max_concurrent))
+        watcher = asyncio.create_task(self._watch(job_id, asyncio.current_task(), exclusive))
+        try:
+            with compute.tracking() as work:
+                try:
+                    async with self._semaphore:
+                        await self._update(job_id, status="running", started_at=_now())
+                        result = await fn(JobContext(self, job_id))
+                except asyncio.CancelledError:
+                    if any(not f.done() for f in work):
+                        await self._update(job_id, message="Cancelling: waiting for running computation to finish")
+                        await compute.settle(work)
+                    raise
+            await self._update(
+                job_id,
+                status="succeeded",
+                progress=1.0,
+                result=jsonable_encoder(result),
+                finished_at=_now(),
+            )
+        except asyncio.CancelledError:
+            await self._update(job_id, status="cancelled", finished_at=_now())
+        except Exception as exc:
+            logger.exception("Job %s failed", job_id)
+            await self._update(job_id, status="failed", error=str(exc), finished_at=_now())
+        finally:
+            watcher.cancel()
+            if exclusive is not None:
+                await self._release(exclusive, job_id)
+            self._tasks.pop(job_id, None)
+
+    async def _watch(self, job_id: str, task: asyncio.Task | None, exclusive: str | None) -> None:
+        """Poll the cross-worker cancel flag and keep the exclusive lock alive."""
+        renew_every = max(1.0, settings.job_lock_ttl_seconds / 3)
+        last_renew = time.monotonic()
+        while True:
+            await asyncio.sleep(settings.job_poll_seconds)
+            client = await self._client()
+            if client is not None and task is not None:
+                try:
+                    if await client.get(f"{_PREFIX}{job_id}:cancel"):
+                        task.cancel()
+                        task = None  # keep renewing while the job winds down
+                except Exception:
+                    pass
+            if exclusive is not None and time.monotonic() - last_renew >= renew_every:
+                await self._renew(exclusive, job_id)
+                last_renew = time.monotonic()
+
+    async def cancel(self, job_id: str) -> dict[str, Any] | None:
+        """Request cancellation; returns the current record (None if unknown)."""
+        record = await self.get(job_id)
+        if record is None or record["status"] in _FINISHED:
+            return record
+        task = self._tasks.get(job_id)
+        if task is not None:
+            if not task.cancelling():  # a second cancel would cut short the wait for its work
+                task.cancel()
+            return record
+        client = await self._client()
+        if client is not None:
+            try:
+                await client.set(f"{_PREFIX}{job_id}:cancel", "1", ex=settings.job_ttl_seconds or None)
+            except Exception as exc:
+                logger.warning("Job store cancel error: %s", exc)
+        return record
+
+    async def shutdown(self) -> None:
+        """Cancel this worker's jobs and close the Redis client."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if self._redis is not None:
+            try:
+                await self._redis.aclose()
+            except Exception:
+                pass
+            self._redis = None
+
+
+# Module-level singleton — one job manager per worker process
+job_manager = JobManager()
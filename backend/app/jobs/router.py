@@ -0,0 +1,80 @@
+"""Job status, result and cancel routes (API key required)."""
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
+
+from app.core.security import verify_api_key
+from app.jobs.manager import JobConflictError, JobFn, job_manager
+from app.jobs.schemas import JobResult, JobStatus
+
+router = APIRouter(prefix="/api", tags=["jobs"], dependencies=[Depends(verify_api_key)])
+
+
+async def submit_job(
+    kind: str,
+    params: dict[str, Any],
+    fn: JobFn,
+    *,
+    exclusive: str | None = None,
+) -> JSONResponse:
+    """Submit a background job and answer 202 with its status (409 if locked)."""
+    try:
+        record = await job_manager.submit(kind, params, fn, exclusive=exclusive)
+    except JobConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    status = JobStatus(**record)
+    return JSONResponse(
+        status_code=202,
+        content=status.model_dump(),
+        headers={"Location": f"/api/jobs/{status.id}"},
+    )
+
+
+@asynccontextmanager
+async def run_exclusive(name: str) -> AsyncIterator[None]:
+    """Hold job lock name around inline request work (409 while a job holds it)."""
+    try:
+        async with job_manager.exclusive(name):
+            yield
+    except JobConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+async def _get_or_404(job_id: str) -> dict[str, Any]:
+    record = await job_manager.get(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return record
+
+
+@router.get("/jobs", response_model=list[JobStatus])
+async def list_jobs(limit: int = 20) -> list[JobStatus]:
+    """Most recently submitted jobs."""
+    return [JobStatus(**r) for r in await job_manager.list_recent(max(1, min(limit, 100)))]
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str) -> JobStatus:
+    """Job status and progress."""
+    return JobStatus(**await _get_or_404(job_id))
+
+
+@router.get("/jobs/{job_id}/result", response_model=JobResult)
+async def get_job_result(job_id: str) -> JobResult:
+    """Result (or error) of a finished job; 409 while it is still queued or running."""
+    record = await _get_or_404(job_id)
+    if record["status"] in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {record['status']}")
+    return JobResult(**record)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobStatus)
+async def cancel_job(job_id: str) -> JobStatus:
+    """Request cancellation; running work stops at its next await point."""
+    record = await job_manager.cancel(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return JobStatus(**record)
@@ -0,0 +1,31 @@
+"""Job API schemas."""
+
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+JobState = Literal["queued", "running", "succeeded", "failed", "cancelled"]
+
+
+class JobStatus(BaseModel):
+    """Job record without its result payload."""
+
+    id: str
+    kind: str
+    status: JobState
+    progress: float
+    message: str | None = None
+    params: dict[str, Any]
+    submitted_at: str
+    started_at: str | None = None
+    finished_at: str | None = None
+    error: str | None = None
+
+
+class JobResult(BaseModel):
+    """Outcome of a finished job."""
+
+    id: str
+    status: JobState
+    result: Any = None
+    error: str | None = None
@@ -3,7 +3,9 @@
 from fastapi import APIRouter, Depends
 
 from app.core.security import verify_api_key
-from app.db.session import AsyncSessionDep
+from app.db.session import AsyncSessionDep, AsyncSessionLocal
+from app.jobs.manager import JobContext
+from app.jobs.router import submit_job
 from app.knowledge_rag.schemas import IngestRequest, QueryRequest, QueryResponse
 from app.knowledge_rag.service import KnowledgeService
 
@@ -22,9 +24,7 @@ async def reset_rag_store():
     return {"status": "ok", "message": "RAG store resetován", "removed": removed}
 
 
-@router.post("/knowledge/ingest", dependencies=[Depends(verify_api_key)])
-async def ingest_documents(body: IngestRequest):
-    """Ingest documents from folder or raw text (API key required)."""
+async def _ingest(body: IngestRequest) -> dict:
     service = get_knowledge_service()
     if body.text:
         return await service.ingest_text(body.text, body.source)
@@ -33,9 +33,31 @@ async def ingest_documents(body: IngestRequest):
     return {"status": "error", "message": "Provide folder_path or text"}
 
 
+async def _ingest_reports_job(ctx: JobContext) -> dict:
+    from app.knowledge_reports.service import KnowledgeReportService
+    async with AsyncSessionLocal() as session:
+        await ctx.report(0.0, "generating reports")
+        return await KnowledgeReportService(session).ingest_reports()
+
+
+@router.post("/knowledge/ingest", dependencies=[Depends(verify_api_key)])
+async def ingest_documents(body: IngestRequest, background: bool = False):
+    """Ingest documents from folder or raw text (API key required); background=true submits a job."""
+    if background:
+        params = body.model_dump(exclude={"text"})
+
+        async def run(ctx: JobContext) -> dict:
+            return await _ingest(body)
+
+        return await submit_job("knowledge_ingest", params, run)
+    return await _ingest(body)
+
+
 @router.post("/knowledge/ingest-reports", dependencies=[Depends(verify_api_key)])
-async def ingest_reports(session: AsyncSessionDep):
-    """Generate text reports from DB sales data and ingest into ChromaDB."""
+async def ingest_reports(session: AsyncSessionDep, background: bool = False):
+    """Generate text reports from DB sales data and ingest into ChromaDB; background=true submits a job."""
+    if background:
+        return await submit_job("knowledge_ingest_reports", {}, _ingest_reports_job)
     from app.knowledge_reports.service import KnowledgeReportService
     svc = KnowledgeReportService(session)
     return await svc.ingest_reports()
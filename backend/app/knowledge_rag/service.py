@@ -5,6 +5,7 @@ from typing import TYPE_CHECKING, Any
 if TYPE_CHECKING:
     from app.assistants.trace_recorder import AssistantTraceRecorder
 
+from app.core.compute import compute
 from app.knowledge_rag.ingest.chunking import chunk_text
 from app.knowledge_rag.ingest.loaders import load_documents_from_path
 from app.knowledge_rag.ingest.embeddings import get_embedding_provider
@@ -31,6 +32,16 @@ def create_vector_store(vectorstore_name: str | None = None) -> VectorStore | No
     return ChromaVectorStore(emb)
 
 
+def _load_folder_chunks(folder_path: str) -> tuple[list[str], list[dict]]:
+    chunks: list[str] = []
+    metadatas: list[dict] = []
+    for text, meta in load_documents_from_path(folder_path):
+        for chunk in chunk_text(text):
+            chunks.append(chunk)
+            metadatas.append(meta)
+    return chunks, metadatas
+
+
 def get_vector_store() -> VectorStore | None:
     """Create active vector store based on current settings."""
     return create_vector_store()
@@ -46,12 +57,8 @@ class KnowledgeService:
         """Ingest documents from a folder."""
         if not self._store:
             return {"status": "rag_disabled", "ingested": 0}
-        chunks: list[str] = []
-        metadatas: list[dict] = []
-        for text, meta in load_documents_from_path(folder_path):
-            for chunk in chunk_text(text):
-                chunks.append(chunk)
-                metadatas.append(meta)
+        # File parsing (PDFs) and chunking are blocking; keep them off the event loop.
+        chunks, metadatas = await compute.run_thread(_load_folder_chunks, folder_path)
         if not chunks:
             return {"status": "ok", "ingested": 0, "message": "No documents found"}
         ids = await self._store.add_documents(chunks, metadatas)
@@ -6,6 +6,7 @@ from typing import Any
 import pandas as pd
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.compute import compute
 from app.forecasting.repository import ForecastingRepository
 from app.knowledge_rag.ingest.chunking import chunk_text
 from app.knowledge_rag.service import KnowledgeService, get_vector_store
@@ -92,7 +93,8 @@ class KnowledgeReportService:
             pid: grp.reset_index(drop=True)
             for pid, grp in df_all.groupby("product_id")
         }
-        p_texts, p_metas = _build_chunks(
+        p_texts, p_metas = await compute.run_process(
+            _build_chunks,
             product_groups, date_from, date_to, ProductReportGenerator()
         )
         all_texts.extend(p_texts)
@@ -106,7 +108,8 @@ class KnowledgeReportService:
                 for cat, grp in df_all.groupby("category_id")
                 if pd.notna(cat)
             }
-            c_texts, c_metas = _build_chunks(
+            c_texts, c_metas = await compute.run_process(
+                _build_chunks,
                 cat_groups, date_from, date_to, CategoryReportGenerator()
             )
             all_texts.extend(c_texts)
@@ -6,11 +6,17 @@ from typing import AsyncGenerator
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.compute import compute
 from app.core.logging import get_logger, setup_logging
+from app.forecasting.backtest_cache import backtest_cache
+from app.forecasting.forecast_cache import forecast_cache
+from app.forecasting.model_registry import model_registry
 from app.forecasting.router import router as forecasting_router
 from app.forecasting.pricing_router import router as pricing_router
 from app.ai_assistant.router import router as assistant_router
 from app.knowledge_rag.router import router as knowledge_router
+from app.jobs.manager import job_manager
+from app.jobs.router import router as jobs_router
 from app.assistants.router import router as assistants_router
 from app.settings import settings
 
@@ -29,7 +35,13 @@ _metrics: dict[str, int] = {
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     setup_logging()
     logger.info("Application starting", extra={"rag_enabled": settings.rag_enabled})
+    model_registry.start_listener()
     yield
+    await job_manager.shutdown()
+    await model_registry.stop_listener()
+    await backtest_cache.close()
+    await forecast_cache.close()
+    compute.shutdown()
     logger.info("Application shutdown")
 
 
@@ -53,12 +65,13 @@ def create_app() -> FastAPI:
 
     @app.get("/api/metrics")
     async def metrics():
-        return _metrics
+        return {**_metrics, "compute": compute.metrics(), "forecast_cache": forecast_cache.metrics()}
 
     app.include_router(forecasting_router)
     app.include_router(pricing_router)
     app.include_router(assistant_router)
     app.include_router(assistants_router)
+    app.include_router(jobs_router)
     if settings.rag_enabled:
         app.include_router(knowledge_router)
 
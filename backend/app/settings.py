@@ -61,6 +61,51 @@ class Settings(BaseSettings):
     # Paths (default for local; Docker uses /app/artifacts)
     artifacts_path: str = "./artifacts"
 
+    # Forecasting
+    model_registry_refresh_seconds: int = 300
+    forecast_materialize_enabled: bool = True
+    forecast_materialize_history_days: int = 365
+    forecast_materialize_horizon_days: int = 30
+    forecast_materialize_workers: int = 0  # 0 = one per CPU core
+    backtest_workers: int = 0  # 0 = one per CPU core
+    backtest_cache_ttl: int = 86400  # 0 = no expiry
+    forecast_cache_enabled: bool = True  # Redis cache of /forecast and /scenario/price-change responses
+    forecast_cache_ttl: int = 3600  # 0 = no expiry
+    forecast_cache_lock_seconds: float = 5.0  # max wait for another worker computing the same key
+    sales_fetch_copy_enabled: bool = True  # asyncpg COPY for bulk sales reads
+    sales_fetch_chunk_rows: int = 50000
+    sales_snapshot_enabled: bool = True  # full-table reads from {artifacts_path}/sales_snapshot
+    sales_snapshot_max_segments: int = 8
+    dataset_version_cache_seconds: float = 2.0  # in-process cache of the dataset_versions fingerprint
+    import_chunk_rows: int = 200000  # CSV rows parsed per chunk by the Kaggle import
+    feature_state_enabled: bool = True  # inference from product_feature_state instead of raw history
+    training_low_memory: bool = False  # float32 arrays + lgb.Dataset instead of pandas frames
+    training_dataset_cache_entries: int = 4  # binary training Datasets kept for low-memory runs; 0 = off
+    training_segmented: bool = False  # one booster per category_id plus a global fallback
+    segment_min_rows: int = 500  # smaller categories are served by the fallback booster
+    segment_workers: int = 0  # segments trained concurrently; 0 = one per CPU core
+    tuning_workers: int = 0  # parallel CV fits per tuning job; 0 = one per CPU core
+    tuning_candidates: int = 12  # parameter sets per search, default parameters included
+    tuning_folds: int = 3  # expanding-window CV folds
+    tuning_horizon_days: int = 14  # validation days per fold
+    tuning_max_rounds: int = 500  # boosting rounds of a full-budget fold fit
+    tuning_early_stopping_rounds: int = 30
+    model_refresh_rounds: int = 30  # trees added per incremental refresh
+    model_full_retrain_days: int = 7  # incremental chains older than this retrain fully
+    model_max_incremental_refreshes: int = 14
+    model_drift_tolerance: float = 0.25  # refresh falls back to full retrain above (1 + tol) x recorded MAE
+
+    # Compute pools (per worker process)
+    compute_thread_workers: int = 0  # 0 = one per CPU core; LightGBM predict/train
+    compute_process_workers: int = 0  # 0 = one per CPU core; GIL-bound pandas work
+    compute_process_enabled: bool = True  # false runs process work on the thread pool
+
+    # Background jobs
+    job_max_concurrent: int = 2  # per worker
+    job_ttl_seconds: int = 86400  # job records/results kept in Redis
+    job_lock_ttl_seconds: int = 60  # exclusive (training) lock, renewed while the job lives
+    job_poll_seconds: float = 1.0  # cancel-flag poll interval
+
     @field_validator("debug", mode="before")
     @classmethod
     def parse_debug(cls, value: Any) -> Any:
@@ -12,17 +12,8 @@ from app.assistants.trace_recorder import AssistantTraceRecorder
 
 
 class FakeForecastingRepo:
-    async def get_sales_dataset_signature(self):
-        return {
-            "row_count": 4,
-            "quantity_sum": 62.0,
-            "revenue_sum": 460.0,
-            "price_sum": 189.8,
-            "promo_row_count": 2,
-            "promo_quantity_sum": 29.0,
-            "date_from": "2022-01-01",
-            "date_to": "2024-01-01",
-        }
+    async def get_sales_dataset_fingerprint(self):
+        return {"dataset": "sales_facts", "version": 7, "updated_at": "2024-01-01T00:00:00"}
 
     async def get_product_rank_winners(self, *, metric, direction, filters=None, date_range=None, limit=1):
         data = {
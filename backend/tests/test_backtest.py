@@ -257,3 +257,83 @@ def test_rolling_backtest_insufficient_data(sample_df):
     )
     assert len(actuals) == 0
     assert len(preds) == 0
+
+
+def _reference_rolling_backtest(df, predict_fn, train_window_days, step_days):
+    """Per-window implementation: slice, add train context, re-engineer features."""
+    df = df.sort_values([ENTITY_COL, DATE_COL])
+    dates = sorted(df[DATE_COL].unique())
+    actuals, preds, test_dates = [], [], []
+    for i in range(train_window_days, len(dates) - step_days + 1, step_days):
+        train_end = dates[i - 1]
+        test_end = dates[min(i + step_days - 1, len(dates) - 1)]
+        train_df = df[(df[DATE_COL] >= dates[i - train_window_days]) & (df[DATE_COL] <= train_end)]
+        test_df = df[(df[DATE_COL] > train_end) & (df[DATE_COL] <= test_end)]
+        if train_df.empty or test_df.empty:
+            continue
+        test_feat = _compute_test_features_with_context(train_df, test_df)
+        actuals.extend(test_df[TARGET_COL].tolist())
+        preds.extend(predict_fn(test_feat).tolist())
+        test_dates.extend(test_df[DATE_COL].unique().tolist())
+    return np.array(actuals), np.array(preds), test_dates
+
+
+class _CountingPredict:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, df):
+        self.calls += 1
+        return (
+            0.5 * df["lag_7"].to_numpy()
+            + 0.3 * df["rolling_mean_30"].to_numpy()
+            + 2.0 * df["price_vs_avg_30"].to_numpy()
+            + df["dow"].to_numpy()
+        )
+
+
+@pytest.fixture
+def long_history_df():
+    """Two products over 240 days with gaps, plus one product that starts late."""
+    rng = np.random.default_rng(7)
+    rows = []
+    for pid, start_day, n_days in [("P001", 0, 240), ("P002", 0, 240), ("P003", 150, 90)]:
+        for i in range(start_day, start_day + n_days):
+            if pid == "P002" and i % 17 == 3:
+                continue
+            rows.append(
+                {
+                    "date": date(2024, 1, 1) + timedelta(days=i),
+                    "product_id": pid,
+                    "quantity": float(rng.integers(5, 40)),
+                    "price": float(rng.uniform(10, 20)),
+                    "promo_flag": int(i % 9 == 0),
+                    "revenue": 0.0,
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("missing_price", [False, True])
+def test_rolling_backtest_matches_per_window_reference(long_history_df, missing_price):
+    df = long_history_df.copy()
+    if missing_price:
+        df.loc[df.sample(5, random_state=1).index, "price"] = np.nan
+
+    expected = _reference_rolling_backtest(df, _CountingPredict(), 60, 7)
+    actuals, preds, test_dates = rolling_backtest(df, DATE_COL, ENTITY_COL, _CountingPredict(), 60, 7)
+
+    np.testing.assert_array_equal(actuals, expected[0])
+    np.testing.assert_allclose(preds, expected[1], rtol=1e-12)
+    assert test_dates == expected[2]
+
+
+def test_rolling_backtest_scores_precomputed_windows_in_one_call(long_history_df):
+    predict_fn = _CountingPredict()
+    _, preds, _ = rolling_backtest(long_history_df, DATE_COL, ENTITY_COL, predict_fn, 60, 7)
+
+    # P003 starts mid-range, so its early windows need their own context pass;
+    # every other window is scored in a single stacked call.
+    n_windows = len(range(60, 240 - 7 + 1, 7))
+    assert 1 < predict_fn.calls < n_windows
+    assert len(preds) > 0
@@ -0,0 +1,82 @@
+"""Tests for the shared compute executor."""
+
+import asyncio
+import operator
+
+import pytest
+
+from app.core.compute import ComputeExecutor, resolve_workers, split_evenly
+
+
+def _square(x: int) -> int:
+    return x * x
+
+
+def _fail(x: int) -> int:
+    raise ValueError(f"bad item {x}")
+
+
+@pytest.fixture
+def executor():
+    ex = ComputeExecutor()
+    yield ex
+    ex.shutdown()
+
+
+def test_split_evenly_and_resolve_workers():
+    assert split_evenly(list(range(7)), 3) == [[0, 1, 2], [3, 4], [5, 6]]
+    assert split_evenly([1], 4) == [[1]]
+    assert resolve_workers(3) == 3
+    assert resolve_workers(0) >= 1
+
+
+@pytest.mark.asyncio
+async def test_run_thread_records_metrics(executor):
+    assert await executor.run_thread(operator.add, 2, 3) == 5
+    with pytest.raises(ValueError):
+        await executor.run_thread(_fail, 1)
+
+    stats = executor.metrics()["thread"]
+    assert (stats["completed"], stats["failed"], stats["in_flight"], stats["queued"]) == (1, 1, 0, 0)
+    assert stats["exec_seconds_total"] >= 0.0
+
+
+@pytest.mark.asyncio
+async def test_process_work_falls_back_to_threads_when_disabled(executor, monkeypatch):
+    monkeypatch.setattr("app.core.compute.settings.compute_process_enabled", False)
+    assert await executor.run_process(_square, 4) == 16
+    metrics = executor.metrics()
+    assert metrics["thread"]["completed"] == 1
+    assert metrics["process"]["completed"] == 0
+
+
+def test_map_in_processes_keeps_order(executor, monkeypatch):
+    monkeypatch.setattr("app.core.compute.settings.compute_process_workers", 2)
+    assert executor.map_in_processes(_square, range(6), max_workers=2) == [0, 1, 4, 9, 16, 25]
+    assert executor.metrics()["process"]["completed"] == 6
+
+    # A single worker runs inline without touching the pool.
+    assert executor.map_in_processes(_square, [3], max_workers=4) == [9]
+    assert executor.metrics()["process"]["completed"] == 6
+
+
+def test_map_in_processes_propagates_errors(executor, monkeypatch):
+    monkeypatch.setattr("app.core.compute.settings.compute_process_workers", 2)
+    with pytest.raises(ValueError, match="bad item"):
+        executor.map_in_processes(_fail, [1, 2, 3], max_workers=2)
+    stats = executor.metrics()["process"]
+    assert stats["in_flight"] == 0
+    assert stats["failed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_map_from_compute_threads_runs_inline_when_processes_disabled(executor, monkeypatch):
+    monkeypatch.setattr("app.core.compute.settings.compute_process_enabled", False)
+    monkeypatch.setattr("app.core.compute.settings.compute_thread_workers", 2)
+
+    # As the services call it: one map per busy compute thread, all threads taken
+    calls = [executor.run_thread(executor.map_in_processes, _square, range(4), 2) for _ in range(2)]
+    results = await asyncio.wait_for(asyncio.gather(*calls), timeout=5)
+
+    assert results == [[0, 1, 4, 9]] * 2
+    assert executor.metrics()["thread"]["completed"] == 2
@@ -0,0 +1,147 @@
+"""Tests for the online per-product feature state."""
+
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.forecasting.db_models import ProductFeatureState
+from app.forecasting.feature_state import WINDOW, FeatureState, apply_sales, build_feature_states
+from app.forecasting.features import engineer_features
+from app.forecasting.inference import densify_history
+from app.forecasting.repository import ForecastingRepository
+from app.forecasting.training import FEATURE_COLS
+
+START = date(2024, 1, 1)
+
+
+def _history(n_days: int, skip=(), missing_price=()) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    days = [i for i in range(n_days) if i not in skip]
+    return pd.DataFrame(
+        {
+            "product_id": "P1",
+            "date": [START + timedelta(days=i) for i in days],
+            "quantity": rng.integers(1, 50, len(days)).astype(float),
+            "revenue": 0.0,
+            "price": [np.nan if i in missing_price else 10.0 + (i % 5) for i in days],
+            "promo_flag": [i % 6 == 0 for i in days],
+            "category_id": "C1",
+        }
+    )
+
+
+def test_ring_buffers_and_running_sums_track_a_dense_window():
+    df = _history(100, skip={60, 95, 96})
+    state = build_feature_states(df)[0]
+    dense = densify_history(df, df["date"].max())
+
+    assert state.size == WINDOW and state.last_date == START + timedelta(days=99)
+    np.testing.assert_array_equal(state.window(state.quantities), dense["quantity"].to_numpy()[-WINDOW:])
+    np.testing.assert_array_equal(state.window(state.prices), dense["price"].to_numpy()[-WINDOW:])
+    assert state.quantity_sums[7] == pytest.approx(dense["quantity"].iloc[-7:].sum())
+    assert state.quantity_sums[30] == pytest.approx(dense["quantity"].iloc[-30:].sum())
+    assert state.price_sum == pytest.approx(dense["price"].iloc[-30:].sum())
+    # The two filled days break the observed run
+    assert state.observed_days == 3
+    assert state.feature_row() is None
+
+
+def test_leading_missing_prices_are_backfilled():
+    state = FeatureState("P1")
+    state.push(START, 1.0, None)
+    state.push(START + timedelta(days=1), 2.0, float("nan"))
+    state.push(START + timedelta(days=2), 3.0, 4.0)
+    np.testing.assert_array_equal(state.window(state.prices), [4.0, 4.0, 4.0])
+    assert state.price_sum == 12.0
+    with pytest.raises(ValueError):
+        state.push(START + timedelta(days=2), 1.0, 1.0)
+
+
+def test_feature_row_matches_engineered_last_row():
+    df = _history(80, skip={10}, missing_price={20})
+    state = build_feature_states(df)[0]
+    expected = engineer_features(df.assign(price=df["price"].fillna(df["price"].median()))).iloc[-1]
+
+    row = state.feature_row()
+    assert row is not None and len(row) == 1
+    for col in [*FEATURE_COLS, "rolling_mean_price_30"]:
+        assert row[col].iloc[0] == pytest.approx(float(expected[col])), col
+
+
+def test_dense_history_extends_to_horizon():
+    df = _history(40)
+    state = build_feature_states(df)[0]
+    to_date = START + timedelta(days=49)
+    frame = state.dense_history(to_date)
+    expected = densify_history(df, to_date).iloc[-len(frame):].reset_index(drop=True)
+
+    assert frame["date"].tolist() == expected["date"].tolist()
+    np.testing.assert_array_equal(frame["quantity"], expected["quantity"])
+    np.testing.assert_array_equal(frame["price"], expected["price"])
+    assert frame["promo_flag"].iloc[-1] == expected["promo_flag"].iloc[-1]
+
+
+def test_record_round_trip():
+    state = build_feature_states(_history(45))[0]
+    record = state.to_record()
+    assert len(record["quantities"]) == WINDOW * 8
+    restored = FeatureState.from_record(record)
+    restored.push(state.last_date + timedelta(days=1), 5.0, 12.0)
+    state.push(state.last_date + timedelta(days=1), 5.0, 12.0)
+
+    np.testing.assert_array_equal(restored.window(restored.quantities), state.window(state.quantities))
+    assert restored.quantity_sums == pytest.approx(state.quantity_sums)
+    assert restored.price_sum == pytest.approx(state.price_sum)
+    assert restored.observed_days == state.observed_days
+    assert set(record) == {c.name for c in ProductFeatureState.__table__.columns}
+
+
+def test_apply_sales_pushes_appended_days_and_flags_rewrites():
+    history = _history(60, skip={57})
+    full = build_feature_states(history)[0]
+    states = {"P1": build_feature_states(history.iloc[:40])[0]}
+    other = history.iloc[:5].assign(product_id="P2")
+
+    rebuild = apply_sales(states, pd.concat([history.iloc[40:], other]))
+
+    assert rebuild == ["P2"]
+    assert states["P1"].last_date == full.last_date
+    np.testing.assert_array_equal(states["P1"].window(states["P1"].quantities), full.window(full.quantities))
+    assert states["P1"].quantity_sums == pytest.approx(full.quantity_sums)
+    assert states["P1"].price_sum == pytest.approx(full.price_sum)
+    assert states["P1"].observed_days == full.observed_days
+
+    # A row on or before last_date rewrites history; the state is left as is
+    last = states["P1"].last_date
+    assert apply_sales(states, history.iloc[-1:]) == ["P1"]
+    assert states["P1"].last_date == last
+
+
+@pytest.mark.asyncio
+async def test_repository_serves_raw_history_while_states_lag(monkeypatch):
+    monkeypatch.setattr("app.forecasting.repository.settings.feature_state_enabled", True)
+    state = build_feature_states(_history(40))[0]
+    lagging = MagicMock()
+    lagging.all.return_value = [("sales_facts", 3), ("product_feature_state", 2)]
+    current = MagicMock()
+    current.all.return_value = [("sales_facts", 3), ("product_feature_state", 3)]
+    rows = MagicMock()
+    rows.scalars.return_value = [MagicMock(**state.to_record())]
+    session = MagicMock()
+    session.execute = AsyncMock(side_effect=[lagging, current, rows])
+    repo = ForecastingRepository(session)
+    repo.refresh_feature_states = AsyncMock(return_value=True)
+
+    # Lagging states are not rebuilt on the read path
+    assert await repo.get_feature_states(["P1"]) == {}
+    repo.refresh_feature_states.assert_not_awaited()
+
+    states = await repo.get_feature_states(["P1"])
+    assert states["P1"].last_date == state.last_date
+    np.testing.assert_array_equal(states["P1"].window(states["P1"].prices), state.window(state.prices))
+
+    monkeypatch.setattr("app.forecasting.repository.settings.feature_state_enabled", False)
+    assert await repo.get_feature_states(["P1"]) == {}
@@ -2,6 +2,7 @@
 
 from datetime import date, timedelta
 
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -72,3 +73,50 @@ def test_apply_price_delta(sample_df):
     df = apply_price_delta(sample_df, 5.0)
     expected_first = sample_df["price"].iloc[0] * 1.05
     assert abs(df["price"].iloc[0] - expected_first) < 0.01
+
+
+def _reference_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-group lambda implementation the vectorized engine must reproduce."""
+    out = df.copy()
+    out["price"] = out["price"].fillna(out["price"].median())
+    out["date"] = pd.to_datetime(out["date"])
+    out = out.sort_values(["product_id", "date"])
+    grouped = out.groupby("product_id")
+    for lag in (7, 14, 30):
+        out[f"lag_{lag}"] = grouped["quantity"].shift(lag)
+    for w in (7, 30):
+        out[f"rolling_mean_{w}"] = grouped["quantity"].transform(
+            lambda x: x.shift(1).rolling(w, min_periods=1).mean()
+        )
+    out["price_change_pct"] = grouped["price"].pct_change().fillna(0)
+    out["rolling_mean_price_30"] = grouped["price"].transform(
+        lambda x: x.shift(1).rolling(window=30, min_periods=7).mean()
+    )
+    return out.dropna(subset=["lag_30"])
+
+
+def test_engineer_features_matches_per_group_reference():
+    rng = np.random.default_rng(7)
+    rows = []
+    for pid, n_days in [("P001", 75), ("P002", 40), ("P003", 90)]:
+        for i in range(n_days):
+            rows.append({
+                "product_id": pid,
+                "date": date(2024, 1, 1) + timedelta(days=i),
+                "quantity": float(rng.integers(0, 50)),
+                "revenue": 0.0,
+                "price": float(rng.uniform(5, 30)) if i % 11 else None,
+                "promo_flag": int(i % 6 == 0),
+                "category_id": "C1",
+            })
+    df = pd.DataFrame(rows).sample(frac=1.0, random_state=3)
+
+    result = engineer_features(df)
+    expected = _reference_features(df)
+
+    cols = [
+        "lag_7", "lag_14", "lag_30", "rolling_mean_7", "rolling_mean_30",
+        "price_change_pct", "rolling_mean_price_30",
+    ]
+    assert list(result.index) == list(expected.index)
+    pd.testing.assert_frame_equal(result[cols], expected[cols], check_exact=True)
@@ -130,3 +130,90 @@ async def test_backtest_endpoint_structure(app):
     assert "mape" in data
     assert "n_samples" in data
     assert "date_range" in data
+
+
+@pytest.mark.asyncio
+async def test_forecast_batch_endpoint_columnar_payload(app):
+    """POST /api/forecast/batch returns shared dates plus per-product columns."""
+    from app.forecasting.schemas import BatchForecastResponse, BatchForecastSeries
+
+    mock_response = BatchForecastResponse(
+        from_date=date(2024, 6, 1),
+        to_date=date(2024, 6, 2),
+        dates=[date(2024, 6, 1), date(2024, 6, 2)],
+        series={"P001": BatchForecastSeries(predicted_quantity=[12.5, 14.0], predicted_revenue=[250.0, 280.0])},
+        missing=["P999"],
+        model_version="v1",
+    )
+
+    with patch("app.forecasting.router.get_forecasting_service") as mock_factory:
+        mock_service = MagicMock()
+        mock_service.get_forecast_batch = AsyncMock(return_value=mock_response)
+        mock_factory.return_value = mock_service
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            r = await client.post(
+                "/api/forecast/batch",
+                json={"product_ids": ["P001", "P999"], "from_date": "2024-06-01", "to_date": "2024-06-02"},
+            )
+
+    assert r.status_code == 200
+    data = r.json()
+    assert data["dates"] == ["2024-06-01", "2024-06-02"]
+    assert data["series"]["P001"]["predicted_quantity"] == [12.5, 14.0]
+    assert data["missing"] == ["P999"]
+    mock_service.get_forecast_batch.assert_awaited_once_with(
+        ["P001", "P999"], date(2024, 6, 1), date(2024, 6, 2)
+    )
+
+
+@pytest.mark.asyncio
+async def test_forecast_batch_endpoint_rejects_empty_product_list(app):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        r = await client.post(
+            "/api/forecast/batch",
+            json={"product_ids": [], "from_date": "2024-06-01", "to_date": "2024-06-02"},
+        )
+    assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_scenario_price_sweep_endpoint_returns_curve(app):
+    """POST /api/scenario/price-sweep returns one curve point per delta."""
+    from app.forecasting.schemas import ScenarioSweepPoint, ScenarioSweepResponse
+
+    mock_response = ScenarioSweepResponse(
+        product_id="P0001",
+        from_date=date(2024, 6, 1),
+        to_date=date(2024, 6, 30),
+        curve=[
+            ScenarioSweepPoint(price_delta_pct=0.0, total_quantity=100.0, total_revenue=1000.0,
+                               delta_quantity_pct=0.0, delta_revenue_pct=0.0),
+            ScenarioSweepPoint(price_delta_pct=10.0, total_quantity=90.0, total_revenue=990.0,
+                               delta_quantity_pct=-10.0, delta_revenue_pct=-1.0, elasticity=-1.0),
+        ],
+        model_version="v1",
+    )
+
+    with patch("app.forecasting.router.get_forecasting_service") as mock_factory:
+        mock_service = MagicMock()
+        mock_service.scenario_price_sweep = AsyncMock(return_value=mock_response)
+        mock_factory.return_value = mock_service
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            r = await client.post(
+                "/api/scenario/price-sweep",
+                json={
+                    "product_id": "P0001",
+                    "from_date": "2024-06-01",
+                    "to_date": "2024-06-30",
+                    "price_delta_pcts": [10],
+                },
+            )
+
+    assert r.status_code == 200
+    data = r.json()
+    assert [p["price_delta_pct"] for p in data["curve"]] == [0.0, 10.0]
+    assert data["curve"][1]["elasticity"] == -1.0
+    mock_service.scenario_price_sweep.assert_awaited_once()
+    assert mock_service.scenario_price_sweep.await_args.kwargs["price_deltas"] == [10.0]
@@ -0,0 +1,153 @@
+"""Tests for the forecast response cache (keys, payload codec, single flight)."""
+
+import asyncio
+from datetime import date
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.forecasting.forecast_cache import ForecastCache, decode_points, encode_points, make_key, pack, unpack
+from app.forecasting.schemas import ForecastPoint
+
+
+class FakeRedis:
+    """Just enough of a binary redis.asyncio client, shared between 'workers'."""
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+def _cache(redis=None) -> ForecastCache:
+    cache = ForecastCache()
+    cache._get_client = AsyncMock(return_value=redis)
+    return cache
+
+
+def test_key_changes_with_model_data_and_scenario():
+    data = {"dataset": "sales_facts", "version": 3}
+    base = make_key("forecast", "v1", data, "P0001", date(2024, 1, 1), date(2024, 1, 31))
+
+    assert base == make_key("forecast", "v1", dict(data), "P0001", date(2024, 1, 1), date(2024, 1, 31))
+    assert base.startswith("forecasting:forecast:v1:")
+    assert base != make_key("forecast", "v2", data, "P0001", date(2024, 1, 1), date(2024, 1, 31))
+    assert base != make_key("forecast", "v1", {**data, "version": 4}, "P0001", date(2024, 1, 1), date(2024, 1, 31))
+    assert base != make_key("price_change", "v1", data, "P0001", date(2024, 1, 1), date(2024, 1, 31), 0.0)
+    assert make_key("price_change", "v1", data, "P0001", date(2024, 1, 1), date(2024, 1, 31), 5.0) != make_key(
+        "price_change", "v1", data, "P0001", date(2024, 1, 1), date(2024, 1, 31), -5.0
+    )
+
+
+def test_points_round_trip_through_compact_payload():
+    points = [
+        ForecastPoint(date=date(2024, 1, d), product_id="P0001", predicted_quantity=d / 3, predicted_revenue=rev)
+        for d, rev in [(1, 10.25), (2, None), (5, 1e-9)]
+    ]
+    raw = pack({"points": encode_points(points, date(2024, 1, 1))})
+
+    assert isinstance(raw, bytes)
+    assert decode_points(unpack(raw)["points"], date(2024, 1, 1), "P0001") == points
+
+
+@pytest.mark.asyncio
+async def test_second_request_is_served_from_redis():
+    redis = FakeRedis()
+    compute = AsyncMock(return_value={"points": [1, 2]})
+
+    first = await _cache(redis).get_or_compute("k", compute)
+    cache = _cache(redis)
+    second = await cache.get_or_compute("k", compute)
+
+    assert first == second == {"points": [1, 2]}
+    assert compute.await_count == 1
+    assert cache.metrics()["hits"] == 1 and cache.metrics()["misses"] == 0
+    assert "k:lock" not in redis.data
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_compute_once():
+    cache = _cache(FakeRedis())
+    release = asyncio.Event()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"n": calls}
+
+    tasks = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == [{"n": 1}] * 5
+    assert calls == 1
+    metrics = cache.metrics()
+    assert (metrics["misses"], metrics["coalesced"], metrics["stores"]) == (1, 4, 1)
+    assert metrics["hit_ratio"] == 0.8
+
+
+@pytest.mark.asyncio
+async def test_other_worker_waits_for_locked_key():
+    redis = FakeRedis()
+    redis.data["k:lock"] = b"1"
+    other = _cache(redis)
+    compute = AsyncMock(return_value={"mine": True})
+
+    async def finish_elsewhere():
+        await asyncio.sleep(0.1)
+        redis.data["k"] = pack({"theirs": True})
+        del redis.data["k:lock"]
+
+    result, _ = await asyncio.gather(other.get_or_compute("k", compute), finish_elsewhere())
+
+    assert result == {"theirs": True}
+    compute.assert_not_awaited()
+    assert other.metrics()["coalesced"] == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_not_cached():
+    redis = FakeRedis()
+    cache = _cache(redis)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        cache.get_or_compute("k", compute), cache.get_or_compute("k", compute), return_exceptions=True
+    )
+
+    assert all(isinstance(r, ValueError) for r in results)
+    assert calls == 1
+    assert redis.data == {}
+
+
+@pytest.mark.asyncio
+async def test_without_redis_every_request_computes():
+    cache = _cache(None)
+    compute = AsyncMock(return_value={"x": 1})
+
+    await cache.get_or_compute("k", compute)
+    await cache.get_or_compute("k", compute)
+
+    assert compute.await_count == 2
+    assert cache.metrics()["misses"] == 2
@@ -0,0 +1,158 @@
+"""Tests for the columnar sales fetch in ForecastingRepository."""
+
+import io
+from datetime import date, datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.forecasting.repository import (
+    SALES_COLUMNS,
+    ForecastingRepository,
+    sales_frame_from_csv,
+    sales_frame_from_rows,
+)
+
+ROWS = [
+    ("P0001", date(2024, 1, 1), 3.0, 30.0, 10.0, False, "C1"),
+    ("NA", date(2024, 1, 2), 0.0, 0.0, None, True, None),
+    ("P0002", date(2024, 1, 3), 1.5, 18.75, 12.5, True, "C2"),
+]
+
+CSV = (
+    b"P0001,2024-01-01,3,30,10,f,C1\n"
+    b"NA,2024-01-02,0,0,\\N,t,\\N\n"
+    b"P0002,2024-01-03,1.5,18.75,12.5,t,C2\n"
+)
+
+
+def _assert_typed(df: pd.DataFrame):
+    assert list(df.columns) == list(SALES_COLUMNS)
+    for col in ("quantity", "revenue", "price"):
+        assert df[col].dtype == np.float64
+    assert df["promo_flag"].dtype == np.bool_
+    assert df["date"].tolist() == [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)]
+
+
+def test_rows_across_chunks_build_typed_columns():
+    df = sales_frame_from_rows([ROWS[:2], [], ROWS[2:]], SALES_COLUMNS)
+
+    _assert_typed(df)
+    assert df["product_id"].tolist() == ["P0001", "NA", "P0002"]
+    assert np.isnan(df["price"].iloc[1])
+    assert df["category_id"].isna().tolist() == [False, True, False]
+
+
+def test_csv_copy_output_matches_row_build():
+    from_csv = sales_frame_from_csv(io.BytesIO(CSV), SALES_COLUMNS)
+
+    _assert_typed(from_csv)
+    pd.testing.assert_frame_equal(from_csv, sales_frame_from_rows([ROWS], SALES_COLUMNS))
+
+
+def test_empty_result_keeps_schema():
+    df = sales_frame_from_rows([], SALES_COLUMNS)
+    assert df.empty
+    assert list(df.columns) == list(SALES_COLUMNS)
+    assert df["quantity"].dtype == np.float64
+
+
+class _FakeStream:
+    def __init__(self, rows):
+        self._rows = rows
+        self.chunk_sizes: list[int] = []
+
+    async def partitions(self, size):
+        self.chunk_sizes.append(size)
+        for i in range(0, len(self._rows), size):
+            yield self._rows[i : i + size]
+
+
+@pytest.mark.asyncio
+async def test_get_sales_df_streams_only_requested_columns(monkeypatch):
+    monkeypatch.setattr("app.forecasting.repository.settings.sales_fetch_chunk_rows", 2)
+    monkeypatch.setattr("app.forecasting.repository.settings.sales_snapshot_enabled", False)
+    stream = _FakeStream([(r[2], r[3]) for r in ROWS])
+    session = MagicMock()
+    session.connection = AsyncMock(return_value=SimpleNamespace(dialect=SimpleNamespace(name="sqlite")))
+    session.stream = AsyncMock(return_value=stream)
+
+    repo = ForecastingRepository(session)
+    df = await repo.get_sales_df(date(2024, 1, 1), date(2024, 1, 3), columns=["quantity", "revenue"])
+
+    assert list(df.columns) == ["quantity", "revenue"]
+    assert df["quantity"].tolist() == [3.0, 0.0, 1.5]
+    assert stream.chunk_sizes == [2]
+    selected = [c.name for c in session.stream.await_args.args[0].selected_columns]
+    assert selected == ["quantity", "revenue"]
+
+
+@pytest.mark.asyncio
+async def test_get_sales_df_rejects_unknown_columns():
+    repo = ForecastingRepository(MagicMock())
+    with pytest.raises(ValueError, match="Unknown sales columns"):
+        await repo.get_sales_df(date(2024, 1, 1), date(2024, 1, 3), columns=["quantity", "source"])
+
+
+@pytest.mark.asyncio
+async def test_dataset_fingerprint_is_cached_and_invalidated_by_bump(monkeypatch):
+    from app.forecasting.dataset_version import dataset_version_cache
+
+    monkeypatch.setattr("app.forecasting.dataset_version.settings.dataset_version_cache_seconds", 60)
+    dataset_version_cache.invalidate()
+    version_row = MagicMock()
+    version_row.one_or_none.return_value = SimpleNamespace(version=5, updated_at=datetime(2024, 1, 2, 3, 4))
+    bumped = MagicMock(rowcount=1)
+    session = MagicMock()
+    session.connection = AsyncMock(return_value=SimpleNamespace(dialect=SimpleNamespace(name="sqlite")))
+    session.execute = AsyncMock(side_effect=[version_row, bumped, version_row])
+    repo = ForecastingRepository(session)
+
+    first = await repo.get_sales_dataset_fingerprint()
+    second = await repo.get_sales_dataset_fingerprint()
+    assert first == second == {"dataset": "sales_facts", "version": 5, "updated_at": "2024-01-02T03:04:00"}
+    assert session.execute.await_count == 1
+
+    await repo.bump_sales_dataset_version()
+    await repo.get_sales_dataset_fingerprint()
+    assert session.execute.await_count == 3
+    dataset_version_cache.invalidate()
+
+
+@pytest.mark.asyncio
+async def test_bump_defers_to_postgres_version_trigger():
+    from app.forecasting.dataset_version import dataset_version_cache
+
+    dataset_version_cache.put("sales_facts", {"dataset": "sales_facts", "version": 5})
+    has_trigger = MagicMock()
+    has_trigger.scalar.return_value = True
+    session = MagicMock()
+    session.connection = AsyncMock(return_value=SimpleNamespace(dialect=SimpleNamespace(name="postgresql")))
+    session.execute = AsyncMock(return_value=has_trigger)
+
+    await ForecastingRepository(session).bump_sales_dataset_version()
+
+    # Only the pg_trigger lookup ran: the trigger already bumped the version
+    assert session.execute.await_count == 1
+    assert "pg_trigger" in str(session.execute.await_args.args[0])
+    assert dataset_version_cache.get("sales_facts") is None
+
+
+@pytest.mark.asyncio
+async def test_dataset_fingerprint_falls_back_to_signature_without_version_row(monkeypatch):
+    from app.forecasting.dataset_version import dataset_version_cache
+
+    dataset_version_cache.invalidate()
+    monkeypatch.setattr("app.forecasting.dataset_version.settings.dataset_version_cache_seconds", 0)
+    missing = MagicMock()
+    missing.one_or_none.return_value = None
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=missing)
+    repo = ForecastingRepository(session)
+    repo.get_sales_dataset_signature = AsyncMock(return_value={"row_count": 3})
+
+    assert await repo.get_sales_dataset_fingerprint() == {"dataset": "sales_facts", "signature": {"row_count": 3}}
+    assert dataset_version_cache.get("sales_facts") is None
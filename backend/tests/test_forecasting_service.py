@@ -0,0 +1,587 @@
+"""Tests for ForecastingService orchestration (in-memory repository, fake booster)."""
+
+from datetime import date, datetime, timedelta
+import os
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.forecasting.feature_state import build_feature_states
+from app.forecasting.model_registry import ActiveModel
+from app.forecasting.service import ForecastingService
+from app.forecasting.training import FEATURE_COLS, SegmentedModel, load_model, train_model
+
+
+class FakeBooster:
+    """Deterministic stand-in for lgb.Booster driven by a few feature columns."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        X = X[FEATURE_COLS]
+        return np.log1p(
+            0.5 * X["lag_7"].to_numpy()
+            + 0.3 * X["rolling_mean_7"].to_numpy()
+            + 0.01 * X["price"].to_numpy()
+            + X["dow"].to_numpy()
+        )
+
+
+class InMemoryRepo:
+    """Minimal ForecastingRepository double backed by a DataFrame."""
+
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+        self.sales_queries = 0
+        self.use_feature_states = False
+        self.feature_state_queries = 0
+        self.points: dict[tuple[str, str, date], SimpleNamespace] = {}
+
+    async def get_sales_df(self, from_date, to_date, product_ids=None):
+        self.sales_queries += 1
+        return self._slice(from_date, to_date, product_ids)
+
+    def _slice(self, from_date, to_date, product_ids=None):
+        df = self._df[(self._df["date"] >= from_date) & (self._df["date"] <= to_date)]
+        if product_ids:
+            df = df[df["product_id"].isin(product_ids)]
+        return df.sort_values("date").reset_index(drop=True)
+
+    async def get_latest_sales_df(self, product_ids, min_days=90):
+        df = self._df[self._df["product_id"].isin(product_ids)]
+        if df.empty:
+            return df
+        max_date = df["date"].max()
+        return self._slice(max_date - timedelta(days=min_days), max_date, product_ids)
+
+    async def get_feature_states(self, product_ids):
+        if not self.use_feature_states:
+            return {}
+        self.feature_state_queries += 1
+        return {s.product_id: s for s in build_feature_states(self._df[self._df["product_id"].isin(product_ids)])}
+
+    async def get_date_range(self):
+        return self._df["date"].min(), self._df["date"].max()
+
+    async def get_sales_dataset_fingerprint(self):
+        signature = {"row_count": len(self._df), "quantity_sum": float(self._df["quantity"].sum())}
+        return {"dataset": "sales_facts", "signature": signature}
+
+    async def get_forecast_points(self, version, product_id, from_date, to_date):
+        return [
+            row
+            for (v, pid, d), row in sorted(self.points.items())
+            if v == version and pid == product_id and from_date <= d <= to_date
+        ]
+
+    async def replace_forecast_points(self, version, points):
+        self.points = {
+            (version, r.product_id, r.date): SimpleNamespace(
+                date=r.date,
+                predicted_quantity=r.predicted_quantity,
+                predicted_revenue=r.predicted_revenue,
+            )
+            for r in points.itertuples(index=False)
+        }
+        return len(self.points)
+
+
+@pytest.fixture
+def sales_df():
+    rng = np.random.default_rng(0)
+    rows = []
+    for pid, n_days in [("P0001", 120), ("P0002", 90), ("P0003", 45)]:
+        for i in range(n_days):
+            if i % 13 == 5:
+                continue  # gaps exercise the daily reindex
+            rows.append({
+                "product_id": pid,
+                "date": date(2024, 1, 1) + timedelta(days=i),
+                "quantity": float(rng.integers(1, 40)),
+                "revenue": 0.0,
+                "price": float(rng.uniform(5, 20)),
+                "promo_flag": i % 7 == 0,
+                "category_id": "C1",
+            })
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def booster():
+    return FakeBooster()
+
+
+@pytest.fixture
+def active_model(booster):
+    with patch(
+        "app.forecasting.service.model_registry.get_active",
+        AsyncMock(return_value=ActiveModel("v1", "unused", booster)),
+    ):
+        yield
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "from_date,to_date",
+    [(date(2024, 3, 1), date(2024, 3, 20)), (date(2024, 4, 20), date(2024, 5, 15))],
+)
+async def test_forecast_batch_matches_single_product_forecasts(sales_df, booster, active_model, from_date, to_date):
+    service = ForecastingService(InMemoryRepo(sales_df))
+    products = ["P0001", "P0002", "P0003"]
+
+    singles = {}
+    for pid in products:
+        points, _ = await service.get_forecast(pid, from_date, to_date)
+        singles[pid] = {p.date: (p.predicted_quantity, p.predicted_revenue) for p in points}
+
+    repo = InMemoryRepo(sales_df)
+    booster.calls = 0
+    batch = await ForecastingService(repo).get_forecast_batch(products + ["P9999"], from_date, to_date)
+
+    assert repo.sales_queries == 1
+    assert booster.calls == 1
+    assert batch.model_version == "v1"
+    assert batch.missing == ["P9999"]
+    for pid in products:
+        series = batch.series[pid]
+        got = {
+            d: (q, r)
+            for d, q, r in zip(batch.dates, series.predicted_quantity, series.predicted_revenue)
+            if q is not None
+        }
+        assert got == singles[pid]
+
+
+@pytest.mark.asyncio
+async def test_forecast_batch_keeps_products_too_short_for_lag_30(sales_df, booster, active_model):
+    short = sales_df[sales_df["product_id"] == "P0001"].head(20).assign(
+        product_id="P0004", date=[date(2024, 3, 1) + timedelta(days=i) for i in range(20)]
+    )
+    df = pd.concat([sales_df[sales_df["product_id"] == "P0002"], short], ignore_index=True)
+    from_date, to_date = date(2024, 3, 1), date(2024, 3, 20)
+    service = ForecastingService(InMemoryRepo(df))
+
+    singles = {}
+    for pid in ["P0002", "P0004"]:
+        points, _ = await service.get_forecast(pid, from_date, to_date)
+        singles[pid] = [p.predicted_quantity for p in points]
+    booster.calls = 0
+    batch = await service.get_forecast_batch(["P0002", "P0004"], from_date, to_date)
+
+    assert batch.missing == []
+    assert booster.calls == 1
+    assert len(singles["P0004"]) == 20
+    for pid in ["P0002", "P0004"]:
+        assert batch.series[pid].predicted_quantity == singles[pid]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "from_date,to_date",
+    [(date(2024, 3, 1), date(2024, 3, 20)), (date(2024, 5, 10), date(2024, 6, 5))],
+)
+async def test_feature_states_match_history_forecasts(sales_df, active_model, from_date, to_date):
+    products = ["P0001", "P0002", "P0003"]
+    expected = await ForecastingService(InMemoryRepo(sales_df)).get_forecast_batch(products, from_date, to_date)
+
+    repo = InMemoryRepo(sales_df)
+    repo.use_feature_states = True
+    service = ForecastingService(repo)
+    batch = await service.get_forecast_batch(products, from_date, to_date)
+    for pid in products:
+        assert batch.series[pid].predicted_quantity == pytest.approx(expected.series[pid].predicted_quantity)
+        assert batch.series[pid].predicted_revenue == pytest.approx(expected.series[pid].predicted_revenue)
+    # Every product's data ends before May; in March only P0003's does
+    assert repo.sales_queries == (1 if from_date.month == 3 else 0)
+
+    repo.sales_queries = 0
+    points, _ = await service.get_forecast("P0003", from_date, to_date)
+    assert repo.sales_queries == 0
+    assert [p.predicted_quantity for p in points] == pytest.approx(
+        [q for q in expected.series["P0003"].predicted_quantity if q is not None]
+    )
+
+
+@pytest.mark.asyncio
+async def test_forecast_batch_without_model_reports_all_missing(sales_df):
+    with patch("app.forecasting.service.model_registry.get_active", AsyncMock(return_value=None)):
+        batch = await ForecastingService(InMemoryRepo(sales_df)).get_forecast_batch(
+            ["P0001", "P0002"], date(2024, 3, 1), date(2024, 3, 5)
+        )
+    assert batch.series == {}
+    assert batch.missing == ["P0001", "P0002"]
+    assert len(batch.dates) == 5
+
+
+@pytest.mark.asyncio
+async def test_materialized_points_serve_forecast_without_history_fetch(sales_df, booster, active_model):
+    repo = InMemoryRepo(sales_df)
+    from_date, to_date = date(2024, 4, 20), date(2024, 5, 15)
+    live, _ = await ForecastingService(repo).get_forecast("P0001", from_date, to_date)
+
+    with patch("app.forecasting.materialize.load_model", return_value=booster), patch.multiple(
+        "app.forecasting.materialize.settings",
+        forecast_materialize_history_days=60,
+        forecast_materialize_horizon_days=30,
+        forecast_materialize_workers=1,
+    ):
+        from app.forecasting.materialize import materialize_forecasts
+
+        summary = await materialize_forecasts(repo, "v1", "unused")
+
+    assert summary["products"] == 3
+    assert summary["from_date"] == "2024-03-01"
+    assert summary["to_date"] == "2024-05-29"
+
+    repo.sales_queries = 0
+    served, version = await ForecastingService(repo).get_forecast("P0001", from_date, to_date)
+
+    assert version == "v1"
+    assert repo.sales_queries == 0
+    assert [p.date for p in served] == [p.date for p in live]
+    assert [p.predicted_quantity for p in served] == pytest.approx([p.predicted_quantity for p in live])
+
+
+@pytest.mark.asyncio
+async def test_partially_covered_range_runs_live_only_for_gap(sales_df, active_model):
+    repo = InMemoryRepo(sales_df)
+    stored_day = date(2024, 3, 1)
+    repo.points[("v1", "P0001", stored_day)] = SimpleNamespace(
+        date=stored_day, predicted_quantity=-1.0, predicted_revenue=None
+    )
+
+    points, _ = await ForecastingService(repo).get_forecast("P0001", stored_day, date(2024, 3, 5))
+
+    assert [p.date for p in points] == [stored_day + timedelta(days=i) for i in range(5)]
+    assert points[0].predicted_quantity == -1.0
+    assert all(p.predicted_quantity >= 0 for p in points[1:])
+
+
+@pytest.mark.asyncio
+async def test_scenario_price_change_uses_one_fetch_and_one_predict(sales_df, booster, active_model):
+    repo = InMemoryRepo(sales_df)
+    from_date, to_date = date(2024, 3, 1), date(2024, 3, 20)
+    booster.calls = 0
+
+    result = await ForecastingService(repo).scenario_price_change("P0001", from_date, to_date, 10.0)
+
+    assert repo.sales_queries == 1
+    assert booster.calls == 1
+    live, _ = await ForecastingService(InMemoryRepo(sales_df)).get_forecast("P0001", from_date, to_date)
+    assert [p.predicted_quantity for p in result.base_forecast_points] == [p.predicted_quantity for p in live]
+    assert len(result.scenario_forecast_points) == 20
+    # FakeBooster demand rises with price, so +10% must raise quantity
+    assert result.delta_quantity_pct > 0
+
+
+@pytest.mark.asyncio
+async def test_price_sweep_curve_matches_individual_scenarios(sales_df, booster, active_model):
+    from_date, to_date = date(2024, 3, 1), date(2024, 3, 20)
+    repo = InMemoryRepo(sales_df)
+    booster.calls = 0
+
+    sweep = await ForecastingService(repo).scenario_price_sweep("P0001", from_date, to_date, [10.0, -20.0, 5.0])
+
+    assert repo.sales_queries == 1
+    assert booster.calls == 1
+    assert sweep.model_version == "v1"
+    assert [p.price_delta_pct for p in sweep.curve] == [-20.0, 0.0, 5.0, 10.0]
+    assert sweep.curve[1].delta_quantity_pct == 0.0
+    assert sweep.curve[1].elasticity is None
+
+    service = ForecastingService(InMemoryRepo(sales_df))
+    for point in sweep.curve:
+        single = await service.scenario_price_change("P0001", from_date, to_date, point.price_delta_pct)
+        assert point.total_quantity == pytest.approx(
+            sum(p.predicted_quantity for p in single.scenario_forecast_points)
+        )
+        assert point.total_revenue == pytest.approx(
+            sum(p.predicted_revenue for p in single.scenario_forecast_points)
+        )
+
+
+@pytest.mark.asyncio
+async def test_price_sweep_rejects_non_positive_prices(sales_df, active_model):
+    with pytest.raises(ValueError, match="-100"):
+        await ForecastingService(InMemoryRepo(sales_df)).scenario_price_sweep(
+            "P0001", date(2024, 3, 1), date(2024, 3, 5), [-100.0]
+        )
+
+
+class DictForecastCache:
+    def __init__(self):
+        self.store: dict[str, dict] = {}
+
+    async def get_or_compute(self, key, compute):
+        if key not in self.store:
+            self.store[key] = await compute()
+        return self.store[key]
+
+
+@pytest.mark.asyncio
+async def test_forecast_and_scenario_responses_are_cached(sales_df, booster, active_model):
+    cache = DictForecastCache()
+    repo = InMemoryRepo(sales_df)
+    from_date, to_date = date(2024, 3, 1), date(2024, 3, 20)
+    uncached = ForecastingService(InMemoryRepo(sales_df))
+
+    with patch("app.forecasting.service.forecast_cache", cache):
+        first = await ForecastingService(repo).get_forecast("P0001", from_date, to_date)
+        second = await ForecastingService(repo).get_forecast("P001", from_date, to_date)
+        scenario = await ForecastingService(repo).scenario_price_change("P0001", from_date, to_date, 10.0)
+        again = await ForecastingService(repo).scenario_price_change("P0001", from_date, to_date, 10.0)
+        assert repo.sales_queries == 2
+        await ForecastingService(repo).scenario_price_change("P0001", from_date, to_date, -10.0)
+        # A sales write changes the dataset fingerprint and so the key
+        repo._df = sales_df.iloc[:-1]
+        await ForecastingService(repo).get_forecast("P0001", from_date, to_date)
+
+    assert repo.sales_queries == 4
+    assert len(cache.store) == 4
+    assert first == second == await uncached.get_forecast("P0001", from_date, to_date)
+    assert scenario == again == await uncached.scenario_price_change("P0001", from_date, to_date, 10.0)
+
+
+class DictBacktestCache:
+    def __init__(self):
+        self.store: dict[str, dict] = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, payload):
+        self.store[key] = payload
+
+
+@pytest.mark.asyncio
+async def test_portfolio_backtest_matches_single_product_backtests(sales_df, booster, active_model):
+    cache = DictBacktestCache()
+    repo = InMemoryRepo(sales_df)
+    window = dict(from_date=date(2024, 2, 15), to_date=date(2024, 4, 29), train_window_days=30, step_days=7)
+
+    with patch("app.forecasting.service.backtest_cache", cache):
+        result = await ForecastingService(repo).run_portfolio_backtest(**window)
+
+    assert repo.sales_queries == 1
+    assert result["cached"] is False
+    assert result["model_version"] == "v1"
+    assert [p["product_id"] for p in result["products"]] == ["P0001", "P0002"]
+    assert result["skipped"] == [{"product_id": "P0003", "message": "Insufficient data"}]
+
+    service = ForecastingService(InMemoryRepo(sales_df))
+    for product in result["products"]:
+        single = await service.run_backtest(product["product_id"], **window)
+        assert {k: product[k] for k in single} == single
+        assert product["seconds"] >= 0
+
+    aggregate = result["aggregate"]
+    assert aggregate["n_products"] == 2
+    assert aggregate["n_samples"] == sum(p["n_samples"] for p in result["products"])
+    assert min(p["mae"] for p in result["products"]) <= aggregate["mae"] <= max(p["mae"] for p in result["products"])
+    assert set(result["timing"]) >= {"fetch_seconds", "backtest_seconds", "total_seconds"}
+
+
+@pytest.mark.asyncio
+async def test_portfolio_backtest_is_cached_per_params(sales_df, booster, active_model):
+    cache = DictBacktestCache()
+    repo = InMemoryRepo(sales_df)
+    window = dict(from_date=date(2024, 2, 15), to_date=date(2024, 4, 29), train_window_days=30, step_days=7)
+
+    with patch("app.forecasting.service.backtest_cache", cache):
+        first = await ForecastingService(repo).run_portfolio_backtest(**window)
+        second = await ForecastingService(repo).run_portfolio_backtest(**window)
+        other = await ForecastingService(repo).run_portfolio_backtest(**{**window, "step_days": 14})
+
+    assert repo.sales_queries == 2
+    assert second["cached"] is True
+    assert {k: v for k, v in second.items() if k != "cached"} == {k: v for k, v in first.items() if k != "cached"}
+    assert other["cached"] is False
+    assert len(cache.store) == 2
+
+
+class ArtifactRepo(InMemoryRepo):
+    """InMemoryRepo plus model_artifacts rows for training-mode tests."""
+
+    def __init__(self, df, artifacts):
+        super().__init__(df)
+        self.artifacts = {a.version: a for a in artifacts}
+        self._session = SimpleNamespace(commit=AsyncMock(), rollback=AsyncMock())
+
+    async def get_active_model_artifact(self):
+        return next((a for a in self.artifacts.values() if a.is_active), None)
+
+    async def get_model_artifact(self, version):
+        return self.artifacts.get(version)
+
+    async def create_model_artifact(self, version, file_path, trained_at, data_from, data_to, mae=None, mape=None,
+                                    training_mode="full", parent_version=None, base_version=None, refresh_count=0,
+                                    params=None, cv_metrics=None, segments=None):
+        for art in self.artifacts.values():
+            art.is_active = False
+        art = SimpleNamespace(
+            id=len(self.artifacts) + 1, version=version, file_path=file_path, trained_at=trained_at,
+            data_from=data_from, data_to=data_to, mae=mae, mape=mape, is_active=True,
+            training_mode=training_mode, parent_version=parent_version,
+            base_version=base_version or version, refresh_count=refresh_count,
+            params=params, cv_metrics=cv_metrics, segments=segments,
+        )
+        self.artifacts[version] = art
+        return art
+
+
+@pytest.fixture
+def trained_parent(sales_df, tmp_path, monkeypatch):
+    """A real booster trained through 2024-03-10, registered as the active artifact."""
+    monkeypatch.setattr("app.forecasting.training.settings.artifacts_path", str(tmp_path))
+    monkeypatch.setattr("app.forecasting.service.settings.forecast_materialize_enabled", False)
+    history = sales_df[sales_df["date"] <= date(2024, 3, 10)]
+    booster, meta = train_model(history, date(2024, 1, 1), date(2024, 3, 10), split_date=date(2024, 3, 1))
+    parent = SimpleNamespace(
+        id=1, version=meta["version"], file_path=meta["file_path"], trained_at=datetime.utcnow(),
+        data_from=date(2024, 1, 1), data_to=date(2024, 3, 10), mae=100.0, mape=None, is_active=True,
+        training_mode="full", parent_version=None, base_version=meta["version"], refresh_count=0,
+        params=None, cv_metrics=None, segments=None,
+    )
+    with patch("app.forecasting.service.model_registry") as registry:
+        registry.get_active = AsyncMock(return_value=ActiveModel(parent.version, parent.file_path, booster))
+        registry.publish_activation = AsyncMock()
+        yield parent, booster
+
+
+@pytest.mark.asyncio
+async def test_incremental_refresh_warm_starts_on_new_rows(sales_df, trained_parent):
+    parent, booster = trained_parent
+    parent_trees = booster.num_trees()
+    repo = ArtifactRepo(sales_df, [parent])
+
+    with patch("app.forecasting.service.settings.model_refresh_rounds", 5):
+        result = await ForecastingService(repo).train(mode="incremental")
+
+    assert result["training_mode"] == "incremental"
+    assert result["parent_version"] == parent.version
+    assert result["date_range"] == {"new_from": "2024-03-11", "new_to": "2024-04-29"}
+    assert result["new_rows"] == len(sales_df[sales_df["date"] >= date(2024, 3, 11)])
+    assert result["trees_added"] == 5
+    assert booster.num_trees() == parent_trees
+
+    child = repo.artifacts[result["version"]]
+    assert (child.training_mode, child.parent_version, child.base_version, child.refresh_count) == (
+        "incremental", parent.version, parent.version, 1,
+    )
+    assert (child.data_from, child.data_to) == (date(2024, 1, 1), date(2024, 4, 29))
+    assert child.mae == result["pre_refresh_mae"]
+    assert (result["drift_check"], result["drift_baseline_mae"]) == ("passed", 100.0)
+    assert load_model(child.file_path).num_trees() == parent_trees + 5
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "change,reason",
+    [({"mae": 0.01}, "drift"), ({"refresh_count": 99}, "max_incremental_refreshes")],
+)
+async def test_incremental_refresh_falls_back_to_full_retrain(sales_df, trained_parent, change, reason):
+    parent, _ = trained_parent
+    for key, value in change.items():
+        setattr(parent, key, value)
+    repo = ArtifactRepo(sales_df, [parent])
+
+    result = await ForecastingService(repo).train(mode="incremental")
+
+    assert result["fallback_reason"] == reason
+    assert result["training_mode"] == "full"
+    assert repo.artifacts[result["version"]].refresh_count == 0
+
+
+@pytest.mark.asyncio
+async def test_drift_check_is_skipped_for_in_sample_parent_mae(sales_df, trained_parent):
+    parent, booster = trained_parent
+    _, meta = train_model(sales_df[sales_df["date"] <= date(2024, 3, 10)], date(2024, 1, 1), date(2024, 3, 10))
+    assert meta["eval_source"] == "train"
+    parent.file_path, parent.mae = meta["file_path"], 0.01  # in-sample MAE, far below any real error
+    repo = ArtifactRepo(sales_df, [parent])
+
+    result = await ForecastingService(repo).train(mode="incremental")
+
+    assert result["training_mode"] == "incremental"
+    assert (result["drift_check"], result["drift_baseline_mae"]) == ("not_comparable", None)
+
+
+@pytest.mark.asyncio
+async def test_incremental_refresh_without_new_sales_is_rejected(sales_df, trained_parent):
+    parent, _ = trained_parent
+    repo = ArtifactRepo(sales_df[sales_df["date"] <= date(2024, 3, 10)], [parent])
+
+    with pytest.raises(ValueError, match="No new sales"):
+        await ForecastingService(repo).train(mode="incremental")
+
+
+@pytest.mark.asyncio
+async def test_low_memory_retrain_reuses_cached_dataset(sales_df, trained_parent):
+    parent, _ = trained_parent
+    repo = ArtifactRepo(sales_df, [parent])
+
+    first = await ForecastingService(repo).train(low_memory=True)
+    queries = repo.sales_queries
+    second = await ForecastingService(repo).train(low_memory=True)
+
+    assert (first["low_memory"], first["dataset_cache"]) == (True, "miss")
+    assert second["dataset_cache"] == "hit"
+    assert repo.sales_queries == queries
+    assert second["mae"] == pytest.approx(first["mae"])
+    assert second["peak_rss_mb"] > 0
+
+
+@pytest.mark.asyncio
+async def test_tune_publishes_tuned_artifact_and_refresh_keeps_params(sales_df, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.forecasting.training.settings.artifacts_path", str(tmp_path))
+    monkeypatch.setattr("app.forecasting.service.settings.forecast_materialize_enabled", False)
+    monkeypatch.setattr("app.forecasting.service.settings.tuning_max_rounds", 40)
+    monkeypatch.setattr("app.forecasting.service.settings.tuning_early_stopping_rounds", 5)
+    repo = ArtifactRepo(sales_df[sales_df["date"] <= date(2024, 3, 31)], [])
+
+    with patch("app.forecasting.service.model_registry") as registry:
+        registry.publish_activation = AsyncMock()
+        result = await ForecastingService(repo).tune(n_candidates=3, n_folds=2, horizon_days=7)
+
+        art = repo.artifacts[result["version"]]
+        assert art.training_mode == "tuned"
+        assert art.params == result["best_params"]
+        assert art.cv_metrics["folds"] == result["folds"] and len(result["folds"]) == 2
+        assert art.mae == pytest.approx(result["mae"])
+        assert load_model(art.file_path).num_trees() == art.params["n_estimators"]
+        assert not [p for p in os.listdir(tmp_path) if p.startswith("cv_matrix_")]
+
+        registry.get_active = AsyncMock(return_value=None)
+        art.mae = 1e6  # no drift fallback
+        repo._df = sales_df
+        monkeypatch.setattr("app.forecasting.service.settings.model_refresh_rounds", 3)
+        refreshed = await ForecastingService(repo).train(mode="incremental")
+
+    assert refreshed["training_mode"] == "incremental"
+    assert repo.artifacts[refreshed["version"]].params == art.params
+
+
+@pytest.mark.asyncio
+async def test_segmented_train_publishes_model_group(sales_df, trained_parent, monkeypatch):
+    parent, _ = trained_parent
+    monkeypatch.setattr("app.forecasting.segments.settings.segment_min_rows", 100)
+    repo = ArtifactRepo(sales_df, [parent])
+
+    result = await ForecastingService(repo).train(segmented=True)
+    art = repo.artifacts[result["version"]]
+
+    assert result["training_mode"] == art.training_mode == "segmented"
+    assert set(art.segments) == {"C1", "__global__"}
+    assert art.segments["C1"]["products"] == 3
+    assert isinstance(load_model(art.file_path), SegmentedModel)
+
+    # A model group is never warm-started: refreshes retrain the whole group
+    refreshed = await ForecastingService(repo).train(mode="incremental")
+    assert refreshed["fallback_reason"] == "segmented_model"
+    assert refreshed["training_mode"] == "segmented"
+
@@ -0,0 +1,131 @@
+"""Tests for the streaming Kaggle CSV import."""
+
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pandas as pd
+import pytest
+
+from app.forecasting.import_kaggle import import_csv, iter_csv_partials
+
+ROWS = [
+    # Date, Store ID, Product ID, Category, Units Sold, Price, Discount, Holiday/Promotion
+    ("2024-01-01", "S1", "P0001", "Toys", 10, 5.0, 10, 0),
+    ("2024-01-01", "S1", "P0002", "", 4, 2.0, 0, 1),
+    ("2024-01-01", "S2", "P0001", "Games", 6, 6.0, 0, 1),
+    ("2024-01-02", "S1", "P0001", "Toys", 0, 7.0, 0, 0),
+    ("2024-01-01", "S3", "P0002", "Food", 1, 3.0, 50, 0),
+    ("2024-01-02", "S2", "P0001", "Toys", 0, 8.0, 0, 0),
+]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "retail_store_inventory.csv"
+    pd.DataFrame(
+        ROWS,
+        columns=["Date", "Store ID", "Product ID", "Category", "Units Sold", "Price", "Discount", "Holiday/Promotion"],
+    ).to_csv(path, index=False)
+    return path
+
+
+def _reference(rows) -> dict:
+    """Row-by-row aggregation the import has always produced."""
+    agg = {}
+    for d, _, pid, cat, qty, price, discount, promo in rows:
+        key = (date.fromisoformat(d), pid)
+        revenue = qty * price * (1 - discount / 100)
+        if key not in agg:
+            agg[key] = [0.0, 0.0, price, promo == 1, cat]
+        agg[key][0] += qty
+        agg[key][1] += revenue
+        agg[key][3] = agg[key][3] or promo == 1
+    return {
+        key: (qty, rev, rev / qty if qty > 0 else price, promo, cat or None)
+        for key, (qty, rev, price, promo, cat) in agg.items()
+    }
+
+
+def _merge(partials: list[pd.DataFrame]) -> dict:
+    """Python equivalent of the staging-table merge (first row by chunk order)."""
+    merged = {}
+    for part in partials:
+        for row in part.itertuples(index=False):
+            key = (row.date, row.product_id)
+            if key not in merged:
+                merged[key] = [0.0, 0.0, row.price, False, row.category_id]
+            merged[key][0] += row.quantity
+            merged[key][1] += row.revenue
+            merged[key][3] = merged[key][3] or row.promo_flag
+    return {
+        key: (qty, rev, rev / qty if qty > 0 else price, promo, cat or None)
+        for key, (qty, rev, price, promo, cat) in merged.items()
+    }
+
+
+def test_chunked_partials_merge_to_row_by_row_result(csv_path):
+    chunks = list(iter_csv_partials(csv_path, chunk_rows=2))
+
+    assert len(chunks) == 3
+    assert [fraction for _, fraction in chunks][-1] == 1.0
+    merged = _merge([part for part, _ in chunks])
+    expected = _reference(ROWS)
+    assert merged.keys() == expected.keys()
+    for key, values in expected.items():
+        assert merged[key] == pytest.approx(values), key
+
+
+def test_missing_required_column_is_rejected(tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text("Date,Product ID,Price\n2024-01-01,P1,2.0\n")
+    with pytest.raises(ValueError, match="Units Sold"):
+        list(iter_csv_partials(path, chunk_rows=10))
+
+
+@pytest.mark.asyncio
+async def test_import_copies_partials_and_reports_progress(csv_path, monkeypatch):
+    monkeypatch.setattr("app.forecasting.import_kaggle.settings.import_chunk_rows", 4)
+    driver = MagicMock()
+    driver.copy_records_to_table = AsyncMock()
+    raw = MagicMock(driver_connection=driver)
+    conn = MagicMock()
+    conn.get_raw_connection = AsyncMock(return_value=raw)
+    merged = MagicMock()
+    merged.scalar_one.return_value = 3
+    merged.scalars.return_value.all.return_value = ["P0001", "P0002"]
+    session = MagicMock()
+    session.connection = AsyncMock(return_value=conn)
+    session.execute = AsyncMock(return_value=merged)
+    session.commit = AsyncMock()
+    session_cm = MagicMock()
+    session_cm.__aenter__ = AsyncMock(return_value=session)
+    session_cm.__aexit__ = AsyncMock(return_value=False)
+    engine_cm = MagicMock()
+    engine_cm.__aenter__ = AsyncMock(return_value=MagicMock(run_sync=AsyncMock()))
+    engine_cm.__aexit__ = AsyncMock(return_value=False)
+    progress = AsyncMock()
+
+    repo = MagicMock(
+        lock_feature_states=AsyncMock(return_value=True),
+        bump_sales_dataset_version=AsyncMock(),
+        refresh_feature_states=AsyncMock(),
+        refresh_sales_period_rollups=AsyncMock(),
+    )
+
+    with patch("app.forecasting.import_kaggle.AsyncSessionLocal", return_value=session_cm), patch(
+        "app.forecasting.import_kaggle.async_engine", MagicMock(begin=MagicMock(return_value=engine_cm))
+    ), patch("app.forecasting.import_kaggle.ForecastingRepository", return_value=repo):
+        n = await import_csv(csv_path, progress=progress)
+
+    assert n == 3
+    assert driver.copy_records_to_table.await_count == 2
+    records = [r for call in driver.copy_records_to_table.await_args_list for r in call.kwargs["records"]]
+    assert records[0] == (0, date(2024, 1, 1), "P0001", 16.0, 81.0, 5.0, True, "Toys")
+    assert {type(r[6]) for r in records} == {bool}
+    assert [r[0] for r in records] == [0, 0, 0, 1, 1]
+    fractions = [call.args[0] for call in progress.await_args_list]
+    assert fractions == sorted(fractions) and fractions[-1] == 1.0
+    repo.bump_sales_dataset_version.assert_awaited_once()
+    repo.refresh_feature_states.assert_awaited_once_with(product_ids=["P0001", "P0002"])
+    repo.refresh_sales_period_rollups.assert_awaited_once()
+    session.commit.assert_awaited_once()
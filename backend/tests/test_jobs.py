@@ -0,0 +1,311 @@
+"""Tests for the background job manager and job endpoints."""
+
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.core.compute import compute
+from app.jobs.manager import JobConflictError, JobManager
+from app.main import create_app
+
+HEADERS = {"X-Api-Key": "test-key"}
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio for the job manager, shared between 'workers'."""
+
+    def __init__(self):
+        self.data: dict[str, str] = {}
+        self.recent: dict[str, float] = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def eval(self, script, numkeys, key, owner, *args):
+        if self.data.get(key) != owner:
+            return 0
+        if "'del'" in script:
+            del self.data[key]
+        return 1
+
+    async def zadd(self, key, mapping):
+        self.recent.update(mapping)
+
+    async def zremrangebyrank(self, key, start, stop):
+        return 0
+
+    async def zrevrange(self, key, start, stop):
+        return sorted(self.recent, key=self.recent.get, reverse=True)[start : stop + 1]
+
+
+def _manager(redis=None) -> JobManager:
+    manager = JobManager()
+    manager._client = AsyncMock(return_value=redis)
+    return manager
+
+
+async def _wait(manager: JobManager, job_id: str) -> dict:
+    for _ in range(200):
+        record = await manager.get(job_id)
+        if record["status"] in ("succeeded", "failed", "cancelled"):
+            return record
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture(autouse=True)
+def fast_poll(monkeypatch):
+    monkeypatch.setattr("app.jobs.manager.settings.job_poll_seconds", 0.01)
+
+
+@pytest.mark.asyncio
+async def test_submit_returns_immediately_and_records_result():
+    manager = _manager()
+    release = asyncio.Event()
+
+    async def job(ctx):
+        await ctx.report(0.5, "halfway")
+        await release.wait()
+        return {"answer": 42}
+
+    record = await manager.submit("demo", {"x": 1}, job)
+    assert record["status"] == "queued"
+
+    await asyncio.sleep(0.02)
+    running = await manager.get(record["id"])
+    assert (running["status"], running["progress"], running["message"]) == ("running", 0.5, "halfway")
+
+    release.set()
+    done = await _wait(manager, record["id"])
+    assert done["status"] == "succeeded"
+    assert done["progress"] == 1.0
+    assert done["result"] == {"answer": 42}
+
+
+@pytest.mark.asyncio
+async def test_failed_job_records_error():
+    manager = _manager()
+
+    async def job(ctx):
+        raise ValueError("Insufficient data")
+
+    record = await manager.submit("demo", {}, job)
+    done = await _wait(manager, record["id"])
+    assert (done["status"], done["error"]) == ("failed", "Insufficient data")
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_running_job():
+    manager = _manager()
+
+    async def job(ctx):
+        await asyncio.sleep(10)
+
+    record = await manager.submit("demo", {}, job)
+    await asyncio.sleep(0.02)
+    await manager.cancel(record["id"])
+    assert (await _wait(manager, record["id"]))["status"] == "cancelled"
+
+
+@pytest.mark.asyncio
+async def test_finished_records_expire_locally(monkeypatch):
+    monkeypatch.setattr("app.jobs.manager.settings.job_ttl_seconds", 0.05)
+    manager = _manager()
+    release = asyncio.Event()
+
+    async def job(ctx):
+        return "done"
+
+    async def slow(ctx):
+        await release.wait()
+
+    finished = await manager.submit("demo", {}, job)
+    await _wait(manager, finished["id"])
+    running = await manager.submit("demo", {}, slow)
+    assert [r["id"] for r in await manager.list_recent()] == [running["id"], finished["id"]]
+
+    await asyncio.sleep(0.1)
+    assert await manager.get(finished["id"]) is None
+    assert (await manager.get(running["id"]))["status"] == "running"
+    assert [r["id"] for r in await manager.list_recent()] == [running["id"]]
+
+    release.set()
+    await _wait(manager, running["id"])
+    assert list(manager._records) == [running["id"]]
+
+
+@pytest.mark.asyncio
+async def test_exclusive_lock_is_shared_across_workers():
+    redis = FakeRedis()
+    worker_a, worker_b = _manager(redis), _manager(redis)
+    release = asyncio.Event()
+
+    async def train(ctx):
+        await release.wait()
+        return "trained"
+
+    first = await worker_a.submit("train", {}, train, exclusive="train")
+    with pytest.raises(JobConflictError) as exc:
+        await worker_b.submit("train", {}, train, exclusive="train")
+    assert exc.value.holder == first["id"]
+
+    # Status is visible from the other worker; cancel from there is honoured by the owner.
+    await asyncio.sleep(0.02)
+    assert (await worker_b.get(first["id"]))["status"] == "running"
+    await worker_b.cancel(first["id"])
+    assert (await _wait(worker_a, first["id"]))["status"] == "cancelled"
+
+    second = await worker_b.submit("train", {}, train, exclusive="train")
+    release.set()
+    assert (await _wait(worker_b, second["id"]))["result"] == "trained"
+    assert "jobs:lock:train" not in redis.data
+    assert [r["id"] for r in await worker_a.list_recent()] == [second["id"], first["id"]]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_job_keeps_lock_until_offloaded_work_exits():
+    manager = _manager(FakeRedis())
+    started, release = threading.Event(), threading.Event()
+
+    def fit():
+        started.set()
+        release.wait(5)
+        return "model"
+
+    async def train(ctx):
+        return await compute.run_thread(fit)
+
+    record = await manager.submit("train", {}, train, exclusive="train")
+    await asyncio.to_thread(started.wait, 5)
+    await manager.cancel(record["id"])
+    await asyncio.sleep(0.05)
+
+    # The coroutine is cancelled but fit() still runs in the compute thread
+    assert (await manager.get(record["id"]))["status"] == "running"
+    with pytest.raises(JobConflictError):
+        await manager.submit("train", {}, train, exclusive="train")
+
+    release.set()
+    assert (await _wait(manager, record["id"]))["status"] == "cancelled"
+    second = await manager.submit("train", {}, train, exclusive="train")
+    assert (await _wait(manager, second["id"]))["status"] == "succeeded"
+
+
+@pytest.mark.asyncio
+async def test_background_train_endpoint_returns_job():
+    manager = _manager()
+    release = asyncio.Event()
+
+    async def train(**kwargs):
+        await release.wait()
+        return {"version": "v2", "mae": 1.5}
+
+    service = MagicMock()
+    service.train = AsyncMock(side_effect=train)
+    session = MagicMock()
+    session.commit = AsyncMock()
+    session_cm = MagicMock()
+    session_cm.__aenter__ = AsyncMock(return_value=session)
+    session_cm.__aexit__ = AsyncMock(return_value=False)
+
+    with patch("app.jobs.router.job_manager", manager), patch(
+        "app.forecasting.router.get_forecasting_service", return_value=service
+    ), patch("app.forecasting.router.AsyncSessionLocal", return_value=session_cm):
+        async with AsyncClient(transport=ASGITransport(app=create_app()), base_url="http://test") as client:
+            r = await client.post("/api/admin/train", params={"background": "true"}, headers=HEADERS)
+            assert r.status_code == 202
+            job_id = r.json()["id"]
+            assert r.headers["Location"] == f"/api/jobs/{job_id}"
+
+            conflict = await client.post("/api/admin/train", params={"background": "true"}, headers=HEADERS)
+            pending = await client.get(f"/api/jobs/{job_id}/result", headers=HEADERS)
+            release.set()
+            await _wait(manager, job_id)
+            result = await client.get(f"/api/jobs/{job_id}/result", headers=HEADERS)
+            missing = await client.get("/api/jobs/nope", headers=HEADERS)
+
+    assert conflict.status_code == 409
+    assert pending.status_code == 409
+    assert result.status_code == 200
+    assert result.json()["result"] == {"version": "v2", "mae": 1.5}
+    assert missing.status_code == 404
+    service.train.assert_awaited_once_with(
+        from_date=None, to_date=None, split_date=None, mode="full", low_memory=None, segmented=None
+    )
+
+
+@pytest.mark.asyncio
+async def test_sync_train_shares_the_training_lock():
+    redis = FakeRedis()
+    manager = _manager(redis)
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def train(*args, **kwargs):
+        started.set()
+        await release.wait()
+        return {"version": "v2"}
+
+    async def background_train(ctx):
+        await release.wait()
+
+    service = MagicMock()
+    service.train = AsyncMock(side_effect=train)
+
+    with patch("app.jobs.router.job_manager", manager), patch(
+        "app.forecasting.router.get_forecasting_service", return_value=service
+    ):
+        async with AsyncClient(transport=ASGITransport(app=create_app()), base_url="http://test") as client:
+            sync = asyncio.create_task(client.post("/api/admin/train", headers=HEADERS))
+            await started.wait()
+            queued = await client.post("/api/admin/train", params={"background": "true"}, headers=HEADERS)
+            concurrent = await client.post("/api/admin/train", headers=HEADERS)
+            release.set()
+            done = await sync
+            assert "jobs:lock:train" not in redis.data
+
+            release.clear()
+            job = await manager.submit("train", {}, background_train, exclusive="train")
+            blocked = await client.post("/api/admin/train", headers=HEADERS)
+            release.set()
+            await _wait(manager, job["id"])
+
+    assert done.status_code == 200 and done.json() == {"version": "v2"}
+    assert queued.status_code == concurrent.status_code == blocked.status_code == 409
+    assert job["id"] in blocked.json()["detail"]
+    assert service.train.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_tune_endpoint_runs_as_exclusive_job():
+    manager = _manager()
+    service = MagicMock()
+    service.tune = AsyncMock(return_value={"version": "v3", "mae": 1.0})
+    session = MagicMock()
+    session.commit = AsyncMock()
+    session_cm = MagicMock()
+    session_cm.__aenter__ = AsyncMock(return_value=session)
+    session_cm.__aexit__ = AsyncMock(return_value=False)
+
+    with patch("app.jobs.router.job_manager", manager), patch(
+        "app.forecasting.router.get_forecasting_service", return_value=service
+    ), patch("app.forecasting.router.AsyncSessionLocal", return_value=session_cm):
+        async with AsyncClient(transport=ASGITransport(app=create_app()), base_url="http://test") as client:
+            r = await client.post("/api/admin/tune", params={"search": "random", "n_candidates": 4}, headers=HEADERS)
+            assert r.status_code == 202
+            record = await _wait(manager, r.json()["id"])
+            bad = await client.post("/api/admin/tune", params={"search": "grid"}, headers=HEADERS)
+
+    assert record["result"] == {"version": "v3", "mae": 1.0}
+    assert bad.status_code == 422
+    kwargs = service.tune.await_args.kwargs
+    assert (kwargs["search"], kwargs["n_candidates"], kwargs["n_folds"]) == ("random", 4, None)
+    assert callable(kwargs["progress"])
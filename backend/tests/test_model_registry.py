@@ -0,0 +1,149 @@
+"""Tests for the in-process model registry."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.forecasting.model_registry import _CHANNEL, ModelRegistry
+
+
+def _artifact(tmp_path, version="v1"):
+    path = tmp_path / f"lgb_{version}.txt"
+    path.write_text("model")
+    return SimpleNamespace(version=version, file_path=str(path))
+
+
+def _repo(*artifacts):
+    repo = MagicMock()
+    repo.get_active_model_artifact = AsyncMock(side_effect=list(artifacts))
+    return repo
+
+
+@pytest.mark.asyncio
+async def test_get_active_loads_once_and_caches(tmp_path):
+    registry = ModelRegistry()
+    repo = _repo(_artifact(tmp_path))
+    booster = object()
+
+    with patch("app.forecasting.model_registry.load_model", return_value=booster) as load:
+        first = await registry.get_active(repo)
+        second = await registry.get_active(repo)
+
+    assert first is second
+    assert first.version == "v1"
+    assert first.booster is booster
+    load.assert_called_once()
+    repo.get_active_model_artifact.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_active_returns_none_without_artifact(tmp_path):
+    registry = ModelRegistry()
+    missing = SimpleNamespace(version="v1", file_path=str(tmp_path / "missing.txt"))
+
+    assert await registry.get_active(_repo(None)) is None
+    assert await registry.get_active(_repo(missing)) is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate_keeps_booster_when_version_unchanged(tmp_path):
+    registry = ModelRegistry()
+    art = _artifact(tmp_path)
+    repo = _repo(art, art)
+
+    with patch("app.forecasting.model_registry.load_model", return_value=object()) as load:
+        first = await registry.get_active(repo)
+        registry.invalidate()
+        second = await registry.get_active(repo)
+
+    assert first is second
+    load.assert_called_once()
+    assert repo.get_active_model_artifact.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_activate_swaps_without_db_lookup(tmp_path):
+    registry = ModelRegistry()
+    repo = _repo()
+    booster = object()
+
+    registry.activate("v2", "/tmp/lgb_v2.txt", booster)
+    active = await registry.get_active(repo)
+
+    assert active.version == "v2"
+    assert active.booster is booster
+    repo.get_active_model_artifact.assert_not_awaited()
+
+
+def test_activate_bounds_cached_versions():
+    registry = ModelRegistry()
+    for v in ("v1", "v2", "v3"):
+        registry.activate(v, f"/tmp/{v}.txt", object())
+    assert list(registry._boosters) == ["v2", "v3"]
+
+
+@pytest.mark.asyncio
+async def test_handle_notification_hot_swaps():
+    registry = ModelRegistry()
+    registry.activate("v1", "/tmp/v1.txt", object())
+    new_booster = object()
+
+    with patch("app.forecasting.model_registry.load_model", return_value=new_booster):
+        await registry.handle_notification(json.dumps({"version": "v2", "file_path": "/tmp/v2.txt"}))
+
+    assert registry._active.version == "v2"
+    assert registry._active.booster is new_booster
+
+
+@pytest.mark.asyncio
+async def test_handle_notification_invalidates_on_load_failure():
+    registry = ModelRegistry()
+    registry.activate("v1", "/tmp/v1.txt", object())
+
+    with patch("app.forecasting.model_registry.load_model", side_effect=OSError("gone")):
+        await registry.handle_notification(json.dumps({"version": "v2", "file_path": "/tmp/v2.txt"}))
+
+    assert registry._active.version == "v1"
+    assert registry._resolved_at is None
+
+
+@pytest.mark.asyncio
+async def test_publish_activation_uses_channel():
+    registry = ModelRegistry()
+    registry._redis = AsyncMock()
+
+    await registry.publish_activation("v3", "/tmp/v3.txt")
+
+    registry._redis.publish.assert_awaited_once_with(
+        _CHANNEL, json.dumps({"version": "v3", "file_path": "/tmp/v3.txt"})
+    )
+
+
+@pytest.mark.asyncio
+async def test_listener_retries_until_redis_is_reachable(monkeypatch):
+    monkeypatch.setattr("app.forecasting.model_registry._RETRY_MIN_SECONDS", 0.0)
+    registry = ModelRegistry()
+    received = asyncio.Event()
+
+    async def listen():
+        yield {"type": "subscribe", "data": 1}
+        yield {"type": "message", "data": json.dumps({"version": "v2", "file_path": "/tmp/v2.txt"})}
+        await asyncio.Event().wait()
+
+    pubsub = MagicMock(subscribe=AsyncMock(), aclose=AsyncMock(), listen=listen)
+    # Unreachable at startup, then a subscription that fails, then a working one
+    pubsub.subscribe.side_effect = [ConnectionError("reset"), None]
+    client = MagicMock(pubsub=MagicMock(return_value=pubsub))
+    clients = iter([None, None, client, client])
+    registry._client = AsyncMock(side_effect=lambda: next(clients))
+    registry.handle_notification = AsyncMock(side_effect=lambda raw: received.set())
+
+    registry.start_listener()
+    await asyncio.wait_for(received.wait(), timeout=5)
+    await registry.stop_listener()
+
+    assert registry._client.await_count == 4
+    registry.handle_notification.assert_awaited_once_with(json.dumps({"version": "v2", "file_path": "/tmp/v2.txt"}))
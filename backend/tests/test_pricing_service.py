@@ -0,0 +1,267 @@
+"""Tests for PricingOptimizationService candidate grid evaluation."""
+
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.forecasting.feature_state import build_feature_states
+from app.forecasting.model_registry import ActiveModel
+from app.forecasting.pricing_engine import candidate_feature_matrix, refine_prices
+from app.forecasting.pricing_schemas import PortfolioPricingRequest, PricingOptimizeRequest
+from app.forecasting.pricing_service import PricingOptimizationService
+from app.forecasting.training import FEATURE_COLS
+
+
+class DemandCurveBooster:
+    """Fake booster with demand falling linearly in price; records batch sizes."""
+
+    def __init__(self):
+        self.batch_sizes: list[int] = []
+
+    def predict(self, X):
+        self.batch_sizes.append(len(X))
+        X = X[FEATURE_COLS]
+        quantity = np.maximum(0.0, 100.0 - 4.0 * X["price"].to_numpy())
+        return np.log1p(quantity)
+
+
+def _history() -> pd.DataFrame:
+    rng = np.random.default_rng(3)
+    start = date(2024, 1, 1)
+    return pd.DataFrame(
+        {
+            "date": [start + timedelta(days=i) for i in range(90)],
+            "product_id": "P0001",
+            "quantity": rng.integers(10, 40, 90).astype(float),
+            "revenue": 100.0,
+            "price": rng.uniform(9.0, 11.0, 90),
+            "promo_flag": False,
+            "category_id": "C1",
+        }
+    )
+
+
+@pytest.fixture
+def booster():
+    return DemandCurveBooster()
+
+
+@pytest.fixture
+def service(booster):
+    repo = AsyncMock()
+    repo.get_latest_sales_df = AsyncMock(return_value=_history())
+    repo.get_feature_states = AsyncMock(return_value={})
+    active = ActiveModel(version="v1", file_path="/tmp/v1.txt", booster=booster)
+    with patch(
+        "app.forecasting.pricing_service.model_registry.get_active",
+        AsyncMock(return_value=active),
+    ):
+        yield PricingOptimizationService(repo)
+
+
+def test_candidate_feature_matrix_only_changes_price_columns():
+    base = np.arange(len(FEATURE_COLS), dtype=float) + 1.0
+    prices = np.array([5.0, 10.0, 20.0])
+    X = candidate_feature_matrix(base, prices, base_price=10.0, base_rolling_mean_price=8.0)
+
+    assert X.shape == (3, len(FEATURE_COLS))
+    cols = {c: X[:, FEATURE_COLS.index(c)] for c in FEATURE_COLS}
+    np.testing.assert_allclose(cols["price"], prices)
+    np.testing.assert_allclose(cols["log_price"], np.log(prices))
+    np.testing.assert_allclose(cols["price_vs_avg_30"], prices / 8.0)
+    np.testing.assert_allclose(cols["price_change_pct"], [-0.5, 0.0, 1.0])
+    untouched = [i for i, c in enumerate(FEATURE_COLS) if c not in ("price", "log_price", "price_vs_avg_30", "price_change_pct")]
+    np.testing.assert_array_equal(X[:, untouched], np.tile(base[untouched], (3, 1)))
+
+
+@pytest.mark.asyncio
+async def test_optimize_evaluates_grid_in_single_predict(service, booster):
+    body = PricingOptimizeRequest(product_id="P0001", cost=2.0, price_min=5.0, price_max=20.0, n_steps=4000)
+    result = await service.optimize(body)
+
+    # One call for current state + full grid, one for the smoothed price.
+    assert booster.batch_sizes == [4001, 1]
+    assert len(result["scenarios"]) == 4000
+
+    # profit = (p - 2) * (100 - 4p) peaks at p = 13.5
+    assert result["recommendation"]["raw_optimal_price"] == pytest.approx(13.5, abs=0.01)
+    best = max(result["scenarios"], key=lambda s: s["objective_score"])
+    assert best["price"] == pytest.approx(result["recommendation"]["raw_optimal_price"], abs=0.05)
+
+
+@pytest.mark.asyncio
+async def test_risk_adjusted_objective_reports_penalty_per_scenario(service):
+    body = PricingOptimizeRequest(
+        product_id="P0001",
+        cost=2.0,
+        price_min=5.0,
+        price_max=20.0,
+        n_steps=16,
+        strategy={"objective": "risk_adjusted_profit", "quantity_swing_penalty": 2.0},
+    )
+    result = await service.optimize(body)
+
+    for scenario in result["scenarios"]:
+        assert scenario["objective_score"] == pytest.approx(
+            scenario["profit"] - scenario["risk_penalty"], abs=0.02
+        )
+    assert result["recommendation"]["raw_optimal_price"] < 13.5
+
+
+def test_refine_prices_brackets_best_price_at_precision():
+    prices = np.array([4.0, 0.0, 2.0, 1.0, 3.0])
+    scores = -((prices - 2.3) ** 2)
+
+    batch = refine_prices(prices, scores, n_points=8, precision=0.01)
+
+    assert len(batch) == 8
+    assert batch.min() > 1.0 and batch.max() < 3.0
+    np.testing.assert_allclose(batch, np.round(batch, 2))
+    assert 2.0 not in batch
+    # Neighbours one cent apart leave nothing to refine
+    assert len(refine_prices(np.array([2.29, 2.3, 2.31]), np.array([0.0, 1.0, 0.0]), n_points=8, precision=0.01)) == 0
+
+
+@pytest.mark.asyncio
+async def test_adaptive_search_reaches_cent_precision_in_few_evaluations(service, booster):
+    body = PricingOptimizeRequest(
+        product_id="P0001", cost=2.0, price_min=1.0, price_max=1000.0, n_steps=11, search="adaptive"
+    )
+    result = await service.optimize(body)
+
+    assert result["recommendation"]["raw_optimal_price"] == pytest.approx(13.5, abs=0.01)
+    search = result["search"]
+    assert search["mode"] == "adaptive"
+    # A grid at cent resolution over this range would take ~100k evaluations
+    assert search["evaluations"] < 100
+    assert booster.batch_sizes[0] == 11 + 1
+    assert len(booster.batch_sizes) == search["rounds"] + 1
+    assert sum(booster.batch_sizes[:-1]) == search["evaluations"] + 1
+    prices = [s["price"] for s in result["scenarios"]]
+    assert len(prices) == search["evaluations"] and prices == sorted(prices)
+
+
+@pytest.mark.asyncio
+async def test_rejects_oversized_grid(service):
+    body = PricingOptimizeRequest(product_id="P0001", cost=2.0, price_min=5.0, price_max=20.0, n_steps=10_001)
+    with pytest.raises(ValueError, match="n_steps"):
+        await service.optimize(body)
+
+
+@pytest.fixture
+def portfolio_repo():
+    histories = []
+    for i, pid in enumerate(["P0001", "P0002", "P0003"]):
+        frame = _history()
+        frame["product_id"] = pid
+        frame["price"] = frame["price"] + i
+        histories.append(frame)
+    df = pd.concat(histories, ignore_index=True)
+
+    async def latest(product_ids, min_days=90):
+        return df[df["product_id"].isin(product_ids)].reset_index(drop=True)
+
+    repo = AsyncMock()
+    repo.get_latest_sales_df = AsyncMock(side_effect=latest)
+    repo.get_latest_sales_df_per_product = AsyncMock(side_effect=latest)
+    repo.get_feature_states = AsyncMock(return_value={})
+    return repo
+
+
+@pytest.mark.asyncio
+async def test_portfolio_matches_single_product_results(portfolio_repo, booster):
+    body = PortfolioPricingRequest(
+        items=[
+            {"product_id": "P0001", "cost": 2.0, "price_min": 5.0, "price_max": 20.0},
+            {"product_id": "P0002", "cost": 3.0, "price_min": 6.0, "price_max": 18.0, "n_steps": 25},
+            {"product_id": "P0404", "cost": 1.0, "price_min": 2.0, "price_max": 4.0},
+        ],
+        strategy={"objective": "risk_adjusted_profit", "quantity_swing_penalty": 0.5},
+    )
+    active = ActiveModel(version="v1", file_path="/tmp/v1.txt", booster=booster)
+    with patch(
+        "app.forecasting.pricing_service.model_registry.get_active",
+        AsyncMock(return_value=active),
+    ):
+        service = PricingOptimizationService(portfolio_repo)
+        result = await service.optimize_portfolio(body)
+
+        # One grid predict across all products plus one for smoothed prices.
+        assert booster.batch_sizes == [(50 + 1) + (25 + 1), 2]
+        portfolio_repo.get_latest_sales_df_per_product.assert_awaited_once()
+        assert result["failed"] == [{"product_id": "P0404", "detail": "No sales history"}]
+
+        by_product = {r.pop("product_id"): r for r in result["recommendations"]}
+        assert list(by_product) == ["P0001", "P0002"]
+        for req in body.item_requests()[:2]:
+            assert by_product[req.product_id] == await service.optimize(req)
+
+
+@pytest.mark.asyncio
+async def test_feature_state_gives_same_recommendations_without_history(portfolio_repo, booster):
+    body = PortfolioPricingRequest(
+        items=[
+            {"product_id": "P0001", "cost": 2.0, "price_min": 5.0, "price_max": 20.0},
+            {"product_id": "P0003", "cost": 3.0, "price_min": 6.0, "price_max": 18.0, "n_steps": 25},
+        ],
+    )
+    active = ActiveModel(version="v1", file_path="/tmp/v1.txt", booster=booster)
+    with patch(
+        "app.forecasting.pricing_service.model_registry.get_active",
+        AsyncMock(return_value=active),
+    ):
+        service = PricingOptimizationService(portfolio_repo)
+        expected = await service.optimize_portfolio(body)
+        single = await service.optimize(body.item_requests()[0])
+
+        history = await portfolio_repo.get_latest_sales_df_per_product(["P0001", "P0003"])
+        states = {s.product_id: s for s in build_feature_states(history)}
+        portfolio_repo.get_feature_states = AsyncMock(side_effect=lambda ids: {p: states[p] for p in ids})
+        portfolio_repo.get_latest_sales_df.reset_mock()
+        portfolio_repo.get_latest_sales_df_per_product.reset_mock()
+
+        assert await service.optimize_portfolio(body) == expected
+        assert await service.optimize(body.item_requests()[0]) == single
+        portfolio_repo.get_latest_sales_df.assert_not_awaited()
+        portfolio_repo.get_latest_sales_df_per_product.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_portfolio_rejects_duplicate_products(portfolio_repo):
+    body = PortfolioPricingRequest(
+        items=[
+            {"product_id": "P0001", "cost": 2.0, "price_min": 5.0, "price_max": 20.0},
+            {"product_id": "P001", "cost": 2.0, "price_min": 5.0, "price_max": 20.0},
+        ]
+    )
+    with pytest.raises(ValueError, match="Duplicate"):
+        await PricingOptimizationService(portfolio_repo).optimize_portfolio(body)
+
+
+@pytest.mark.asyncio
+async def test_adaptive_portfolio_refines_products_in_shared_batches(portfolio_repo, booster):
+    body = PortfolioPricingRequest(
+        items=[
+            {"product_id": "P0001", "cost": 2.0, "price_min": 5.0, "price_max": 20.0},
+            {"product_id": "P0002", "cost": 3.0, "price_min": 6.0, "price_max": 18.0},
+        ],
+        n_steps=6,
+        search="adaptive",
+    )
+    active = ActiveModel(version="v1", file_path="/tmp/v1.txt", booster=booster)
+    with patch(
+        "app.forecasting.pricing_service.model_registry.get_active",
+        AsyncMock(return_value=active),
+    ):
+        service = PricingOptimizationService(portfolio_repo)
+        result = await service.optimize_portfolio(body)
+
+        by_product = {r.pop("product_id"): r for r in result["recommendations"]}
+        rounds = max(r["search"]["rounds"] for r in by_product.values())
+        assert booster.batch_sizes[0] == 2 * (6 + 1)
+        assert len(booster.batch_sizes) == rounds + 1
+        for req in body.item_requests():
+            assert by_product[req.product_id] == await service.optimize(req)
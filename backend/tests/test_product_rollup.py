@@ -0,0 +1,125 @@
+"""Tests for the product_sales_rollup aggregates and the ranking queries over them."""
+
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, insert
+
+from app.forecasting.db_models import ProductSalesRollup, SalesFact
+from app.forecasting.repository import (
+    ROLLUP_COLUMNS,
+    ForecastingRepository,
+    product_rank_winners_query,
+    product_ranked_list_query,
+    product_rollup_source,
+)
+
+ROWS = [
+    # product_id, day, quantity, price, promo
+    ("P1", 0, 10.0, 2.0, False),
+    ("P1", 1, 20.0, 2.0, True),
+    ("P1", 2, 10.0, None, False),
+    ("P2", 0, 15.0, 4.0, False),
+    ("P2", 1, 25.0, 3.0, True),
+    ("P3", 0, 8.0, 1.0, False),
+    ("P3", 1, 12.0, 1.0, True),
+    ("P3", 2, 20.0, 1.0, False),
+    ("P4", 0, 5.0, 9.0, False),
+]
+
+
+@pytest.fixture
+def conn():
+    engine = create_engine("sqlite://")
+    SalesFact.metadata.create_all(engine, tables=[SalesFact.__table__, ProductSalesRollup.__table__])
+    with engine.begin() as connection:
+        connection.execute(
+            insert(SalesFact),
+            [
+                {
+                    "product_id": pid,
+                    "date": date(2024, 1, 1) + timedelta(days=day),
+                    "quantity": qty,
+                    "revenue": qty * (price or 1.0),
+                    "price": price,
+                    "promo_flag": promo,
+                }
+                for pid, day, qty, price, promo in ROWS
+            ],
+        )
+        connection.execute(insert(ProductSalesRollup).from_select(ROLLUP_COLUMNS, product_rollup_source()))
+        yield connection
+
+
+def _reference(metric: str) -> pd.Series:
+    df = pd.DataFrame(ROWS, columns=["product_id", "day", "quantity", "price", "promo"])
+    df["revenue"] = df["quantity"] * df["price"].fillna(1.0)
+    g = df.groupby("product_id")
+    if metric in ("quantity", "revenue"):
+        return g[metric].sum()
+    if metric == "avg_price":
+        return g["price"].mean().dropna()
+    promo = df[df["promo"]].groupby("product_id")["quantity"].mean()
+    base = df[~df["promo"]].groupby("product_id")["quantity"].mean()
+    return ((promo - base) / base * 100.0).dropna()
+
+
+def test_rollup_rows_hold_additive_aggregates(conn):
+    row = conn.execute(ProductSalesRollup.__table__.select().where(ProductSalesRollup.product_id == "P1")).one()
+    assert (row.row_count, row.day_count, row.quantity_sum) == (3, 3, 40.0)
+    assert (row.promo_row_count, row.promo_quantity_sum) == (1, 20.0)
+    assert (row.non_promo_row_count, row.non_promo_quantity_sum) == (2, 20.0)
+    assert (row.price_row_count, row.price_sum) == (2, 4.0)
+    assert (row.first_date, row.last_date) == (date(2024, 1, 1), date(2024, 1, 3))
+
+
+@pytest.mark.parametrize("metric", ["quantity", "revenue", "promo_lift", "avg_price"])
+@pytest.mark.parametrize("direction", ["desc", "asc"])
+def test_winners_match_group_by_over_sales_facts(conn, metric, direction):
+    expected = _reference(metric)
+    extreme = expected.max() if direction == "desc" else expected.min()
+    winners = sorted(pid for pid, value in expected.items() if value == pytest.approx(extreme))
+
+    for rollup in (ProductSalesRollup.__table__, product_rollup_source().subquery()):
+        rows = conn.execute(product_rank_winners_query(rollup, metric, direction)).all()
+        assert [r.product_id for r in rows] == winners
+        assert all(r.metric_value == pytest.approx(extreme) for r in rows)
+
+
+def test_ties_are_returned_in_one_query(conn):
+    # P1, P2 and P3 all sold 40 units
+    rows = conn.execute(product_rank_winners_query(ProductSalesRollup.__table__, "quantity", "desc")).all()
+    assert [(r.product_id, r.metric_value) for r in rows] == [("P1", 40.0), ("P2", 40.0), ("P3", 40.0)]
+
+
+def test_ranked_list_breaks_ties_by_product(conn):
+    rows = conn.execute(product_ranked_list_query(ProductSalesRollup.__table__, "quantity", "asc", 3)).all()
+    assert [r.product_id for r in rows] == ["P4", "P1", "P2"]
+    with pytest.raises(ValueError):
+        product_ranked_list_query(ProductSalesRollup.__table__, "avg_price", "desc", 3)
+    with pytest.raises(ValueError):
+        product_rank_winners_query(ProductSalesRollup.__table__, "quantity", "sideways")
+
+
+@pytest.mark.asyncio
+async def test_stale_rollup_is_rebuilt_before_reading():
+    versions = MagicMock()
+    versions.all.return_value = [("sales_facts", 9), ("product_sales_rollup", 8)]
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=versions)
+    repo = ForecastingRepository(session)
+    repo.refresh_product_sales_rollup = AsyncMock(return_value=True)
+
+    assert await repo._product_rollup() is ProductSalesRollup.__table__
+    repo.refresh_product_sales_rollup.assert_awaited_once()
+
+    versions.all.return_value = [("sales_facts", 9), ("product_sales_rollup", 9)]
+    await repo._product_rollup()
+    assert repo.refresh_product_sales_rollup.await_count == 1
+
+    # No version row: aggregate on the fly rather than trusting the table
+    versions.all.return_value = []
+    assert await repo._product_rollup() is not ProductSalesRollup.__table__
+    assert repo.refresh_product_sales_rollup.await_count == 1
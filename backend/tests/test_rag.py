@@ -38,3 +38,35 @@ def test_create_vector_store_selects_chroma(_mock):
          patch("app.knowledge_rag.service.settings.vectorstore", "chroma"):
         store = create_vector_store()
     assert store.__class__.__name__ == "ChromaVectorStore"
+
+
+class RecordingStore:
+    """In-memory vector store stand-in that keeps what was added."""
+
+    def __init__(self):
+        self.chunks: list[str] = []
+        self.metadatas: list[dict] = []
+
+    async def add_documents(self, texts, metadatas):
+        self.chunks.extend(texts)
+        self.metadatas.extend(metadatas)
+        return [str(i) for i in range(len(texts))]
+
+
+@pytest.mark.asyncio
+async def test_ingest_from_folder_loads_chunks_and_stores_them(tmp_path):
+    (tmp_path / "notes.txt").write_text("Promotions lift weekend sales.", encoding="utf-8")
+    (tmp_path / "guide.md").write_text("# Pricing\nKeep margins above cost.", encoding="utf-8")
+    (tmp_path / "ignored.csv").write_text("a,b\n1,2", encoding="utf-8")
+    store = RecordingStore()
+
+    result = await KnowledgeService(store).ingest_from_folder(str(tmp_path))
+
+    assert result == {"status": "ok", "ingested": len(store.chunks)}
+    assert len(store.chunks) >= 2
+    assert {m["filename"] for m in store.metadatas} == {"notes.txt", "guide.md"}
+    assert await KnowledgeService(RecordingStore()).ingest_from_folder(str(tmp_path / "missing")) == {
+        "status": "ok",
+        "ingested": 0,
+        "message": "No documents found",
+    }
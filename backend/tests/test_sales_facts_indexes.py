@@ -0,0 +1,182 @@
+"""
+EXPLAIN regression test: forecasting repository reads use index scans on a
+partitioned sales_facts with 10M+ rows.
+
+Builds the migration 006 layout in a throwaway schema of DATABASE_URL and
+skips when PostgreSQL is not reachable. SALES_EXPLAIN_TEST_PRODUCTS /
+SALES_EXPLAIN_TEST_DAYS size the generated table (default 2000 x 5000).
+"""
+
+import importlib.util
+import json
+import os
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.forecasting.repository import ForecastingRepository
+from app.settings import settings
+
+N_PRODUCTS = int(os.environ.get("SALES_EXPLAIN_TEST_PRODUCTS", "2000"))
+N_DAYS = int(os.environ.get("SALES_EXPLAIN_TEST_DAYS", "5000"))
+FIRST_DAY = date(2013, 1, 1)
+LAST_DAY = FIRST_DAY + timedelta(days=N_DAYS - 1)
+PRODUCTS = ["P0007", "P0123", "P1999"]
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+
+def _migration():
+    path = Path(__file__).resolve().parents[1] / "app/db/migrations/versions/006_sales_facts_partitioning.py"
+    spec = importlib.util.spec_from_file_location("migration_006", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def engine():
+    schema = f"explain_{uuid.uuid4().hex[:8]}"
+    admin = create_async_engine(settings.database_url, connect_args={"timeout": 3})
+    try:
+        async with admin.begin() as conn:
+            await conn.execute(text(f"CREATE SCHEMA {schema}"))
+    except Exception as exc:  # no server, no database, no permissions
+        await admin.dispose()
+        pytest.skip(f"PostgreSQL not available: {exc}")
+
+    eng = create_async_engine(
+        settings.database_url, connect_args={"server_settings": {"search_path": schema}}
+    )
+    try:
+        async with eng.begin() as conn:
+            await conn.execute(text("CREATE SEQUENCE sales_facts_id_seq"))
+            for statement in _migration().partitioned_sales_ddl(FIRST_DAY.year, LAST_DAY.year + 1):
+                await conn.execute(text(statement))
+            await conn.execute(
+                text(
+                    """
+                    INSERT INTO sales_facts (product_id, date, quantity, revenue, price, promo_flag, category_id)
+                    SELECT 'P' || lpad(p::text, 4, '0'), :first + d, (p + d) % 17, ((p + d) % 17) * 2.5,
+                           2.5, d % 7 = 0, 'C' || (p % 20)
+                    FROM generate_series(0, :days - 1) AS d, generate_series(0, :products - 1) AS p
+                    """
+                ),
+                {"first": FIRST_DAY, "days": N_DAYS, "products": N_PRODUCTS},
+            )
+        async with eng.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("ANALYZE sales_facts"))
+        yield eng
+    finally:
+        await eng.dispose()
+        async with admin.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        await admin.dispose()
+
+
+@pytest.fixture(autouse=True)
+def plain_selects(monkeypatch):
+    # Capture the statements the repository sends, not the snapshot/COPY paths
+    monkeypatch.setattr("app.forecasting.repository.settings.sales_snapshot_enabled", False)
+    monkeypatch.setattr("app.forecasting.repository.settings.sales_fetch_copy_enabled", False)
+
+
+_INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan", "Bitmap Heap Scan"}
+
+
+def _scans(plan: dict) -> list[tuple[str, str]]:
+    """(node type, relation or index name) for every sales_facts scan in the plan tree."""
+    found = []
+    if plan.get("Relation Name", "").startswith("sales_facts"):
+        found.append((plan["Node Type"], plan["Relation Name"]))
+    elif plan["Node Type"] == "Bitmap Index Scan":
+        found.append((plan["Node Type"], plan["Index Name"]))
+    for child in plan.get("Plans", []):
+        found.extend(_scans(child))
+    return found
+
+
+async def _explained_scans(engine, call) -> list[list[tuple[str, str]]]:
+    """Run call(repo), then EXPLAIN every sales_facts statement it issued with the same parameters."""
+    statements: list[tuple[str, tuple]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "sales_facts" in statement:
+            statements.append((statement, tuple(parameters or ())))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async with AsyncSession(engine) as session:
+            await call(ForecastingRepository(session))
+            raw = await (await session.connection()).get_raw_connection()
+            plans = []
+            for statement, parameters in statements:
+                explained = await raw.driver_connection.fetchval(
+                    "EXPLAIN (FORMAT JSON) " + statement, *parameters
+                )
+                plan = json.loads(explained) if isinstance(explained, str) else explained
+                plans.append(_scans(plan[0]["Plan"]))
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+    return plans
+
+
+def _assert_index_scans(plans: list[list[tuple[str, str]]], max_partitions: int | None = None):
+    assert plans, "no statements captured"
+    for scans in plans:
+        assert scans, "statement did not touch sales_facts"
+        assert all(node in _INDEX_NODES for node, _ in scans), scans
+        if max_partitions is not None:
+            partitions = {name for node, name in scans if node != "Bitmap Index Scan"}
+            assert len(partitions) <= max_partitions, scans
+
+
+async def test_table_has_ten_million_rows(engine):
+    if N_PRODUCTS * N_DAYS < 10_000_000:
+        pytest.skip("table sized below 10M rows via SALES_EXPLAIN_TEST_*")
+    async with engine.connect() as conn:
+        n = await conn.scalar(
+            text(
+                "SELECT sum(c.reltuples)::bigint FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = 'sales_facts'::regclass"
+            )
+        )
+    assert n >= 10_000_000
+
+
+async def test_product_range_read_uses_composite_index_and_prunes(engine):
+    from_date, to_date = date(2020, 3, 1), date(2020, 5, 31)
+    plans = await _explained_scans(engine, lambda repo: repo.get_sales_df(from_date, to_date, PRODUCTS))
+    _assert_index_scans(plans, max_partitions=1)
+
+
+async def test_date_only_read_uses_brin_and_prunes(engine):
+    from_date, to_date = date(2021, 6, 1), date(2021, 6, 7)
+    plans = await _explained_scans(engine, lambda repo: repo.get_sales_df(from_date, to_date))
+    _assert_index_scans(plans, max_partitions=1)
+    bitmap_indexes = [name for scans in plans for node, name in scans if node == "Bitmap Index Scan"]
+    assert bitmap_indexes and all(name.endswith("_date_idx") and "product" not in name for name in bitmap_indexes)
+
+
+async def test_latest_history_reads_use_index_scans(engine):
+    plans = await _explained_scans(engine, lambda repo: repo.get_latest_sales_df(PRODUCTS, min_days=90))
+    assert len(plans) == 2  # latest date lookup, then the trailing window
+    _assert_index_scans(plans)
+
+
+async def test_latest_history_per_product_uses_index_scans(engine):
+    plans = await _explained_scans(engine, lambda repo: repo.get_latest_sales_df_per_product(PRODUCTS, min_days=90))
+    _assert_index_scans(plans)
+
+
+async def test_aggregated_daily_uses_index_scans(engine):
+    plans = await _explained_scans(
+        engine, lambda repo: repo.get_aggregated_daily(date(2019, 1, 1), date(2019, 12, 31), PRODUCTS[:1])
+    )
+    _assert_index_scans(plans, max_partitions=1)
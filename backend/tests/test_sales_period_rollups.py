@@ -0,0 +1,202 @@
+"""Tests for weekly/monthly sales rollups and LTTB downsampling of /api/data/historical."""
+
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, insert
+
+from app.forecasting.db_models import SalesPeriodRollup
+from app.forecasting.downsample import downsample_series, lttb_indices
+from app.forecasting.repository import (
+    ForecastingRepository,
+    aggregate_sales_periods,
+    period_rollup_frame,
+    period_rollup_query,
+    period_start,
+)
+from app.main import create_app
+
+
+def _sales_frame() -> pd.DataFrame:
+    days = [date(2024, 1, 1) + timedelta(days=i) for i in range(40)]
+    return pd.DataFrame(
+        {
+            "product_id": ["P1"] * 40 + ["P2"] * 40,
+            "date": days * 2,
+            "quantity": [float(i) for i in range(80)],
+            "revenue": [2.0 * i for i in range(80)],
+            "price": [np.nan if i % 10 == 0 else 2.0 for i in range(80)],
+        }
+    )
+
+
+def test_period_start():
+    assert period_start(date(2024, 1, 10), "week") == date(2024, 1, 8)
+    assert period_start(date(2024, 1, 8), "week") == date(2024, 1, 8)
+    assert period_start(date(2024, 2, 29), "month") == date(2024, 2, 1)
+    with pytest.raises(ValueError):
+        period_start(date(2024, 1, 1), "year")
+
+
+def test_aggregate_sales_periods_matches_daily_sums():
+    df = _sales_frame()
+    monthly = aggregate_sales_periods(df, "month")
+    assert [(r["date"], r["product_id"]) for r in monthly] == [
+        ("2024-01-01", "P1"), ("2024-01-01", "P2"), ("2024-02-01", "P1"), ("2024-02-01", "P2"),
+    ]
+    assert sum(r["quantity"] for r in monthly) == df["quantity"].sum()
+    assert monthly[0]["quantity"] == sum(range(31))
+    assert monthly[0]["price"] == 2.0
+
+    weekly = aggregate_sales_periods(df, "week")
+    # 2024-01-01 is a Monday: 40 days span six whole weeks and a partial one
+    assert len(weekly) == 2 * 6
+    assert {r["date"] for r in weekly} == {str(date(2024, 1, 1) + timedelta(weeks=w)) for w in range(6)}
+    assert sum(r["revenue"] for r in weekly) == df["revenue"].sum()
+    assert aggregate_sales_periods(df.iloc[0:0], "week") == []
+
+
+def test_period_rollup_frame_keeps_additive_price_columns():
+    frame = period_rollup_frame(_sales_frame(), "month")
+    assert list(frame.columns) == [c.name for c in SalesPeriodRollup.__table__.columns]
+    first = frame.iloc[0]
+    assert (first["resolution"], first["product_id"], first["period_start"]) == ("month", "P1", date(2024, 1, 1))
+    # Days 0, 10, 20 and 30 have no price
+    assert (first["row_count"], first["price_count"], first["price_sum"]) == (31, 27, 54.0)
+    with pytest.raises(ValueError):
+        period_rollup_frame(_sales_frame(), "day")
+
+
+def test_period_rollup_query_reads_requested_periods():
+    engine = create_engine("sqlite://")
+    SalesPeriodRollup.metadata.create_all(engine, tables=[SalesPeriodRollup.__table__])
+    with engine.begin() as conn:
+        conn.execute(
+            insert(SalesPeriodRollup),
+            [
+                {"resolution": res, "product_id": pid, "period_start": start, "quantity": 10.0,
+                 "revenue": 20.0, "price_sum": 6.0, "price_count": count, "row_count": 3}
+                for res, start in (("month", date(2024, 1, 1)), ("month", date(2024, 2, 1)), ("week", date(2024, 1, 1)))
+                for pid, count in (("P2", 3), ("P1", 0))
+            ],
+        )
+        rows = conn.execute(period_rollup_query("month", date(2024, 1, 1), date(2024, 1, 31))).all()
+        assert [(r.period_start, r.product_id, r.price) for r in rows] == [
+            (date(2024, 1, 1), "P1", 0.0),
+            (date(2024, 1, 1), "P2", 2.0),
+        ]
+        rows = conn.execute(period_rollup_query("month", date(2024, 1, 1), date(2024, 3, 1), ["P2"])).all()
+        assert [r.period_start for r in rows] == [date(2024, 1, 1), date(2024, 2, 1)]
+
+
+def _versions_session(versions: list[tuple[str, int]], rows=()):
+    version_result = MagicMock()
+    version_result.all.return_value = versions
+    rollup_result = MagicMock()
+    rollup_result.all.return_value = list(rows)
+    session = MagicMock()
+    session.execute = AsyncMock(side_effect=[version_result, rollup_result])
+    return session
+
+
+@pytest.mark.asyncio
+async def test_current_rollup_is_read_and_stale_rollup_falls_back_to_raw_sales():
+    row = MagicMock(period_start=date(2024, 1, 1), product_id="P1", quantity=5.0, revenue=10.0, price=2.0)
+    repo = ForecastingRepository(_versions_session([("sales_facts", 4), ("sales_period_rollups", 4)], [row]))
+    repo.get_sales_df = AsyncMock()
+    rows = await repo.get_aggregated_sales(date(2024, 1, 15), date(2024, 1, 20), resolution="month")
+    assert rows == [{"date": "2024-01-01", "product_id": "P1", "quantity": 5.0, "revenue": 10.0, "price": 2.0}]
+    repo.get_sales_df.assert_not_awaited()
+
+    # A lagging stamp, or no sales_facts version row, is served from raw sales without a rebuild
+    for versions in ([("sales_facts", 5), ("sales_period_rollups", 4)], []):
+        repo = ForecastingRepository(_versions_session(versions))
+        repo.refresh_sales_period_rollups = AsyncMock()
+        repo.get_sales_df = AsyncMock(return_value=_sales_frame())
+        rows = await repo.get_aggregated_sales(date(2024, 1, 3), date(2024, 1, 10), ["P1"], resolution="week")
+        # Whole weeks overlapping the range are read
+        assert repo.get_sales_df.await_args.args[:3] == (date(2024, 1, 1), date(2024, 1, 14), ["P1"])
+        assert rows[0]["date"] == "2024-01-01"
+        repo.refresh_sales_period_rollups.assert_not_awaited()
+
+    repo = ForecastingRepository(MagicMock())
+    repo.get_aggregated_daily = AsyncMock(return_value=[])
+    await repo.get_aggregated_sales(date(2024, 1, 1), date(2024, 1, 2))
+    repo.get_aggregated_daily.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_refresh_rebuilds_weekly_and_monthly_rows_and_stamps():
+    session = MagicMock()
+    session.execute = AsyncMock()
+    repo = ForecastingRepository(session)
+    sales = MagicMock(version=7)
+    repo._lock_stamp = AsyncMock(return_value=(MagicMock(version=6), sales))
+    repo._fetch_sales_frame = AsyncMock(return_value=_sales_frame())
+    repo._write_stamp = AsyncMock(return_value=7)
+
+    assert await repo.refresh_sales_period_rollups() is True
+
+    records = session.execute.await_args_list[-1].args[1]
+    df = _sales_frame()
+    assert len(records) == len(aggregate_sales_periods(df, "week")) + len(aggregate_sales_periods(df, "month"))
+    assert sum(r["quantity"] for r in records if r["resolution"] == "week") == df["quantity"].sum()
+    repo._write_stamp.assert_awaited_once()
+
+    repo._lock_stamp = AsyncMock(return_value=(MagicMock(version=7), sales))
+    assert await repo.refresh_sales_period_rollups() is False
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50.0)
+    y[437] = 25.0
+    idx = lttb_indices(x, y, 100)
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == 999
+    assert np.all(np.diff(idx) > 0)
+    assert 437 in idx
+    assert list(lttb_indices(x[:10], y[:10], 50)) == list(range(10))
+
+
+def test_downsample_series_caps_each_product():
+    rows = [
+        {"date": str(date(2024, 1, 1) + timedelta(days=d)), "product_id": pid, "quantity": float(d % 7), "revenue": 0.0, "price": 0.0}
+        for d in range(200)
+        for pid in ("P1", "P2")
+    ]
+    rows.append({"date": "2024-01-01", "product_id": "P3", "quantity": 1.0, "revenue": 0.0, "price": 0.0})
+    rows.sort(key=lambda r: (r["date"], r["product_id"]))
+    out = downsample_series(rows, 50)
+    counts = pd.Series([r["product_id"] for r in out]).value_counts()
+    assert counts.to_dict() == {"P1": 50, "P2": 50, "P3": 1}
+    assert out == sorted(out, key=lambda r: (r["date"], r["product_id"]))
+
+
+@pytest.mark.asyncio
+async def test_historical_endpoint_passes_resolution_and_downsamples():
+    rows = [
+        {"date": str(date(2024, 1, 1) + timedelta(days=d)), "product_id": "P1", "quantity": float(d), "revenue": 0.0, "price": 0.0}
+        for d in range(30)
+    ]
+    with patch(
+        "app.forecasting.router.ForecastingRepository.get_aggregated_sales", AsyncMock(return_value=rows)
+    ) as get_sales:
+        app = create_app()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            r = await client.get(
+                "/api/data/historical",
+                params={"from_date": "2024-01-01", "to_date": "2024-03-01", "resolution": "week", "max_points": 10},
+            )
+            assert r.status_code == 200
+            assert len(r.json()) == 10
+            assert get_sales.await_args.args[-1] == "week"
+
+            r = await client.get(
+                "/api/data/historical", params={"from_date": "2024-01-01", "to_date": "2024-03-01", "resolution": "year"}
+            )
+            assert r.status_code == 422
@@ -0,0 +1,180 @@
+"""
+Trigger-maintained derived tables stay in step with app ingest on PostgreSQL.
+
+Builds sales_facts and migrations 007-010 in a throwaway schema of
+DATABASE_URL; skips when PostgreSQL is not reachable.
+"""
+
+import importlib.util
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import pytest_asyncio
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import delete, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.forecasting.dataset_version import (
+    FEATURE_STATE,
+    PERIOD_ROLLUPS,
+    PRODUCT_ROLLUP,
+    SALES_DATASET,
+    dataset_version_cache,
+)
+from app.forecasting.db_models import DatasetVersion, SalesFact, SalesPeriodRollup
+from app.forecasting.feature_state import build_feature_states
+from app.forecasting.repository import SALES_COLUMNS, ForecastingRepository, aggregate_sales_periods
+from app.settings import settings
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+_MIGRATIONS = (
+    "007_dataset_versions",
+    "008_product_sales_rollup",
+    "009_sales_period_rollups",
+    "010_product_feature_state",
+)
+
+
+def _migration(name: str):
+    path = Path(__file__).resolve().parents[1] / f"app/db/migrations/versions/{name}.py"
+    spec = importlib.util.spec_from_file_location(f"migration_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _upgrade(sync_conn):
+    SalesFact.__table__.create(sync_conn)
+    with Operations.context(MigrationContext.configure(sync_conn)):
+        for name in _MIGRATIONS:
+            _migration(name).upgrade()
+
+
+@pytest_asyncio.fixture(loop_scope="module")
+async def engine():
+    schema = f"rollups_{uuid.uuid4().hex[:8]}"
+    admin = create_async_engine(settings.database_url, connect_args={"timeout": 3})
+    try:
+        async with admin.begin() as conn:
+            await conn.execute(text(f"CREATE SCHEMA {schema}"))
+    except Exception as exc:  # no server, no database, no permissions
+        await admin.dispose()
+        pytest.skip(f"PostgreSQL not available: {exc}")
+
+    eng = create_async_engine(
+        settings.database_url, connect_args={"server_settings": {"search_path": schema}}
+    )
+    try:
+        async with eng.begin() as conn:
+            await conn.run_sync(_upgrade)
+        yield eng
+    finally:
+        await eng.dispose()
+        async with admin.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        await admin.dispose()
+
+
+async def _ingest(session: AsyncSession, n_days: int = 40) -> None:
+    """Write sales like the seed endpoint: rows, then the version bump, one transaction."""
+    for i in range(n_days):
+        for pid, qty in (("P0001", 3.0), ("P0002", 5.0)):
+            session.add(
+                SalesFact(
+                    product_id=pid,
+                    date=date(2024, 1, 1) + timedelta(days=i),
+                    quantity=qty,
+                    revenue=qty * 2.0,
+                    price=2.0,
+                    promo_flag=False,
+                    category_id="C1",
+                )
+            )
+    await session.flush()
+    await ForecastingRepository(session).bump_sales_dataset_version()
+    await session.commit()
+
+
+async def _versions(session: AsyncSession) -> dict[str, int]:
+    return dict((await session.execute(select(DatasetVersion.name, DatasetVersion.version))).all())
+
+
+async def test_ingest_then_bump_leaves_rollup_stamps_current(engine):
+    dataset_version_cache.invalidate()
+    async with AsyncSession(engine) as session:
+        await _ingest(session)
+        versions = await _versions(session)
+
+        assert versions[PRODUCT_ROLLUP] == versions[SALES_DATASET]
+        assert versions[PERIOD_ROLLUPS] == versions[SALES_DATASET]
+        # A current stamp means the ranking read does not rebuild the rollup
+        assert await ForecastingRepository(session).refresh_product_sales_rollup() is False
+
+
+async def test_lagging_period_rollups_are_served_raw_until_rebuilt(engine):
+    dataset_version_cache.invalidate()
+    async with AsyncSession(engine) as session:
+        await _ingest(session)
+        # As after create_all: an empty table whose stamp lags sales_facts
+        await session.execute(delete(SalesPeriodRollup))
+        await session.execute(update(DatasetVersion).where(DatasetVersion.name == PERIOD_ROLLUPS).values(version=0))
+        await session.commit()
+
+        repo = ForecastingRepository(session)
+        raw = await repo.get_aggregated_sales(date(2024, 1, 1), date(2024, 2, 9), resolution="week")
+        df = await repo.get_sales_df(
+            date(2024, 1, 1), date(2024, 2, 11), ["P0001", "P0002"], ["product_id", "date", "quantity", "revenue", "price"]
+        )
+
+        assert raw == aggregate_sales_periods(df, "week")
+        assert (await _versions(session))[PERIOD_ROLLUPS] == 0  # reads never rebuild
+
+        assert await repo.refresh_sales_period_rollups() is True
+        versions = await _versions(session)
+        assert versions[PERIOD_ROLLUPS] == versions[SALES_DATASET]
+        assert await repo.get_aggregated_sales(date(2024, 1, 1), date(2024, 2, 9), resolution="week") == raw
+
+
+async def test_appended_sales_are_pushed_onto_current_feature_states(engine, monkeypatch):
+    monkeypatch.setattr("app.forecasting.repository.settings.feature_state_enabled", True)
+    dataset_version_cache.invalidate()
+    async with AsyncSession(engine) as session:
+        await _ingest(session)
+        repo = ForecastingRepository(session)
+        await repo.refresh_feature_states()
+        await session.commit()
+
+        # Append ten more days the way the seed endpoint does
+        assert await repo.lock_feature_states() is True
+        rows = [
+            dict(
+                product_id="P0001",
+                date=date(2024, 2, 10) + timedelta(days=i),
+                quantity=4.0,
+                revenue=8.0,
+                price=2.0,
+                promo_flag=False,
+                category_id="C1",
+            )
+            for i in range(10)
+        ]
+        session.add_all([SalesFact(**row, source="seed") for row in rows])
+        await session.flush()
+        await repo.bump_sales_dataset_version()
+        await repo.update_feature_states(pd.DataFrame(rows))
+        await session.commit()
+
+        versions = await _versions(session)
+        assert versions[FEATURE_STATE] == versions[SALES_DATASET]
+        states = await repo.get_feature_states(["P0001", "P0002"])
+        df = await repo.get_sales_df(date(2024, 1, 1), date(2024, 2, 19), ["P0001"], list(SALES_COLUMNS))
+        expected = build_feature_states(df)[0]
+        assert states["P0001"].last_date == date(2024, 2, 19)
+        assert states["P0001"].quantity_sums == pytest.approx(expected.quantity_sums)
+        assert states["P0001"].observed_days == expected.observed_days
+        assert states["P0002"].last_date == date(2024, 2, 9)
@@ -0,0 +1,240 @@
+"""Tests for the on-disk sales_facts snapshot."""
+
+import asyncio
+import fcntl
+import os
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.forecasting.repository import SALES_COLUMNS
+from app.forecasting.sales_snapshot import SalesSnapshot, _write_segment
+
+
+class TableRepo:
+    """In-memory sales_facts with ids; counts how many rows are fetched."""
+
+    def __init__(self, n_rows: int):
+        self.table = pd.DataFrame([self._row(i) for i in range(1, n_rows + 1)])
+        self.fetched: list[tuple[int, int]] = []
+        self.version: int | None = None  # dataset_versions row; None = no row yet
+        self.signature_scans = 0
+
+    @staticmethod
+    def _row(i: int) -> dict:
+        return {
+            "id": i,
+            "product_id": f"P{i % 3:04d}",
+            "date": date(2024, 1, 1) + timedelta(days=i // 3),
+            "quantity": float(i),
+            "revenue": float(i) * 2.5,
+            "price": None if i % 7 == 0 else 2.5,
+            "promo_flag": i % 5 == 0,
+            "category_id": None if i % 11 == 0 else f"C{i % 2}",
+        }
+
+    def append(self, n: int) -> None:
+        start = int(self.table["id"].max()) + 1
+        self.table = pd.concat(
+            [self.table, pd.DataFrame([self._row(i) for i in range(start, start + n)])], ignore_index=True
+        )
+
+    async def get_sales_max_id(self) -> int:
+        return int(self.table["id"].max()) if len(self.table) else 0
+
+    async def get_sales_dataset_fingerprint(self) -> dict:
+        if self.version is None:
+            return {"dataset": "sales_facts", "signature": await self.get_sales_dataset_signature()}
+        return {"dataset": "sales_facts", "version": self.version}
+
+    async def get_sales_dataset_signature(self, max_id=None) -> dict:
+        self.signature_scans += 1
+        rows = self.table if max_id is None else self.table[self.table["id"] <= max_id]
+        return {"row_count": len(rows), "quantity_sum": float(rows["quantity"].sum())}
+
+    async def get_sales_rows_by_id(self, after_id: int, upto_id: int) -> pd.DataFrame:
+        self.fetched.append((after_id, upto_id))
+        rows = self.table[(self.table["id"] > after_id) & (self.table["id"] <= upto_id)]
+        return rows[list(SALES_COLUMNS)].reset_index(drop=True)
+
+    def expected(self, from_date: date, to_date: date) -> pd.DataFrame:
+        rows = self.table[(self.table["date"] >= from_date) & (self.table["date"] <= to_date)]
+        return rows.sort_values("date", kind="stable")[list(SALES_COLUMNS)].reset_index(drop=True)
+
+
+def _assert_same(actual: pd.DataFrame, expected: pd.DataFrame):
+    assert list(actual.columns) == list(expected.columns)
+    for col in actual.columns:
+        left, right = actual[col].tolist(), expected[col].tolist()
+        if col == "price":
+            np.testing.assert_array_equal(np.array(left, dtype=float), np.array(right, dtype=float))
+        elif col == "category_id":
+            assert [None if pd.isna(v) else v for v in left] == [None if pd.isna(v) else v for v in right]
+        else:
+            assert left == right, col
+
+
+@pytest.mark.asyncio
+async def test_snapshot_builds_once_and_serves_from_disk(tmp_path):
+    repo = TableRepo(60)
+    snapshot = SalesSnapshot(tmp_path)
+
+    first = await snapshot.get_sales_df(repo, date(2024, 1, 3), date(2024, 1, 10))
+    second = await snapshot.get_sales_df(repo, date(2024, 1, 3), date(2024, 1, 10))
+
+    assert repo.fetched == [(0, 60)]
+    _assert_same(first, repo.expected(date(2024, 1, 3), date(2024, 1, 10)))
+    _assert_same(second, first)
+    assert first["quantity"].dtype == np.float64
+    assert first["promo_flag"].dtype == np.bool_
+
+
+@pytest.mark.asyncio
+async def test_appended_rows_are_fetched_incrementally(tmp_path):
+    repo = TableRepo(60)
+    snapshot = SalesSnapshot(tmp_path)
+    await snapshot.refresh(repo)
+
+    repo.append(15)
+    df = await snapshot.get_sales_df(repo, date(2023, 1, 1), date(2025, 1, 1))
+
+    assert repo.fetched == [(0, 60), (60, 75)]
+    assert len(snapshot._load_manifest()["segments"]) == 2
+    _assert_same(df, repo.expected(date(2023, 1, 1), date(2025, 1, 1)))
+
+
+@pytest.mark.asyncio
+async def test_changed_rows_trigger_full_rebuild(tmp_path):
+    repo = TableRepo(60)
+    snapshot = SalesSnapshot(tmp_path)
+    await snapshot.refresh(repo)
+
+    repo.table.loc[repo.table["id"] == 10, "quantity"] = 999.0
+    repo.append(3)
+    df = await snapshot.get_sales_df(repo, date(2023, 1, 1), date(2025, 1, 1))
+
+    assert repo.fetched == [(0, 60), (0, 63)]
+    assert len(list(tmp_path.glob("seg-*"))) == 1
+    assert 999.0 in df["quantity"].tolist()
+
+
+@pytest.mark.asyncio
+async def test_segments_are_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.forecasting.sales_snapshot.settings.sales_snapshot_max_segments", 2)
+    repo = TableRepo(30)
+    snapshot = SalesSnapshot(tmp_path)
+    await snapshot.refresh(repo)
+    for _ in range(3):
+        repo.append(5)
+        manifest = await snapshot.refresh(repo)
+
+    assert len(manifest["segments"]) <= 2
+    assert manifest["rows"] == 45
+    df = await snapshot.get_sales_df(repo, date(2023, 1, 1), date(2025, 1, 1), columns=["product_id", "quantity"])
+    expected = repo.expected(date(2023, 1, 1), date(2025, 1, 1))
+    assert sorted(df["quantity"].tolist()) == sorted(expected["quantity"].tolist())
+    assert list(df.columns) == ["product_id", "quantity"]
+
+
+@pytest.mark.asyncio
+async def test_unchanged_dataset_version_skips_signature_scans(tmp_path):
+    repo = TableRepo(60)
+    repo.version = 1
+    snapshot = SalesSnapshot(tmp_path)
+    await snapshot.refresh(repo)
+    scans = repo.signature_scans
+
+    await snapshot.get_sales_df(repo, date(2024, 1, 1), date(2024, 1, 5))
+    assert repo.signature_scans == scans
+
+    repo.append(6)
+    repo.version = 2
+    df = await snapshot.get_sales_df(repo, date(2023, 1, 1), date(2025, 1, 1))
+    assert repo.fetched == [(0, 60), (60, 66)]
+    assert repo.signature_scans > scans
+    assert len(df) == 66
+
+
+@pytest.mark.asyncio
+async def test_workers_sharing_the_directory_refresh_once(tmp_path):
+    class SlowRepo(TableRepo):
+        async def get_sales_rows_by_id(self, after_id, upto_id):
+            await asyncio.sleep(0.01)  # let the other worker run mid-refresh
+            return await super().get_sales_rows_by_id(after_id, upto_id)
+
+    repo = SlowRepo(60)
+    await SalesSnapshot(tmp_path).refresh(repo)
+    repo.append(15)
+
+    # Separate instances = separate worker processes: only the flock is shared
+    first, second = await asyncio.gather(SalesSnapshot(tmp_path).refresh(repo), SalesSnapshot(tmp_path).refresh(repo))
+
+    assert repo.fetched == [(0, 60), (60, 75)]
+    assert first == second
+    assert sorted(p.name for p in tmp_path.glob("seg-*")) == sorted(first["segments"])
+    df = await SalesSnapshot(tmp_path).get_sales_df(repo, date(2023, 1, 1), date(2025, 1, 1))
+    _assert_same(df, repo.expected(date(2023, 1, 1), date(2025, 1, 1)))
+
+
+@pytest.mark.asyncio
+async def test_prune_keeps_segments_of_the_manifest_on_disk(tmp_path):
+    repo = TableRepo(30)
+    manifest = await SalesSnapshot(tmp_path).refresh(repo)
+
+    SalesSnapshot(tmp_path)._prune([])
+
+    assert sorted(p.name for p in tmp_path.glob("seg-*")) == manifest["segments"]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_waits_for_readers_before_pruning(tmp_path):
+    repo = TableRepo(30)
+    reader = SalesSnapshot(tmp_path)
+    old = (await reader.refresh(repo))["segments"]
+    repo.table.loc[repo.table["id"] == 5, "quantity"] = 999.0  # forces a full rebuild
+
+    async with reader._flock(fcntl.LOCK_SH):
+        rebuild = asyncio.create_task(SalesSnapshot(tmp_path).refresh(repo))
+        await asyncio.sleep(0.1)
+        assert not rebuild.done()
+        assert all((tmp_path / seg).is_dir() for seg in old)
+    new = (await rebuild)["segments"]
+
+    assert not any((tmp_path / seg).exists() for seg in old)
+    df = await reader.get_sales_df(repo, date(2023, 1, 1), date(2025, 1, 1))
+    assert 999.0 in df["quantity"].tolist()
+    assert new == reader._load_manifest()["segments"]
+
+
+@pytest.mark.asyncio
+async def test_reads_hold_a_shared_lock_and_writes_run_off_the_loop(tmp_path, monkeypatch):
+    repo = TableRepo(30)
+    snapshot = SalesSnapshot(tmp_path)
+    writers = []
+
+    def recording_write(root, df):
+        writers.append(threading.current_thread() is threading.main_thread())
+        return _write_segment(root, df)
+
+    monkeypatch.setattr("app.forecasting.sales_snapshot._write_segment", recording_write)
+    await snapshot.refresh(repo)
+    read = snapshot._read
+
+    def checked_read(*args):
+        fd = os.open(tmp_path / ".lock", os.O_RDWR)
+        try:
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)  # other readers are fine
+        finally:
+            os.close(fd)
+        return read(*args)
+
+    snapshot._read = checked_read
+    df = await snapshot.get_sales_df(repo, date(2023, 1, 1), date(2025, 1, 1))
+
+    assert len(df) == 30
+    assert writers == [False]
@@ -0,0 +1,111 @@
+"""Tests for segmented (per-category) model groups and their routing."""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.forecasting.inference import densify_history, predict_dense, predict_price_sweep
+from app.forecasting.segments import plan_segments, train_segmented_model
+from app.forecasting.training import (
+    FALLBACK_SEGMENT,
+    FEATURE_COLS,
+    GROUP_SUFFIX,
+    SegmentedModel,
+    load_model,
+    predict,
+)
+
+
+@pytest.fixture
+def sales_df():
+    rng = np.random.default_rng(3)
+    rows = []
+    # C0 and C1 are large enough for their own booster; C2 is not
+    for pid, category, level in [("P1", "C0", 10), ("P2", "C0", 12), ("P3", "C1", 60), ("P4", "C2", 30)]:
+        for i in range(100 if category != "C2" else 40):
+            rows.append({
+                "product_id": pid,
+                "date": date(2024, 1, 1) + timedelta(days=i),
+                "quantity": float(level + rng.integers(0, 5) + 2 * (i % 7)),
+                "revenue": 0.0,
+                "price": float(rng.uniform(5, 15)),
+                "promo_flag": i % 9 == 0,
+                "category_id": category,
+            })
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def group(sales_df, tmp_path):
+    return train_segmented_model(
+        sales_df, date(2024, 1, 1), date(2024, 4, 9), date(2024, 4, 1), str(tmp_path), min_rows=60
+    )
+
+
+def test_plan_segments_uses_latest_category_and_min_rows(sales_df):
+    moved = sales_df.copy()
+    moved.loc[(moved["product_id"] == "P4") & (moved["date"] == date(2024, 2, 9)), "category_id"] = "C1"
+    assert plan_segments(sales_df, None, min_rows=100) == {"C0": ["P1", "P2"], "C1": ["P3"]}
+    assert plan_segments(moved, None, min_rows=100) == {"C0": ["P1", "P2"], "C1": ["P3", "P4"]}
+    assert plan_segments(sales_df, date(2024, 1, 20), min_rows=100) == {}
+
+
+def test_group_records_per_segment_metrics(group):
+    model, meta = group
+    assert set(model.segments) == {"C0", "C1"}
+    assert model.product_segments == {"P1": "C0", "P2": "C0", "P3": "C1"}
+    assert set(meta["segments"]) == {"C0", "C1", FALLBACK_SEGMENT}
+    assert meta["segments"][FALLBACK_SEGMENT]["products"] == 1
+    assert meta["segments"]["C0"]["products"] == 2
+    assert meta["eval_source"] == "test"
+    assert meta["n_eval_samples"] == sum(s["n_eval_samples"] for s in meta["segments"].values())
+    assert meta["file_path"].endswith(GROUP_SUFFIX)
+
+
+def test_rows_route_to_their_segment_booster(group):
+    model, _ = group
+    X = pd.DataFrame(np.random.default_rng(0).uniform(0, 20, (5, len(FEATURE_COLS))), columns=FEATURE_COLS)
+    products = ["P1", "P3", "P4", "NEW", None]
+    categories = ["C0", "C1", "C2", "C1", None]
+
+    routed = model.predict(X, products, categories)
+
+    assert list(model.route(products, categories)) == ["C0", "C1", FALLBACK_SEGMENT, "C1", FALLBACK_SEGMENT]
+    expected = [
+        model.segments["C0"].predict(X.iloc[[0]])[0],
+        model.segments["C1"].predict(X.iloc[[1]])[0],
+        model.fallback.predict(X.iloc[[2]])[0],
+        model.segments["C1"].predict(X.iloc[[3]])[0],
+        model.fallback.predict(X.iloc[[4]])[0],
+    ]
+    np.testing.assert_allclose(routed, expected)
+    np.testing.assert_allclose(model.predict(X), model.fallback.predict(X))
+
+
+def test_group_round_trips_through_load_model(group):
+    model, meta = group
+    loaded = load_model(meta["file_path"])
+    assert isinstance(loaded, SegmentedModel)
+    assert loaded.product_segments == model.product_segments
+    X = np.random.default_rng(1).uniform(0, 20, (4, len(FEATURE_COLS)))
+    np.testing.assert_allclose(loaded.predict(X, ["P1", "P2", "P3", "P4"]), model.predict(X, ["P1", "P2", "P3", "P4"]))
+
+
+def test_batched_inference_matches_per_product_predictions(group, sales_df):
+    model, _ = group
+    dense = densify_history(sales_df, date(2024, 4, 20))
+
+    batched = predict_dense(model, dense)
+    sweep = predict_price_sweep(model, dense, [0.0])
+
+    for pid, rows in batched.groupby("product_id"):
+        booster = model.segments.get(model.product_segments.get(pid), model.fallback)
+        single = predict_dense(booster, dense[dense["product_id"] == pid])
+        np.testing.assert_allclose(rows["predicted_quantity"].to_numpy(), single["predicted_quantity"].to_numpy())
+    np.testing.assert_allclose(
+        sweep.sort_values(["product_id", "date"])["predicted_quantity"].to_numpy(),
+        batched.sort_values(["product_id", "date"])["predicted_quantity"].to_numpy(),
+    )
+    np.testing.assert_allclose(predict(model, batched), batched["predicted_quantity"].to_numpy())
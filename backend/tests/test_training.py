@@ -0,0 +1,138 @@
+"""Tests for the low-memory training path and its binary Dataset cache."""
+
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.forecasting.features import engineer_features
+from app.forecasting.training import (
+    FEATURE_COLS,
+    RssPeak,
+    compact_sales_frame,
+    dataset_cache_hit,
+    dataset_cache_key,
+    load_model,
+    train_model,
+    training_arrays,
+)
+
+
+@pytest.fixture
+def sales_df():
+    rng = np.random.default_rng(1)
+    rows = []
+    for p, pid in enumerate(["P0002", "P0001", "P0003"]):
+        for i in range(150):
+            rows.append({
+                "product_id": pid,
+                "date": date(2024, 1, 1) + timedelta(days=i),
+                "quantity": float(rng.integers(0, 30) + 10 * p + (i % 7)),
+                "revenue": 0.0,
+                "price": float(rng.uniform(5, 15)),
+                "promo_flag": i % 9 == 0,
+                "category_id": f"C{p % 2}",
+            })
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture(autouse=True)
+def artifacts(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.forecasting.training.settings.artifacts_path", str(tmp_path))
+    return tmp_path
+
+
+def test_compact_frame_uses_codes_and_narrow_types(sales_df):
+    compact = compact_sales_frame(sales_df)
+    assert compact["date"].dtype.kind == "M"
+    assert compact.drop(columns="date").dtypes.to_dict() == {
+        "product_id": np.int32,
+        "quantity": np.float32,
+        "price": np.float32,
+        "promo_flag": np.int8,
+        "category_id": np.int16,
+    }
+    # Sorted codes keep the per-product order of the string ids
+    assert compact.loc[sales_df["product_id"] == "P0001", "product_id"].unique().tolist() == [0]
+    assert compact.memory_usage(deep=True).sum() < sales_df.memory_usage(deep=True).sum() / 3
+
+
+def test_training_arrays_match_engineered_features(sales_df):
+    split = date(2024, 5, 1)
+    arrays = training_arrays(sales_df, split)
+    expected = engineer_features(sales_df).sort_values(["product_id", "date"])
+    expected_dates = pd.to_datetime(expected["date"])
+    train = expected[expected_dates < pd.Timestamp(split)]
+
+    assert arrays.X_train.dtype == np.float32 and arrays.X_train.flags["C_CONTIGUOUS"]
+    assert arrays.X_train.shape == (len(train), len(FEATURE_COLS))
+    np.testing.assert_allclose(
+        arrays.X_train, train[FEATURE_COLS].to_numpy(np.float32), rtol=1e-5, atol=1e-6
+    )
+    assert arrays.eval_source == "test"
+    assert len(arrays.actuals_eval) == len(expected) - len(train)
+
+
+def test_low_memory_training_tracks_standard_metrics(sales_df):
+    _, standard = train_model(sales_df, date(2024, 1, 1), date(2024, 5, 29), split_date=date(2024, 5, 1))
+    booster, lean = train_model(
+        sales_df, date(2024, 1, 1), date(2024, 5, 29), split_date=date(2024, 5, 1), low_memory=True
+    )
+
+    assert lean["n_eval_samples"] == standard["n_eval_samples"]
+    assert lean["mae"] == pytest.approx(standard["mae"], rel=0.1)
+    assert (lean["low_memory"], lean["dataset_cache"]) == (True, None)
+    with open(lean["file_path"].replace(".txt", "_meta.json")) as f:
+        meta = json.load(f)
+    assert meta["peak_rss_mb"] > 0 and meta["low_memory"] is True
+    assert booster.feature_name() == FEATURE_COLS
+
+
+def test_cached_dataset_trains_without_a_frame(sales_df, artifacts):
+    window = (date(2024, 1, 1), date(2024, 5, 29))
+    key = dataset_cache_key({"dataset": "sales_facts", "version": 3}, *window, None)
+    assert key != dataset_cache_key({"dataset": "sales_facts", "version": 4}, *window, None)
+
+    _, first = train_model(sales_df, *window, low_memory=True, cache_key=key)
+    assert first["dataset_cache"] == "miss" and dataset_cache_hit(key)
+    _, second = train_model(None, *window, low_memory=True, cache_key=key, params={"num_leaves": 15})
+    _, same = train_model(None, *window, low_memory=True, cache_key=key)
+
+    assert second["dataset_cache"] == "hit"
+    assert same["mae"] == pytest.approx(first["mae"])
+    X = np.random.default_rng(0).uniform(0, 20, (5, len(FEATURE_COLS)))
+    np.testing.assert_allclose(load_model(same["file_path"]).predict(X), load_model(first["file_path"]).predict(X))
+    assert load_model(second["file_path"]).params["num_leaves"] == 15
+
+    with pytest.raises(ValueError, match="sales frame"):
+        train_model(None, *window, low_memory=True, cache_key="missing")
+
+
+def test_dataset_cache_keeps_newest_entries(sales_df, artifacts, monkeypatch):
+    monkeypatch.setattr("app.forecasting.training.settings.training_dataset_cache_entries", 1)
+    window = (date(2024, 1, 1), date(2024, 5, 29))
+    old = dataset_cache_key({"version": 1}, *window, None)
+    new = dataset_cache_key({"version": 2}, *window, None)
+    train_model(sales_df, *window, low_memory=True, cache_key=old)
+    os.utime(os.path.join(artifacts, "dataset_cache", f"{old}.bin"), (0, 0))
+    train_model(sales_df, *window, low_memory=True, cache_key=new)
+
+    assert not dataset_cache_hit(old) and dataset_cache_hit(new)
+
+
+def test_rss_peak_covers_only_its_own_block():
+    with RssPeak() as big:
+        buffer = np.ones(50_000_000)  # ~400 MB, touched
+        during = big.mb
+        del buffer
+    with RssPeak() as small:
+        pass
+
+    if during is None:
+        pytest.skip("current RSS is not available on this platform")
+    assert big.mb >= during
+    # A process-lifetime high-water mark would still report the buffer here
+    assert small.mb < during - 200
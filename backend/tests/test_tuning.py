@@ -0,0 +1,115 @@
+"""Tests for time-series cross-validation and the hyperparameter search."""
+
+import os
+from datetime import date, timedelta
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.forecasting.training import LGB_PARAMS
+from app.forecasting.tuning import (
+    evaluate_candidates,
+    expanding_folds,
+    halving_schedule,
+    run_search,
+    sample_candidates,
+    write_cv_matrix,
+)
+
+
+@pytest.fixture
+def sales_df():
+    rng = np.random.default_rng(2)
+    rows = []
+    for p, pid in enumerate(["P0001", "P0002", "P0003"]):
+        for i in range(120):
+            rows.append({
+                "product_id": pid,
+                "date": date(2024, 1, 1) + timedelta(days=i),
+                "quantity": float(rng.integers(0, 20) + 10 * p + 3 * (i % 7)),
+                "revenue": 0.0,
+                "price": float(rng.uniform(5, 15)),
+                "promo_flag": i % 9 == 0,
+                "category_id": "C1",
+            })
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def matrix(sales_df, tmp_path):
+    directory = str(tmp_path / "cv")
+    return directory, write_cv_matrix(sales_df, directory)
+
+
+def test_cv_matrix_is_sorted_by_date_and_memory_mappable(matrix):
+    directory, dates = matrix
+    assert np.all(dates[:-1] <= dates[1:])
+    X = np.load(os.path.join(directory, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(directory, "y.npy"), mmap_mode="r")
+    assert X.dtype == np.float32 and X.shape[0] == len(dates) == len(y)
+
+
+def test_expanding_folds_never_validate_on_training_dates(matrix):
+    _, dates = matrix
+    folds = expanding_folds(dates, n_folds=3, horizon_days=7)
+
+    assert [(f.valid_from, f.valid_to) for f in folds] == [
+        (date(2024, 4, 9), date(2024, 4, 15)),
+        (date(2024, 4, 16), date(2024, 4, 22)),
+        (date(2024, 4, 23), date(2024, 4, 29)),
+    ]
+    for f in folds:
+        # Early stopping uses the horizon before the window, fitting everything earlier
+        assert dates[f.fit_end] == np.datetime64(f.valid_from - timedelta(days=7))
+        assert dates[f.fit_end - 1] < dates[f.fit_end]
+        assert dates[f.train_end - 1] < np.datetime64(f.valid_from)
+        assert dates[f.train_end] == np.datetime64(f.valid_from)
+        assert dates[f.valid_end - 1] == np.datetime64(f.valid_to)
+    # Expanding: every fold trains on all rows before its window
+    assert folds[1].train_end == folds[0].valid_end
+    with pytest.raises(ValueError, match="No usable folds"):
+        expanding_folds(dates, n_folds=1, horizon_days=118)
+
+
+def test_halving_schedule_and_candidates():
+    assert halving_schedule(12, 540, eta=3) == [(12, 60), (4, 180), (1, 540)]
+    assert halving_schedule(1, 300) == [(1, 300)]
+    candidates = sample_candidates(4, seed=7)
+    assert candidates[0] == LGB_PARAMS
+    assert candidates == sample_candidates(4, seed=7)
+    assert all(0.6 <= c["feature_fraction"] <= 1.0 and c["bagging_freq"] == 1 for c in candidates[1:])
+
+
+def test_evaluate_candidates_reports_every_fold(matrix):
+    directory, dates = matrix
+    folds = expanding_folds(dates, n_folds=2, horizon_days=10)
+    scores = evaluate_candidates(directory, {0: LGB_PARAMS, 5: sample_candidates(2)[1]}, folds, 40, 5)
+
+    assert set(scores) == {0, 5}
+    for fold_metrics in scores.values():
+        assert [m["fold"] for m in fold_metrics] == [0, 1]
+        assert all(1 <= m["best_iteration"] <= 40 and m["mae"] > 0 for m in fold_metrics)
+        assert fold_metrics[1]["train_rows"] > fold_metrics[0]["train_rows"]
+        assert all(m["early_stopping_rows"] > 0 for m in fold_metrics)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("search,evaluations", [("halving", (6 + 2 + 1) * 2), ("random", 6 * 2)])
+async def test_run_search_returns_best_config_with_fold_metrics(matrix, search, evaluations):
+    directory, dates = matrix
+    folds = expanding_folds(dates, n_folds=2, horizon_days=10)
+    progress = AsyncMock()
+
+    result = await run_search(
+        directory, folds, sample_candidates(6), search=search, max_rounds=60, early_stopping_rounds=5,
+        eta=3, progress=progress,
+    )
+
+    assert result.evaluations == evaluations
+    assert result.n_candidates == 6
+    assert len(result.folds) == 2
+    assert result.cv["mae"] == pytest.approx(np.mean([f["mae"] for f in result.folds]))
+    assert result.rungs[-1]["rounds"] == 60
+    assert progress.await_args_list[-1].args[0] == 1.0
@@ -68,13 +68,16 @@ export async function fetchBacktest(
 export async function fetchHistoricalData(
   fromDate: string,
   toDate: string,
-  productId?: string
+  productId?: string,
+  options?: { resolution?: "day" | "week" | "month"; maxPoints?: number }
 ) {
   const params = new URLSearchParams({
     from_date: fromDate,
     to_date: toDate,
   });
   if (productId) params.set("product_id", productId);
+  if (options?.resolution) params.set("resolution", options.resolution);
+  if (options?.maxPoints) params.set("max_points", String(options.maxPoints));
   const r = await fetch(`${API_BASE}/api/data/historical?${params}`);
   if (!r.ok) throw new Error(await r.text());
   return r.json();